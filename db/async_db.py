@@ -0,0 +1,153 @@
+from __future__ import annotations
+
+import asyncio
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from pathlib import Path
+from typing import Any, Callable, TypeVar
+
+from sqlalchemy import event
+from sqlalchemy.engine import Result
+from sqlalchemy.orm import Session
+
+from db.db import DB_PATH, SessionLocal, _env_int, _set_sqlite_pragmas
+
+# 非同期(asyncio)用のDBアクセス
+# - aiosqlite があれば SQLAlchemy の asyncio 拡張(AsyncSession)を使う
+# - なければ同期 Session の処理をスレッドプールに逃がす互換実装を使う
+#   (どちらも `async with AsyncSessionLocal() as s: await s.execute(...)` で同じように書ける)
+# - execute() の結果は取り出し済み(バッファ済み)で返るので、await の後の .scalars().all() などでDBは触らない
+#
+# 使える操作: execute / scalar / scalars / get / add / add_all / flush / commit / rollback / close / run_sync
+
+T = TypeVar("T")
+
+try:
+    import aiosqlite  # noqa: F401  (ドライバがあるかどうかだけ見る)
+except ImportError:  # pragma: no cover
+    HAS_AIOSQLITE = False
+else:
+    HAS_AIOSQLITE = True
+
+
+if HAS_AIOSQLITE:
+    from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+    ASYNC_DATABASE_URL = f"sqlite+aiosqlite:///{Path(DB_PATH).as_posix()}"
+
+    async_engine = create_async_engine(
+        ASYNC_DATABASE_URL,
+        echo=False,
+        pool_size=_env_int("CINEMA_DB_POOL_SIZE", 8),
+        max_overflow=_env_int("CINEMA_DB_MAX_OVERFLOW", 8),
+        pool_timeout=_env_int("CINEMA_DB_POOL_TIMEOUT", 30),
+        connect_args={"timeout": _env_int("CINEMA_SQLITE_BUSY_TIMEOUT_MS", 10000) / 1000},
+    )
+    # 同期エンジンと同じ PRAGMA(WAL, busy_timeout など)を接続ごとに流す
+    event.listen(async_engine.sync_engine, "connect", _set_sqlite_pragmas)
+
+    # commit 後も属性を読めるようにする(非同期では遅延ロードができないため)
+    AsyncSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False)
+
+    async def dispose_async_engine() -> None:
+        await async_engine.dispose()
+
+else:
+    # DB処理用のスレッド数は接続プール(pool_size + max_overflow)に合わせる
+    _MAX_SESSIONS = _env_int("CINEMA_DB_POOL_SIZE", 8) + _env_int("CINEMA_DB_MAX_OVERFLOW", 8)
+    _executor = ThreadPoolExecutor(max_workers=_MAX_SESSIONS, thread_name_prefix="cinema-db")
+
+    # 使用中のセッション数の上限(イベントループごと)
+    # セッションは close まで接続を持ち続けるので、接続数より多く同時に開くと
+    # スレッドが全部「接続待ち」で埋まり、接続を返すはずの処理が実行されずに止まる
+    _session_slots: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore] = (
+        weakref.WeakKeyDictionary()
+    )
+
+    def _slots() -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        slots = _session_slots.get(loop)
+        if slots is None:
+            slots = _session_slots[loop] = asyncio.Semaphore(_MAX_SESSIONS)
+        return slots
+
+    class AsyncSession:  # type: ignore[no-redef]
+        """同期 Session をスレッドで動かす AsyncSession 互換(よく使う操作だけ)。
+
+        1つのセッションの操作は await で順番に実行されるので、同時に2スレッドから触られることはない。
+        """
+
+        def __init__(self, **kwargs: Any):
+            self.sync_session: Session = SessionLocal(expire_on_commit=False, **kwargs)
+            self._slot: asyncio.Semaphore | None = None
+
+        async def _run(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+            # 最初のDB操作で枠を取り、close で返す
+            if self._slot is None:
+                slot = _slots()
+                await slot.acquire()
+                self._slot = slot
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(_executor, partial(fn, *args, **kwargs))
+
+        async def __aenter__(self) -> AsyncSession:
+            return self
+
+        async def __aexit__(self, *exc_info: Any) -> None:
+            await self.close()
+
+        async def execute(self, statement: Any, params: Any = None, **kwargs: Any) -> Result:
+            # スレッド側で全行取り出してから返す(AsyncSession.execute と同じくバッファ済み)
+            # 行を返さない文(UPDATE など)はそのまま返す(rowcount は読める)
+            def _execute() -> Any:
+                result = self.sync_session.execute(statement, params, **kwargs)
+                return result.freeze() if getattr(result, "returns_rows", True) else result
+
+            result = await self._run(_execute)
+            return result() if callable(result) else result
+
+        async def scalar(self, statement: Any, params: Any = None, **kwargs: Any) -> Any:
+            return await self._run(self.sync_session.scalar, statement, params, **kwargs)
+
+        async def scalars(self, statement: Any, params: Any = None, **kwargs: Any) -> Any:
+            return (await self.execute(statement, params, **kwargs)).scalars()
+
+        async def get(self, entity: Any, ident: Any, **kwargs: Any) -> Any:
+            return await self._run(self.sync_session.get, entity, ident, **kwargs)
+
+        def add(self, instance: Any) -> None:
+            self.sync_session.add(instance)
+
+        def add_all(self, instances: Any) -> None:
+            self.sync_session.add_all(instances)
+
+        async def flush(self) -> None:
+            await self._run(self.sync_session.flush)
+
+        async def commit(self) -> None:
+            await self._run(self.sync_session.commit)
+
+        async def rollback(self) -> None:
+            await self._run(self.sync_session.rollback)
+
+        async def close(self) -> None:
+            if self._slot is None:
+                # DBに触っていない(接続を持っていない)
+                self.sync_session.close()
+                return
+            try:
+                await asyncio.get_running_loop().run_in_executor(_executor, self.sync_session.close)
+            finally:
+                self._slot.release()
+                self._slot = None
+
+        async def run_sync(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+            # fn(sync_session, *args) をスレッドで実行する(AsyncSession.run_sync と同じ呼び方)
+            return await self._run(fn, self.sync_session, *args, **kwargs)
+
+    def AsyncSessionLocal(**kwargs: Any) -> AsyncSession:  # type: ignore[no-redef]  # noqa: N802
+        return AsyncSession(**kwargs)
+
+    async def dispose_async_engine() -> None:
+        return None
@@ -1,31 +1,31 @@
 from __future__ import annotations
 
 import os
+from contextlib import contextmanager
 from datetime import datetime
+from typing import Iterator
 
 from pathlib import Path
 
-from sqlalchemy import create_engine
+from sqlalchemy import MetaData, Table, create_engine, event, inspect
+from sqlalchemy.engine import Connection
 from sqlalchemy.orm import sessionmaker
 
 try:
     # 通常のインポートパス (例: python router.py)
-    from db.models import Base
+    from db.models import Base, uuid_to_bytes
 except ImportError:  # pragma: no cover
     # dbディレクトリ内から実行する場合のパス (例: python db/init_db.py)
     # 初期化時はこちらが動く
-    from models import Base
+    from models import Base, uuid_to_bytes
 
-# DBファイルのパスと接続URLの設定
 _ROOT_DIR = Path(__file__).resolve().parent.parent  # プロジェクトルート
-DB_PATH = str((_ROOT_DIR / "cinema.db").resolve())  # DBファイルの絶対パス
-DATABASE_URL = f"sqlite:///{Path(DB_PATH).as_posix()}" # SQLiteの接続URL
 
 
 def _load_dotenv_if_exists() -> None:
     """プロジェクトルートの .env を（あれば）読み込む。
 
-    - .env はローカル設定用（管理者アカウントなど）
+    - .env はローカル設定用（管理者アカウント・DB設定など）
     - python-dotenv が未インストールでも動作は継続する（単に読み込めないだけ）
     """
 
@@ -41,14 +41,69 @@ def _load_dotenv_if_exists() -> None:
         return
 
 
+def _env_str(key: str, default: str) -> str:
+    value = (os.environ.get(key) or "").strip()
+    return value if value else default
+
+
+def _env_int(key: str, default: int) -> int:
+    # 数値として読めない値は無視して既定値を使う
+    try:
+        return int(_env_str(key, str(default)))
+    except ValueError:
+        return default
+
+
 _load_dotenv_if_exists()
 
+# DBファイルのパスと接続URLの設定
+# CINEMA_DB_PATH で別ファイルを指定できる(ベンチマーク用の一時DBなど)
+DB_PATH = str(Path(_env_str("CINEMA_DB_PATH", str(_ROOT_DIR / "cinema.db"))).resolve())  # DBファイルの絶対パス
+DATABASE_URL = f"sqlite:///{Path(DB_PATH).as_posix()}" # SQLiteの接続URL
+
+# 接続ごとに流すPRAGMA(すべて .env / 環境変数で上書き可)
+# - journal_mode=WAL: 読み込みが書き込みをブロックしない(改札・窓口端末の同時アクセス向け)
+# - synchronous=NORMAL: WALなら電源断以外でDBが壊れることはなく、commitごとのfsyncが減る
+# - cache_size: 負数はKiB指定(既定 64MiB)
+# - busy_timeout: ロック待ちでいきなり "database is locked" にせず待つ時間(ms)
+SQLITE_PRAGMAS: dict[str, str] = {
+    "journal_mode": _env_str("CINEMA_SQLITE_JOURNAL_MODE", "WAL"),
+    "synchronous": _env_str("CINEMA_SQLITE_SYNCHRONOUS", "NORMAL"),
+    "cache_size": str(_env_int("CINEMA_SQLITE_CACHE_SIZE", -65536)),
+    "mmap_size": str(_env_int("CINEMA_SQLITE_MMAP_SIZE", 256 * 1024 * 1024)),
+    "temp_store": _env_str("CINEMA_SQLITE_TEMP_STORE", "MEMORY"),
+    "busy_timeout": str(_env_int("CINEMA_SQLITE_BUSY_TIMEOUT_MS", 10000)),
+}
+
 # engine: DBへの接続口みたいなもの, SQLAlchemyのコア部分
+# SQLiteは書き込みが常に1本なので、プールは「読み込み用の接続を使い回す」ための設定。
+# 接続数を増やしても書き込みは速くならないが、読み込みはWALで並列に走る。
 engine = create_engine(
     DATABASE_URL,
     echo=False,    # SQLログ見たいなら True
     future=True,   # 2.0スタイルを有効にするオプション
+    pool_size=_env_int("CINEMA_DB_POOL_SIZE", 8),
+    max_overflow=_env_int("CINEMA_DB_MAX_OVERFLOW", 8),
+    pool_timeout=_env_int("CINEMA_DB_POOL_TIMEOUT", 30),
+    connect_args={
+        # プール内の接続をスレッド間で受け渡せるようにする
+        "check_same_thread": False,
+        # sqlite3ドライバ側のロック待ち(秒)も busy_timeout に合わせる
+        "timeout": _env_int("CINEMA_SQLITE_BUSY_TIMEOUT_MS", 10000) / 1000,
+    },
 )
+
+
+@event.listens_for(engine, "connect")
+def _set_sqlite_pragmas(dbapi_connection, connection_record) -> None:
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in SQLITE_PRAGMAS.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+    finally:
+        cursor.close()
+
+
 # DB操作用のセッションを作るためのクラス
 # セッション: DB操作の単位, やり取りを管理する
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)
@@ -56,16 +111,172 @@ SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, futu
 # DB初期化関数: テーブルを作成する
 def init_db() -> None:
     Base.metadata.create_all(engine)
+    upgrade_db()
+
+
+# 別のインデックスに置き換えたので、既存DBに残っていれば消すもの
+_OBSOLETE_INDEXES = {
+    "shows": ("ix_shows_movie_start",),  # → ix_shows_movie_cover(先頭2列が同じ)
+}
+
+
+def ensure_indexes(conn: Connection) -> list[str]:
+    # create_all は既存テーブルをまるごとスキップするため、後から models.py に足した
+    # インデックスは既存の cinema.db に作られない。ここで不足分だけ作成する(冪等)。
+    inspector = inspect(conn)
+    created: list[str] = []
+    for table in Base.metadata.sorted_tables:
+        existing = {ix["name"] for ix in inspector.get_indexes(table.name)}
+        for name in _OBSOLETE_INDEXES.get(table.name, ()):
+            if name in existing:
+                conn.exec_driver_sql(f'DROP INDEX "{name}"')
+                created.append(f"-{name}")
+        for index in table.indexes:
+            if index.name in existing:
+                continue
+            index.create(conn)
+            created.append(str(index.name))
+    return created
+
+
+@contextmanager
+def write_transaction() -> Iterator[Connection]:
+    """BEGIN IMMEDIATE で先に書き込みロックを取ってからトランザクションを始める。
+
+    sqlite3ドライバの既定では BEGIN が最初のINSERT/UPDATEまで遅延され、DDLは
+    トランザクションの外で実行されてしまう。まとめて巻き戻したい処理はこちらを使う。
+    """
+    with engine.connect() as conn:
+        # ドライバ側の自動BEGINを止め、BEGIN/COMMITをこちらで発行する
+        conn.execution_options(isolation_level="AUTOCOMMIT")
+        conn.exec_driver_sql("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.exec_driver_sql("ROLLBACK")
+            raise
+        conn.exec_driver_sql("COMMIT")
+
+
+def _column_types(conn: Connection, table_name: str) -> dict[str, str]:
+    rows = conn.exec_driver_sql(f'PRAGMA table_info("{table_name}")').all()
+    return {str(row[1]): str(row[2]).upper() for row in rows}
+
+
+def rebuild_table(conn: Connection, table: Table, column_exprs: dict[str, str]) -> None:
+    # SQLiteは ALTER TABLE で列の型を変えられないので、公式の手順どおり
+    # 「新しい定義でテーブル作成 → 全行コピー → 旧テーブル削除 → リネーム」で作り直す。
+    # column_exprs: 列名 → コピー時に使うSQL式(変換が必要な列だけ指定)
+    old_columns = _column_types(conn, table.name)
+    tmp_name = f"_{table.name}_rebuild"
+
+    # インデックス名は新テーブル側で使うので、旧テーブルのものは先に消す
+    for ix in inspect(conn).get_indexes(table.name):
+        conn.exec_driver_sql(f"DROP INDEX IF EXISTS \"{ix['name']}\"")
+
+    # 外部キーの参照先を解決できるよう、全テーブルを写したMetaData上で作る
+    metadata = MetaData()
+    for t in Base.metadata.sorted_tables:
+        t.to_metadata(metadata)
+    tmp = table.to_metadata(metadata, name=tmp_name)
+    tmp.create(conn)
+
+    # 旧テーブルにある列だけコピー(新しく増えた列は既定値のまま)
+    columns = [c.name for c in table.columns if c.name in old_columns]
+    col_list = ", ".join(f'"{c}"' for c in columns)
+    select_list = ", ".join(column_exprs.get(c, f'"{c}"') for c in columns)
+    conn.exec_driver_sql(f'INSERT INTO "{tmp_name}" ({col_list}) SELECT {select_list} FROM "{table.name}"')
+    conn.exec_driver_sql(f'DROP TABLE "{table.name}"')
+    conn.exec_driver_sql(f'ALTER TABLE "{tmp_name}" RENAME TO "{table.name}"')
+
+
+# ISO文字列(YYYY-MM-DDTHH:MM)で保存していた日時列 → 経過分(INTEGER)
+_EPOCH_MINUTE_COLUMNS: dict[str, tuple[str, ...]] = {
+    "shows": ("start_at", "end_at"),
+    "tickets": ("issued_at", "used_at"),
+}
+
+
+def _epoch_minute_exprs(conn: Connection) -> dict[str, dict[str, str]]:
+    exprs: dict[str, dict[str, str]] = {}
+    for table_name, columns in _EPOCH_MINUTE_COLUMNS.items():
+        types = _column_types(conn, table_name)
+        if all(types.get(c, "INTEGER") == "INTEGER" for c in columns):
+            continue
+
+        # strftime('%s') はタイムゾーン変換なしで秒に直すので、to_epoch_min と同じ値になる
+        exprs[table_name] = {
+            c: (
+                f"CASE WHEN typeof(\"{c}\") = 'text' "
+                f"THEN CAST(strftime('%s', replace(\"{c}\", 'T', ' ')) AS INTEGER) / 60 "
+                f"ELSE \"{c}\" END"
+            )
+            for c in columns
+        }
+    return exprs
+
+
+def _uuid_blob(value):
+    # UUID文字列 → 16バイト。UUIDとして読めない値は(一意性を保つため)元の値のまま残す
+    if not isinstance(value, str):
+        return value
+    return uuid_to_bytes(value) or value
+
+
+def _ticket_uuid_exprs(conn: Connection) -> dict[str, dict[str, str]]:
+    # TEXTで保存していたチケットUUID → 16バイトのBLOB
+    # SQLite 3.41 未満には unhex() がないので、変換用の関数をこの接続に登録して使う
+    if _column_types(conn, "tickets").get("uuid", "BLOB") == "BLOB":
+        return {}
+    conn.connection.driver_connection.create_function("cinema_uuid_blob", 1, _uuid_blob, deterministic=True)
+    return {"tickets": {"uuid": 'cinema_uuid_blob("uuid")'}}
+
+
+def _migrate_columns(conn: Connection) -> list[str]:
+    # 列の変換が必要なテーブルを、1テーブルにつき1回だけ作り直す
+    # (作り直すと列の宣言型が最新になるので、変換はまとめて行わないと後の判定で漏れる)
+    exprs: dict[str, dict[str, str]] = {}
+    for found in (_epoch_minute_exprs(conn), _ticket_uuid_exprs(conn)):
+        for table_name, column_exprs in found.items():
+            exprs.setdefault(table_name, {}).update(column_exprs)
+    for table_name, column_exprs in exprs.items():
+        rebuild_table(conn, Base.metadata.tables[table_name], column_exprs)
+    return list(exprs)
+
+
+def upgrade_db() -> None:
+    # 既存DBを作り直さずに最新スキーマへ寄せる(何度実行してもOK)
+    # 途中で失敗した場合はまとめて巻き戻る
+    with write_transaction() as conn:
+        migrated = _migrate_columns(conn)
+        created = ensure_indexes(conn)
+        # 集計テーブル(上映日カレンダー・上映回ごとの販売状況)を追加する前のDBなら、既存の上映回・チケットから作る
+        # (services は db.db を import するので、ここで遅延 import する)
+        from services import movieSearch, showCalendar, showOccupancy
+
+        showCalendar.fill_if_empty(conn)
+        showOccupancy.fill_if_empty(conn)
+        # 映画の全文検索(FTS5 の仮想テーブルはモデルにないので create_all では作られない)・タグ
+        movieSearch.ensure_search_index(conn)
+        movieSearch.fill_if_empty(conn)
+        # スキーマを変えたときだけ統計情報を更新(クエリプランナ用)
+        if migrated or created:
+            conn.exec_driver_sql("ANALYZE")
 
 
 def reset_db(remove_file: bool = True) -> None:
     # DBの作り直し
 
-    if remove_file and os.path.exists(DB_PATH):
-        os.remove(DB_PATH)
+    if remove_file:
+        # WALモードでは -wal / -shm も一緒に消さないと古い内容が復活する
+        engine.dispose()
+        for path in (DB_PATH, f"{DB_PATH}-wal", f"{DB_PATH}-shm"):
+            if os.path.exists(path):
+                os.remove(path)
 
-    # テーブル作成
+    # テーブル作成(init_db() と同じく、集計テーブルの中身・検索索引などもここでそろえる)
     Base.metadata.create_all(engine)
+    upgrade_db()
 
     # 環境変数から管理者ユーザーを作成
     admin_username = (os.environ.get("CINEMA_ADMIN_USERNAME") or "").strip()
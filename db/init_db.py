@@ -1,5 +1,14 @@
-from db import reset_db
+import os
+import sys
+
+# python db/init_db.py で実行すると db/ が先頭に入るので、プロジェクトルートを先に入れて
+# db パッケージ・services(upgrade_db が使う)を同じ形で import できるようにする
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if sys.path[0] != ROOT_DIR:
+    sys.path.insert(0, ROOT_DIR)
+
+from db.db import reset_db
 
 if __name__ == "__main__":
     reset_db(remove_file=True)
-    print("OK: reset tables in cinema.db")
\ No newline at end of file
+    print("OK: reset tables in cinema.db")
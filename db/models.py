@@ -1,11 +1,15 @@
 from __future__ import annotations
 
 import uuid
+from datetime import datetime, timedelta
 
 from sqlalchemy import (
     ForeignKey,
+    Index,
     Integer,
+    LargeBinary,
     String,
+    TypeDecorator,
     UniqueConstraint,
 )
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
@@ -15,6 +19,79 @@ class Base(DeclarativeBase):
     pass
 
 
+# 日時は「1970-01-01T00:00 からの経過分数」(整数)でDBに保存する
+# - タイムゾーンは持たない(壁時計の時刻をそのまま分に換算する)
+# - 整数なので範囲検索・インデックスが軽く、表示のたびに文字列をパースしなくて済む
+_EPOCH = datetime(1970, 1, 1)
+_MINUTE = timedelta(minutes=1)
+
+
+def to_epoch_min(value: datetime | str | int) -> int:
+    # datetime / ISO文字列(YYYY-MM-DDTHH:MM, YYYY-MM-DD HH:MM) / 整数 を分に揃える
+    if isinstance(value, int):
+        return value
+    if isinstance(value, str):
+        value = datetime.strptime(value.strip().replace(" ", "T"), "%Y-%m-%dT%H:%M")
+    return (value - _EPOCH) // _MINUTE
+
+
+def from_epoch_min(value: int) -> datetime:
+    # timedelta(minutes=...) より単位の timedelta の整数倍の方が速い(繰り返し上映の展開で回数が多い)
+    return _EPOCH + _MINUTE * int(value)
+
+
+class EpochMinutes(TypeDecorator):
+    """日時をINTEGER(経過分)で保存し、Python側では datetime として扱う列型。
+
+    検索条件に ISO文字列や datetime を渡しても、自動で整数に変換して比較される。
+    """
+
+    impl = Integer
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        return to_epoch_min(value)
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        return from_epoch_min(value)
+
+
+# チケットUUIDは文字列(36文字)ではなく16バイトのBLOBでDBに保存する
+# - インデックスが小さくなり(キーが半分以下)、照合の比較も短いバイト列同士で済む
+# - 大文字・ハイフンなしで入力されたUUIDも、同じ16バイトになるので一致する
+def uuid_to_bytes(value: str | bytes | uuid.UUID) -> bytes:
+    if isinstance(value, bytes):
+        return value
+    if isinstance(value, uuid.UUID):
+        return value.bytes
+    try:
+        return uuid.UUID(str(value).strip()).bytes
+    except ValueError:
+        # UUIDとして読めない入力は、どのチケットとも一致しない空のバイト列にする
+        return b""
+
+
+class UuidBytes(TypeDecorator):
+    """UUIDをBLOB(16バイト)で保存し、Python側では UUID文字列(小文字・ハイフン付き)として扱う列型。"""
+
+    impl = LargeBinary
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        return uuid_to_bytes(value)
+
+    def process_result_value(self, value, dialect):
+        if value is None or isinstance(value, str):
+            return value
+        return str(uuid.UUID(bytes=bytes(value)))
+
+
 #DBのテーブル定義
 
 
@@ -53,10 +130,11 @@ class Movie(Base):
     default_price: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
 
     # JSON文字列を入れる想定（例: '["action","comedy"]'）
-    tags_json: Mapped[str] = mapped_column(String, nullable=False, default="[]")
+    # タグ・説明は一覧では使わないので遅延読み込み(触ったときに2列まとめて読む)
+    tags_json: Mapped[str] = mapped_column(String, nullable=False, default="[]", deferred=True, deferred_group="details")
 
     # 作品説明（任意）
-    description: Mapped[str | None] = mapped_column(String, nullable=True)
+    description: Mapped[str | None] = mapped_column(String, nullable=True, deferred=True, deferred_group="details")
 
     # 上映期間（任意）
     run_start_date: Mapped[str | None] = mapped_column(String, nullable=True)  # ISO8601 
@@ -71,6 +149,13 @@ class Movie(Base):
 
 class Show(Base):
     __tablename__ = "shows"
+    __table_args__ = (
+        # カレンダー/上映回選択: movie_id + start_at の範囲検索
+        # 上映回選択で表示する列(hall/end_at/price)まで含めて、テーブル本体を読まずに済ませる
+        Index("ix_shows_movie_cover", "movie_id", "start_at", "hall", "end_at", "price"),
+        # スケジュール衝突チェック: hall + 時間帯の範囲検索(end_atまで含めてテーブルを読まずに済ませる)
+        Index("ix_shows_hall_start_end", "hall", "start_at", "end_at"),
+    )
 
     #回ごとのidと、上映される映画のID
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
@@ -78,8 +163,8 @@ class Show(Base):
 
     # 上映情報
     hall: Mapped[str] = mapped_column(String, nullable=False)      # "A"～"D"
-    start_at: Mapped[str] = mapped_column(String, nullable=False)  # ISO8601
-    end_at: Mapped[str] = mapped_column(String, nullable=False)    # ISO8601
+    start_at: Mapped[datetime] = mapped_column(EpochMinutes, nullable=False)  # 経過分(INTEGER)
+    end_at: Mapped[datetime] = mapped_column(EpochMinutes, nullable=False)    # 経過分(INTEGER)
     #end_atはmovieのduration_minから自動算出(持っとく方が便利)
 
     # 価格情報（基本料金）
@@ -94,14 +179,28 @@ class Show(Base):
         cascade="all, delete-orphan",
     )
 
+    # 座席の仮押さえも、showが消えたら一緒に消す
+    seat_holds: Mapped[list["SeatHold"]] = relationship(
+        back_populates="show",
+        cascade="all, delete-orphan",
+    )
+
 
 class Ticket(Base):
     __tablename__ = "tickets"
+    __table_args__ = (
+        # 予約一覧/キャンセル: user_id + 未使用(used_at IS NULL) + 発行日時順
+        Index("ix_tickets_user_used_issued", "user_id", "used_at", "issued_at"),
+        # 予約履歴(使用済みも含む)のページ送り: user_id + 発行日時順
+        Index("ix_tickets_user_issued", "user_id", "issued_at"),
+        # 上映回ごとのチケット数集計・削除時のcascade
+        Index("ix_tickets_show", "show_id"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
 
     # QRに入れる一意ID、当日改札の照合用
-    uuid: Mapped[str] = mapped_column(String, nullable=False, unique=True)
+    uuid: Mapped[str] = mapped_column(UuidBytes, nullable=False, unique=True)
 
     show_id: Mapped[int] = mapped_column(ForeignKey("shows.id"), nullable=False)
 
@@ -120,8 +219,8 @@ class Ticket(Base):
     sum_price: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
 
     # 改札用に、発行・使用日時を保持
-    issued_at: Mapped[str | None] = mapped_column(String, nullable=True)
-    used_at: Mapped[str | None] = mapped_column(String, nullable=True)
+    issued_at: Mapped[datetime | None] = mapped_column(EpochMinutes, nullable=True)
+    used_at: Mapped[datetime | None] = mapped_column(EpochMinutes, nullable=True)
 
     # Showとの関連付け
     show: Mapped["Show"] = relationship(back_populates="tickets")
@@ -142,6 +241,8 @@ class TicketSeat(Base):
     __table_args__ = (
         # 同一showで同一seatを二重予約できないようにする
         UniqueConstraint("show_id", "seat", name="uq_ticket_seats_show_seat"),
+        # チケットごとの座席取得(改札/QR表示)
+        Index("ix_ticket_seats_ticket_seat", "ticket_id", "seat"),
     )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
@@ -153,4 +254,92 @@ class TicketSeat(Base):
     # 
     seat: Mapped[str] = mapped_column(String, nullable=False)  # "A-1" 等
 
-    ticket: Mapped["Ticket"] = relationship(back_populates="seats")
\ No newline at end of file
+    ticket: Mapped["Ticket"] = relationship(back_populates="seats")
+
+
+# 上映日カレンダーの集計(映画 × 上映日ごとに1行)
+# - カレンダー表示で上映回を全件読まずに済むよう、上映回数・最初の開始・座席数・販売済み席数を持つ
+# - 上映回の追加/削除(AdminScheduleEdit)、チケットの購入/キャンセルのたびに同じトランザクションで更新する
+#   (services.showCalendar)
+class ShowDay(Base):
+    __tablename__ = "show_days"
+    __table_args__ = {"sqlite_with_rowid": False}
+
+    movie_id: Mapped[int] = mapped_column(ForeignKey("movies.id"), primary_key=True)
+    # 上映日の 00:00(経過分)。カレンダーは movie_id + day の範囲で主キーから引く
+    day: Mapped[datetime] = mapped_column(EpochMinutes, primary_key=True)
+
+    show_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    first_start_at: Mapped[datetime] = mapped_column(EpochMinutes, nullable=False)
+    # その日の上映回の総座席数(ホールのレイアウトから) / 販売済みの席数
+    seat_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    sold_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+
+# 上映回ごとの販売状況(上映回1つにつき1行。行がなければ全部0)
+# - 上映回選択で残席を出すときに、上映回ごとに ticket_seats を数えずに済むようにする
+# - チケットの購入/キャンセル、上映回の削除と同じトランザクションで更新する(services.showOccupancy)
+class ShowOccupancy(Base):
+    __tablename__ = "show_occupancy"
+    __table_args__ = {"sqlite_with_rowid": False}
+
+    show_id: Mapped[int] = mapped_column(ForeignKey("shows.id"), primary_key=True)
+
+    # 予約済みの席数 / チケット枚数 / 売上(チケットの sum_price の合計)
+    seat_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    ticket_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    revenue: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+
+# 映画のタグ(tags_json を1タグ1行に展開したもの。タグで映画を引く用)
+# - タグは NFKC + 小文字にそろえて入れる。映画の追加・編集・削除と同じトランザクションで更新する(services.movieSearch)
+# - タイトル・説明の全文検索(FTS5 の movies_fts)はモデルにできないので services.movieSearch で作る
+class MovieTag(Base):
+    __tablename__ = "movie_tags"
+    __table_args__ = (
+        # タグ → 映画
+        Index("ix_movie_tags_tag_movie", "tag", "movie_id"),
+        {"sqlite_with_rowid": False},
+    )
+
+    movie_id: Mapped[int] = mapped_column(ForeignKey("movies.id"), primary_key=True)
+    tag: Mapped[str] = mapped_column(String, primary_key=True)
+
+
+# キャッシュの版(キャッシュ1種類につき1行。行がなければ版0)
+# - 元のテーブルを書き換えたら同じトランザクションで版を上げ、各プロセスのキャッシュを無効にする
+# - 今は映画一覧(name="movies", services.movieCatalog)だけ
+class CacheVersion(Base):
+    __tablename__ = "cache_versions"
+    __table_args__ = {"sqlite_with_rowid": False}
+
+    name: Mapped[str] = mapped_column(String, primary_key=True)
+    version: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+
+# 座席の仮押さえ(座席選択〜購入確定までの間、他の人に取られないようにする)
+# - hold_token ごと(=購入手続き1回ごと)に座席を押さえ、expires_at を過ぎたら無効
+# - 購入確定時に TicketSeat に置き換えて削除する
+class SeatHold(Base):
+    __tablename__ = "seat_holds"
+    __table_args__ = (
+        # 同一showで同一seatを二重に押さえられないようにする
+        UniqueConstraint("show_id", "seat", name="uq_seat_holds_show_seat"),
+        # 期限切れの掃除: expires_at の範囲削除
+        Index("ix_seat_holds_expires", "expires_at"),
+        # 購入確定/取り消し時に自分の押さえをまとめて引く
+        Index("ix_seat_holds_token", "hold_token"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    show_id: Mapped[int] = mapped_column(ForeignKey("shows.id"), nullable=False)
+    seat: Mapped[str] = mapped_column(String, nullable=False)  # "A-1" 等
+
+    # 押さえた手続きの識別子(セッションごとのランダム文字列)
+    hold_token: Mapped[str] = mapped_column(String, nullable=False)
+    user_id: Mapped[str | None] = mapped_column(ForeignKey("users.id"), nullable=True)
+
+    # 有効期限(経過分)。これ以前(<=)なら期限切れ
+    expires_at: Mapped[datetime] = mapped_column(EpochMinutes, nullable=False)
+
+    show: Mapped["Show"] = relationship(back_populates="seat_holds")
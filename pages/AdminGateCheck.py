@@ -1,29 +1,144 @@
-from datetime import datetime
-
 from rich.console import Console
 from rich.table import Table
 
 from utils.rich_compat import TABLE_KWARGS
 
-from sqlalchemy import select
-
-from db.db import SessionLocal
-from db.models import Movie, Show, Ticket, TicketSeat
+import sys
+import time
+from pathlib import Path
+
+from services.errors import TicketNotFoundError
+from services.gate import (
+    SCAN_ACCEPTED,
+    SCAN_DUPLICATE,
+    SCAN_UNKNOWN,
+    ScanResult,
+    check_in,
+    check_in_batch,
+    read_scan_batches,
+)
+from services.gateIndex import GateIndex
 from utils.datetimeFormat import format_ymd_hm
 
 console = Console(highlight=False)
 
+_SCAN_LABELS = {
+    SCAN_ACCEPTED: "[green]入場OK[/green]",
+    SCAN_DUPLICATE: "[red]使用済み[/red]",
+    SCAN_UNKNOWN: "[red]該当なし[/red]",
+}
+
+
+def _print_scan_results(results: list[ScanResult], first_no: int) -> None:
+    # 一括改札の結果(1行1件)
+    t = Table(**TABLE_KWARGS)
+    t.add_column("No", justify="right")
+    t.add_column("UUID", overflow="fold")
+    t.add_column("状態")
+    t.add_column("ホール")
+    t.add_column("開始")
+    t.add_column("座席")
+    for i, r in enumerate(results, start=first_no):
+        t.add_row(
+            str(i),
+            r.uuid,
+            _SCAN_LABELS[r.status],
+            r.hall or "-",
+            format_ymd_hm(r.start_at),
+            ", ".join(r.seats) if r.seats else "-",
+        )
+    console.print(t)
+
+
+# 事前読み込みモードで、入場記録をDBへ書くタイミング(件数 / 秒のどちらか早い方)
+OFFLINE_FLUSH_EVERY = 50
+OFFLINE_FLUSH_SEC = 30.0
+
+
+def _flush_offline(index: GateIndex) -> bool:
+    # 書けなかった分は残して、次の機会に書き直す
+    try:
+        result = index.flush()
+    except Exception as exc:
+        console.print(f"[red]入場記録の書き込みに失敗しました(未書き込み {index.pending_count}件): {exc}[/red]")
+        return False
+    for ticket_uuid in result.conflicts:
+        console.print(f"[yellow]他の端末で入場済みでした(二重入場の可能性): {ticket_uuid}[/yellow]")
+    return True
+
+
+def _run_offline() -> None:
+    # 当日分のチケットをメモリに読み込み、照合はメモリ上で行う(DBが遅くても待たない)
+    try:
+        index = GateIndex.load()
+    except Exception as exc:
+        console.print(f"[red]チケットを読み込めませんでした: {exc}[/red]")
+        return
+    console.print(f"本日分のチケット {len(index)}件(上映回 {len(index.shows)}件)を読み込みました。")
+    console.print("UUIDを読み取ってください (rで読み直し / bで終了)")
+
+    last_flush = time.monotonic()
+    while True:
+        raw = input("> ").strip()
+        if raw.lower() in {"", "b", "back"}:
+            break
+        if raw.lower() == "r":
+            # 新しく売れたチケット・他の端末での入場を反映する
+            _flush_offline(index)
+            try:
+                index.reload()
+            except Exception as exc:
+                console.print(f"[red]読み直しに失敗しました: {exc}[/red]")
+                continue
+            console.print(f"読み直しました: {len(index)}件")
+            continue
+
+        r = index.scan(raw)
+        if r.status == SCAN_UNKNOWN:
+            console.print(f"{_SCAN_LABELS[r.status]}  {r.uuid}")
+        else:
+            console.print(
+                f"{_SCAN_LABELS[r.status]}  {', '.join(r.seats) or '-'}  "
+                f"ホール{r.hall or '-'} {format_ymd_hm(r.start_at)}  {r.movie_title or '-'}"
+            )
+
+        if index.pending_count >= OFFLINE_FLUSH_EVERY or (
+            index.pending_count and time.monotonic() - last_flush >= OFFLINE_FLUSH_SEC
+        ):
+            _flush_offline(index)
+            last_flush = time.monotonic()
+
+    # 終了時は残りを書く(書けなければもう一度だけ試す)
+    if not _flush_offline(index):
+        _flush_offline(index)
+
+
+def _run_batch(batches) -> None:
+    # バッチごとに照合 → 結果表示。最後に件数をまとめて出す
+    counts = {SCAN_ACCEPTED: 0, SCAN_DUPLICATE: 0, SCAN_UNKNOWN: 0}
+    n = 0
+    try:
+        for batch in batches:
+            results = check_in_batch(batch)
+            _print_scan_results(results, n + 1)
+            n += len(results)
+            for r in results:
+                counts[r.status] += 1
+    except Exception as exc:
+        console.print(f"[red]更新に失敗しました: {exc}[/red]")
+    console.print(
+        f"合計 {n}件  入場OK={counts[SCAN_ACCEPTED]}  "
+        f"使用済み={counts[SCAN_DUPLICATE]}  該当なし={counts[SCAN_UNKNOWN]}"
+    )
+
 
 def run(session: dict) -> dict:
     """改札(UUID照合/used_at更新)(管理者向け）"""
     console.print("[bold][AdminGateCheck][/bold]")
 
-    def _now_iso_min() -> str:
-        return datetime.now().strftime("%Y-%m-%dT%H:%M")
-
     # チケットUUIDの入力待ち
     while True:
-        ticket_uuid = input("チケットUUIDを入力してください (bで戻る): ").strip()
+        ticket_uuid = input("チケットUUIDを入力してください (fでファイル一括 / sで連続読み取り / oで事前読み込み / bで戻る): ").strip()
         if ticket_uuid.lower() in {"b", "back"}:
             session["next_page"] = "admin_menu"
             return session
@@ -31,67 +146,54 @@ def run(session: dict) -> dict:
             session["next_page"] = "admin_menu"
             return session
 
-        # DBから該当するチケットを探す
-        with SessionLocal() as db_session:
-            ticket = (
-                db_session.execute(select(Ticket).where(Ticket.uuid == ticket_uuid))
-                .scalar_one_or_none()
-            )
-            if ticket is None:
-                console.print("[red]チケットが見つかりません。[/red]")
-                continue
-                
-            # 関連する上映・映画情報も取得
-            show = (
-                db_session.execute(select(Show).where(Show.id == ticket.show_id))
-                .scalar_one_or_none()
-            )
-            movie = None
-            if show is not None:
-                movie = (
-                    db_session.execute(select(Movie).where(Movie.id == show.movie_id))
-                    .scalar_one_or_none()
-                )
-
-            seats = (
-                db_session.execute(
-                    select(TicketSeat.seat)
-                    .where(TicketSeat.ticket_id == ticket.id)
-                    .order_by(TicketSeat.seat)
-                )
-                .scalars()
-                .all()
-            )
-
-            # 結果表示
-            t = Table(title="改札結果", **TABLE_KWARGS)
-            t.add_column("項目")
-            t.add_column("値")
-            t.add_row("UUID", ticket.uuid)
-            t.add_row("名前", ticket.user_name or "-")
-            t.add_row("座席", ", ".join(seats) if seats else "-")
-            if show is not None:
-                t.add_row("開始", format_ymd_hm(show.start_at))
-                t.add_row("ホール", show.hall)
-            if movie is not None:
-                t.add_row("映画", movie.title)
-
-            if ticket.used_at:
-                t.add_row("状態", "[red]使用済み[/red]")
-                t.add_row("使用日時", format_ymd_hm(ticket.used_at) if ticket.used_at else "-")
-                console.print(t)
-                continue
-
-            # 未使用なら使用済みに更新
-            ticket.used_at = _now_iso_min()
+        # ファイル一括: 1行1UUIDのファイルをまとめて照合
+        if ticket_uuid.lower() == "f":
+            path = Path(input("ファイルのパス: ").strip())
             try:
-                db_session.commit()
-            except Exception as exc:
-                db_session.rollback()
-                console.print(f"[red]更新に失敗しました: {exc}[/red]")
-                continue
-
+                with path.open(encoding="utf-8") as f:
+                    _run_batch(read_scan_batches(f, live=False))
+            except OSError as exc:
+                console.print(f"[red]ファイルを読めません: {exc}[/red]")
+            continue
+
+        # 事前読み込み: 当日分をメモリに読み込んでから照合する
+        if ticket_uuid.lower() == "o":
+            _run_offline()
+            continue
+
+        # 連続読み取り: スキャナーから続けて届いた行はまとめて照合する(空行で終了)
+        if ticket_uuid.lower() == "s":
+            console.print("UUIDを読み取ってください(空行で終了)")
+            _run_batch(read_scan_batches(sys.stdin, stop_on_blank=True))
+            continue
+
+        # 照合と used_at の更新(未使用なら入場OKにする)
+        try:
+            result = check_in(ticket_uuid)
+        except TicketNotFoundError:
+            console.print("[red]チケットが見つかりません。[/red]")
+            continue
+        except Exception as exc:
+            console.print(f"[red]更新に失敗しました: {exc}[/red]")
+            continue
+        ticket = result.reservation
+
+        # 結果表示
+        t = Table(title="改札結果", **TABLE_KWARGS)
+        t.add_column("項目")
+        t.add_column("値")
+        t.add_row("UUID", ticket.uuid)
+        t.add_row("名前", ticket.user_name or "-")
+        t.add_row("座席", ", ".join(ticket.seats) if ticket.seats else "-")
+        if ticket.start_at is not None:
+            t.add_row("開始", format_ymd_hm(ticket.start_at))
+            t.add_row("ホール", ticket.hall or "-")
+        if ticket.movie_title is not None:
+            t.add_row("映画", ticket.movie_title)
+
+        if result.admitted:
             t.add_row("状態", "[green]入場OK[/green]")
-            t.add_row("使用日時", format_ymd_hm(ticket.used_at) if ticket.used_at else "-")
-            console.print(t)
-
+        else:
+            t.add_row("状態", "[red]使用済み[/red]")
+        t.add_row("使用日時", format_ymd_hm(ticket.used_at))
+        console.print(t)
@@ -4,6 +4,10 @@ from sqlalchemy import select
 
 from db.db import SessionLocal
 from db.models import Movie
+from services.movieCatalog import bump_movie_version
+from services.movieSearch import remove_movie
+from services.showCalendar import remove_movie_days
+from services.showOccupancy import remove_shows
 
 console = Console(highlight=False)
 
@@ -56,7 +60,14 @@ def run(session: dict) -> dict:
 
         # 削除実行
         try:
+            show_ids = [s.id for s in movie.shows]
             db_session.delete(movie)
+            # 上映日カレンダー・上映回ごとの販売状況の集計も一緒に消す(上映回は cascade で消えるが、集計は別テーブル)
+            remove_movie_days(db_session.connection(), movie.id)
+            remove_shows(db_session.connection(), show_ids)
+            # 検索の索引から外し、映画一覧のキャッシュも無効にする
+            remove_movie(db_session.connection(), movie.id)
+            bump_movie_version(db_session.connection())
             db_session.commit()
             console.print("[green]削除しました。[/green]")
         except Exception as exc:
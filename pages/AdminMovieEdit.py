@@ -9,6 +9,8 @@ from datetime import date       # 日付を扱うためのモジュール
 
 from db.db import SessionLocal  # DB操作のセッションを生成するクラス
 from db.models import Movie     # テーブル"Movie"のモデルをインポート
+from services.movieCatalog import bump_movie_version  # 映画一覧キャッシュの版
+from services.movieSearch import sync_movie  # 映画検索の索引(全文検索・タグ)
 
 console = Console(highlight=False)
 
@@ -180,6 +182,10 @@ def run(session: dict) -> dict:
                 movie.run_start_date = run_start_date
                 movie.run_end_date = run_end_date
 
+            # 検索の索引を更新し、映画一覧のキャッシュを無効にする(保存と同じトランザクション)
+            db_session.flush()  # 追加なら movie.id 確定
+            sync_movie(db_session.connection(), movie.id)
+            bump_movie_version(db_session.connection())
             db_session.commit()
         except Exception as exc:
 
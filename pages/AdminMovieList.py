@@ -1,10 +1,7 @@
 from rich.console import Console
 from rich.table import Table
 
-from sqlalchemy import select   # db操作用、Select文
-
-from db.db import SessionLocal  # DB操作のセッションを生成するクラス
-from db.models import Movie     # テーブル"Movie"のモデルをインポート
+from services.movieCatalog import list_movie_summaries  # 映画一覧(一覧に出す列だけ、キャッシュあり)
 from utils.rich_compat import TABLE_KWARGS
 
 console = Console(highlight=False)
@@ -20,9 +17,8 @@ def run(session: dict) -> dict:
 
     # DBへの接続を試行
     try:
-        with SessionLocal() as db_session:
-            movies = db_session.execute(select(Movie).order_by(Movie.id)).scalars().all()
-            # Movieテーブルの全行をソートし、それをmoviesにセット、scalars()で余分なデータをカットしall()でリスト化
+        # id順の映画一覧。説明・タグは読まない。映画が変わっていなければ前回読んだものを使う
+        movies = list_movie_summaries()
 
     except Exception as exc:
         console.print(f"[red]DBアクセスに失敗しました: {exc}[/red]")
@@ -8,7 +8,12 @@ from datetime import date, datetime, timedelta # 日付・時間操作用
 from sqlalchemy import func, select  # DB操作用、集約関数func、Select文 
 
 from db.db import SessionLocal # DB操作のセッションを生成するクラス
-from db.models import Movie, Show, Ticket   # テーブル"Movie", "Show", "Ticket"のモデルをインポート
+from db.models import Movie, Show, Ticket, from_epoch_min   # テーブル"Movie", "Show", "Ticket"のモデルをインポート
+from utils.hallSchedule import HallScheduleIndex  # 同一ホールの時間帯の重なり検索
+from utils.recurrence import MonthlyRule, WeeklyRule, parse_dates  # 繰り返し上映の展開
+from services.showCalendar import refresh_show_days  # 上映日カレンダーの集計
+from services.showOccupancy import remove_shows  # 上映回ごとの販売状況
+from services.movieCatalog import list_movie_summaries  # 映画一覧(キャッシュあり)
 
 console = Console(highlight=False)
 
@@ -78,17 +83,12 @@ def run(session: dict) -> dict:
         v = value.strip().replace(" ", "T")
         return datetime.strptime(v, "%Y-%m-%dT%H:%M")
 
-    # ISO文字列(YYYY-MM-DDTHH:MM)をdatetime型に変換する関数
-    def _parse_iso_min(value: str) -> datetime:
-        v = str(value).strip().replace(" ", "T")
-        return datetime.strptime(v, "%Y-%m-%dT%H:%M")
-
+    # 表示用(DBの start_at/end_at は datetime で返ってくるのでパースは不要)
     def _to_iso_min(dt: datetime) -> str:
         return dt.strftime("%Y-%m-%dT%H:%M")
 
     # 最初に映画一覧を表示（movie_id入力の助け）
-    with SessionLocal() as db_session:
-        movies = db_session.execute(select(Movie).order_by(Movie.id)).scalars().all()
+    movies = list_movie_summaries()
 
     if movies:
         table = Table(title="映画一覧", **TABLE_KWARGS)
@@ -137,7 +137,8 @@ def run(session: dict) -> dict:
         repeat = input("繰り返しにしますか? (y/n): ").strip().lower()
 
         # スケジュール変更後の上映回一覧を持つリスト
-        desired: dict[tuple[str, str], dict[str, object]] = {}
+        # キーは (開始日時, hall)。DBの Show.start_at と同じ datetime で持つ
+        desired: dict[tuple[datetime, str], dict[str, object]] = {}
 
         # 繰り返し設定
         if repeat == "y":
@@ -168,6 +169,24 @@ def run(session: dict) -> dict:
                 session["next_page"] = "admin_menu"
                 return session
 
+            # 上映しない日(休館日など)。期間は YYYY-MM-DD..YYYY-MM-DD
+            while True:
+                exclude_raw = _prompt_str("除外日(カンマ区切り、期間は YYYY-MM-DD..YYYY-MM-DD。空Enterでなし)", "") or ""
+                try:
+                    exclude = parse_dates(exclude_raw)
+                except ValueError:
+                    console.print("[red]YYYY-MM-DD または YYYY-MM-DD..YYYY-MM-DD で入力してください。[/red]")
+                    continue
+                break
+
+            # 展開した開始時刻(経過分)を desired に入れる
+            def _add_occurrences(starts) -> None:
+                duration = timedelta(minutes=movie.duration_min)
+                for start_min in starts:
+                    start_at_dt = from_epoch_min(start_min)
+                    end_at_dt = start_at_dt + duration
+                    desired[(start_at_dt, hall)] = {"start_at": start_at_dt, "end_at": end_at_dt, "price": price}
+
             # n週ごとリピート
             # 放映する曜日を選択
             if repeat_type == "1":
@@ -215,57 +234,17 @@ def run(session: dict) -> dict:
                         times_by_dow[dow] = unique_sorted
                         break
 
-                # start_dからend_dまで走査し、該当曜日かつinterval_weeksごとに上映を追加
-                # 上映はここで一括生成
-                day = start_d
-                while day <= end_d:
-                    week_index = (day - start_d).days // 7
-                    if week_index % interval_weeks == 0 and day.weekday() in days_of_week:
-                        for start_time in times_by_dow.get(day.weekday(), []):
-                            start_at_dt = datetime.combine(day, start_time)
-                            end_at_dt = start_at_dt + timedelta(minutes=movie.duration_min)
-                            key = (_to_iso_min(start_at_dt), hall)
-                            desired[key] = {
-                                "start_at": _to_iso_min(start_at_dt),
-                                "end_at": _to_iso_min(end_at_dt),
-                                "price": price,
-                            }
-                    day = day + timedelta(days=1)
+                # 曜日ごとに「最初の回 + interval_weeks 週ずつ」で上映を一括生成(1日ずつは走査しない)
+                _add_occurrences(WeeklyRule(start_d, end_d, times_by_dow, interval_weeks, exclude).occurrences())
 
             # n月ごとリピート(これいる？)
             elif repeat_type == "2":
                 start_time_str = _prompt_time("開始時刻(start_time, HH:MM)", None, required=True)
                 interval_months = _prompt_int("繰り返し間隔(interval_months)", 1, required=True) or 1
-                day_of_month = start_d.day
                 start_time = datetime.strptime(start_time_str, "%H:%M").time()
 
-                # start_dの月からend_dの月まで、interval_monthsごとに走査
-                year = start_d.year
-                month = start_d.month
-
-                def _add_months(y: int, m: int, add: int) -> tuple[int, int]:
-                    nm = m + add
-                    y += (nm - 1) // 12
-                    m = ((nm - 1) % 12) + 1
-                    return y, m
-
-                while True:
-                    try:
-                        candidate = date(year, month, day_of_month)
-                    except ValueError:
-                        # その月に存在しない日(例: 31日)はスキップ
-                        candidate = None
-
-                    if candidate is not None and start_d <= candidate <= end_d:
-                        start_at_dt = datetime.combine(candidate, start_time)
-                        end_at_dt = start_at_dt + timedelta(minutes=movie.duration_min)
-                        key = (_to_iso_min(start_at_dt), hall)
-                        desired[key] = {"start_at": _to_iso_min(start_at_dt), "end_at": _to_iso_min(end_at_dt), "price": price}
-
-                    # 次の月へ
-                    year, month = _add_months(year, month, interval_months)
-                    if date(year, month, 1) > end_d.replace(day=1):
-                        break
+                # start_dと同じ日付で、interval_monthsごと(その月に存在しない日(例: 31日)はスキップ)
+                _add_occurrences(MonthlyRule(start_d, end_d, [start_time], interval_months, exclude).occurrences())
 
             else:
                 console.print("[red]無効な選択です。[/red]")
@@ -285,8 +264,8 @@ def run(session: dict) -> dict:
                 return session
 
             end_at_dt = start_at_dt + timedelta(minutes=movie.duration_min)
-            key = (_to_iso_min(start_at_dt), hall)
-            desired[key] = {"start_at": _to_iso_min(start_at_dt), "end_at": _to_iso_min(end_at_dt), "price": price}
+            key = (start_at_dt, hall)
+            desired[key] = {"start_at": start_at_dt, "end_at": end_at_dt, "price": price}
 
         # 既存showを取得(対象movie_id + hallのみを管理範囲にする)
         existing_shows = db_session.execute(
@@ -294,7 +273,7 @@ def run(session: dict) -> dict:
         ).scalars().all()
 
         # 既存showをキー付きで辞書化
-        existing_by_key: dict[tuple[str, str], Show] = {(s.start_at, s.hall): s for s in existing_shows}
+        existing_by_key: dict[tuple[datetime, str], Show] = {(s.start_at, s.hall): s for s in existing_shows}
 
         to_add: list[Show] = []
         to_update: list[Show] = []
@@ -304,7 +283,7 @@ def run(session: dict) -> dict:
         for key, info in desired.items():
             if key in existing_by_key:
                 s = existing_by_key[key]
-                new_end_at = str(info["end_at"])
+                new_end_at = info["end_at"]
                 new_price = int(info["price"])  # type: ignore[arg-type]
                 changed = False
                 if s.end_at != new_end_at:
@@ -320,8 +299,8 @@ def run(session: dict) -> dict:
                     Show(
                         movie_id=movie.id,
                         hall=hall,
-                        start_at=str(info["start_at"]),
-                        end_at=str(info["end_at"]),
+                        start_at=info["start_at"],
+                        end_at=info["end_at"],
                         price=int(info["price"]),  # type: ignore[arg-type]
                     )
                 )
@@ -334,21 +313,19 @@ def run(session: dict) -> dict:
 
         # ---- スケジュール衝突チェック（同一hallで時間帯が被る） ----
         # まず自分自身との衝突チェック
-        desired_intervals: list[tuple[str, str]] = []
+        desired_intervals: list[tuple[datetime, datetime]] = []
         for info in desired.values():
-            desired_intervals.append((str(info["start_at"]), str(info["end_at"])))
+            desired_intervals.append((info["start_at"], info["end_at"]))  # type: ignore[arg-type]
         desired_intervals.sort(key=lambda x: x[0])
 
-        # 設定した上映会について、前回の終了時刻と次の開始時刻を比較して衝突を検知
-        internal_conflicts: list[tuple[str, str, str, str]] = []
-        prev_start: str | None = None
-        prev_end: str | None = None
+        # 入力した上映回を索引に入れ、時間帯が重なるペアを抽出
+        desired_index: HallScheduleIndex[tuple[datetime, datetime]] = HallScheduleIndex()
         for start_s, end_s in desired_intervals:
-            if prev_start is not None and prev_end is not None:
-                # ISO文字列は辞書順で時系列になる前提（YYYY-MM-DDTHH:MM）
-                if start_s < prev_end:
-                    internal_conflicts.append((prev_start, prev_end, start_s, end_s))
-            prev_start, prev_end = start_s, end_s
+            desired_index.add(hall, start_s, end_s, (start_s, end_s))
+
+        internal_conflicts: list[tuple[datetime, datetime, datetime, datetime]] = [
+            (a[0], a[1], b[0], b[1]) for a, b in desired_index.overlapping_pairs(hall)
+        ]
 
         # 衝突する箇所が見つかれば警告
         if internal_conflicts:
@@ -357,7 +334,10 @@ def run(session: dict) -> dict:
             ctbl.add_column("枠A")
             ctbl.add_column("枠B")
             for a_start, a_end, b_start, b_end in internal_conflicts:
-                ctbl.add_row(f"{a_start} ~ {a_end}", f"{b_start} ~ {b_end}")
+                ctbl.add_row(
+                    f"{_to_iso_min(a_start)} ~ {_to_iso_min(a_end)}",
+                    f"{_to_iso_min(b_start)} ~ {_to_iso_min(b_end)}",
+                )
             console.print(ctbl)
             input("EnterでAdminMenuに戻ります... ")
             session["next_page"] = "admin_menu"
@@ -393,16 +373,16 @@ def run(session: dict) -> dict:
 
             other_shows = [s for s in hall_candidates if s.id not in ignore_ids]
 
-            # 個別に時間を比較して実際に衝突しているものを抽出
-            external_conflicts: list[tuple[str, str, Show]] = []
-            for start_s, end_s in desired_intervals:
-                ds = _parse_iso_min(start_s)
-                de = _parse_iso_min(end_s)
-                for s in other_shows:
-                    ss = _parse_iso_min(s.start_at)
-                    se = _parse_iso_min(s.end_at)
-                    if ds < se and de > ss:
-                        external_conflicts.append((start_s, end_s, s))
+            # 既存showを索引に入れ、入力した枠ごとに重なる上映だけを二分探索で引く
+            # (全組み合わせを比べると、長期間の繰り返し登録で入力数×既存数になる)
+            existing_index: HallScheduleIndex[Show] = HallScheduleIndex()
+            for s in other_shows:
+                existing_index.add(hall, s.start_at, s.end_at, s)
+
+            external_conflicts: list[tuple[datetime, datetime, Show]] = []
+            for ds, de in desired_intervals:
+                for s in existing_index.overlapping(hall, ds, de):
+                    external_conflicts.append((ds, de, s))
 
             if external_conflicts:
                 movie_ids = list({c[2].movie_id for c in external_conflicts})
@@ -421,8 +401,8 @@ def run(session: dict) -> dict:
                 for d_start, d_end, s in external_conflicts:
                     m = movie_map2.get(s.movie_id)
                     etbl.add_row(
-                        f"{d_start} ~ {d_end}",
-                        f"show_id={s.id} {s.start_at} ~ {s.end_at}",
+                        f"{_to_iso_min(d_start)} ~ {_to_iso_min(d_end)}",
+                        f"show_id={s.id} {_to_iso_min(s.start_at)} ~ {_to_iso_min(s.end_at)}",
                         m.title if m is not None else f"movie_id={s.movie_id}",
                     )
                 console.print(etbl)
@@ -458,7 +438,7 @@ def run(session: dict) -> dict:
         if delete_with_tickets:
             console.print("\n[yellow]注意: 以下の上映回を削除するとチケットも抹消されます[/yellow]")
             for s, cnt in delete_with_tickets:
-                console.print(f"  show_id={s.id} start_at={s.start_at} tickets={cnt}")
+                console.print(f"  show_id={s.id} start_at={_to_iso_min(s.start_at)} tickets={cnt}")
 
         # 確認入力
         confirm = input("この差分を反映しますか? (y/n): ").strip().lower()
@@ -476,6 +456,15 @@ def run(session: dict) -> dict:
             for s in to_delete:
                 db_session.delete(s)
 
+            # 追加/削除した上映回の日のカレンダー集計を、同じトランザクションで数え直す
+            db_session.flush()
+            refresh_show_days(
+                db_session.connection(),
+                {(movie.id, s.start_at) for s in to_add + to_delete},
+            )
+            # 削除した上映回の販売状況の行も消す
+            remove_shows(db_session.connection(), [s.id for s in to_delete])
+
             # updateはオブジェクトに値を入れているのでcommitで反映
             db_session.commit()
 
@@ -3,10 +3,8 @@ from rich.table import Table
 
 from utils.rich_compat import TABLE_KWARGS
 
-from sqlalchemy import select
-
-from db.db import SessionLocal
-from db.models import Movie, Show, Ticket, TicketSeat
+from services.errors import TicketAlreadyUsedError, TicketNotFoundError
+from services.reservation import cancel, list_reservations
 from utils.datetimeFormat import format_ymd_hm
 
 console = Console(highlight=False)
@@ -17,7 +15,7 @@ def run(session: dict) -> dict:
     # - sessionのuser_nameで現在の予約一覧を表示
     # - 番号選択でキャンセル
     # - used_at が入っている場合はキャンセル不可
-    # - y/n確認後、Ticketを削除（cascadeでticket_seatsも削除）
+    # - y/n確認後、Ticketを削除（ticket_seatsも一緒に削除）
 
     console.print("[bold][UserCancelTicket][/bold]")
 
@@ -28,56 +26,15 @@ def run(session: dict) -> dict:
         session["next_page"] = "login"
         return session
 
-    # DBからチケット一覧を取得
-    with SessionLocal() as db_session:
-        tickets = (
-            db_session.execute(
-                select(Ticket)
-                .where(Ticket.user_id == str(user_id), Ticket.used_at.is_(None))
-                .order_by(Ticket.issued_at.desc().nullslast(), Ticket.id.desc())
-            )
-            .scalars()
-            .all()
-        )
-
-        # チケットが見つからなければメニューに戻る
-        if not tickets:
-            console.print("[yellow]現在の予約が見つかりませんでした。[/yellow]")
-            input("Enterでメニューに戻ります... ")
-            session["next_page"] = "user_menu"
-            return session
+    # DBからチケット一覧を取得(上映回・映画・座席もまとめて取る)
+    tickets = list_reservations(str(user_id))
 
-        # チケットに関連する上映情報
-        show_ids = [t.show_id for t in tickets]
-        shows = (
-            db_session.execute(select(Show).where(Show.id.in_(show_ids)))
-            .scalars()
-            .all()
-        )
-        show_map = {s.id: s for s in shows}
-
-        # チケットに関連する映画情報
-        movie_ids = list({s.movie_id for s in shows})
-        movies = (
-            db_session.execute(select(Movie).where(Movie.id.in_(movie_ids)))
-            .scalars()
-            .all()
-        )
-        movie_map = {m.id: m for m in movies}
-
-        # チケットに関連する座席情報
-        ticket_ids = [t.id for t in tickets]
-        seat_rows = (
-            db_session.execute(
-                select(TicketSeat.ticket_id, TicketSeat.seat)
-                .where(TicketSeat.ticket_id.in_(ticket_ids))
-                .order_by(TicketSeat.ticket_id, TicketSeat.seat)
-            )
-            .all()
-        )
-        seats_by_ticket: dict[int, list[str]] = {}
-        for tid, seat in seat_rows:
-            seats_by_ticket.setdefault(int(tid), []).append(str(seat))
+    # チケットが見つからなければメニューに戻る
+    if not tickets:
+        console.print("[yellow]現在の予約が見つかりませんでした。[/yellow]")
+        input("Enterでメニューに戻ります... ")
+        session["next_page"] = "user_menu"
+        return session
 
     # 予約一覧を表示
     table = Table(title=f"キャンセル対象一覧: {user_name}", **TABLE_KWARGS)
@@ -91,15 +48,12 @@ def run(session: dict) -> dict:
 
     # 予約一覧をテーブルに追加
     for i, ticket in enumerate(tickets, start=1):
-        show = show_map.get(ticket.show_id)
-        movie = movie_map.get(show.movie_id) if show is not None else None
-        seats = seats_by_ticket.get(ticket.id, [])
         table.add_row(
             str(i),
-            movie.title if movie is not None else "(unknown)",
-            format_ymd_hm(show.start_at) if show is not None else "-",
-            show.hall if show is not None else "-",
-            ", ".join(seats) if seats else "-",
+            ticket.movie_title or "(unknown)",
+            format_ymd_hm(ticket.start_at),
+            ticket.hall or "-",
+            ", ".join(ticket.seats) if ticket.seats else "-",
             f"{ticket.sum_price}円",
             "使用済" if ticket.used_at else "未使用",
         )
@@ -127,20 +81,16 @@ def run(session: dict) -> dict:
             console.print("[yellow]このチケットは使用済みのためキャンセルできません。[/yellow]")
             continue
 
-        show = show_map.get(selected.show_id)
-        movie = movie_map.get(show.movie_id) if show is not None else None
-        seats = seats_by_ticket.get(selected.id, [])
-
         # 確認表示
         t = Table(title="キャンセル確認", **TABLE_KWARGS)
         t.add_column("項目")
         t.add_column("値")
         t.add_row("UUID", selected.uuid)
         t.add_row("名前", selected.user_name or "-")
-        t.add_row("映画", movie.title if movie is not None else "(unknown)")
-        t.add_row("開始", format_ymd_hm(show.start_at) if show is not None else "-")
-        t.add_row("ホール", show.hall if show is not None else "-")
-        t.add_row("座席", ", ".join(seats) if seats else "-")
+        t.add_row("映画", selected.movie_title or "(unknown)")
+        t.add_row("開始", format_ymd_hm(selected.start_at))
+        t.add_row("ホール", selected.hall or "-")
+        t.add_row("座席", ", ".join(selected.seats) if selected.seats else "-")
         t.add_row("合計", f"{selected.sum_price} 円")
         console.print(t)
 
@@ -150,29 +100,24 @@ def run(session: dict) -> dict:
             session["next_page"] = "user_menu"
             return session
 
-        # キャンセル実行
-        with SessionLocal() as db_session:
-            ticket = db_session.execute(select(Ticket).where(Ticket.uuid == selected.uuid)).scalar_one_or_none()
-            if ticket is None:
-                console.print("[red]チケットが見つかりません（既に消された可能性）。[/red]")
-                input("Enterでメニューに戻ります... ")
-                session["next_page"] = "user_menu"
-                return session
-            if ticket.used_at:
-                console.print("[yellow]このチケットは使用済みのためキャンセルできません。[/yellow]")
-                input("Enterでメニューに戻ります... ")
-                session["next_page"] = "user_menu"
-                return session
-
-            try:
-                db_session.delete(ticket)
-                db_session.commit()
-            except Exception as exc:
-                db_session.rollback()
-                console.print(f"[red]キャンセルに失敗しました: {exc}[/red]")
-                input("Enterでメニューに戻ります... ")
-                session["next_page"] = "user_menu"
-                return session
+        # キャンセル実行(Ticketと座席を削除)
+        try:
+            cancel(selected.uuid, str(user_id))
+        except TicketNotFoundError:
+            console.print("[red]チケットが見つかりません（既に消された可能性）。[/red]")
+            input("Enterでメニューに戻ります... ")
+            session["next_page"] = "user_menu"
+            return session
+        except TicketAlreadyUsedError:
+            console.print("[yellow]このチケットは使用済みのためキャンセルできません。[/yellow]")
+            input("Enterでメニューに戻ります... ")
+            session["next_page"] = "user_menu"
+            return session
+        except Exception as exc:
+            console.print(f"[red]キャンセルに失敗しました: {exc}[/red]")
+            input("Enterでメニューに戻ります... ")
+            session["next_page"] = "user_menu"
+            return session
 
         console.print("[green]キャンセルしました。[/green]")
         input("Enterでメニューに戻ります... ")
@@ -1,39 +1,23 @@
 from __future__ import annotations
 
-import json                                     # JSON操作用
-import uuid                                     # UUID生成用
-from decimal import Decimal, ROUND_HALF_UP      # 料金計算用, ROUND_HALF_UPは四捨五入用
-from datetime import datetime                   # 発行日時用 
+from datetime import datetime                   # 座席の確保期限の表示用
 
 from rich.console import Console
 
 from sqlalchemy import select
-from sqlalchemy.exc import IntegrityError # DB操作用、例外処理
 
 from db.db import SessionLocal
-from db.models import Movie, Show, Ticket, TicketSeat # DBのmovie, Show, Ticket, TicketSeatモデルをインポート
+from db.models import Movie, Show # DBのmovie, Showモデルをインポート
+from utils.datetimeFormat import format_ymd_hm
+from utils import QRGenerator
+from services.errors import InvalidBreakdownError, SeatConflictError
+from services.pricing import MEMBER_DISCOUNT_MULT, PRICE_RULES, quote, validate_breakdown
+from services.reservation import reserve
+from services.seatHold import release_hold
 
 console = Console(highlight=False)
 
 
-# 料金ルール（必要ならここだけ触ればOK）
-# - base_price (= show.price) に倍率を掛ける
-# - Decimal文字列で書くと丸めが安定する
-PRICE_RULES: dict[str, dict[str, str]] = {
-    "adult": {"label": "一般", "mult": "1.0"},
-    "college": {"label": "大学生", "mult": "0.8"},
-    "highschool": {"label": "高校生", "mult": "0.7"},
-    "junior": {"label": "小中学生", "mult": "0.6"},
-    "child": {"label": "幼児(3歳以上)", "mult": "0.5"},
-    "senior": {"label": "シニア(60歳以上)", "mult": "0.7"},
-    "disabled": {"label": "障がい者割引", "mult": "0.7"},
-    "other": {"label": "その他", "mult": "1.0"},
-}
-
-# 会員割引（合計に対して倍率を掛ける）
-MEMBER_DISCOUNT_MULT = Decimal("0.8")
-
-
 def run(session: dict) -> dict:
     # 購入/確定（最小）
     # - SeatSelectで選ばれた座席を使って Ticket + TicketSeat を作成する
@@ -133,7 +117,6 @@ def run(session: dict) -> dict:
         # 例：child: 2, adult: 1 みたいに
         while True:
             breakdown: dict[str, int] = {}
-            total = 0
             for key, rule in PRICE_RULES.items():
                 label = rule["label"]
                 cnt = _prompt_int(f"{label}({key}) 枚数", 0, required=True) or 0
@@ -141,10 +124,11 @@ def run(session: dict) -> dict:
                     console.print("[red]0以上で入力してください。[/red]")
                     break
                 breakdown[key] = cnt
-                total += cnt
 
-            if total != seat_count:
-                console.print(f"[red]内訳の合計({total})が座席数({seat_count})と一致しません。[/red]")
+            try:
+                validate_breakdown(breakdown, seat_count)
+            except InvalidBreakdownError as exc:
+                console.print(f"[red]{exc}[/red]")
                 retry = input("再入力しますか? (y/n): ").strip().lower()
                 if retry == "y":
                     continue
@@ -153,97 +137,75 @@ def run(session: dict) -> dict:
 
             break
 
-        # 合計金額計算（内訳×倍率）
-        base_price = Decimal(str(show.price))
-        sum_price_dec = Decimal("0")
-        unit_prices: dict[str, int] = {}
-
-        # 単価計算、種別ごとに倍率適用
-        for key, cnt in breakdown.items():
-            mult = Decimal(PRICE_RULES[key]["mult"])
-            unit = (base_price * mult).quantize(Decimal("1"), rounding=ROUND_HALF_UP)
-            unit_prices[key] = int(unit)
-            sum_price_dec += unit * Decimal(cnt)
-
-        # 会員割引適用
-        pre_discount = sum_price_dec
-        if int(is_member) == 1:
-            sum_price_dec = (sum_price_dec * MEMBER_DISCOUNT_MULT).quantize(Decimal("1"), rounding=ROUND_HALF_UP)
-
-        sum_price = int(sum_price_dec)
-
-        # 保存用に内訳データをJSON化
-        breakdown_json = json.dumps(breakdown, ensure_ascii=False)
+        # 合計金額計算（内訳×倍率、会員割引）
+        price = quote(show.price, breakdown, is_member)
+        sum_price = price.sum_price
 
         # 確認表示
         console.print(f"\n映画: {movie_title}")
-        console.print(f"上映: show_id={show.id} hall={show.hall} start_at={show.start_at}")
+        console.print(f"上映: show_id={show.id} hall={show.hall} start_at={format_ymd_hm(show.start_at)}")
         console.print(f"座席: {', '.join(selected_seats)}")
+        hold_expires_at = session.get("hold_expires_at")
+        if isinstance(hold_expires_at, datetime):
+            console.print(f"座席の確保期限: {format_ymd_hm(hold_expires_at)}")
         console.print("\n[bold]内訳[/bold]")
         for key, cnt in breakdown.items():
             if cnt <= 0:
                 continue
             label = PRICE_RULES[key]["label"]
-            console.print(f"  {label}: {cnt} × {unit_prices[key]}円")
+            console.print(f"  {label}: {cnt} × {price.unit_prices[key]}円")
 
-        if int(is_member) == 1:
-            console.print(f"\n会員割引: ×{MEMBER_DISCOUNT_MULT}（{int(pre_discount)}円 → {sum_price}円）")
+        if price.is_member:
+            console.print(f"\n会員割引: ×{MEMBER_DISCOUNT_MULT}（{price.pre_discount}円 → {sum_price}円）")
         console.print(f"\n合計: {sum_price} 円")
 
         confirm = input("購入を確定しますか? (y/n): ").strip().lower()
+        hold_token = session.get("hold_token")
         if confirm != "y":
+            # 座席を選び直すので仮押さえは解放する
+            if isinstance(hold_token, str) and hold_token:
+                release_hold(hold_token)
+            session.pop("hold_expires_at", None)
             console.print("[yellow]キャンセルしました。[/yellow]")
             session["next_page"] = "user_seat_select"
             return session
 
         # Ticket + TicketSeat情報確定
-        issued_at = datetime.now().strftime("%Y-%m-%dT%H:%M")
-        ticket = Ticket(
-            uuid=str(uuid.uuid4()),
-            show_id=show.id,
-            user_id=str(user_id),
-            user_name=user_name,
-            age=age,
-            sex=sex,
-            is_member=int(is_member),
-            breakdown_json=breakdown_json,
-            sum_price=sum_price,
-            issued_at=issued_at,
-        )
-
-        ticket_uuid = str(ticket.uuid)
-
-        # 登録実行
+        # (座席・内訳の検証、料金計算、書き込みは services.reservation.reserve が行う)
         try:
-            # DBへの書き込みをリクエスト
-            db_session.add(ticket)
-            db_session.flush()  # ticket.id を確定させる
-
-            for seat in selected_seats:
-                db_session.add(
-                    TicketSeat(
-                        ticket_id=ticket.id,
-                        show_id=show.id,
-                        seat=str(seat),
-                    )
-                )
-
-            db_session.commit()
-        except IntegrityError:
-            # 弾かれた場合のパス(重複予約時)
-            db_session.rollback()
-            console.print("[red]購入に失敗しました（他の人が先に予約した可能性があります）。[/red]")
+            issued = reserve(
+                show.id,
+                selected_seats,
+                breakdown,
+                str(user_id),
+                user_name=user_name,
+                age=age,
+                sex=sex,
+                is_member=int(is_member),
+                hold_token=hold_token if isinstance(hold_token, str) else None,
+            )
+        except SeatConflictError as exc:
+            # 弾かれた場合のパス(重複予約時、押さえの期限切れ中に他の人が選んだ場合)
+            console.print(f"[red]購入に失敗しました。他の人が先に予約した座席があります: {', '.join(exc.seats)}[/red]")
             input("Enterで座席選択に戻ります... ")
             session["next_page"] = "user_seat_select"
             return session
         except Exception as exc:
             # その他のエラー時
-            db_session.rollback()
             console.print(f"[red]購入に失敗しました: {exc}[/red]")
             input("Enterで座席選択に戻ります... ")
             session["next_page"] = "user_seat_select"
             return session
 
+        ticket_uuid = issued.uuid
+
+    # チケット表示(UserTicketQR)では描画済みのQRを出すだけにする
+    QRGenerator.prerender(ticket_uuid)
+
+    # 押さえは購入で使い切ったので、次の購入用に作り直させる
+    session.pop("hold_token", None)
+    session.pop("hold_expires_at", None)
+
     # チケット表示へ遷移
     session["ticket_uuid"] = ticket_uuid
     session["next_page"] = "user_ticket_qr"
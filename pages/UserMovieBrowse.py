@@ -3,23 +3,37 @@ from rich.table import Table
 
 from utils.rich_compat import TABLE_KWARGS
 
-from sqlalchemy import select
-
-from db.db import SessionLocal
-from db.models import Movie
+from services.movieCatalog import list_movie_summaries
+from services.movieSearch import SEARCH_LIMIT, search_movies
 
 console = Console(highlight=False)
 
 
+def _render(movies, title: str) -> None:
+    # テーブル作成
+    table = Table(title=title, **TABLE_KWARGS)
+    table.add_column("No", justify="right")
+    table.add_column("movie_id", justify="right")
+    table.add_column("title")
+    table.add_column("duration", justify="right")
+    table.add_column("price", justify="right")
+
+    # 映画一覧をテーブルに追加
+    for i, m in enumerate(movies, start=1):
+        table.add_row(str(i), str(m.id), m.title, f"{m.duration_min}min", str(m.default_price))
+
+    console.print(table)
+
+
 def run(session: dict) -> dict:
     # 映画一覧（ユーザー向け）
     # - moviesを一覧表示し、番号選択でmovie_idをsessionに入れて次へ
+    # - s で検索(タイトル・説明の語、#タグ)。結果は一致度の高い順に上位だけ出す
 
     console.print("[bold][UserMovieBrowse][/bold]")
 
-    # DBから映画一覧を取得
-    with SessionLocal() as db_session:
-        movies = db_session.execute(select(Movie).order_by(Movie.id)).scalars().all()
+    # 映画一覧を取得(一覧に出す列だけ。映画が変わっていなければキャッシュを使う)
+    movies = list_movie_summaries()
 
     if not movies:
         console.print("[yellow]映画が登録されていません。[/yellow]")
@@ -27,27 +41,30 @@ def run(session: dict) -> dict:
         session["next_page"] = "user_menu"
         return session
 
-    # テーブル作成
-    table = Table(title="映画一覧", **TABLE_KWARGS)
-    table.add_column("No", justify="right")
-    table.add_column("movie_id", justify="right")
-    table.add_column("title")
-    table.add_column("duration", justify="right")
-    table.add_column("price", justify="right")
-
-    # 映画一覧をテーブルに追加
-    for i, m in enumerate(movies, start=1):
-        table.add_row(str(i), str(m.id), m.title, f"{m.duration_min}min", str(m.default_price))
-
-    console.print(table)
+    _render(movies, "映画一覧")
 
     while True:
         # 予約する映画を選択
-        raw = input("選択してください (番号 / bで戻る): ").strip().lower()
+        raw = input("選択してください (番号 / sで検索 / bで戻る): ").strip().lower()
         # bなら戻る
         if raw in {"b", "back"}:
             session["next_page"] = "user_menu"
             return session
+        # sなら検索語を入力して一覧を絞り込む(空Enterで全件に戻す)
+        if raw == "s":
+            query = input("検索語 (タイトル・説明の語 / #タグ、空白区切りで絞り込み。空Enterで全件): ").strip()
+            if not query:
+                movies = list_movie_summaries()
+                _render(movies, "映画一覧")
+                continue
+            found = search_movies(query)
+            if not found:
+                console.print(f"[yellow]「{query}」に一致する映画はありません。[/yellow]")
+                continue
+            movies = found
+            more = f"、上位{SEARCH_LIMIT}件" if len(found) >= SEARCH_LIMIT else ""
+            _render(movies, f"検索結果: {query} ({len(found)}件{more})")
+            continue
         # 数値チェック
         if not raw.isdigit():
             console.print("[red]番号を入力してください。[/red]")
@@ -57,7 +74,7 @@ def run(session: dict) -> dict:
         if idx < 1 or idx > len(movies):
             console.print("[red]範囲外です。[/red]")
             continue
-        
+
         # movie_idをセットして上映回選択へ
         movie = movies[idx - 1]
         session["movie_id"] = movie.id
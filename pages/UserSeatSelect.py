@@ -1,11 +1,16 @@
+import uuid
+
 from rich.console import Console
 
 from sqlalchemy import select
 
 from db.db import SessionLocal
 from db.models import Movie, Show, TicketSeat  # movie, Show, TicketSeatモデルをインポート
-from utils.hallLayout import get_all_seats, render_seat_map  # ホールレイアウト表示ユーティリティ
+from utils.hallLayout import get_occupancy, render_seat_map  # ホールレイアウト表示ユーティリティ
+from utils.seatAllocator import allocate_seats
+from utils.seatOccupancy import SeatOccupancy, unknown_seats
 from utils.datetimeFormat import format_ymd_hm
+from services.seatHold import SeatConflictError, held_seats, hold_seats, release_hold
 
 console = Console(highlight=False)
 
@@ -30,6 +35,12 @@ def run(session: dict) -> dict:
         show_id = int(raw)
         session["show_id"] = show_id
 
+    # 座席の仮押さえ用の識別子(購入手続きごと。購入確定でクリアされる)
+    hold_token = session.get("hold_token")
+    if not isinstance(hold_token, str) or not hold_token:
+        hold_token = uuid.uuid4().hex
+        session["hold_token"] = hold_token
+
     # DBから上映回情報と予約済み座席を取得
     with SessionLocal() as db_session:
         # showの情報を取得
@@ -51,30 +62,57 @@ def run(session: dict) -> dict:
             .all()
         )
 
-    console.print(f"\n映画: {movie_title}")
-    console.print(f"上映: show_id={show.id} hall={show.hall} start_at={format_ymd_hm(show.start_at)}")
-    render_seat_map(console, hall=show.hall, reserved=reserved)
+        # 他の人が仮押さえ中の座席(自分の押さえは選び直せるように除く)
+        held = held_seats(db_session, show.id, exclude_token=hold_token)
 
-    # ホールのレイアウトを取得
+    # ホールのレイアウトを取得し、予約済み座席をビットマスクにする
+    # (レイアウトはプロセス内でキャッシュ済みなら読み直さない)
     try:
-        all_seats = get_all_seats(show.hall)
+        occupancy = get_occupancy(show.hall, reserved)
+        held_occupancy = get_occupancy(show.hall, held)
     except FileNotFoundError as exc:
         console.print(f"[red]{exc}[/red]")
         input("Enterでメニューに戻ります... ")
         session["next_page"] = "user_menu"
         return session
 
-    reserved_set = {s.strip().upper() for s in reserved}
+    console.print(f"\n映画: {movie_title}")
+    console.print(f"上映: show_id={show.id} hall={show.hall} start_at={format_ymd_hm(show.start_at)}")
+    render_seat_map(console, hall=show.hall, reserved=occupancy, held=held_occupancy)
+    # 選べない座席 = 予約済み + 他の人が仮押さえ中
+    unavailable = occupancy | held_occupancy
+    console.print(f"空席: {unavailable.vacant_count} / {occupancy.layout.seat_count}")
+    layout = occupancy.layout
+
+    # 選んだ座席を仮押さえする。取れなかった座席は選べない座席に加える
+    def _hold(seats: list[str]) -> bool:
+        nonlocal unavailable
+        try:
+            expires_at = hold_seats(show.id, seats, hold_token, user_id=session.get("user_id"))
+        except SeatConflictError as exc:
+            unavailable = unavailable | SeatOccupancy.from_seats(layout, exc.seats)
+            console.print(f"[red]既に予約済み、または他の人が選択中の座席があります: {', '.join(exc.seats)}[/red]")
+            return False
+        session["hold_expires_at"] = expires_at
+        console.print(f"[green]座席を仮押さえしました（{format_ymd_hm(expires_at)} まで）。[/green]")
+        return True
+
+    def _back() -> dict:
+        release_hold(hold_token)
+        session.pop("selected_seats", None)
+        session.pop("hold_expires_at", None)
+        session["next_page"] = "user_show_select"
+        return session
 
     # 購入枚数（座席数）を入力
+    # 上映回選択で並び席の絞り込みをしていれば、その席数を既定にする
+    default_count = max(1, int(session.get("show_adjacent") or 1))
     while True:
-        raw_cnt = input("購入枚数(座席数) [1] (bで戻る): ").strip().lower()
+        raw_cnt = input(f"購入枚数(座席数) [{default_count}] (bで戻る): ").strip().lower()
         if raw_cnt in {"b", "back"}:
-            session.pop("selected_seats", None)
-            session["next_page"] = "user_show_select"
-            return session
+            return _back()
         if raw_cnt == "":
-            seat_count = 1
+            seat_count = default_count
             break
         if not raw_cnt.isdigit():
             console.print("[red]数字を入力してください。[/red]")
@@ -90,11 +128,26 @@ def run(session: dict) -> dict:
     # 座席入力（カンマ区切り）
     while True:
         raw = input(
-            f"座席を{seat_count}個入力してください（例: A-1,A-2 / bで戻る）: "
+            f"座席を{seat_count}個入力してください（例: A-1,A-2 / aでおまかせ / bで戻る）: "
         ).strip()
         if raw.lower() in {"b", "back"}:
-            session.pop("selected_seats", None)
-            session["next_page"] = "user_show_select"
+            return _back()
+
+        # おまかせ: 中央寄りの連続席を自動で選ぶ(取れなければ分割)
+        if raw.lower() in {"a", "auto"}:
+            allocation = allocate_seats(unavailable, seat_count)
+            if allocation is None:
+                console.print(f"[red]空席が足りません（空席={unavailable.vacant_count}）。[/red]")
+                continue
+            if not allocation.contiguous:
+                console.print(f"[yellow]連続した空席がないため、{allocation.blocks}か所に分けて選びました。[/yellow]")
+            console.print(f"おまかせ座席: {', '.join(allocation.seats)}")
+            if input("この座席でよろしいですか? (y/n): ").strip().lower() != "y":
+                continue
+            if not _hold(allocation.seats):
+                continue
+            session["selected_seats"] = allocation.seats
+            session["next_page"] = "user_checkout"
             return session
 
         tokens = [t.strip().upper() for t in raw.split(",") if t.strip() != ""]
@@ -117,16 +170,19 @@ def run(session: dict) -> dict:
             )
             continue
 
-        invalid = [t for t in normalized if t not in all_seats]
+        invalid = unknown_seats(layout, normalized)
         if invalid:
             console.print(f"[red]存在しない座席があります: {', '.join(invalid)}[/red]")
             continue
 
-        taken = [t for t in normalized if t in reserved_set]
+        taken = SeatOccupancy.from_seats(layout, normalized) & unavailable
         if taken:
-            console.print(f"[red]すでに予約済みの座席があります: {', '.join(taken)}[/red]")
+            console.print(f"[red]すでに予約済み/仮押さえ中の座席があります: {', '.join(taken.seat_ids())}[/red]")
             continue
-        
+
+        if not _hold(normalized):
+            continue
+
         # 決済へ進む
         session["selected_seats"] = normalized
         session["next_page"] = "user_checkout"
@@ -2,7 +2,7 @@ from __future__ import annotations
 
 import re  #正規表現モジュール
 import calendar
-from datetime import date, datetime, timedelta
+from datetime import date
 
 from rich.console import Console    # 印字用
 from rich.table import Table    # テーブル表示用
@@ -12,24 +12,29 @@ from utils.rich_compat import TABLE_KWARGS
 from sqlalchemy import select
 
 from db.db import SessionLocal
-from db.models import Movie, Show
+from db.models import Movie
+from services.showCalendar import ShowDaySummary, month_show_days
 
 console = Console(highlight=False)
 
 
 _MONTH_RE = re.compile(r"^(\d{4})[-/](\d{1,2})$") #YYYY-MM形式の正規表現
 
-# 月初と月末のISOフォーマット(YYYY-MM-DDTHH:MM)を取得
-def _month_bounds(year: int, month: int) -> tuple[str, str]:
-    start = datetime(year, month, 1)
-    if month == 12:
-        end = datetime(year + 1, 1, 1)
-    else:
-        end = datetime(year, month + 1, 1)
-    return start.strftime("%Y-%m-%dT%H:%M"), end.strftime("%Y-%m-%dT%H:%M")
+# 空き状況ごとの色
+_COLOR_OPEN = "#00ff00"      # 空席あり
+_COLOR_FEW = "#ffff00"       # 残りわずか
+_COLOR_SOLD_OUT = "#ff5f5f"  # 満席
+
+
+def _day_color(summary: ShowDaySummary) -> str:
+    if summary.sold_out:
+        return _COLOR_SOLD_OUT
+    if summary.few_left:
+        return _COLOR_FEW
+    return _COLOR_OPEN
 
 # カレンダー表示
-def _render_calendar(year: int, month: int, show_days: set[int]) -> None:
+def _render_calendar(year: int, month: int, show_days: dict[int, ShowDaySummary]) -> None:
     cal = calendar.Calendar(firstweekday=6)  # Sunday start
 
     # テーブル作成
@@ -48,9 +53,10 @@ def _render_calendar(year: int, month: int, show_days: set[int]) -> None:
                 row.append(" ")
                 continue
             
-            # 上映がある日なら緑で表示
-            if d in show_days:
-                row.append(f"[#00ff00]{d:2d}[/]")
+            # 上映がある日は空き状況で色分け
+            summary = show_days.get(d)
+            if summary is not None:
+                row.append(f"[{_day_color(summary)}]{d:2d}[/]")
             else:
                 row.append(f"{d:2d}")
 
@@ -58,7 +64,9 @@ def _render_calendar(year: int, month: int, show_days: set[int]) -> None:
 
     # コンソールに印字
     console.print(table)
-    console.print("[#00ff00]緑[/] = 上映あり")
+    console.print(
+        f"[{_COLOR_OPEN}]緑[/] = 上映あり(空席あり)  [{_COLOR_FEW}]黄[/] = 残りわずか  [{_COLOR_SOLD_OUT}]赤[/] = 満席"
+    )
 
 # ページ本体
 def run(session: dict) -> dict:
@@ -79,46 +87,17 @@ def run(session: dict) -> dict:
     if not isinstance(year, int) or not isinstance(month, int):# isinstanceで型チェック
         year, month = today.year, today.month
 
+    # 映画名は月を切り替えても変わらないので最初に1回だけ取得
+    with SessionLocal() as db_session:
+        movie = db_session.execute(select(Movie).where(Movie.id == movie_id)).scalar_one_or_none()
+    movie_title = movie.title if movie is not None else "(unknown)"
+
     # 入力を受け付けるメインループ
     while True:
-        # movie名 + 指定された月の上映日セットを取得
-        with SessionLocal() as db_session:
-            # 対象の映画の情報を取得
-            movie = db_session.execute(select(Movie).where(Movie.id == movie_id)).scalar_one_or_none()
-
-            # 範囲の定義
-            month_start, month_end = _month_bounds(year, month)
-
-            # 指定月の上映回を取得
-            # 指定された映画ID && 開始日時が月初以降 && 開始日時が月末前
-            shows = (
-                db_session.execute(
-                    select(Show)
-                    .where(Show.movie_id == movie_id)
-                    .where(Show.start_at >= month_start)
-                    .where(Show.start_at < month_end)
-                )
-
-                # 結果から余分な情報を取り除き、リストとして返却
-                .scalars()
-                .all()
-            )
-
-        movie_title = movie.title if movie is not None else "(unknown)"
+        # 指定された月の上映日(集計テーブル show_days を主キーで引くだけ)
+        show_days = month_show_days(movie_id, year, month)
         console.print(f"映画: {movie_title} (movie_id={movie_id})")
 
-        # 上映がある日だけを抽出
-        show_days: set[int] = set()
-        for s in shows:
-            # ISO: YYYY-MM-DDTHH:MM の想定
-            try:
-                # スライスで日付部分だけを取りだし、セットに追加
-                show_days.add(int(str(s.start_at)[8:10]))
-            
-            # 例外はゴミ箱にぶん投げる
-            except Exception:
-                continue
-        
         # カレンダーを表示
         _render_calendar(year, month, show_days)
 
@@ -3,12 +3,13 @@ from rich.table import Table
 
 from utils.rich_compat import TABLE_KWARGS
 
-from datetime import datetime, timedelta
+from datetime import datetime
 
 from sqlalchemy import select
 
 from db.db import SessionLocal
-from db.models import Movie, Show
+from db.models import Movie
+from services.catalog import list_show_availability
 from utils.datetimeFormat import format_ymd_hm
 
 console = Console(highlight=False)
@@ -18,6 +19,7 @@ def run(session: dict) -> dict:
     # 上映回選択
     # - session["movie_id"] のshowsを表示し、番号選択で show_id をセットして座席へ
     # - session["selected_date"] (YYYY-MM-DD) があれば、その日の上映回だけに絞る
+    # - 残席を表示し、満席の回を隠す / N席並んで空いている回だけにする絞り込みができる
 
     console.print("[bold][UserShowSelect][/bold]")
 
@@ -33,72 +35,101 @@ def run(session: dict) -> dict:
     if selected_date is not None and not isinstance(selected_date, str):
         selected_date = None
 
-    # DBから上映回一覧を取得
-    with SessionLocal() as db_session:
-        movie = db_session.execute(select(Movie).where(Movie.id == movie_id)).scalar_one_or_none()
+    # 絞り込み条件(ページを出入りしても保つ)
+    # - show_hide_sold_out: 満席の回を隠す
+    # - show_adjacent: 同じ行で N 席並んで空いている回だけ(0なら絞り込まない)
+    hide_sold_out = bool(session.get("show_hide_sold_out", False))
+    adjacent = int(session.get("show_adjacent") or 0)
 
-        # selected_date ~ selected_date +1日の範囲で絞り込み
-        stmt = select(Show).where(Show.movie_id == movie_id)
-        if selected_date:
-            try:
-                d0 = datetime.strptime(selected_date, "%Y-%m-%d")
-                d1 = d0 + timedelta(days=1)
-                start0 = d0.strftime("%Y-%m-%dT%H:%M")
-                start1 = d1.strftime("%Y-%m-%dT%H:%M")
-                stmt = stmt.where(Show.start_at >= start0).where(Show.start_at < start1)
-            except Exception:
-                selected_date = None
-
-        # 範囲内に存在する上映回を取得
-        shows = db_session.execute(stmt.order_by(Show.start_at, Show.hall, Show.id)).scalars().all()
+    on_date = None
+    if selected_date:
+        try:
+            on_date = datetime.strptime(selected_date, "%Y-%m-%d").date()
+        except ValueError:
+            selected_date = None
 
+    # 映画名は絞り込みを変えても変わらないので最初に1回だけ取得
+    with SessionLocal() as db_session:
+        movie = db_session.execute(select(Movie).where(Movie.id == movie_id)).scalar_one_or_none()
     movie_title = movie.title if movie is not None else "(unknown)"
-    if selected_date:
-        console.print(f"映画: {movie_title} (movie_id={movie_id})  日付: {selected_date}")
-    else:
-        console.print(f"映画: {movie_title} (movie_id={movie_id})")
 
-    # 上映回がなければ戻る
-    if not shows:
+    while True:
+        # 上映回一覧 + 残席(予約済み席数は集計テーブル show_occupancy から。上映回ごとに数えない)
+        shows = list_show_availability(movie_id, on_date, hide_sold_out=hide_sold_out, adjacent=adjacent)
+        filtered = hide_sold_out or adjacent > 1
+
         if selected_date:
-            console.print("[yellow]その日の上映回がありません。[/yellow]")
-            input("Enterでカレンダーに戻ります... ")
-            session["next_page"] = "user_show_calendar"
+            console.print(f"映画: {movie_title} (movie_id={movie_id})  日付: {selected_date}")
         else:
-            console.print("[yellow]上映回がありません。管理者がスケジュールを作成してください。[/yellow]")
-            input("Enterで映画一覧に戻ります... ")
-            session["next_page"] = "user_movie_browse"
-        return session
+            console.print(f"映画: {movie_title} (movie_id={movie_id})")
+
+        # 上映回がなければ戻る(絞り込み中なら条件を変えられるように残る)
+        if not shows and not filtered:
+            if selected_date:
+                console.print("[yellow]その日の上映回がありません。[/yellow]")
+                input("Enterでカレンダーに戻ります... ")
+                session["next_page"] = "user_show_calendar"
+            else:
+                console.print("[yellow]上映回がありません。管理者がスケジュールを作成してください。[/yellow]")
+                input("Enterで映画一覧に戻ります... ")
+                session["next_page"] = "user_movie_browse"
+            return session
 
-    # richでテーブル作成
-    table = Table(title="上映回一覧", **TABLE_KWARGS)
-    table.add_column("No", justify="right")
-    table.add_column("show_id", justify="right")
-    table.add_column("start_at")
-    table.add_column("end_at")
-    table.add_column("hall")
-    table.add_column("price", justify="right")
-
-    # 上映回一覧をテーブルに追加
-    for i, s in enumerate(shows, start=1):
-        table.add_row(
-            str(i),
-            str(s.id),
-            format_ymd_hm(s.start_at),
-            format_ymd_hm(s.end_at),
-            s.hall,
-            str(s.price),
-        )
-
-    console.print(table)
+        conditions = []
+        if hide_sold_out:
+            conditions.append("満席を隠す")
+        if adjacent > 1:
+            conditions.append(f"{adjacent}席並びで空きあり")
+        if conditions:
+            console.print(f"絞り込み: {' / '.join(conditions)}")
+
+        if shows:
+            # richでテーブル作成
+            table = Table(title="上映回一覧", **TABLE_KWARGS)
+            table.add_column("No", justify="right")
+            table.add_column("show_id", justify="right")
+            table.add_column("start_at")
+            table.add_column("end_at")
+            table.add_column("hall")
+            table.add_column("price", justify="right")
+            table.add_column("残席", justify="right")
+
+            # 上映回一覧をテーブルに追加
+            for i, s in enumerate(shows, start=1):
+                table.add_row(
+                    str(i),
+                    str(s.id),
+                    format_ymd_hm(s.start_at),
+                    format_ymd_hm(s.end_at),
+                    s.hall,
+                    str(s.price),
+                    f"{s.remaining}/{s.seat_count}" if not s.sold_out or s.seat_count == 0 else "[red]満席[/red]",
+                )
+
+            console.print(table)
+        else:
+            console.print("[yellow]条件に合う上映回がありません。[/yellow]")
 
-    # 上映回選択
-    while True:
-        raw = input("選択してください (番号 / bで戻る): ").strip().lower()
+        # 上映回選択
+        raw = input("選択してください (番号 / f満席を隠す・表示 / n<席数>で並び席の絞り込み(nで解除) / bで戻る): ").strip().lower()
         # bなら戻る
         if raw in {"b", "back"}:
             session["next_page"] = "user_show_calendar" if selected_date else "user_movie_browse"
             return session
+        # fで満席の回の表示/非表示を切り替え
+        if raw == "f":
+            hide_sold_out = not hide_sold_out
+            session["show_hide_sold_out"] = hide_sold_out
+            continue
+        # n<N>で並び席の絞り込み
+        if raw.startswith("n"):
+            value = raw[1:].strip()
+            if value and not value.isdigit():
+                console.print("[red]n の後に席数を入力してください (例: n3)。[/red]")
+                continue
+            adjacent = int(value) if value else 0
+            session["show_adjacent"] = adjacent
+            continue
         # 数値チェック
         if not raw.isdigit():
             console.print("[red]番号を入力してください。[/red]")
@@ -108,7 +139,7 @@ def run(session: dict) -> dict:
         if idx < 1 or idx > len(shows):
             console.print("[red]範囲外です。[/red]")
             continue
-        
+
         # show_idをセットして座席選択へ
         show = shows[idx - 1]
         session["show_id"] = show.id
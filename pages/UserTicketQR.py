@@ -2,10 +2,7 @@ import json
 from rich.console import Console
 from rich.table import Table
 
-from sqlalchemy import select
-
-from db.db import SessionLocal
-from db.models import Movie, Show, Ticket, TicketSeat
+from services.reservation import get_reservation
 from utils.datetimeFormat import format_ymd_hm
 from utils import QRGenerator
 from utils.rich_compat import TABLE_KWARGS
@@ -29,44 +26,27 @@ def run(session: dict) -> dict:
     user_role = session.get("user_role")
     user_id = session.get("user_id")
 
-    # DB照合してチケット詳細を表示
-    with SessionLocal() as db_session:
-        ticket = db_session.execute(select(Ticket).where(Ticket.uuid == str(ticket_uuid))).scalar_one_or_none()
-        if ticket is None:
-            console.print("[red]チケットが見つかりません。UUIDを確認してください。[/red]")
-            input("Enterでメニューに戻ります... ")
-            session["next_page"] = "user_menu"
-            return session
-
-        if user_role == "User" and isinstance(user_id, str) and user_id.strip():
-            if str(ticket.user_id) != str(user_id):
-                console.print("[yellow]このチケットはあなたのアカウントに紐づいていないため表示できません。[/yellow]")
-                input("Enterでメニューに戻ります... ")
-                session["next_page"] = "user_menu"
-                return session
+    # DB照合してチケット詳細を表示(チケット・上映回・映画・座席を1クエリで取る)
+    ticket = get_reservation(str(ticket_uuid))
+    if ticket is None:
+        console.print("[red]チケットが見つかりません。UUIDを確認してください。[/red]")
+        input("Enterでメニューに戻ります... ")
+        session["next_page"] = "user_menu"
+        return session
 
-        # ユーザー側には使用済みチケットを見せない
-        if ticket.used_at:
-            console.print("[yellow]このチケットは使用済みのため表示できません。[/yellow]")
+    if user_role == "User" and isinstance(user_id, str) and user_id.strip():
+        if str(ticket.user_id) != str(user_id):
+            console.print("[yellow]このチケットはあなたのアカウントに紐づいていないため表示できません。[/yellow]")
             input("Enterでメニューに戻ります... ")
             session["next_page"] = "user_menu"
             return session
 
-        # 関連する上映・映画情報を取得
-        show = db_session.execute(select(Show).where(Show.id == ticket.show_id)).scalar_one_or_none()
-        movie = None
-        if show is not None:
-            movie = db_session.execute(select(Movie).where(Movie.id == show.movie_id)).scalar_one_or_none()
-
-        seats = (
-            db_session.execute(
-                select(TicketSeat.seat)
-                .where(TicketSeat.ticket_id == ticket.id)
-                .order_by(TicketSeat.seat)
-            )
-            .scalars()
-            .all()
-        )
+    # ユーザー側には使用済みチケットを見せない
+    if ticket.used_at:
+        console.print("[yellow]このチケットは使用済みのため表示できません。[/yellow]")
+        input("Enterでメニューに戻ります... ")
+        session["next_page"] = "user_menu"
+        return session
 
     # 表示
     console.print("\n[yellow]UUIDは照合のために保管をお願いします[/yellow]")
@@ -86,20 +66,19 @@ def run(session: dict) -> dict:
     info.add_column("項目")
     info.add_column("値")
 
-    movie_title = movie.title if movie is not None else "(unknown)"
-    info.add_row("映画", movie_title)
-    if show is not None:
-        info.add_row("上映", f"show_id={show.id}")
-        info.add_row("ホール", show.hall)
-        info.add_row("開始", format_ymd_hm(show.start_at))
-        info.add_row("終了", format_ymd_hm(show.end_at))
-        info.add_row("基本料金", f"{show.price} 円")
+    info.add_row("映画", ticket.movie_title or "(unknown)")
+    if ticket.show_found:
+        info.add_row("上映", f"show_id={ticket.show_id}")
+        info.add_row("ホール", ticket.hall)
+        info.add_row("開始", format_ymd_hm(ticket.start_at))
+        info.add_row("終了", format_ymd_hm(ticket.end_at))
+        info.add_row("基本料金", f"{ticket.price} 円")
     else:
         info.add_row("上映", "(showが見つかりません)")
 
-    info.add_row("座席", ", ".join(seats) if seats else "-")
-    info.add_row("発行", str(ticket.issued_at) if ticket.issued_at else "-")
-    info.add_row("使用", str(ticket.used_at) if ticket.used_at else "未使用")
+    info.add_row("座席", ", ".join(ticket.seats) if ticket.seats else "-")
+    info.add_row("発行", format_ymd_hm(ticket.issued_at))
+    info.add_row("使用", format_ymd_hm(ticket.used_at) if ticket.used_at else "未使用")
     info.add_row("合計", f"{ticket.sum_price} 円")
     console.print(info)
 
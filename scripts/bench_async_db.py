@@ -0,0 +1,150 @@
+from __future__ import annotations
+
+"""同時リクエストN件を、同期クエリと非同期クエリ(db.async_db)で処理したときの比較(ベンチマーク)。
+
+- 1リクエスト = 座席選択で使う「上映回の取得 + 座席表」(一部は改札の check_in)
+- sync : コルーチンの中から同期の services をそのまま呼ぶ(イベントループが毎回止まる)
+- async: services.asyncQueries を await する(aiosqlite がなければスレッドに逃がす互換実装)
+- 処理中に 1ms ごとに起きるタイマーを回し、イベントループが止まった最大時間(loop lag)も出す
+  (sync は件数/秒が出ても、その間ほかのコルーチン=他のクライアントへの応答が一切進まない)
+- CINEMA_DB_PATH で一時DBを使うので cinema.db には触らない
+
+使い方:
+  python scripts/bench_async_db.py
+  python scripts/bench_async_db.py --concurrency 1,50,200 --requests 2000
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+
+def _seed(n_shows: int, tickets_per_show: int) -> list[str]:
+    from db.db import SessionLocal, init_db
+    from db.models import Movie, Show, User
+    from services.reservation import create_ticket
+    from utils.hallLayout import load_layout
+
+    init_db()
+    with SessionLocal() as db_session:
+        db_session.add(Movie(title="bench", duration_min=120, default_price=1800))
+        db_session.add(User(id="bench-user", username="bench", password_hash="-", role="User"))
+        db_session.flush()
+        day0 = datetime(2030, 1, 1, 9)
+        for i in range(n_shows):
+            start = day0 + timedelta(hours=3 * i)
+            db_session.add(Show(movie_id=1, hall="ABCD"[i % 4], start_at=start, end_at=start + timedelta(hours=2), price=1800))
+        db_session.commit()
+
+    uuids = []
+    for show_id in range(1, n_shows + 1):
+        seats = list(load_layout("ABCD"[(show_id - 1) % 4]).seat_list)
+        for k in range(tickets_per_show):
+            uuids.append(create_ticket(show_id=show_id, user_id="bench-user", seats=seats[2 * k:2 * k + 2]).uuid)
+    return uuids
+
+
+async def _loop_lag(stop: asyncio.Event) -> float:
+    # 1ms ごとに起きるはずのタイマーが、どれだけ遅れて起きたかの最大値
+    worst = 0.0
+    while not stop.is_set():
+        t0 = time.perf_counter()
+        await asyncio.sleep(0.001)
+        worst = max(worst, time.perf_counter() - t0 - 0.001)
+    return worst
+
+
+async def _run(mode: str, concurrency: int, n_requests: int, n_shows: int, uuids: list[str]) -> tuple[float, float]:
+    from services import asyncQueries
+    from services.catalog import get_seat_map
+    from services.gate import check_in
+
+    rng = random.Random(concurrency)
+    jobs = [(rng.randint(1, n_shows), rng.random() < 0.1) for _ in range(n_requests)]
+    gate_uuids = iter(uuids)
+    queue: asyncio.Queue = asyncio.Queue()
+    for job in jobs:
+        queue.put_nowait(job)
+
+    async def request(show_id: int, gate: bool) -> None:
+        if mode == "sync":
+            get_seat_map(show_id)
+            if gate:
+                check_in(next(gate_uuids, "-"))
+        else:
+            await asyncQueries.get_seat_map(show_id)
+            if gate:
+                await asyncQueries.check_in(next(gate_uuids, "-"))
+
+    async def worker() -> None:
+        from services.errors import TicketNotFoundError
+
+        while not queue.empty():
+            show_id, gate = queue.get_nowait()
+            try:
+                await request(show_id, gate)
+            except TicketNotFoundError:
+                pass
+
+    stop = asyncio.Event()
+    lag_task = asyncio.create_task(_loop_lag(stop))
+    await asyncio.sleep(0.01)
+    t0 = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - t0
+    stop.set()
+    lag = await lag_task
+    return n_requests / elapsed, lag
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="同期/非同期DBアクセスのスループット比較")
+    parser.add_argument("--concurrency", type=str, default="1,10,50,200", help="同時リクエスト数(カンマ区切り)")
+    parser.add_argument("--requests", type=int, default=1000, help="各設定で処理するリクエスト数")
+    parser.add_argument("--shows", type=int, default=40)
+    args = parser.parse_args()
+    levels = [int(c) for c in args.concurrency.split(",")]
+
+    tmp = tempfile.TemporaryDirectory()
+    # db.db を import する前に設定する(import時に読む)
+    os.environ["CINEMA_DB_PATH"] = os.path.join(tmp.name, "bench.db")
+
+    from db.async_db import HAS_AIOSQLITE, dispose_async_engine
+    from db.db import engine
+
+    uuids = _seed(args.shows, 12)
+    random.Random(0).shuffle(uuids)
+    print(f"async driver: {'aiosqlite' if HAS_AIOSQLITE else 'thread fallback (aiosqlite not installed)'}")
+    print(f"{'N':>5} {'mode':<6}{'req/s':>10}{'loop lag(ms)':>14}")
+
+    async def _all() -> None:
+        for n in levels:
+            for mode in ("sync", "async"):
+                rate, lag = await _run(mode, n, args.requests, args.shows, uuids)
+                print(f"{n:>5} {mode:<6}{rate:>10.0f}{lag * 1000:>14.2f}")
+        await dispose_async_engine()
+
+    asyncio.run(_all())
+
+    with engine.connect() as conn:
+        used = conn.exec_driver_sql("SELECT COUNT(*) FROM tickets WHERE used_at IS NOT NULL").scalar_one()
+    engine.dispose()
+    tmp.cleanup()
+    if used == 0:
+        print("ERROR: check_in did not update any ticket")
+        return 1
+    print(f"\nOK: checked in {used} tickets")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+"""購入確定の書き込み(ORMで1席ずつ vs create_ticket の複数行INSERT)の比較(ベンチマーク)。
+
+- 旧実装: Session に Ticket を add → flush → TicketSeat を1席ずつ add → commit
+  最初のINSERT(flush)から commit が終わるまでを「書き込みロックを持っている時間」として計る
+- 新実装: services.reservation.create_ticket()
+  値の組み立て・仮押さえ/予約済みチェックも含めた呼び出し全体の時間を計る(ロック時間の上限)
+- 団体予約を想定して座席数を変えて比較する
+- CINEMA_DB_PATH で一時DBを使うので cinema.db には触らない
+
+使い方:
+  python scripts/bench_bulk_checkout.py
+  python scripts/bench_bulk_checkout.py --sizes 1,50,200 --repeat 50
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+
+def _legacy_checkout(SessionLocal, Ticket, TicketSeat, show_id: int, seats: list[str]) -> float:
+    # 変更前の UserCheckout と同じ書き込み
+    with SessionLocal() as db_session:
+        ticket = Ticket(
+            uuid=str(uuid.uuid4()),
+            show_id=show_id,
+            user_id="bench-user",
+            breakdown_json="{}",
+            issued_at=datetime.now().replace(second=0, microsecond=0),
+        )
+        t0 = time.perf_counter()
+        db_session.add(ticket)
+        db_session.flush()
+        for seat in seats:
+            db_session.add(TicketSeat(ticket_id=ticket.id, show_id=show_id, seat=seat))
+        db_session.commit()
+        return time.perf_counter() - t0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="購入確定の書き込み時間の比較")
+    parser.add_argument("--sizes", type=str, default="1,4,50,100,200", help="1回の購入の座席数(カンマ区切り)")
+    parser.add_argument("--repeat", type=int, default=30)
+    args = parser.parse_args()
+    sizes = [int(s) for s in args.sizes.split(",")]
+
+    tmp = tempfile.TemporaryDirectory()
+    # db.db を import する前に設定する(import時に読む)
+    os.environ["CINEMA_DB_PATH"] = os.path.join(tmp.name, "bench.db")
+
+    from db.db import SessionLocal, engine, init_db
+    from db.models import Movie, Show, Ticket, TicketSeat, User
+    from services.reservation import create_ticket
+
+    init_db()
+    n_shows = len(sizes) * args.repeat * 2
+    with SessionLocal() as db_session:
+        db_session.add(Movie(title="bench", duration_min=120, default_price=1800))
+        db_session.add(User(id="bench-user", username="bench", password_hash="-", role="User"))
+        db_session.flush()
+        day0 = datetime(2030, 1, 1, 19)
+        for i in range(n_shows):
+            start = day0 + timedelta(days=i)
+            db_session.add(Show(movie_id=1, hall="A", start_at=start, end_at=start + timedelta(hours=2), price=1800))
+        db_session.commit()
+
+    print(f"{'seats':>6}{'legacy(ms)':>12}{'bulk(ms)':>12}{'speedup':>10}")
+    show_id = 0
+    for size in sizes:
+        seats = [f"S-{i + 1}" for i in range(size)]
+        legacy = bulk = 0.0
+        for _ in range(args.repeat):
+            show_id += 1
+            legacy += _legacy_checkout(SessionLocal, Ticket, TicketSeat, show_id, seats)
+
+            show_id += 1
+            t0 = time.perf_counter()
+            create_ticket(show_id=show_id, user_id="bench-user", seats=seats)
+            bulk += time.perf_counter() - t0
+
+        legacy_ms = legacy * 1000 / args.repeat
+        bulk_ms = bulk * 1000 / args.repeat
+        print(f"{size:>6}{legacy_ms:>12.2f}{bulk_ms:>12.2f}{legacy_ms / bulk_ms:>9.1f}x")
+
+    # 同じ座席数ぶん書けていることを確認
+    with engine.connect() as conn:
+        n_seats = conn.exec_driver_sql("SELECT COUNT(*) FROM ticket_seats").scalar_one()
+    expected = sum(sizes) * args.repeat * 2
+    engine.dispose()
+    tmp.cleanup()
+    if n_seats != expected:
+        print(f"ERROR: ticket_seats={n_seats} expected={expected}")
+        return 1
+    print(f"\nOK: ticket_seats={n_seats}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
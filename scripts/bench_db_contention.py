@@ -0,0 +1,181 @@
+from __future__ import annotations
+
+"""複数プロセス同時アクセス時の予約スループット比較(ベンチマーク)。
+
+- 窓口端末(予約=書き込み)と座席表表示/改札(読み込み)を別プロセスで同時に走らせる
+- 旧設定(rollback journal / synchronous=FULL / 既定キャッシュ)と
+  現在の設定(db/db.py の SQLITE_PRAGMAS)で reservations/sec を比較する
+- 各プロセスは CINEMA_DB_PATH で一時DBを参照するので cinema.db には触らない
+
+使い方:
+  python scripts/bench_db_contention.py
+  python scripts/bench_db_contention.py --writers 8 --readers 8 --seconds 10
+"""
+
+import argparse
+import multiprocessing as mp
+import os
+import random
+import sys
+import tempfile
+import time
+import uuid
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+# 変更前(create_engine(DATABASE_URL) のみ)相当のPRAGMA
+LEGACY_ENV = {
+    "CINEMA_SQLITE_JOURNAL_MODE": "DELETE",
+    "CINEMA_SQLITE_SYNCHRONOUS": "FULL",
+    "CINEMA_SQLITE_CACHE_SIZE": "-2000",
+    "CINEMA_SQLITE_MMAP_SIZE": "0",
+    "CINEMA_SQLITE_TEMP_STORE": "DEFAULT",
+    "CINEMA_SQLITE_BUSY_TIMEOUT_MS": "5000",
+}
+
+N_SHOWS = 20
+SEATS_PER_SHOW = 400
+
+
+def _apply_env(db_path: str, extra_env: dict[str, str]) -> None:
+    # db.db を import する前に呼ぶこと(import時に設定を読む)
+    os.environ["CINEMA_DB_PATH"] = db_path
+    for key, value in extra_env.items():
+        os.environ[key] = value
+
+
+def _prepare(db_path: str, extra_env: dict[str, str]) -> None:
+    _apply_env(db_path, extra_env)
+
+    from db.db import SessionLocal, init_db
+    from db.models import Movie, Show, User
+
+    init_db()
+    with SessionLocal() as db_session:
+        db_session.add(Movie(title="bench", duration_min=120, default_price=1800))
+        db_session.add(User(id="bench-user", username="bench", password_hash="-", role="User"))
+        db_session.flush()
+        for i in range(N_SHOWS):
+            db_session.add(
+                Show(movie_id=1, hall="A", start_at=f"2025-01-{i + 1:02d}T19:00", end_at=f"2025-01-{i + 1:02d}T21:00", price=1800)
+            )
+        db_session.commit()
+
+
+def _writer(db_path: str, extra_env: dict[str, str], seconds: float, seed: int, out: mp.Queue) -> None:
+    _apply_env(db_path, extra_env)
+
+    from sqlalchemy.exc import IntegrityError, OperationalError
+
+    from db.db import SessionLocal
+    from db.models import Ticket, TicketSeat
+
+    rnd = random.Random(seed)
+    ok = conflicts = errors = 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        show_id = rnd.randint(1, N_SHOWS)
+        seats = {f"S-{rnd.randint(1, SEATS_PER_SHOW)}" for _ in range(rnd.randint(1, 4))}
+        # UserCheckout と同じ書き込みパターン(add → flush → seats → commit)
+        with SessionLocal() as db_session:
+            try:
+                ticket = Ticket(uuid=str(uuid.uuid4()), show_id=show_id, user_id="bench-user", breakdown_json="{}")
+                db_session.add(ticket)
+                db_session.flush()
+                for seat in seats:
+                    db_session.add(TicketSeat(ticket_id=ticket.id, show_id=show_id, seat=seat))
+                db_session.commit()
+                ok += 1
+            except IntegrityError:
+                db_session.rollback()
+                conflicts += 1
+            except OperationalError:
+                # database is locked など
+                db_session.rollback()
+                errors += 1
+    out.put(("writer", ok, conflicts, errors))
+
+
+def _reader(db_path: str, extra_env: dict[str, str], seconds: float, seed: int, out: mp.Queue) -> None:
+    _apply_env(db_path, extra_env)
+
+    from sqlalchemy import select
+    from sqlalchemy.exc import OperationalError
+
+    from db.db import SessionLocal
+    from db.models import Show, TicketSeat
+
+    rnd = random.Random(seed)
+    ok = errors = 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        show_id = rnd.randint(1, N_SHOWS)
+        # UserSeatSelect と同じ読み込みパターン
+        with SessionLocal() as db_session:
+            try:
+                db_session.execute(select(Show).where(Show.id == show_id)).scalar_one_or_none()
+                db_session.execute(select(TicketSeat.seat).where(TicketSeat.show_id == show_id)).scalars().all()
+                ok += 1
+            except OperationalError:
+                errors += 1
+    out.put(("reader", ok, 0, errors))
+
+
+def _run(label: str, extra_env: dict[str, str], writers: int, readers: int, seconds: float) -> dict[str, float]:
+    ctx = mp.get_context("spawn")
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "bench.db")
+
+        # 準備も別プロセスで行う(このプロセスでは db.db を import しない)
+        prep = ctx.Process(target=_prepare, args=(db_path, extra_env))
+        prep.start()
+        prep.join()
+
+        out: mp.Queue = ctx.Queue()
+        procs = [ctx.Process(target=_writer, args=(db_path, extra_env, seconds, i, out)) for i in range(writers)]
+        procs += [ctx.Process(target=_reader, args=(db_path, extra_env, seconds, 1000 + i, out)) for i in range(readers)]
+        for p in procs:
+            p.start()
+        results = [out.get() for _ in procs]
+        for p in procs:
+            p.join()
+
+    total = {"reservations": 0, "conflicts": 0, "write_errors": 0, "reads": 0, "read_errors": 0}
+    for kind, ok, conflicts, errors in results:
+        if kind == "writer":
+            total["reservations"] += ok
+            total["conflicts"] += conflicts
+            total["write_errors"] += errors
+        else:
+            total["reads"] += ok
+            total["read_errors"] += errors
+
+    print(
+        f"{label:<8} reservations/s={total['reservations'] / seconds:8.1f}"
+        f"  reads/s={total['reads'] / seconds:9.1f}"
+        f"  conflicts={total['conflicts']}"
+        f"  errors(w/r)={total['write_errors']}/{total['read_errors']}"
+    )
+    return total
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="複数プロセス同時アクセス時の予約スループット比較")
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    args = parser.parse_args()
+
+    print(f"writers={args.writers} readers={args.readers} seconds={args.seconds}")
+    before = _run("before", LEGACY_ENV, args.writers, args.readers, args.seconds)
+    after = _run("after", {}, args.writers, args.readers, args.seconds)
+
+    if before["reservations"] > 0:
+        print(f"reservations speedup: {after['reservations'] / before['reservations']:.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,167 @@
+from __future__ import annotations
+
+"""改札の処理速度(1件ずつ vs 一括)の比較(ベンチマーク)。
+
+- 大規模上映(400席)を想定し、チケットを大量に作ってから読み取り列を流す
+  読み取り列には 再入場(使用済み) と 該当なしのUUID を少し混ぜる
+- legacy : 変更前の AdminGateCheck と同じ(1件ごとにセッション、4クエリ、commit)
+- single : services.gate.check_in を1件ずつ
+- batch-N: services.gate.check_in_batch を N件ずつ
+- 計測ごとに used_at を戻してから流す
+- CINEMA_DB_PATH で一時DBを使うので cinema.db には触らない
+
+使い方:
+  python scripts/bench_gate_batch.py
+  python scripts/bench_gate_batch.py --tickets 20000 --batch-sizes 100,500,2000
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+
+def _seed(n_tickets: int) -> list[str]:
+    # 1上映回あたり200枚(各2席)ずつ、直接まとめてINSERTする
+    from sqlalchemy import insert
+
+    from db.db import SessionLocal, init_db, write_transaction
+    from db.models import Movie, Show, Ticket, TicketSeat, User
+
+    init_db()
+    per_show = 200
+    n_shows = (n_tickets + per_show - 1) // per_show
+    with SessionLocal() as db_session:
+        db_session.add(Movie(title="premiere", duration_min=120, default_price=1800))
+        db_session.add(User(id="bench-user", username="bench", password_hash="-", role="User"))
+        db_session.flush()
+        day0 = datetime(2030, 1, 1, 9)
+        for i in range(n_shows):
+            start = day0 + timedelta(hours=3 * i)
+            db_session.add(Show(movie_id=1, hall="P", start_at=start, end_at=start + timedelta(hours=2), price=1800))
+        db_session.commit()
+
+    uuids = [str(uuid.uuid4()) for _ in range(n_tickets)]
+    issued = datetime(2029, 12, 1, 10)
+    with write_transaction() as conn:
+        conn.execute(
+            insert(Ticket),
+            [
+                {"uuid": u, "show_id": i // per_show + 1, "user_id": "bench-user", "breakdown_json": "{}", "issued_at": issued}
+                for i, u in enumerate(uuids)
+            ],
+        )
+        conn.execute(
+            insert(TicketSeat),
+            [
+                {"ticket_id": i + 1, "show_id": i // per_show + 1, "seat": f"{chr(ord('A') + (i % per_show) // 10)}-{2 * (i % 10) + k + 1}"}
+                for i in range(n_tickets)
+                for k in range(2)
+            ],
+        )
+    return uuids
+
+
+def _legacy_scan(SessionLocal, select, Movie, Show, Ticket, TicketSeat, ticket_uuid: str) -> None:
+    # 変更前の AdminGateCheck と同じ処理(表示は除く)
+    with SessionLocal() as db_session:
+        ticket = db_session.execute(select(Ticket).where(Ticket.uuid == ticket_uuid)).scalar_one_or_none()
+        if ticket is None:
+            return
+        show = db_session.execute(select(Show).where(Show.id == ticket.show_id)).scalar_one_or_none()
+        if show is not None:
+            db_session.execute(select(Movie).where(Movie.id == show.movie_id)).scalar_one_or_none()
+        db_session.execute(select(TicketSeat.seat).where(TicketSeat.ticket_id == ticket.id)).scalars().all()
+        if ticket.used_at is not None:
+            return
+        ticket.used_at = datetime.now().replace(second=0, microsecond=0)
+        db_session.commit()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="改札の処理速度の比較")
+    parser.add_argument("--tickets", type=int, default=10000)
+    parser.add_argument("--batch-sizes", type=str, default="50,500,2000")
+    parser.add_argument("--single-limit", type=int, default=2000, help="1件ずつの方式で流す件数(遅いので一部だけ)")
+    args = parser.parse_args()
+    batch_sizes = [int(b) for b in args.batch_sizes.split(",")]
+
+    tmp = tempfile.TemporaryDirectory()
+    # db.db を import する前に設定する(import時に読む)。ホール P(400席)のレイアウトは不要(座席は直接入れる)
+    os.environ["CINEMA_DB_PATH"] = os.path.join(tmp.name, "bench.db")
+
+    from sqlalchemy import select
+
+    from db.db import SessionLocal, engine
+    from db.models import Movie, Show, Ticket, TicketSeat
+    from services.gate import SCAN_ACCEPTED, check_in, check_in_batch
+    from services.errors import TicketNotFoundError
+
+    uuids = _seed(args.tickets)
+
+    # 読み取り列: 全チケット + 再入場3% + 該当なし2%
+    rng = random.Random(0)
+    scans = list(uuids)
+    scans += rng.sample(uuids, len(uuids) * 3 // 100)
+    scans += [str(uuid.uuid4()) for _ in range(len(uuids) * 2 // 100)]
+    rng.shuffle(scans)
+
+    def _reset() -> None:
+        with engine.begin() as conn:
+            conn.exec_driver_sql("UPDATE tickets SET used_at = NULL")
+
+    print(f"tickets={len(uuids)} scans={len(scans)}")
+    print(f"{'mode':<12}{'scans':>8}{'sec':>9}{'scans/s':>10}")
+
+    def _report(label: str, n: int, elapsed: float) -> None:
+        print(f"{label:<12}{n:>8}{elapsed:>9.2f}{n / elapsed:>10.0f}")
+
+    subset = scans[: args.single_limit]
+    _reset()
+    t0 = time.perf_counter()
+    for u in subset:
+        _legacy_scan(SessionLocal, select, Movie, Show, Ticket, TicketSeat, u)
+    _report("legacy", len(subset), time.perf_counter() - t0)
+
+    _reset()
+    t0 = time.perf_counter()
+    for u in subset:
+        try:
+            check_in(u)
+        except TicketNotFoundError:
+            pass
+    _report("single", len(subset), time.perf_counter() - t0)
+
+    accepted_counts = set()
+    for size in batch_sizes:
+        _reset()
+        accepted = 0
+        t0 = time.perf_counter()
+        for i in range(0, len(scans), size):
+            accepted += sum(1 for r in check_in_batch(scans[i:i + size]) if r.status == SCAN_ACCEPTED)
+        _report(f"batch-{size}", len(scans), time.perf_counter() - t0)
+        accepted_counts.add(accepted)
+
+    with engine.connect() as conn:
+        used = conn.exec_driver_sql("SELECT COUNT(*) FROM tickets WHERE used_at IS NOT NULL").scalar_one()
+    engine.dispose()
+    tmp.cleanup()
+
+    # どのバッチサイズでも、全チケットがちょうど1回ずつ入場OKになっていること
+    if accepted_counts != {len(uuids)} or used != len(uuids):
+        print(f"ERROR: accepted={sorted(accepted_counts)} used={used} expected={len(uuids)}")
+        return 1
+    print(f"\nOK: accepted={len(uuids)}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,169 @@
+from __future__ import annotations
+
+"""改札のメモリ索引(services.gateIndex.GateIndex)の計測(ベンチマーク)。
+
+- 当日の上映回に大量のチケットを作り、索引の読み込み時間とメモリ量を測る
+  メモリ量は「UUID文字列 → 値の dict」で持った場合と比べる(tracemalloc)
+- 1件あたりの照合時間を、DBへ問い合わせる check_in と比べる
+- 溜めた入場記録をまとめて書く flush の時間を測る
+- CINEMA_DB_PATH で一時DBを使うので cinema.db には触らない
+
+使い方:
+  python scripts/bench_gate_index.py
+  python scripts/bench_gate_index.py --tickets 100000
+"""
+
+import argparse
+import gc
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+import uuid
+from datetime import date, datetime, timedelta
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+
+def _seed(n_tickets: int) -> list[str]:
+    # 当日の上映回(1回400席 = 200枚 × 2席)に、直接まとめてINSERTする
+    from sqlalchemy import insert
+
+    from db.db import SessionLocal, init_db, write_transaction
+    from db.models import Movie, Show, Ticket, TicketSeat, User
+
+    init_db()
+    per_show = 200
+    n_shows = (n_tickets + per_show - 1) // per_show
+    day0 = datetime.combine(date.today(), datetime.min.time())
+    with SessionLocal() as db_session:
+        db_session.add(Movie(title="premiere", duration_min=120, default_price=1800))
+        db_session.add(User(id="bench-user", username="bench", password_hash="-", role="User"))
+        db_session.flush()
+        for i in range(n_shows):
+            # 1日に収まるように、上映回を1分ずつずらす
+            start = day0 + timedelta(minutes=i % (24 * 60))
+            db_session.add(Show(movie_id=1, hall=f"P{i}", start_at=start, end_at=start + timedelta(hours=2), price=1800))
+        db_session.commit()
+
+    uuids = [str(uuid.uuid4()) for _ in range(n_tickets)]
+    with write_transaction() as conn:
+        conn.execute(
+            insert(Ticket),
+            [
+                {"uuid": u, "show_id": i // per_show + 1, "user_id": "bench-user", "breakdown_json": "{}", "issued_at": day0}
+                for i, u in enumerate(uuids)
+            ],
+        )
+        conn.execute(
+            insert(TicketSeat),
+            [
+                {"ticket_id": i + 1, "show_id": i // per_show + 1, "seat": f"{chr(ord('A') + (i % per_show) // 10)}-{2 * (i % 10) + k + 1}"}
+                for i in range(n_tickets)
+                for k in range(2)
+            ],
+        )
+    return uuids
+
+
+def _measure(build) -> int:
+    # build() が作るオブジェクトのメモリ量(バイト)
+    gc.collect()
+    tracemalloc.start()
+    obj = build()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del obj
+    return size
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="改札のメモリ索引の計測")
+    parser.add_argument("--tickets", type=int, default=50000)
+    parser.add_argument("--db-scans", type=int, default=1000, help="DB照合(check_in)で流す件数")
+    args = parser.parse_args()
+
+    tmp = tempfile.TemporaryDirectory()
+    # db.db を import する前に設定する(import時に読む)
+    os.environ["CINEMA_DB_PATH"] = os.path.join(tmp.name, "bench.db")
+
+    from db.db import engine
+    from services.errors import TicketNotFoundError
+    from services.gate import SCAN_ACCEPTED, check_in
+    from services.gateIndex import GateIndex
+
+    uuids = _seed(args.tickets)
+
+    # 読み込み(DBの行は先に全部読んでおき、索引の組み立て分だけを比べる)
+    with engine.connect() as conn:
+        rows = conn.exec_driver_sql(
+            "SELECT t.id, t.uuid, t.show_id, t.used_at, group_concat(s.seat) "
+            "FROM tickets t LEFT JOIN ticket_seats s ON s.ticket_id = t.id GROUP BY t.id"
+        ).all()
+
+    def _str_dict():
+        # 比較用: UUID文字列 → 値の dict
+        # (tickets.uuid は16バイトで保存しているので、変更前と同じ UUID文字列 のキーに戻す)
+        return {
+            str(uuid.UUID(bytes=r[1])): {"ticket_id": r[0], "show_id": r[2], "used_at": r[3], "seats": tuple(r[4].split(","))}
+            for r in rows
+        }
+
+    str_bytes = _measure(_str_dict)
+    index_bytes = _measure(GateIndex.load)
+    # 時間は tracemalloc なしで測る(tracemalloc は確保のたびに記録するので遅くなる)
+    t0 = time.perf_counter()
+    index = GateIndex.load()
+    load_sec = time.perf_counter() - t0
+    if len(index) != len(uuids):
+        print(f"ERROR: loaded={len(index)} expected={len(uuids)}")
+        return 1
+
+    print(f"tickets={len(index)} shows={len(index.shows)}")
+    print(f"load (query + build)     : {load_sec * 1000:8.1f} ms")
+    print(f"memory str-key dict      : {str_bytes / 1024 / 1024:8.2f} MiB ({str_bytes / len(rows):.0f} B/ticket)")
+    print(f"memory GateIndex         : {index_bytes / 1024 / 1024:8.2f} MiB ({index_bytes / len(rows):.0f} B/ticket)")
+
+    # 照合: 全チケット + 再入場5%
+    rng = random.Random(0)
+    scans = list(uuids) + rng.sample(uuids, len(uuids) // 20)
+    rng.shuffle(scans)
+    t0 = time.perf_counter()
+    accepted = sum(1 for u in scans if index.scan(u).status == SCAN_ACCEPTED)
+    scan_sec = time.perf_counter() - t0
+    print(f"scan in memory           : {scan_sec / len(scans) * 1e6:8.2f} us/scan ({len(scans)} scans)")
+
+    t0 = time.perf_counter()
+    result = index.flush()
+    flush_sec = time.perf_counter() - t0
+    print(f"flush {result.written:>6} entries      : {flush_sec * 1000:8.1f} ms")
+
+    # DB照合(1件ずつ)。flush で全件使用済みになっているので、更新なしの照合時間になる
+    db_scans = scans[: args.db_scans]
+    t0 = time.perf_counter()
+    for u in db_scans:
+        try:
+            check_in(u)
+        except TicketNotFoundError:
+            pass
+    db_sec = time.perf_counter() - t0
+    print(f"check_in via DB          : {db_sec / len(db_scans) * 1e6:8.2f} us/scan ({len(db_scans)} scans)")
+
+    with engine.connect() as conn:
+        used = conn.exec_driver_sql("SELECT COUNT(*) FROM tickets WHERE used_at IS NOT NULL").scalar_one()
+    engine.dispose()
+    tmp.cleanup()
+
+    if accepted != len(uuids) or used != len(uuids) or result.conflicts:
+        print(f"ERROR: accepted={accepted} used={used} conflicts={len(result.conflicts)} expected={len(uuids)}")
+        return 1
+    print(f"\nOK: accepted={accepted} written={result.written}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,254 @@
+from __future__ import annotations
+
+"""server.py(HTTP/JSON API)の負荷試験(ベンチマーク)。
+
+- 一時DBにサンプルを入れて server.py を別プロセスで起動し、localhost から多数の同時クライアントで叩く
+- 各クライアントは「映画一覧 → 上映回 → 座席表 → 仮押さえ → 予約 → (一部)改札/キャンセル」を繰り返す
+- 既定は keep-alive(1接続を使い回す)。--close で毎回接続し直した場合と比べられる
+- リクエスト数/秒、レイテンシ(p50/p95/p99)、ステータス別の件数を出す
+- CINEMA_DB_PATH で一時DBを使うので cinema.db には触らない
+
+使い方:
+  python scripts/bench_http_api.py
+  python scripts/bench_http_api.py --clients 300 --duration 10
+  python scripts/bench_http_api.py --close
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+API_TOKEN = "bench-token"
+
+
+class _Client:
+    # keep-alive の最小HTTPクライアント(標準ライブラリだけで、同時に数百本張れるように asyncio で書く)
+    def __init__(self, host: str, port: int, keep_alive: bool):
+        self.host = host
+        self.port = port
+        self.keep_alive = keep_alive
+        self.reader: asyncio.StreamReader | None = None
+        self.writer: asyncio.StreamWriter | None = None
+
+    async def close(self) -> None:
+        if self.writer is not None:
+            self.writer.close()
+            try:
+                await self.writer.wait_closed()
+            except ConnectionError:
+                pass
+        self.reader = self.writer = None
+
+    async def request(
+        self, method: str, path: str, body: dict | None = None, token: str | None = None
+    ) -> tuple[int, object]:
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        payload = json.dumps(body).encode("utf-8") if body is not None else b""
+        head = (
+            f"{method} {path} HTTP/1.1\r\n"
+            f"Host: {self.host}\r\n"
+            f"Content-Length: {len(payload)}\r\n"
+            f"Connection: {'keep-alive' if self.keep_alive else 'close'}\r\n"
+        )
+        if payload:
+            head += "Content-Type: application/json\r\n"
+        if token:
+            head += f"Authorization: Bearer {token}\r\n"
+        self.writer.write(head.encode("latin-1") + b"\r\n" + payload)
+        await self.writer.drain()
+
+        status_line = await self.reader.readuntil(b"\r\n")
+        status = int(status_line.split(b" ", 2)[1])
+        length = 0
+        server_close = False
+        while True:
+            line = await self.reader.readuntil(b"\r\n")
+            if line == b"\r\n":
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            name = name.strip().lower()
+            if name == "content-length":
+                length = int(value)
+            elif name == "connection" and value.strip().lower() == "close":
+                server_close = True
+        data = await self.reader.readexactly(length) if length else b""
+        if server_close or not self.keep_alive:
+            await self.close()
+        return status, json.loads(data) if data else None
+
+
+class _Stats:
+    def __init__(self) -> None:
+        self.latencies: list[float] = []
+        self.statuses: Counter[int] = Counter()
+        self.errors = 0
+        self.tickets = 0
+
+
+async def _buyer(no: int, args, port: int, show_ids: list[int], deadline: float, stats: _Stats) -> None:
+    rng = random.Random(no)
+    client = _Client("127.0.0.1", port, keep_alive=not args.close)
+    user_id = f"bench-{no % args.users}"
+
+    async def call(method: str, path: str, body: dict | None = None, token: str | None = None):
+        t0 = time.perf_counter()
+        status, data = await client.request(method, path, body, token)
+        stats.latencies.append(time.perf_counter() - t0)
+        stats.statuses[status] += 1
+        return status, data
+
+    try:
+        while time.perf_counter() < deadline:
+            await call("GET", "/movies")
+            await call("GET", "/movies/1/shows")
+            show_id = rng.choice(show_ids)
+            status, seat_map = await call("GET", f"/shows/{show_id}/seats")
+            if status != 200:
+                continue
+
+            # 空席から2席選んで押さえ → 予約
+            vacant = [
+                f"{chr(ord('A') + r)}-{sum(1 for c in row[: x + 1] if c in 'oxh')}"
+                for r, row in enumerate(seat_map["rows"])
+                for x, c in enumerate(row)
+                if c == "o"
+            ]
+            if len(vacant) < 2:
+                continue
+            seats = rng.sample(vacant, 2)
+            status, hold = await call("POST", f"/shows/{show_id}/holds", {"seats": seats, "user_id": user_id})
+            if status != 200:
+                continue
+            status, ticket = await call(
+                "POST",
+                "/reservations",
+                {
+                    "show_id": show_id,
+                    "seats": seats,
+                    "breakdown": {"adult": 2},
+                    "user_id": user_id,
+                    "user_name": user_id,
+                    "hold_token": hold["hold_token"],
+                },
+            )
+            if status != 201:
+                continue
+            stats.tickets += 1
+
+            await call("GET", f"/users/{user_id}/reservations")
+            roll = rng.random()
+            if roll < 0.3:
+                await call("POST", "/gate/check-in", {"uuid": ticket["uuid"]}, API_TOKEN)
+            elif roll < 0.5:
+                await call("DELETE", f"/reservations/{ticket['uuid']}?user_id={user_id}")
+    except (ConnectionError, asyncio.IncompleteReadError, OSError):
+        stats.errors += 1
+    finally:
+        await client.close()
+
+
+def _seed(n_shows: int, users: int) -> list[int]:
+    from db.db import SessionLocal, engine, init_db
+    from db.models import Movie, Show, User
+
+    init_db()
+    with SessionLocal() as db_session:
+        db_session.add(Movie(title="bench", duration_min=120, default_price=1800))
+        for u in range(users):
+            db_session.add(User(id=f"bench-{u}", username=f"bench{u}", password_hash="-", role="User"))
+        db_session.flush()
+        day0 = datetime(2030, 1, 1, 9)
+        shows = []
+        for i in range(n_shows):
+            start = day0 + timedelta(hours=3 * i)
+            show = Show(movie_id=1, hall="ABCD"[i % 4], start_at=start, end_at=start + timedelta(hours=2), price=1800)
+            db_session.add(show)
+            shows.append(show)
+        db_session.commit()
+        show_ids = [s.id for s in shows]
+    engine.dispose()
+    return show_ids
+
+
+def _percentile(values: list[float], p: float) -> float:
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="HTTP/JSON API サーバーの負荷試験")
+    parser.add_argument("--clients", type=int, default=200, help="同時クライアント数")
+    parser.add_argument("--duration", type=float, default=5.0, help="計測時間(秒)")
+    parser.add_argument("--shows", type=int, default=20)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--workers", type=int, default=None, help="server.py のスレッド数(既定はサーバー側の既定値)")
+    parser.add_argument("--close", action="store_true", help="keep-alive を使わず毎回接続し直す")
+    args = parser.parse_args()
+
+    tmp = tempfile.TemporaryDirectory()
+    # db.db を import する前に設定する(import時に読む)。サーバープロセスにも引き継ぐ
+    os.environ["CINEMA_DB_PATH"] = os.path.join(tmp.name, "bench.db")
+    # 改札APIのトークン(サーバープロセスに引き継ぐ)
+    os.environ["CINEMA_API_TOKEN"] = API_TOKEN
+    show_ids = _seed(args.shows, args.users)
+
+    cmd = [sys.executable, os.path.join(ROOT_DIR, "server.py"), "--port", "0"]
+    if args.workers:
+        cmd += ["--workers", str(args.workers)]
+    proc = subprocess.Popen(cmd, cwd=ROOT_DIR, stdout=subprocess.PIPE, text=True)
+    try:
+        line = proc.stdout.readline()
+        if not line.startswith("listening on"):
+            print(f"ERROR: server did not start: {line!r}")
+            return 1
+        print(line.strip())
+        port = int(line.split()[2].rsplit(":", 1)[1])
+
+        async def _run() -> tuple[_Stats, float]:
+            stats = _Stats()
+            t0 = time.perf_counter()
+            deadline = t0 + args.duration
+            await asyncio.gather(*(_buyer(i, args, port, show_ids, deadline, stats) for i in range(args.clients)))
+            return stats, time.perf_counter() - t0
+
+        stats, elapsed = asyncio.run(_run())
+    finally:
+        proc.terminate()
+        proc.wait(timeout=10)
+        tmp.cleanup()
+
+    lat = sorted(stats.latencies)
+    total = len(lat)
+    print(f"clients={args.clients} keep_alive={not args.close} elapsed={elapsed:.1f}s")
+    print(f"requests={total}  req/s={total / elapsed:.0f}  tickets={stats.tickets}  connection errors={stats.errors}")
+    print(
+        "latency ms: "
+        f"p50={_percentile(lat, 0.50) * 1000:.1f}  p95={_percentile(lat, 0.95) * 1000:.1f}  "
+        f"p99={_percentile(lat, 0.99) * 1000:.1f}  max={(lat[-1] if lat else 0) * 1000:.1f}"
+    )
+    print("status: " + "  ".join(f"{s}={n}" for s, n in sorted(stats.statuses.items())))
+
+    server_errors = sum(n for s, n in stats.statuses.items() if s >= 500)
+    if server_errors or stats.errors or stats.tickets == 0:
+        print(f"ERROR: 5xx={server_errors} connection errors={stats.errors} tickets={stats.tickets}")
+        return 1
+    print("\nOK")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,235 @@
+from __future__ import annotations
+
+"""インデックス有無によるページごとのクエリ時間の比較(ベンチマーク)。
+
+- 一時ファイルのSQLiteに1年分の上映回と大量のチケットを投入
+- インデックス無し(旧スキーマ相当) → ensure_indexes() 適用後 の順で
+  各ページが発行するクエリを同じ条件で計測する
+- cinema.db には一切触らない
+
+使い方:
+  python scripts/bench_indexes.py
+  python scripts/bench_indexes.py --tickets 2000000 --repeat 200
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from sqlalchemy import create_engine, insert, select, text
+
+from db.db import ensure_indexes
+from db.models import Base, Movie, Show, Ticket, TicketSeat, User
+
+HALLS = ["A", "B", "C", "D"]
+START_TIMES = ["10:00", "13:00", "16:00", "19:00", "21:30"]
+
+
+def _populate(engine, n_movies: int, n_users: int, n_tickets: int, seed: int) -> dict[str, int]:
+    rnd = random.Random(seed)
+    day0 = datetime(2025, 1, 1)
+
+    with engine.begin() as conn:
+        conn.execute(
+            insert(Movie),
+            [{"title": f"movie{i}", "duration_min": 120, "default_price": 1800, "tags_json": "[]"} for i in range(n_movies)],
+        )
+        conn.execute(
+            insert(User),
+            [{"id": f"user{i}", "username": f"user{i}", "password_hash": "-", "role": "User"} for i in range(n_users)],
+        )
+
+        # 1年 x ホール x 開始時刻ぶんの上映回
+        shows: list[dict[str, object]] = []
+        for d in range(365):
+            day = day0 + timedelta(days=d)
+            for hall in HALLS:
+                for t in START_TIMES:
+                    start = datetime.combine(day.date(), datetime.strptime(t, "%H:%M").time())
+                    shows.append(
+                        {
+                            "movie_id": rnd.randint(1, n_movies),
+                            "hall": hall,
+                            "start_at": start.strftime("%Y-%m-%dT%H:%M"),
+                            "end_at": (start + timedelta(minutes=120)).strftime("%Y-%m-%dT%H:%M"),
+                            "price": 1800,
+                        }
+                    )
+        conn.execute(insert(Show), shows)
+        n_shows = len(shows)
+
+        # チケット(1枚2席)をまとめて投入
+        batch = 50_000
+        ticket_id = 0
+        for base in range(0, n_tickets, batch):
+            tickets: list[dict[str, object]] = []
+            seats: list[dict[str, object]] = []
+            for _ in range(min(batch, n_tickets - base)):
+                ticket_id += 1
+                show_id = rnd.randint(1, n_shows)
+                issued = day0 + timedelta(minutes=rnd.randint(0, 365 * 24 * 60))
+                tickets.append(
+                    {
+                        "id": ticket_id,
+                        "uuid": f"{ticket_id:032x}",
+                        "show_id": show_id,
+                        "user_id": f"user{rnd.randrange(n_users)}",
+                        "breakdown_json": "{}",
+                        "sum_price": 3600,
+                        "issued_at": issued.strftime("%Y-%m-%dT%H:%M"),
+                        "used_at": None if rnd.random() < 0.3 else issued.strftime("%Y-%m-%dT%H:%M"),
+                    }
+                )
+                # 座席番号は ticket_id 由来で一意にして unique 制約に当たらないようにする
+                seats.append({"ticket_id": ticket_id, "show_id": show_id, "seat": f"T{ticket_id}-1"})
+                seats.append({"ticket_id": ticket_id, "show_id": show_id, "seat": f"T{ticket_id}-2"})
+            conn.execute(insert(Ticket), tickets)
+            conn.execute(insert(TicketSeat), seats)
+
+    return {"movies": n_movies, "users": n_users, "shows": n_shows, "tickets": n_tickets}
+
+
+def _drop_indexes(engine) -> None:
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                conn.exec_driver_sql(f"DROP INDEX IF EXISTS {index.name}")
+        conn.exec_driver_sql("ANALYZE")
+
+
+# ページごとの代表クエリ(各ページの select と同じ条件)
+def _page_queries(counts: dict[str, int]):
+    def calendar(rnd: random.Random):
+        month = rnd.randint(1, 11)
+        return (
+            select(Show)
+            .where(Show.movie_id == rnd.randint(1, counts["movies"]))
+            .where(Show.start_at >= f"2025-{month:02d}-01T00:00")
+            .where(Show.start_at < f"2025-{month + 1:02d}-01T00:00")
+        )
+
+    def show_select(rnd: random.Random):
+        day = datetime(2025, 1, 1) + timedelta(days=rnd.randrange(364))
+        return (
+            select(Show)
+            .where(Show.movie_id == rnd.randint(1, counts["movies"]))
+            .where(Show.start_at >= day.strftime("%Y-%m-%dT00:00"))
+            .where(Show.start_at < (day + timedelta(days=1)).strftime("%Y-%m-%dT00:00"))
+            .order_by(Show.start_at, Show.hall, Show.id)
+        )
+
+    def schedule_conflict(rnd: random.Random):
+        day = datetime(2025, 1, 1) + timedelta(days=rnd.randrange(300))
+        return (
+            select(Show)
+            .where(
+                Show.hall == rnd.choice(HALLS),
+                Show.start_at < (day + timedelta(days=28)).strftime("%Y-%m-%dT00:00"),
+                Show.end_at > day.strftime("%Y-%m-%dT00:00"),
+            )
+            .order_by(Show.start_at)
+        )
+
+    def reservation_list(rnd: random.Random):
+        return (
+            select(Ticket)
+            .where(Ticket.user_id == f"user{rnd.randrange(counts['users'])}", Ticket.used_at.is_(None))
+            .order_by(Ticket.issued_at.desc().nullslast(), Ticket.id.desc())
+        )
+
+    def ticket_seats(rnd: random.Random):
+        return (
+            select(TicketSeat.seat)
+            .where(TicketSeat.ticket_id == rnd.randint(1, counts["tickets"]))
+            .order_by(TicketSeat.seat)
+        )
+
+    return {
+        "UserShowCalendar": calendar,
+        "UserShowSelect": show_select,
+        "AdminScheduleEdit(conflict)": schedule_conflict,
+        "UserReservationList": reservation_list,
+        "AdminGateCheck(seats)": ticket_seats,
+    }
+
+
+def _measure(engine, queries, repeat: int, seed: int) -> dict[str, float]:
+    # 同じseedで同じ引数列を流し、1クエリあたりの平均時間(ms)を返す
+    result: dict[str, float] = {}
+    with engine.connect() as conn:
+        for name, build in queries.items():
+            rnd = random.Random(seed)
+            stmts = [build(rnd) for _ in range(repeat)]
+            t0 = time.perf_counter()
+            for stmt in stmts:
+                conn.execute(stmt).all()
+            result[name] = (time.perf_counter() - t0) * 1000 / repeat
+    return result
+
+
+def _plans(engine, queries, seed: int) -> dict[str, str]:
+    plans: dict[str, str] = {}
+    with engine.connect() as conn:
+        for name, build in queries.items():
+            stmt = build(random.Random(seed))
+            compiled = stmt.compile(engine, compile_kwargs={"literal_binds": True})
+            rows = conn.execute(text(f"EXPLAIN QUERY PLAN {compiled}")).all()
+            plans[name] = " / ".join(str(r[-1]) for r in rows)
+    return plans
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="インデックス有無によるクエリ時間の比較")
+    parser.add_argument("--movies", type=int, default=50)
+    parser.add_argument("--users", type=int, default=2_000)
+    parser.add_argument("--tickets", type=int, default=300_000)
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        Base.metadata.create_all(engine)
+
+        t0 = time.perf_counter()
+        counts = _populate(engine, args.movies, args.users, args.tickets, args.seed)
+        print(f"populated {counts} in {time.perf_counter() - t0:.1f}s")
+
+        queries = _page_queries(counts)
+
+        _drop_indexes(engine)
+        before = _measure(engine, queries, args.repeat, args.seed)
+        before_plans = _plans(engine, queries, args.seed)
+
+        with engine.begin() as conn:
+            created = ensure_indexes(conn)
+            conn.exec_driver_sql("ANALYZE")
+        print(f"created indexes: {', '.join(created)}")
+        after = _measure(engine, queries, args.repeat, args.seed)
+        after_plans = _plans(engine, queries, args.seed)
+        engine.dispose()
+
+    print()
+    print(f"{'page':<30}{'before(ms)':>12}{'after(ms)':>12}{'speedup':>10}")
+    for name in queries:
+        b, a = before[name], after[name]
+        print(f"{name:<30}{b:>12.3f}{a:>12.3f}{b / a if a > 0 else float('inf'):>9.1f}x")
+
+    print()
+    for name in queries:
+        print(f"[{name}]")
+        print(f"  before: {before_plans[name]}")
+        print(f"  after : {after_plans[name]}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
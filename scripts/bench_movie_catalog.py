@@ -0,0 +1,162 @@
+from __future__ import annotations
+
+"""映画一覧(UserMovieBrowse / AdminMovieList / AdminScheduleEdit)の読み取りの比較(ベンチマーク)。
+
+- 20,000 本(既定)の映画を作る(説明は1本あたり約1KB、タグつき)
+- 1回の表示あたりの時間と、読んだ一覧が持つメモリ量(tracemalloc)を比べる
+  orm_full   : select(Movie) で説明・タグまで全列を読む(変更前の書き方)
+  orm_lazy   : select(Movie)。説明・タグは遅延読み込み(deferred)なので読まない
+  projection : 一覧に出す列だけを読んで値だけの dataclass にする(キャッシュなし)
+  cached     : services.movieCatalog.list_movie_summaries(版を確かめて、変わっていなければキャッシュ)
+- 映画を編集して版を上げると、次の読み取りで新しい値が返ることを確かめる
+- CINEMA_DB_PATH で一時DBを使うので cinema.db には触らない
+
+使い方:
+  python scripts/bench_movie_catalog.py
+  python scripts/bench_movie_catalog.py --movies 50000 --repeat 10
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+
+def _seed(n_movies: int, seed: int) -> None:
+    from sqlalchemy import insert
+
+    from db.db import init_db, write_transaction
+    from db.models import Movie
+
+    init_db()
+    rng = random.Random(seed)
+    words = ["アクション", "ミステリー", "コメディ", "ドラマ", "ファンタジー", "ドキュメンタリー"]
+    rows = []
+    for i in range(n_movies):
+        tags = rng.sample(words, 2)
+        rows.append({
+            "title": f"映画{i:05d}",
+            "duration_min": rng.randint(80, 180),
+            "default_price": rng.choice((1500, 1800, 2000)),
+            "tags_json": '["' + '","'.join(tags) + '"]',
+            # 約1KBの説明文
+            "description": "".join(rng.choice(words) for _ in range(60)),
+            "run_start_date": "2030-01-01",
+            "run_end_date": "2030-03-31",
+        })
+    with write_transaction() as conn:
+        conn.execute(insert(Movie), rows)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="映画一覧の読み取りの比較")
+    parser.add_argument("--movies", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    tmp = tempfile.TemporaryDirectory()
+    # db.db を import する前に設定する(import時に読む)
+    os.environ["CINEMA_DB_PATH"] = os.path.join(tmp.name, "bench.db")
+
+    from sqlalchemy import select, update
+    from sqlalchemy.orm import undefer_group
+
+    from db.db import SessionLocal, engine, write_transaction
+    from db.models import Movie
+    from services.movieCatalog import (
+        _SUMMARIES,
+        MovieSummary,
+        bump_movie_version,
+        clear_movie_cache,
+        list_movie_summaries,
+    )
+
+    _seed(args.movies, args.seed)
+
+    def orm_full() -> list[tuple]:
+        with SessionLocal() as db_session:
+            movies = db_session.execute(select(Movie).options(undefer_group("details")).order_by(Movie.id)).scalars().all()
+            return [(m.id, m.title, m.duration_min, m.default_price) for m in movies]
+
+    def orm_lazy() -> list[tuple]:
+        with SessionLocal() as db_session:
+            movies = db_session.execute(select(Movie).order_by(Movie.id)).scalars().all()
+            return [(m.id, m.title, m.duration_min, m.default_price) for m in movies]
+
+    def projection() -> list[tuple]:
+        with engine.connect() as conn:
+            movies = [MovieSummary(*row) for row in conn.execute(_SUMMARIES)]
+        return [(m.id, m.title, m.duration_min, m.default_price) for m in movies]
+
+    def cached() -> list[tuple]:
+        return [(m.id, m.title, m.duration_min, m.default_price) for m in list_movie_summaries()]
+
+    # 読んだ一覧そのもののメモリ量(表示が終わるまで持っている分)
+    def held_orm(full: bool):
+        def _load():
+            stmt = select(Movie).order_by(Movie.id)
+            if full:
+                stmt = stmt.options(undefer_group("details"))
+            db_session = SessionLocal()
+            return db_session, db_session.execute(stmt).scalars().all()
+        return _load
+
+    def held_projection():
+        with engine.connect() as conn:
+            return [MovieSummary(*row) for row in conn.execute(_SUMMARIES)]
+
+    def held_cached():
+        clear_movie_cache()
+        return list_movie_summaries()
+
+    methods = {"orm_full": orm_full, "orm_lazy": orm_lazy, "projection": projection, "cached": cached}
+    holders = {"orm_full": held_orm(True), "orm_lazy": held_orm(False), "projection": held_projection, "cached": held_cached}
+
+    expected = orm_full()
+    print(f"movies={args.movies} repeat={args.repeat}")
+    print(f"{'method':<12}{'ms/view':>10}{'held MiB':>10}")
+    for name, fn in methods.items():
+        if fn() != expected:
+            print(f"ERROR: {name} returned a different list")
+            return 1
+        t0 = time.perf_counter()
+        for _ in range(args.repeat):
+            fn()
+        ms = (time.perf_counter() - t0) * 1000 / args.repeat
+        tracemalloc.start()
+        held = holders[name]()
+        size, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        if isinstance(held, tuple):
+            held[0].close()
+        del held
+        print(f"{name:<12}{ms:>10.3f}{size / 1024 / 1024:>10.1f}")
+
+    # 編集 → 版を上げる → 次の読み取りで新しい値(読み直しの時間も出す)
+    list_movie_summaries()
+    with write_transaction() as conn:
+        conn.execute(update(Movie).where(Movie.id == 1).values(title="renamed"))
+        bump_movie_version(conn)
+    t0 = time.perf_counter()
+    movies = list_movie_summaries()
+    reload_ms = (time.perf_counter() - t0) * 1000
+    engine.dispose()
+    tmp.cleanup()
+    if movies[0].title != "renamed":
+        print("ERROR: cache was not invalidated by the version bump")
+        return 1
+    print(f"reload after version bump: {reload_ms:.3f} ms")
+    print("\nOK: all methods return the same list, cache follows the version")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,157 @@
+from __future__ import annotations
+
+"""映画検索(UserMovieBrowse の s)の比較(ベンチマーク)。
+
+- 100,000 本(既定)の映画を作る(日本語のタイトル・説明、英単語まじり、タグ2つ)
+- like : タイトル・説明の LIKE '%語%'、タグは tags_json の LIKE(索引なしの素直な書き方。全件を読む)
+- fts  : services.movieSearch.search_movies(FTS5 の movies_fts + movie_tags、一致度順に上位50件)
+- 検索語は 1文字 / 2文字 / 4文字 / 英単語の前方一致 / タグ / 語+タグ
+- 上位を絞らずに引いた結果が LIKE と同じ映画になることを確かめる
+  (英単語は前方一致なので、LIKE の部分一致の結果に含まれることだけ確かめる)
+- 索引を全件作る時間と、映画1本の編集で索引を更新する時間も出す
+- CINEMA_DB_PATH で一時DBを使うので cinema.db には触らない
+
+使い方:
+  python scripts/bench_movie_search.py
+  python scripts/bench_movie_search.py --movies 20000 --repeat 50
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+WORDS = [
+    "東京", "大阪", "恋", "夏", "物語", "冒険", "宇宙", "戦争", "探偵", "魔法", "少女", "少年", "猫", "海",
+    "夜空", "星", "旅", "家族", "未来", "約束", "秘密", "記憶", "奇跡", "青春", "最後", "始まり", "ロボット", "ミステリー",
+]
+LATIN = ["star", "night", "love", "dream", "city", "blue"]
+TAGS = ["action", "mystery", "comedy", "drama", "fantasy", "horror", "romance", "sf", "anime", "documentary"]
+
+# (検索語, 英単語の前方一致か)
+QUERIES = [
+    ("恋", False),
+    ("探偵", False),
+    ("宇宙戦争", False),
+    ("ロボット 少女", False),
+    ("sta", True),
+    ("#horror", False),
+    ("魔法 #anime", False),
+]
+
+
+def _seed(n_movies: int, seed: int) -> None:
+    from sqlalchemy import insert
+
+    from db.db import init_db, write_transaction
+    from db.models import Movie
+
+    init_db()
+    rng = random.Random(seed)
+    rows = []
+    for i in range(n_movies):
+        title = "".join(rng.sample(WORDS, 2))
+        if rng.random() < 0.3:
+            title += f" {rng.choice(LATIN).capitalize()}"
+        joints = "のとが"
+        description = "".join(w + rng.choice(joints) for w in rng.choices(WORDS, k=12)) + "。"
+        rows.append({
+            "title": f"{title} {i}",
+            "duration_min": 120,
+            "default_price": 1800,
+            "tags_json": json.dumps(rng.sample(TAGS, 2)),
+            "description": description,
+        })
+    with write_transaction() as conn:
+        conn.execute(insert(Movie), rows)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="映画検索の比較")
+    parser.add_argument("--movies", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    tmp = tempfile.TemporaryDirectory()
+    # db.db を import する前に設定する(import時に読む)
+    os.environ["CINEMA_DB_PATH"] = os.path.join(tmp.name, "bench.db")
+
+    from sqlalchemy import or_, select, update
+
+    from db.db import engine, write_transaction
+    from db.models import Movie
+    from services.movieSearch import has_fts, rebuild_movie_search, search_movies, split_query, sync_movie
+
+    _seed(args.movies, args.seed)
+    t0 = time.perf_counter()
+    with write_transaction() as conn:
+        if not has_fts(conn):
+            print("ERROR: this SQLite has no FTS5 (search falls back to LIKE)")
+            return 1
+        rebuild_movie_search(conn)
+        conn.exec_driver_sql("ANALYZE")
+    build_ms = (time.perf_counter() - t0) * 1000
+
+    def like(query: str) -> list[int]:
+        words, tags = split_query(query)
+        stmt = select(Movie.id).order_by(Movie.id)
+        for word in words:
+            stmt = stmt.where(or_(Movie.title.like(f"%{word}%"), Movie.description.like(f"%{word}%")))
+        for tag in tags:
+            stmt = stmt.where(Movie.tags_json.like(f'%"{tag}"%'))
+        with engine.connect() as conn:
+            return list(conn.execute(stmt).scalars())
+
+    def timed(fn, query: str) -> float:
+        t0 = time.perf_counter()
+        for _ in range(args.repeat):
+            fn(query)
+        return (time.perf_counter() - t0) * 1000 / args.repeat
+
+    print(f"movies={args.movies} repeat={args.repeat} index build={build_ms:.0f} ms")
+    print(f"{'query':<16}{'hits':>7}{'like ms':>10}{'fts ms':>10}")
+    for query, prefix in QUERIES:
+        expected = set(like(query))
+        found = {m.id for m in search_movies(query, limit=None)}
+        if (not found <= expected) if prefix else (found != expected):
+            print(f"ERROR: search for {query!r} returned {len(found)} movies, LIKE returned {len(expected)}")
+            return 1
+        like_ms = timed(like, query)
+        fts_ms = timed(search_movies, query)
+        print(f"{query:<16}{len(found):>7}{like_ms:>10.2f}{fts_ms:>10.2f}")
+
+    # 映画1本の編集(タイトル・説明・タグを書き換えて索引を更新)
+    rng = random.Random(args.seed)
+    edits = [rng.randint(1, args.movies) for _ in range(200)]
+    t0 = time.perf_counter()
+    for movie_id in edits:
+        with write_transaction() as conn:
+            conn.execute(
+                update(Movie)
+                .where(Movie.id == movie_id)
+                .values(title=f"編集済み{movie_id}", description="書き換えた説明", tags_json='["edited"]')
+            )
+            sync_movie(conn, movie_id)
+    edit_ms = (time.perf_counter() - t0) * 1000 / len(edits)
+    edited = {m.id for m in search_movies("#edited", limit=None)}
+    renamed = {m.id for m in search_movies("編集済み", limit=None)}
+    engine.dispose()
+    tmp.cleanup()
+    print(f"edit + sync_movie : {edit_ms:.3f} ms per movie")
+    if edited != set(edits) or renamed != set(edits):
+        print("ERROR: edited movies are not found by the updated index")
+        return 1
+    print("\nOK: search results match LIKE, edits are reflected in the index")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
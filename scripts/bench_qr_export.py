@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+"""チケットQRの一括出力(services.qrExport)の処理速度(ベンチマーク)。
+
+- 上映回(400席 = 200枚 × 2席)にチケットを大量に作り、ワーカー数を変えて出力する
+- 1秒あたりの枚数と、ワーカー1つ(=1コア)あたりの枚数を出す
+- 親プロセスの最大メモリ(ru_maxrss)が枚数に比例して増えないことも確かめる
+  (少ない枚数で1回出力した後の値と、全件を出力した後の値を比べる)
+- CINEMA_DB_PATH で一時DBを使うので cinema.db には触らない。画像は一時ディレクトリに書く
+
+使い方:
+  python scripts/bench_qr_export.py
+  python scripts/bench_qr_export.py --tickets 20000 --workers 1,2,4,8 --format png
+"""
+
+import argparse
+import csv
+import os
+import resource
+import sys
+import tempfile
+import uuid
+from datetime import datetime, timedelta
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+
+def _seed(n_tickets: int) -> None:
+    from sqlalchemy import insert
+
+    from db.db import SessionLocal, init_db, write_transaction
+    from db.models import Movie, Show, Ticket, TicketSeat, User
+
+    init_db()
+    per_show = 200
+    n_shows = (n_tickets + per_show - 1) // per_show
+    day0 = datetime(2030, 1, 1, 9)
+    with SessionLocal() as db_session:
+        db_session.add(Movie(title="団体上映会", duration_min=120, default_price=1800))
+        db_session.add(User(id="bench-user", username="bench", password_hash="-", role="User"))
+        db_session.flush()
+        for i in range(n_shows):
+            start = day0 + timedelta(hours=3 * i)
+            db_session.add(Show(movie_id=1, hall="P", start_at=start, end_at=start + timedelta(hours=2), price=1800))
+        db_session.commit()
+
+    with write_transaction() as conn:
+        conn.execute(
+            insert(Ticket),
+            [
+                {"uuid": str(uuid.uuid4()), "show_id": i // per_show + 1, "user_id": "bench-user", "user_name": "幹事", "breakdown_json": "{}", "issued_at": day0}
+                for i in range(n_tickets)
+            ],
+        )
+        conn.execute(
+            insert(TicketSeat),
+            [
+                {"ticket_id": i + 1, "show_id": i // per_show + 1, "seat": f"{chr(ord('A') + (i % per_show) // 10)}-{2 * (i % 10) + k + 1}"}
+                for i in range(n_tickets)
+                for k in range(2)
+            ],
+        )
+
+
+def _max_rss_mib() -> float:
+    # Linux は KiB、macOS はバイト
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / 1024 / 1024 if sys.platform == "darwin" else rss / 1024
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="チケットQRの一括出力の処理速度")
+    parser.add_argument("--tickets", type=int, default=10000)
+    parser.add_argument("--workers", type=str, default=None, help="ワーカー数(カンマ区切り。既定: 1 と CPUコア数)")
+    parser.add_argument("--format", type=str, default="svg,png")
+    args = parser.parse_args()
+    cpus = os.cpu_count() or 1
+    levels = [int(w) for w in args.workers.split(",")] if args.workers else sorted({1, cpus})
+    formats = [f.strip() for f in args.format.split(",") if f.strip()]
+
+    tmp = tempfile.TemporaryDirectory()
+    # db.db を import する前に設定する(import時に読む)
+    os.environ["CINEMA_DB_PATH"] = os.path.join(tmp.name, "bench.db")
+
+    from db.db import engine
+    from services.qrExport import export_tickets, ticket_filter
+
+    _seed(args.tickets)
+
+    # 少ない枚数(最初の上映回だけ)で1回出して、メモリの基準にする
+    export_tickets(os.path.join(tmp.name, "warmup"), ticket_filter([1]), formats=formats, workers=1)
+    base_rss = _max_rss_mib()
+
+    print(f"tickets={args.tickets} formats={','.join(formats)} cpus={cpus}")
+    print(f"{'workers':>8}{'sec':>9}{'tickets/s':>11}{'per worker':>12}{'MiB':>8}")
+    all_shows = ticket_filter(date_from=datetime(2030, 1, 1).date())
+    for n in levels:
+        out_dir = os.path.join(tmp.name, f"out{n}")
+        summary = export_tickets(out_dir, all_shows, formats=formats, workers=n)
+        if summary.tickets != args.tickets or summary.files != args.tickets * len(formats):
+            print(f"ERROR: workers={n} tickets={summary.tickets} files={summary.files}")
+            return 1
+        with open(summary.manifest_path, encoding="utf-8-sig", newline="") as f:
+            rows = list(csv.DictReader(f))
+        missing = [r for r in rows[:: max(1, len(rows) // 50)] for p in r["files"].split(";") if not os.path.exists(os.path.join(out_dir, p))]
+        if len(rows) != args.tickets or missing:
+            print(f"ERROR: manifest rows={len(rows)} missing files={len(missing)}")
+            return 1
+        print(
+            f"{n:>8}{summary.seconds:>9.2f}{summary.tickets_per_sec:>11.0f}"
+            f"{summary.tickets_per_sec / n:>12.0f}{summary.bytes_written / 1024 / 1024:>8.1f}"
+        )
+
+    rss = _max_rss_mib()
+    engine.dispose()
+    tmp.cleanup()
+    print(f"\nparent max RSS: {base_rss:.1f} MiB after 200 tickets, {rss:.1f} MiB after {args.tickets} tickets")
+    print(f"OK: exported {args.tickets} tickets x {len(levels)} runs")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+"""チケットQRの描画時間の比較(ベンチマーク)。
+
+- legacy : 変更前の QRGenerator.print と同じ(毎回 QRCode を作り、1セルずつ if で文字にする)
+- rows   : 行ごとに bytes → translate で文字にする(QRCode の生成は毎回)
+- cached : QRGenerator.render(同じチケットの2回目以降はキャッシュから返す)
+- 変換だけの時間(QRの生成を除く)も legacy と rows で比べる
+- どの方式も同じ文字列になることを確かめる(半ブロック / ASCII の両方)
+
+使い方:
+  python scripts/bench_qr_render.py
+  python scripts/bench_qr_render.py --tickets 500 --views 5
+"""
+
+import argparse
+import os
+import sys
+import time
+import uuid
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+
+def _legacy_text(m: list[list[bool]], ascii_only: bool) -> str:
+    # 変更前の QRGenerator.print の変換部分(表示は除く)
+    if ascii_only:
+        return "\n".join("".join("█" if cell else "  " for cell in row) for row in m)
+    h = len(m)
+    w = len(m[0])
+    lines: list[str] = []
+    for y in range(0, h, 2):
+        row_chars: list[str] = []
+        for x in range(w):
+            top = m[y][x]
+            bottom = m[y + 1][x] if y + 1 < h else False
+            if top and bottom:
+                ch = "█"
+            elif top and not bottom:
+                ch = "▀"
+            elif (not top) and bottom:
+                ch = "▄"
+            else:
+                ch = " "
+            row_chars.append(ch)
+        lines.append("".join(row_chars))
+    return "\n".join(lines)
+
+
+def _matrix(data: str, border: int = 4) -> list[list[bool]]:
+    import qrcode
+
+    qr = qrcode.QRCode(border=border, error_correction=qrcode.constants.ERROR_CORRECT_M)
+    qr.add_data(data)
+    qr.make(fit=True)
+    return qr.get_matrix()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="チケットQRの描画時間の比較")
+    parser.add_argument("--tickets", type=int, default=100, help="キャッシュの件数(CACHE_SIZE)を超えると cached は毎回作り直しになる")
+    parser.add_argument("--views", type=int, default=5, help="1枚のチケットを表示する回数")
+    args = parser.parse_args()
+
+    from utils import QRGenerator
+
+    uuids = [str(uuid.uuid4()) for _ in range(args.tickets)]
+    views = [u for _ in range(args.views) for u in uuids]
+
+    # 同じ文字列になること(奇数行の最後の行・境界の幅も含めて)
+    for u in uuids[:20]:
+        for border in (0, 1, 4):
+            m = _matrix(u, border)
+            for mode, ascii_only in ((QRGenerator.MODE_HALF, False), (QRGenerator.MODE_ASCII, True)):
+                if QRGenerator.render(u, border, mode) != _legacy_text(m, ascii_only):
+                    print(f"ERROR: output differs (border={border} mode={mode})")
+                    return 1
+
+    # 変換だけ(QR生成済みの行列から)
+    matrices = [_matrix(u) for u in uuids]
+    t0 = time.perf_counter()
+    for m in matrices:
+        _legacy_text(m, False)
+    legacy_conv = (time.perf_counter() - t0) / len(matrices)
+    t0 = time.perf_counter()
+    for m in matrices:
+        QRGenerator._rows_to_text(m, QRGenerator.MODE_HALF)
+    rows_conv = (time.perf_counter() - t0) / len(matrices)
+
+    # 表示1回あたり(QR生成 + 変換)
+    t0 = time.perf_counter()
+    for u in views:
+        _legacy_text(_matrix(u), False)
+    legacy = (time.perf_counter() - t0) / len(views)
+    t0 = time.perf_counter()
+    for u in views:
+        QRGenerator._rows_to_text(_matrix(u), QRGenerator.MODE_HALF)
+    rows = (time.perf_counter() - t0) / len(views)
+
+    QRGenerator._render.cache_clear()
+    t0 = time.perf_counter()
+    for u in uuids:
+        QRGenerator.prerender(u)
+    prerender = (time.perf_counter() - t0) / len(uuids)
+    t0 = time.perf_counter()
+    for u in views:
+        QRGenerator.render(u)
+    cached = (time.perf_counter() - t0) / len(views)
+    info = QRGenerator._render.cache_info()
+
+    print(f"tickets={args.tickets} views/ticket={args.views} cache={QRGenerator.CACHE_SIZE}")
+    print(f"{'convert only  legacy':<24}{legacy_conv * 1e6:>10.1f} us")
+    print(f"{'convert only  rows':<24}{rows_conv * 1e6:>10.1f} us")
+    print(f"{'per view      legacy':<24}{legacy * 1e6:>10.1f} us")
+    print(f"{'per view      rows':<24}{rows * 1e6:>10.1f} us")
+    print(f"{'prerender (purchase)':<24}{prerender * 1e6:>10.1f} us")
+    print(f"{'per view      cached':<24}{cached * 1e6:>10.1f} us  (hits={info.hits} misses={info.misses})")
+    print("\nOK: outputs match")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
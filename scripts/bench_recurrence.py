@@ -0,0 +1,175 @@
+from __future__ import annotations
+
+"""繰り返し上映の展開(AdminScheduleEdit の weekly/monthly)の比較(ベンチマーク)。
+
+- 1年分(既定)を 30 ホール(既定)ぶん展開する。ホールごとに曜日・時刻・間隔・除外日を変える
+- loop   : 開始日から1日ずつ走査して、週番号と曜日を判定する(変更前の書き方)
+- range  : utils.recurrence(曜日・時刻ごとの等差数列、numpy なし)
+- numpy  : utils.recurrence(numpy の配列演算。numpy が入っていなければ飛ばす)
+- page   : AdminScheduleEdit と同じく、展開した結果を (開始日時, hall) → 値 の dict にするまで
+- ランダムなルールでも loop と同じ上映回になることを確かめる(monthly・除外日を含む)
+- DBは使わない
+
+使い方:
+  python scripts/bench_recurrence.py
+  python scripts/bench_recurrence.py --days 730 --halls 60 --repeat 5
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from db.models import from_epoch_min, to_epoch_min
+from utils.recurrence import HAS_NUMPY, MonthlyRule, WeeklyRule, parse_dates
+
+TIMES = ["09:00", "10:30", "13:00", "15:45", "18:30", "21:00"]
+
+
+def _times(rng: random.Random, k: int) -> list:
+    return sorted(datetime.strptime(t, "%H:%M").time() for t in rng.sample(TIMES, k))
+
+
+def _weekly_rule(rng: random.Random, start_d: date, end_d: date, full: bool) -> WeeklyRule:
+    weekdays = range(7) if full else rng.sample(range(7), rng.randint(1, 7))
+    span = max((end_d - start_d).days + 1, 1)
+    exclude = frozenset(start_d + timedelta(days=rng.randrange(span)) for _ in range(10))
+    return WeeklyRule(
+        start_d,
+        end_d,
+        {d: _times(rng, rng.randint(3, 5) if full else rng.randint(1, 4)) for d in weekdays},
+        1 if full else rng.randint(1, 3),
+        exclude,
+    )
+
+
+def loop_weekly(rule: WeeklyRule) -> list[datetime]:
+    # 変更前の AdminScheduleEdit と同じ走査(除外日の判定だけ足している)
+    out = []
+    day = rule.start_date
+    while day <= rule.end_date:
+        week_index = (day - rule.start_date).days // 7
+        if week_index % rule.interval == 0 and day.weekday() in rule.times_by_weekday and day not in rule.exclude:
+            for start_time in rule.times_by_weekday.get(day.weekday(), []):
+                out.append(datetime.combine(day, start_time))
+        day = day + timedelta(days=1)
+    return out
+
+
+def loop_monthly(rule: MonthlyRule) -> list[datetime]:
+    out = []
+    day = rule.start_date
+    while day <= rule.end_date:
+        months = (day.year - rule.start_date.year) * 12 + day.month - rule.start_date.month
+        if day.day == rule.start_date.day and months % rule.interval == 0 and day not in rule.exclude:
+            out.extend(datetime.combine(day, t) for t in sorted(set(rule.times)))
+        day = day + timedelta(days=1)
+    return out
+
+
+def _check(rng: random.Random, cases: int) -> str | None:
+    methods = [False, True] if HAS_NUMPY else [False]
+    for _ in range(cases):
+        start_d = date(2030, 1, 1) + timedelta(days=rng.randrange(400))
+        end_d = start_d + timedelta(days=rng.randrange(-3, 500))
+        rules = [
+            _weekly_rule(rng, start_d, end_d, False),
+            MonthlyRule(start_d, end_d, _times(rng, rng.randint(1, 3)), rng.randint(1, 4),
+                        frozenset(start_d + timedelta(days=31 * i) for i in range(rng.randint(0, 3)))),
+        ]
+        for rule in rules:
+            expected = [to_epoch_min(d) for d in (loop_weekly(rule) if isinstance(rule, WeeklyRule) else loop_monthly(rule))]
+            for use_numpy in methods:
+                got = list(rule.occurrences(use_numpy=use_numpy))
+                if got != expected:
+                    return f"{rule!r} use_numpy={use_numpy}: {len(got)} occurrences, loop gave {len(expected)}"
+    if parse_dates("2030-01-30..2030-02-02, 2030-03-01") != {
+        date(2030, 1, 30), date(2030, 1, 31), date(2030, 2, 1), date(2030, 2, 2), date(2030, 3, 1)
+    }:
+        return "parse_dates returned a different set"
+    return None
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="繰り返し上映の展開の比較")
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--halls", type=int, default=30)
+    parser.add_argument("--duration", type=int, default=120)
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--cases", type=int, default=300)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    error = _check(rng, args.cases)
+    if error:
+        print(f"ERROR: {error}")
+        return 1
+
+    start_d = date(2030, 1, 1)
+    end_d = start_d + timedelta(days=args.days - 1)
+    rules = [_weekly_rule(rng, start_d, end_d, True) for _ in range(args.halls)]
+    halls = [f"hall{i}" for i in range(args.halls)]
+    duration = timedelta(minutes=args.duration)
+
+    def loop() -> int:
+        return sum(len(loop_weekly(rule)) for rule in rules)
+
+    def engine(use_numpy: bool):
+        def _run() -> int:
+            return sum(len(rule.occurrences(use_numpy=use_numpy)) for rule in rules)
+        return _run
+
+    # 画面と同じく dict にするまで(変更前は datetime を作りながら dict に入れていた)
+    def page_loop() -> int:
+        n = 0
+        for rule, hall in zip(rules, halls):
+            desired = {}
+            for start_at in loop_weekly(rule):
+                desired[(start_at, hall)] = {"start_at": start_at, "end_at": start_at + duration, "price": 1800}
+            n += len(desired)
+        return n
+
+    def page_engine() -> int:
+        n = 0
+        for rule, hall in zip(rules, halls):
+            desired = {}
+            for start_min in rule.occurrences():
+                start_at = from_epoch_min(start_min)
+                desired[(start_at, hall)] = {"start_at": start_at, "end_at": start_at + duration, "price": 1800}
+            n += len(desired)
+        return n
+
+    methods = {"loop": loop, "range": engine(False)}
+    if HAS_NUMPY:
+        methods["numpy"] = engine(True)
+    methods["page(loop)"] = page_loop
+    methods["page(engine)"] = page_engine
+
+    occurrences = loop()
+    print(f"days={args.days} halls={args.halls} occurrences={occurrences} repeat={args.repeat} numpy={HAS_NUMPY}")
+    print(f"{'method':<14}{'ms':>10}{'occ/ms':>10}")
+    for name, fn in methods.items():
+        if fn() != occurrences:
+            print(f"ERROR: {name} returned a different number of occurrences")
+            return 1
+        t0 = time.perf_counter()
+        for _ in range(args.repeat):
+            fn()
+        ms = (time.perf_counter() - t0) * 1000 / args.repeat
+        print(f"{name:<14}{ms:>10.2f}{occurrences / ms:>10.0f}")
+
+    size = sum(rule.occurrences().buffer_info()[1] * 8 for rule in rules)
+    print(f"array('q') size: {size / 1024:.0f} KiB ({occurrences} starts)")
+    print("\nOK: recurrence expansion matches the day-by-day loop")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
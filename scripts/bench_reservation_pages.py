@@ -0,0 +1,196 @@
+from __future__ import annotations
+
+"""予約一覧(UserReservationList)のページ送りの比較(ベンチマーク)。
+
+- チケット履歴が 50,000 枚(既定)あるユーザーを作る(1枚1〜4席、大半は使用済み)
+- all   : 全件を読んで1つの表にする(変更前の UserReservationList の出し方)
+- page  : services.reservation.list_reservation_page で1ページ分だけ読んで表にする
+- 最初の行が出るまでの時間と、その間のメモリのピーク(tracemalloc)を比べる
+- 深いページ(既定 1000 ページ目付近)の読み込みを OFFSET とキー指定(キーセット)で比べる
+- 全ページを次へ/前へでたどった結果が、全件読みの並びと一致することを確かめる
+- CINEMA_DB_PATH で一時DBを使うので cinema.db には触らない
+
+使い方:
+  python scripts/bench_reservation_pages.py
+  python scripts/bench_reservation_pages.py --tickets 100000 --page-size 50
+"""
+
+import argparse
+import io
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+USER_ID = "bench-user"
+
+
+def _seed(n_tickets: int, seed: int) -> None:
+    from sqlalchemy import insert
+
+    from db.db import SessionLocal, init_db, write_transaction
+    from db.models import Movie, Show, Ticket, TicketSeat, User
+
+    init_db()
+    rng = random.Random(seed)
+    n_shows = max(1, n_tickets // 20)
+    day0 = datetime(2025, 1, 1, 9)
+    with SessionLocal() as db_session:
+        for i in range(50):
+            db_session.add(Movie(title=f"映画{i}", duration_min=120, default_price=1800))
+        db_session.add(User(id=USER_ID, username="bench", password_hash="-", role="User"))
+        db_session.commit()
+
+    shows = []
+    for i in range(n_shows):
+        start = day0 + timedelta(hours=2 * i)
+        shows.append({"movie_id": i % 50 + 1, "hall": "ABCD"[i % 4], "start_at": start, "end_at": start + timedelta(hours=2), "price": 1800})
+    tickets, seats = [], []
+    for i in range(n_tickets):
+        show_id = i % n_shows + 1
+        # 同じ分に複数枚発行されることもある(キーの issued_at が重なる)
+        issued = day0 + timedelta(minutes=i // 3)
+        tickets.append({
+            "uuid": f"{rng.getrandbits(128):032x}", "show_id": show_id, "user_id": USER_ID, "user_name": "bench",
+            "breakdown_json": '{"adult":1}', "sum_price": 1800, "issued_at": issued,
+            "used_at": None if i >= n_tickets * 0.95 else issued + timedelta(days=1),
+        })
+        for k in range(rng.randint(1, 4)):
+            seats.append({"ticket_id": i + 1, "show_id": show_id, "seat": f"{'ABCDEF'[i // n_shows % 6]}-{(i // (6 * n_shows)) * 4 + k + 1}"})
+    with write_transaction() as conn:
+        conn.execute(insert(Show), shows)
+        conn.execute(insert(Ticket), tickets)
+        conn.execute(insert(TicketSeat), seats)
+        conn.exec_driver_sql("ANALYZE")
+
+
+def _render(console, items) -> None:
+    # UserReservationList と同じ列の表を作って出す
+    from rich.table import Table
+
+    from utils.datetimeFormat import format_ymd_hm
+    from utils.rich_compat import TABLE_KWARGS
+
+    table = Table(title="予約一覧: bench", **TABLE_KWARGS)
+    for name in ("No", "UUID", "映画", "開始", "hall", "座席", "合計", "使用"):
+        table.add_column(name)
+    for i, t in enumerate(items, start=1):
+        table.add_row(
+            str(i), t.uuid, t.movie_title or "(unknown)", format_ymd_hm(t.start_at), t.hall or "-",
+            ", ".join(t.seats) if t.seats else "-", f"{t.sum_price}円", "使用済" if t.used_at else "未使用",
+        )
+    console.print(table)
+
+
+def _measure(fn) -> tuple[float, float]:
+    # 時間は tracemalloc なしで測り、メモリのピークは別にもう1回実行して測る
+    t0 = time.perf_counter()
+    fn()
+    elapsed = (time.perf_counter() - t0) * 1000
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak / 1024 / 1024
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="予約一覧のページ送りの比較")
+    parser.add_argument("--tickets", type=int, default=50000, help="ユーザー1人のチケット枚数")
+    parser.add_argument("--page-size", type=int, default=20)
+    parser.add_argument("--deep-page", type=int, default=1000, help="OFFSETと比べるページ番号")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    tmp = tempfile.TemporaryDirectory()
+    # db.db を import する前に設定する(import時に読む)
+    os.environ["CINEMA_DB_PATH"] = os.path.join(tmp.name, "bench.db")
+
+    from rich.console import Console
+
+    from db.db import engine
+    from db.models import Ticket
+    from services.reservation import list_reservation_page, list_reservations
+    from services.ticketViews import TICKET_VIEW, load_summaries
+
+    _seed(args.tickets, args.seed)
+    size = args.page_size
+    console = Console(file=io.StringIO(), width=160, highlight=False)
+
+    # 最初の行が出るまで(読み込み + 表の描画)
+    def _all() -> None:
+        _render(console, list_reservations(USER_ID, include_used=True))
+
+    def _first_page() -> None:
+        _render(console, list_reservation_page(USER_ID, limit=size, include_used=True).items)
+
+    all_ms, all_mb = _measure(_all)
+    page_ms, page_mb = _measure(_first_page)
+
+    # 全ページを次へ → 前へでたどり、全件読みと同じ並びになるか
+    expected = [t.ticket_id for t in list_reservations(USER_ID, include_used=True)]
+    forward: list[list[int]] = []
+    t0 = time.perf_counter()
+    page = list_reservation_page(USER_ID, limit=size, include_used=True)
+    forward.append([t.ticket_id for t in page.items])
+    while page.has_next:
+        page = list_reservation_page(USER_ID, after=page.last_key, limit=size, include_used=True)
+        forward.append([t.ticket_id for t in page.items])
+    walk_ms = (time.perf_counter() - t0) * 1000
+    backward = [[t.ticket_id for t in page.items]]
+    while page.has_prev:
+        page = list_reservation_page(USER_ID, before=page.first_key, limit=size, include_used=True)
+        backward.append([t.ticket_id for t in page.items])
+    backward.reverse()
+    if [tid for p in forward for tid in p] != expected or backward != forward:
+        print("ERROR: paging returned different tickets than the full list")
+        return 1
+
+    # 深いページ: OFFSET(前のページを全部読み飛ばす) vs キー指定
+    deep = min(args.deep_page, len(forward)) - 1
+    order = (Ticket.issued_at.desc(), Ticket.id.desc())
+    with engine.connect() as conn:
+        key_row = load_summaries(conn, Ticket.user_id == USER_ID, order_by=order, limit=deep * size)[-1] if deep else None
+    key = (key_row.issued_at, key_row.ticket_id) if key_row else None
+
+    def _offset() -> list[int]:
+        with engine.connect() as conn:
+            rows = conn.execute(TICKET_VIEW.where(Ticket.user_id == USER_ID).order_by(*order).limit(size).offset(deep * size)).all()
+        return [r.id for r in rows]
+
+    def _keyset() -> list[int]:
+        return [t.ticket_id for t in list_reservation_page(USER_ID, after=key, limit=size, include_used=True).items]
+
+    if _offset() != _keyset() or _keyset() != forward[deep]:
+        print("ERROR: OFFSET and keyset pages differ")
+        return 1
+    timings = {}
+    for name, fn in (("offset", _offset), ("keyset", _keyset)):
+        t0 = time.perf_counter()
+        for _ in range(args.repeat):
+            fn()
+        timings[name] = (time.perf_counter() - t0) * 1000 / args.repeat
+
+    engine.dispose()
+    tmp.cleanup()
+
+    print(f"tickets={args.tickets} page size={size} pages={len(forward)}")
+    print(f"first row  all  : {all_ms:9.1f} ms  peak {all_mb:8.1f} MiB")
+    print(f"first row  page : {page_ms:9.1f} ms  peak {page_mb:8.1f} MiB")
+    print(f"page {deep + 1} offset : {timings['offset']:9.3f} ms")
+    print(f"page {deep + 1} keyset : {timings['keyset']:9.3f} ms")
+    print(f"walk all pages  : {walk_ms:9.1f} ms ({walk_ms / len(forward):.3f} ms/page)")
+    print("\nOK: pages match the full list in both directions")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,129 @@
+from __future__ import annotations
+
+"""スケジュール衝突チェックの比較(ベンチマーク)。
+
+- 既存の上映回 10k 件(1日5回の固定枠)と、半年分の繰り返し登録で作られる入力 2k 件を生成(同一ホール)
+- 旧実装(全組み合わせ + 毎回 strptime)と HallScheduleIndex の結果・時間を比較する
+  - 旧実装はDBで入力期間内に絞った既存showを相手にしていたので、同じ絞り込みをしてから比較する
+  - 旧実装は遅すぎるので入力の一部だけ実行し、全件ぶんの時間は比例で見積もる
+- DBは使わない
+
+使い方:
+  python scripts/bench_schedule_conflicts.py
+  python scripts/bench_schedule_conflicts.py --existing 50000 --proposed 5000
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from utils.hallSchedule import HallScheduleIndex
+
+
+def _iso(dt: datetime) -> str:
+    return dt.strftime("%Y-%m-%dT%H:%M")
+
+
+def _parse_iso_min(value: str) -> datetime:
+    v = str(value).strip().replace(" ", "T")
+    return datetime.strptime(v, "%Y-%m-%dT%H:%M")
+
+
+SLOTS_MIN = [9 * 60, 12 * 60, 15 * 60, 18 * 60, 21 * 60]
+
+
+def _generate_existing(n: int, day0: datetime, rnd: random.Random) -> list[tuple[datetime, datetime]]:
+    # 既存スケジュール: 1日5回の固定枠に 90〜150 分の上映(互いに重ならない)
+    result: list[tuple[datetime, datetime]] = []
+    for i in range(n):
+        start = day0 + timedelta(days=i // len(SLOTS_MIN), minutes=SLOTS_MIN[i % len(SLOTS_MIN)])
+        result.append((start, start + timedelta(minutes=rnd.randrange(90, 151, 5))))
+    return result
+
+
+def _generate_proposed(n: int, day0: datetime, days: int, rnd: random.Random) -> list[tuple[datetime, datetime]]:
+    # 入力: 期間内の日付に、10:00〜22:00 の任意の時刻で上映を置く
+    result: list[tuple[datetime, datetime]] = []
+    for _ in range(n):
+        start = day0 + timedelta(days=rnd.randrange(days), minutes=rnd.randrange(10 * 60, 22 * 60, 5))
+        result.append((start, start + timedelta(minutes=rnd.randrange(90, 151, 5))))
+    result.sort()
+    return result
+
+
+def _naive(desired: list[tuple[str, str]], others: list[tuple[int, str, str]]) -> list[tuple[str, int]]:
+    # 旧 AdminScheduleEdit の外部衝突チェックと同じ処理
+    conflicts: list[tuple[str, int]] = []
+    for start_s, end_s in desired:
+        ds = _parse_iso_min(start_s)
+        de = _parse_iso_min(end_s)
+        for show_id, ss_s, se_s in others:
+            ss = _parse_iso_min(ss_s)
+            se = _parse_iso_min(se_s)
+            if ds < se and de > ss:
+                conflicts.append((start_s, show_id))
+    return conflicts
+
+
+def _indexed(desired: list[tuple[datetime, datetime]], others: list[tuple[int, datetime, datetime]]) -> list[tuple[str, int]]:
+    index: HallScheduleIndex[int] = HallScheduleIndex()
+    for show_id, ss, se in others:
+        index.add("A", ss, se, show_id)
+    conflicts: list[tuple[str, int]] = []
+    for ds, de in desired:
+        for show_id in index.overlapping("A", ds, de):
+            conflicts.append((_iso(ds), show_id))
+    return conflicts
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="スケジュール衝突チェックの比較")
+    parser.add_argument("--existing", type=int, default=10_000)
+    parser.add_argument("--proposed", type=int, default=2_000)
+    parser.add_argument("--days", type=int, default=180)
+    parser.add_argument("--naive-sample", type=int, default=20, help="旧実装で実際に流す入力件数")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rnd = random.Random(args.seed)
+    day0 = datetime(2025, 1, 1)
+    existing = [(i + 1, s, e) for i, (s, e) in enumerate(_generate_existing(args.existing, day0, rnd))]
+    # 入力は既存スケジュールの期間の途中、半年分
+    proposed = _generate_proposed(args.proposed, day0 + timedelta(days=365), args.days, rnd)
+
+    # 旧実装は DB で入力範囲内に絞った既存showを、ISO文字列のまま受け取っていた
+    min_start = proposed[0][0]
+    max_end = max(e for _, e in proposed)
+    existing_iso = [(i, _iso(s), _iso(e)) for i, s, e in existing if s < max_end and e > min_start]
+    proposed_iso = [(_iso(s), _iso(e)) for s, e in proposed]
+    print(f"existing={len(existing)} (in range: {len(existing_iso)})  proposed={len(proposed)}")
+
+    t0 = time.perf_counter()
+    indexed = _indexed(proposed, existing)
+    t_indexed = time.perf_counter() - t0
+    print(f"indexed: {t_indexed * 1000:9.1f} ms  conflicts={len(indexed)}")
+
+    sample = min(args.naive_sample, len(proposed_iso))
+    t0 = time.perf_counter()
+    naive = _naive(proposed_iso[:sample], existing_iso)
+    t_naive = (time.perf_counter() - t0) * len(proposed_iso) / max(sample, 1)
+    print(f"naive  : {t_naive * 1000:9.1f} ms  (estimated from {sample} proposed shows)")
+
+    # 旧実装を流した範囲で結果が一致することを確認
+    sampled_keys = {s for s, _ in proposed_iso[:sample]}
+    if sorted(naive) != sorted(c for c in indexed if c[0] in sampled_keys):
+        print("ERROR: results differ")
+        return 1
+    print(f"speedup: {t_naive / t_indexed:.0f}x (same conflicts on the sampled shows)")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+"""おまかせ座席選択(allocate_seats)の速度と結果の確認(ベンチマーク)。
+
+- 指定サイズのホールレイアウト(通路2本)を生成し、ランダムに埋めた上映回を多数作る
+- 人数ごとに allocate_seats() の1回あたりの時間と、連続/分割/満席の割合を出す
+  (max には人数ごとの候補順の初回計算が含まれる)
+- 割り当て結果が空席だけ・重複なし・指定人数ちょうどであることも確認する
+- DBもレイアウトファイルも使わない
+
+使い方:
+  python scripts/bench_seat_allocator.py
+  python scripts/bench_seat_allocator.py --rows 25 --cols 20 --halls 2000
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from utils.hallLayout import HallLayout
+from utils.seatAllocator import allocate_seats
+from utils.seatOccupancy import SeatOccupancy
+
+
+def _make_layout(rows: int, cols: int) -> HallLayout:
+    # 左右の通路で 1:2:1 に区切る
+    side = cols // 4
+    line = "#" * side + "." + "#" * (cols - side * 2) + "." + "#" * side
+    return HallLayout.parse("bench", [line] * rows)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="おまかせ座席選択の速度")
+    parser.add_argument("--rows", type=int, default=20)
+    parser.add_argument("--cols", type=int, default=25)
+    parser.add_argument("--halls", type=int, default=1_000, help="ランダムに埋めた上映回の数")
+    parser.add_argument("--party", type=str, default="1,2,4,6,10", help="人数(カンマ区切り)")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    layout = _make_layout(args.rows, args.cols)
+    rnd = random.Random(args.seed)
+
+    # 埋まり具合 0〜95% の上映回
+    occupancies = []
+    for _ in range(args.halls):
+        fill = rnd.random() * 0.95
+        occupancies.append(SeatOccupancy.from_seats(layout, rnd.sample(layout.seat_list, int(layout.seat_count * fill))))
+
+    print(f"seats={layout.seat_count} halls={args.halls}")
+    print(f"{'party':>5}{'avg(us)':>10}{'max(us)':>10}{'contiguous':>12}{'split':>8}{'full':>8}")
+
+    for party in (int(p) for p in args.party.split(",")):
+        contiguous = split = full = 0
+        worst = 0.0
+        t_total = 0.0
+        for occupancy in occupancies:
+            t0 = time.perf_counter()
+            allocation = allocate_seats(occupancy, party)
+            dt = time.perf_counter() - t0
+            t_total += dt
+            worst = max(worst, dt)
+
+            if allocation is None:
+                full += 1
+                continue
+            if len(allocation.seats) != party or len(set(allocation.seats)) != party:
+                print(f"ERROR: wrong number of seats: {allocation}")
+                return 1
+            if SeatOccupancy.from_seats(layout, allocation.seats) & occupancy:
+                print(f"ERROR: allocated a reserved seat: {allocation}")
+                return 1
+            if allocation.contiguous:
+                contiguous += 1
+            else:
+                split += 1
+
+        print(
+            f"{party:>5}{t_total * 1e6 / len(occupancies):>10.1f}{worst * 1e6:>10.1f}"
+            f"{contiguous:>12}{split:>8}{full:>8}"
+        )
+
+    print("\nOK: all allocations valid")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
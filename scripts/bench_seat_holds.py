@@ -0,0 +1,189 @@
+from __future__ import annotations
+
+"""座席の仮押さえあり/なしで、同時購入時の「入力し終わってから失敗」を比較(ベンチマーク)。
+
+- 多数の購入者(スレッド)が同じ上映回を同時に買いにくる
+  1. 座席表を読む → おまかせ座席を選ぶ
+  2. 内訳・料金の入力(--form-ms のあいだ待つ)
+  3. 購入確定
+- 仮押さえなし(旧実装): 2. の後の commit で初めて重複が分かり、入力をやり直す
+- 仮押さえあり: 1. の直後に hold_seats() で押さえるので、失敗は入力前に分かる
+- 全席売り切れるまで続け、購入数・入力後の失敗数・無駄になった入力時間を比較する
+- CINEMA_DB_PATH で一時DBを使うので cinema.db には触らない
+
+使い方:
+  python scripts/bench_seat_holds.py
+  python scripts/bench_seat_holds.py --buyers 64 --shows 4 --form-ms 200
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from datetime import datetime
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+
+class _Stats:
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.purchases = 0
+        self.hold_failures = 0      # 入力前に分かった失敗(押さえ失敗)
+        self.late_failures = 0      # 入力し終わってからの失敗
+        self.wasted_form_sec = 0.0
+
+    def add(self, **kwargs: float) -> None:
+        with self.lock:
+            for key, value in kwargs.items():
+                setattr(self, key, getattr(self, key) + value)
+
+
+def _buyer(use_holds: bool, n_shows: int, party: int, form_ms: int, seed: int, stats: _Stats) -> None:
+    from sqlalchemy import select
+    from sqlalchemy.exc import IntegrityError, OperationalError
+
+    from db.db import SessionLocal
+    from db.models import Show, Ticket, TicketSeat
+    from services.reservation import SeatConflictError, create_ticket
+    from services.seatHold import held_seats, hold_seats
+    from utils.hallLayout import get_occupancy
+    from utils.seatAllocator import allocate_seats
+
+    rnd = random.Random(seed)
+    token = uuid.uuid4().hex
+    sold_out: set[int] = set()
+
+    while len(sold_out) < n_shows:
+        show_id = rnd.choice([i for i in range(1, n_shows + 1) if i not in sold_out])
+
+        # 1. 座席表を読んでおまかせで選ぶ
+        with SessionLocal() as db_session:
+            hall = db_session.execute(select(Show.hall).where(Show.id == show_id)).scalar_one()
+            reserved = db_session.execute(select(TicketSeat.seat).where(TicketSeat.show_id == show_id)).scalars().all()
+            held = held_seats(db_session, show_id, exclude_token=token) if use_holds else []
+        unavailable = get_occupancy(hall, reserved) | get_occupancy(hall, held)
+        allocation = allocate_seats(unavailable, party)
+        if allocation is None:
+            if not held:
+                sold_out.add(show_id)
+            continue
+        seats = allocation.seats
+
+        if use_holds:
+            try:
+                hold_seats(show_id, seats, token)
+            except SeatConflictError:
+                stats.add(hold_failures=1)
+                continue
+
+        # 2. 内訳・料金の入力
+        form_sec = form_ms / 1000 * (0.5 + rnd.random())
+        time.sleep(form_sec)
+
+        # 3. 購入確定
+        if use_holds:
+            # UserCheckout と同じ書き込み
+            try:
+                create_ticket(show_id=show_id, user_id="bench-user", seats=seats, hold_token=token)
+                stats.add(purchases=1)
+            except (SeatConflictError, OperationalError):
+                stats.add(late_failures=1, wasted_form_sec=form_sec)
+            continue
+
+        # 変更前の UserCheckout と同じ書き込み
+        with SessionLocal() as db_session:
+            try:
+                ticket = Ticket(
+                    uuid=str(uuid.uuid4()),
+                    show_id=show_id,
+                    user_id="bench-user",
+                    breakdown_json="{}",
+                    issued_at=datetime.now().replace(second=0, microsecond=0),
+                )
+                db_session.add(ticket)
+                db_session.flush()
+                for seat in seats:
+                    db_session.add(TicketSeat(ticket_id=ticket.id, show_id=show_id, seat=seat))
+                db_session.commit()
+                stats.add(purchases=1)
+            except (IntegrityError, OperationalError):
+                db_session.rollback()
+                stats.add(late_failures=1, wasted_form_sec=form_sec)
+
+
+def _run(label: str, use_holds: bool, args: argparse.Namespace) -> _Stats:
+    from db.db import SessionLocal, engine, init_db
+    from db.models import Movie, Show, User
+
+    # 前回の実行分を消してから作り直す
+    engine.dispose()
+    for suffix in ("", "-wal", "-shm"):
+        path = os.environ["CINEMA_DB_PATH"] + suffix
+        if os.path.exists(path):
+            os.remove(path)
+    init_db()
+    with SessionLocal() as db_session:
+        db_session.add(Movie(title="bench", duration_min=120, default_price=1800))
+        db_session.add(User(id="bench-user", username="bench", password_hash="-", role="User"))
+        db_session.flush()
+        for i in range(args.shows):
+            db_session.add(
+                Show(movie_id=1, hall="A", start_at=datetime(2030, 1, i + 1, 19), end_at=datetime(2030, 1, i + 1, 21), price=1800)
+            )
+        db_session.commit()
+
+    stats = _Stats()
+    threads = [
+        threading.Thread(target=_buyer, args=(use_holds, args.shows, args.party, args.form_ms, i, stats))
+        for i in range(args.buyers)
+    ]
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - t0
+
+    print(
+        f"{label:<10} purchases={stats.purchases:5d}  late failures={stats.late_failures:5d}"
+        f"  wasted form time={stats.wasted_form_sec:7.1f}s  hold failures={stats.hold_failures:5d}"
+        f"  elapsed={elapsed:5.1f}s"
+    )
+    return stats
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="座席の仮押さえあり/なしの同時購入比較")
+    parser.add_argument("--buyers", type=int, default=32)
+    parser.add_argument("--shows", type=int, default=2)
+    parser.add_argument("--party", type=int, default=2)
+    parser.add_argument("--form-ms", type=int, default=100, help="内訳入力にかかる時間(平均, ms)")
+    args = parser.parse_args()
+
+    tmp = tempfile.TemporaryDirectory()
+    # db.db を import する前に設定する(import時に読む)
+    os.environ["CINEMA_DB_PATH"] = os.path.join(tmp.name, "bench.db")
+    os.environ["CINEMA_DB_POOL_SIZE"] = str(args.buyers)
+
+    print(f"buyers={args.buyers} shows={args.shows} party={args.party} form={args.form_ms}ms (hall A)")
+    before = _run("no holds", False, args)
+    after = _run("holds", True, args)
+
+    from db.db import engine
+
+    engine.dispose()
+    tmp.cleanup()
+
+    print(f"late failures: {before.late_failures} -> {after.late_failures}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+"""座席の埋まり具合の表現(文字列の集合 vs SeatOccupancy)の比較(ベンチマーク)。
+
+- 指定した座席数のホールレイアウトを生成し、上映回ごとの予約済み座席を作る
+- 旧実装(set[str])と SeatOccupancy(ビットマスク)で
+  1上映回あたりのメモリ量と、和/差/空席数/予約済みチェックの時間を比較する
+- DBもレイアウトファイルも使わない
+
+使い方:
+  python scripts/bench_seat_occupancy.py
+  python scripts/bench_seat_occupancy.py --rows 20 --cols 30 --shows 5000
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from utils.hallLayout import HallLayout
+from utils.seatOccupancy import SeatOccupancy
+
+
+def _set_size(seats: set[str]) -> int:
+    # 集合本体 + 要素の文字列
+    return sys.getsizeof(seats) + sum(sys.getsizeof(s) for s in seats)
+
+
+def _timeit(fn, repeat: int) -> float:
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - t0) * 1e6 / repeat
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="座席の埋まり具合の表現の比較")
+    parser.add_argument("--rows", type=int, default=15)
+    parser.add_argument("--cols", type=int, default=20)
+    parser.add_argument("--shows", type=int, default=2_000)
+    parser.add_argument("--fill", type=float, default=0.6, help="予約済みの割合")
+    parser.add_argument("--repeat", type=int, default=2_000)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    # 中央に通路を1本入れたレイアウト
+    half = args.cols // 2
+    line = "#" * half + "." + "#" * (args.cols - half)
+    layout = HallLayout.parse("bench", [line] * args.rows)
+
+    rnd = random.Random(args.seed)
+    n_reserved = int(layout.seat_count * args.fill)
+    reserved_lists = [rnd.sample(layout.seat_list, n_reserved) for _ in range(args.shows)]
+
+    sets = [set(seats) for seats in reserved_lists]
+    masks = [SeatOccupancy.from_seats(layout, seats) for seats in reserved_lists]
+
+    set_bytes = sum(_set_size(s) for s in sets) / len(sets)
+    mask_bytes = sum(sys.getsizeof(m.mask) for m in masks) / len(masks)
+    stored_bytes = len(masks[0].to_bytes())
+    print(f"seats={layout.seat_count} reserved/show={n_reserved} shows={args.shows}")
+    print(f"memory/show: set[str]={set_bytes:,.0f} B  bitmask={mask_bytes:,.0f} B  to_bytes()={stored_bytes} B")
+
+    all_seats = layout.seat_set
+    s1, s2 = sets[0], sets[1]
+    m1, m2 = masks[0], masks[1]
+    request = rnd.sample(layout.seat_list, 4)
+    request_mask = SeatOccupancy.from_seats(layout, request)
+
+    cases = {
+        "union": (lambda: s1 | s2, lambda: m1 | m2),
+        "difference": (lambda: s1 - s2, lambda: m1 - m2),
+        "vacant count": (lambda: len(all_seats - s1), lambda: m1.vacant_count),
+        "taken check(4 seats)": (
+            lambda: [t for t in request if t in s1],
+            lambda: request_mask & m1,
+        ),
+    }
+
+    print()
+    print(f"{'operation':<24}{'set(us)':>10}{'bitmask(us)':>13}{'speedup':>10}")
+    for name, (by_set, by_mask) in cases.items():
+        a = _timeit(by_set, args.repeat)
+        b = _timeit(by_mask, args.repeat)
+        print(f"{name:<24}{a:>10.2f}{b:>13.2f}{a / b if b > 0 else float('inf'):>9.1f}x")
+
+    # 結果が一致することを確認
+    if set((m1 | m2).seat_ids()) != s1 | s2 or set((m1 - m2).seat_ids()) != s1 - s2:
+        print("ERROR: results differ")
+        return 1
+    if m1.vacant_count != len(all_seats - s1):
+        print("ERROR: vacant count differs")
+        return 1
+    if SeatOccupancy.from_bytes(layout, m1.to_bytes()) != m1:
+        print("ERROR: serialization round trip failed")
+        return 1
+    print("\nOK: same results")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+"""services 層(予約・一覧・改札・キャンセル)を TTY なしで回すスループット計測(ベンチマーク)。
+
+- ページ(input()/console)を通さず、services.reservation / services.gate の関数を直接呼ぶ
+- 操作ごとに 1回あたりの時間と 1秒あたりの件数を出す
+- CINEMA_DB_PATH で一時DBを使うので cinema.db には触らない
+
+使い方:
+  python scripts/bench_services.py
+  python scripts/bench_services.py --users 50 --tickets 400 --seats 2
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+
+def _report(label: str, count: int, elapsed: float) -> None:
+    per_ms = elapsed * 1000 / count if count else 0.0
+    rate = count / elapsed if elapsed else 0.0
+    print(f"{label:<18}{count:>8}{per_ms:>12.3f}{rate:>12.0f}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="services 層のスループット計測")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--tickets", type=int, default=300, help="発行するチケット数")
+    parser.add_argument("--seats", type=int, default=2, help="1枚あたりの座席数")
+    args = parser.parse_args()
+
+    tmp = tempfile.TemporaryDirectory()
+    # db.db を import する前に設定する(import時に読む)
+    os.environ["CINEMA_DB_PATH"] = os.path.join(tmp.name, "bench.db")
+
+    from db.db import SessionLocal, engine, init_db
+    from db.models import Movie, Show, User
+    from services.gate import check_in
+    from services.reservation import cancel, list_reservations, reserve
+    from utils.hallLayout import load_layout
+
+    init_db()
+    seat_ids = list(load_layout("A").seat_list)
+    per_show = len(seat_ids) // args.seats
+    n_shows = (args.tickets + per_show - 1) // per_show
+
+    with SessionLocal() as db_session:
+        db_session.add(Movie(title="bench", duration_min=120, default_price=1800))
+        for u in range(args.users):
+            db_session.add(User(id=f"bench-{u}", username=f"bench{u}", password_hash="-", role="User"))
+        db_session.flush()
+        day0 = datetime(2030, 1, 1, 19)
+        for i in range(n_shows):
+            start = day0 + timedelta(days=i)
+            db_session.add(Show(movie_id=1, hall="A", start_at=start, end_at=start + timedelta(hours=2), price=1800))
+        db_session.commit()
+
+    print(f"{'operation':<18}{'count':>8}{'ms/op':>12}{'ops/sec':>12}")
+
+    # 予約
+    issued = []
+    t0 = time.perf_counter()
+    for i in range(args.tickets):
+        show_id = i // per_show + 1
+        k = (i % per_show) * args.seats
+        user_id = f"bench-{i % args.users}"
+        ticket = reserve(
+            show_id,
+            seat_ids[k:k + args.seats],
+            {"adult": args.seats},
+            user_id,
+            user_name=user_id,
+        )
+        issued.append((ticket.uuid, user_id))
+    _report("reserve", len(issued), time.perf_counter() - t0)
+
+    # 一覧
+    t0 = time.perf_counter()
+    listed = 0
+    for u in range(args.users):
+        listed += len(list_reservations(f"bench-{u}"))
+    _report("list_reservations", args.users, time.perf_counter() - t0)
+
+    # 改札(半分)
+    to_check = issued[: len(issued) // 2]
+    t0 = time.perf_counter()
+    admitted = sum(1 for ticket_uuid, _ in to_check if check_in(ticket_uuid).admitted)
+    _report("check_in", len(to_check), time.perf_counter() - t0)
+
+    # キャンセル(未使用の残り半分)
+    to_cancel = issued[len(issued) // 2:]
+    t0 = time.perf_counter()
+    for ticket_uuid, user_id in to_cancel:
+        cancel(ticket_uuid, user_id)
+    _report("cancel", len(to_cancel), time.perf_counter() - t0)
+
+    with engine.connect() as conn:
+        n_tickets = conn.exec_driver_sql("SELECT COUNT(*) FROM tickets").scalar_one()
+        n_seats = conn.exec_driver_sql("SELECT COUNT(*) FROM ticket_seats").scalar_one()
+    engine.dispose()
+    tmp.cleanup()
+
+    expected = len(to_check)
+    if listed != len(issued) or admitted != expected or n_tickets != expected or n_seats != expected * args.seats:
+        print(f"ERROR: listed={listed} admitted={admitted} tickets={n_tickets} seats={n_seats}")
+        return 1
+    print(f"\nOK: tickets={n_tickets} seats={n_seats}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,152 @@
+from __future__ import annotations
+
+"""上映日カレンダー(UserShowCalendar)の月切り替えの比較(ベンチマーク)。
+
+- 映画ごとに1年分の上映回(1日数回、ホールA〜D)とチケットを作る
+- legacy: 変更前と同じ(月を切り替えるたびに Movie と その月の Show.start_at を全部読む)
+- days  : 集計テーブル show_days を movie_id + 月の範囲で引く(services.showCalendar.month_show_days)
+- 書き込み側の追加コスト: 購入時の add_sold_seats(UPDATE 1文) と、1年分の上映回を登録したときの refresh_show_days
+- 最後に、購入で増やした集計が全件作り直した結果と一致することを確かめる
+- CINEMA_DB_PATH で一時DBを使うので cinema.db には触らない
+
+使い方:
+  python scripts/bench_show_calendar.py
+  python scripts/bench_show_calendar.py --movies 50 --shows-per-day 6
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+HALLS = "ABCD"
+YEAR = 2030
+
+
+def _seed(n_movies: int, shows_per_day: int) -> int:
+    from sqlalchemy import insert
+
+    from db.db import SessionLocal, init_db, write_transaction
+    from db.models import Movie, Show, User
+
+    init_db()
+    with SessionLocal() as db_session:
+        for i in range(n_movies):
+            db_session.add(Movie(title=f"movie{i}", duration_min=120, default_price=1800))
+        db_session.add(User(id="bench-user", username="bench", password_hash="-", role="User"))
+        db_session.commit()
+
+    rows = []
+    day0 = datetime(YEAR, 1, 1)
+    for movie_id in range(1, n_movies + 1):
+        for d in range(365):
+            for k in range(shows_per_day):
+                start = day0 + timedelta(days=d, hours=9 + 2 * k, minutes=movie_id % 60)
+                rows.append({"movie_id": movie_id, "hall": HALLS[(movie_id + k) % 4], "start_at": start, "end_at": start + timedelta(hours=2), "price": 1800})
+    with write_transaction() as conn:
+        conn.execute(insert(Show), rows)
+    return len(rows)
+
+
+def _legacy_month(SessionLocal, select, Movie, Show, movie_id: int, year: int, month: int) -> set[int]:
+    # 変更前の UserShowCalendar と同じ読み方
+    start = datetime(year, month, 1)
+    end = datetime(year + 1, 1, 1) if month == 12 else datetime(year, month + 1, 1)
+    with SessionLocal() as db_session:
+        db_session.execute(select(Movie).where(Movie.id == movie_id)).scalar_one_or_none()
+        start_ats = (
+            db_session.execute(
+                select(Show.start_at).where(Show.movie_id == movie_id).where(Show.start_at >= start).where(Show.start_at < end)
+            )
+            .scalars()
+            .all()
+        )
+    return {s.day for s in start_ats}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="上映日カレンダーの月切り替えの比較")
+    parser.add_argument("--movies", type=int, default=20)
+    parser.add_argument("--shows-per-day", type=int, default=4)
+    parser.add_argument("--tickets", type=int, default=2000, help="購入(create_ticket)で作るチケット数")
+    parser.add_argument("--views", type=int, default=500, help="月の切り替え回数")
+    args = parser.parse_args()
+
+    tmp = tempfile.TemporaryDirectory()
+    # db.db を import する前に設定する(import時に読む)
+    os.environ["CINEMA_DB_PATH"] = os.path.join(tmp.name, "bench.db")
+
+    from sqlalchemy import select
+
+    from db.db import SessionLocal, engine, write_transaction
+    from db.models import Movie, Show, ShowDay
+    from services.reservation import create_ticket
+    from services.showCalendar import month_show_days, rebuild_show_days, refresh_show_days
+    from utils.hallLayout import load_layout
+
+    n_shows = _seed(args.movies, args.shows_per_day)
+
+    # 上映回を直接入れたので、集計は refresh_show_days で作る(1年分の上映回を登録したときの時間)
+    t0 = time.perf_counter()
+    with write_transaction() as conn:
+        refresh_show_days(conn, ((m, datetime(YEAR, 1, 1) + timedelta(days=d)) for m in range(1, args.movies + 1) for d in range(365)))
+    refresh_sec = time.perf_counter() - t0
+
+    # 購入: 1枚ごとに show_days の販売済み席数を増やす
+    rng = random.Random(0)
+    seats_by_hall = {h: list(load_layout(h).seat_list) for h in HALLS}
+    used: dict[int, int] = {}
+    with engine.connect() as conn:
+        halls = dict(conn.execute(select(Show.id, Show.hall)).all())
+    t0 = time.perf_counter()
+    for _ in range(args.tickets):
+        show_id = rng.randint(1, n_shows)
+        seats = seats_by_hall[halls[show_id]]
+        k = used.get(show_id, 0)
+        if k + 2 > len(seats):
+            continue
+        used[show_id] = k + 2
+        create_ticket(show_id=show_id, user_id="bench-user", seats=seats[k:k + 2])
+    buy_ms = (time.perf_counter() - t0) * 1000 / args.tickets
+
+    views = [(rng.randint(1, args.movies), rng.randint(1, 12)) for _ in range(args.views)]
+    t0 = time.perf_counter()
+    legacy_days = [_legacy_month(SessionLocal, select, Movie, Show, m, YEAR, mo) for m, mo in views]
+    legacy_ms = (time.perf_counter() - t0) * 1000 / len(views)
+    t0 = time.perf_counter()
+    new_days = [month_show_days(m, YEAR, mo) for m, mo in views]
+    days_ms = (time.perf_counter() - t0) * 1000 / len(views)
+
+    if any(a != set(b) for a, b in zip(legacy_days, new_days)):
+        print("ERROR: show days differ from the legacy query")
+        return 1
+
+    with write_transaction() as conn:
+        before = sorted(conn.execute(select(ShowDay.__table__)).all())
+        rebuild_show_days(conn)
+        after = sorted(conn.execute(select(ShowDay.__table__)).all())
+    sold = sum(r.sold_count for r in after)
+    engine.dispose()
+    tmp.cleanup()
+
+    print(f"movies={args.movies} shows={n_shows} show_days={len(after)} tickets={args.tickets} views={args.views}")
+    print(f"month view  legacy         : {legacy_ms:8.3f} ms")
+    print(f"month view  show_days      : {days_ms:8.3f} ms")
+    print(f"create_ticket (with count) : {buy_ms:8.3f} ms")
+    print(f"refresh 1 year x {args.movies} movies : {refresh_sec * 1000:8.1f} ms")
+    if before != after:
+        print("ERROR: incremental show_days differ from a full rebuild")
+        return 1
+    print(f"\nOK: incremental counts match rebuild (sold seats={sold})")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
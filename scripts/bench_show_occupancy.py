@@ -0,0 +1,162 @@
+from __future__ import annotations
+
+"""上映回選択(UserShowSelect)で残席を出すときの読み取りの比較(ベンチマーク)。
+
+- 映画1本に1日 --shows-per-day 回 × --days 日の上映回を作り、チケットを売る
+- count  : 上映回ごとに ticket_seats を COUNT する(集計テーブルがない場合の素直な書き方)
+- group  : その日の上映回の ticket_seats を GROUP BY でまとめて数える(1クエリだが座席行を全部読む)
+- counter: 集計テーブル show_occupancy を上映回に外部結合する(UserShowSelect の書き方)
+- 書き込み側の追加コスト(create_ticket / cancel 1回あたり)も出す
+- 最後に、購入/キャンセルで増減した集計が作り直した結果と一致することを確かめる
+- CINEMA_DB_PATH で一時DBを使うので cinema.db には触らない
+
+使い方:
+  python scripts/bench_show_occupancy.py
+  python scripts/bench_show_occupancy.py --days 60 --shows-per-day 8 --tickets 20000
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+HALLS = "ABCD"
+DAY0 = datetime(2030, 1, 1)
+
+
+def _seed(days: int, shows_per_day: int) -> int:
+    from sqlalchemy import insert
+
+    from db.db import SessionLocal, init_db, write_transaction
+    from db.models import Movie, Show, User
+
+    init_db()
+    with SessionLocal() as db_session:
+        db_session.add(Movie(title="movie", duration_min=90, default_price=1800))
+        db_session.add(User(id="bench-user", username="bench", password_hash="-", role="User"))
+        db_session.commit()
+
+    rows = []
+    for d in range(days):
+        for k in range(shows_per_day):
+            start = DAY0 + timedelta(days=d, hours=8 + 2 * (k // 4), minutes=k % 4)
+            rows.append({"movie_id": 1, "hall": HALLS[k % 4], "start_at": start, "end_at": start + timedelta(minutes=90), "price": 1800})
+    with write_transaction() as conn:
+        conn.execute(insert(Show), rows)
+    return len(rows)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="上映回選択の残席の読み取りの比較")
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--shows-per-day", type=int, default=8)
+    parser.add_argument("--tickets", type=int, default=5000, help="購入(create_ticket)で作るチケット数")
+    parser.add_argument("--views", type=int, default=300, help="上映回選択の表示回数")
+    args = parser.parse_args()
+
+    tmp = tempfile.TemporaryDirectory()
+    # db.db を import する前に設定する(import時に読む)
+    os.environ["CINEMA_DB_PATH"] = os.path.join(tmp.name, "bench.db")
+
+    from sqlalchemy import func, select
+
+    from db.db import engine, write_transaction
+    from db.models import Show, ShowOccupancy, TicketSeat
+    from services.reservation import cancel, create_ticket
+    from services.showOccupancy import check_show_occupancy
+    from utils.hallLayout import load_layout
+
+    n_shows = _seed(args.days, args.shows_per_day)
+
+    # 購入: 1枚2席。1割はキャンセルする
+    rng = random.Random(0)
+    seats_by_hall = {h: list(load_layout(h).seat_list) for h in HALLS}
+    with engine.connect() as conn:
+        halls = dict(conn.execute(select(Show.id, Show.hall)).all())
+    used: dict[int, int] = {}
+    issued = []
+    t0 = time.perf_counter()
+    for _ in range(args.tickets):
+        show_id = rng.randint(1, n_shows)
+        seats = seats_by_hall[halls[show_id]]
+        k = used.get(show_id, 0)
+        if k + 2 > len(seats):
+            continue
+        used[show_id] = k + 2
+        issued.append(create_ticket(show_id=show_id, user_id="bench-user", seats=seats[k:k + 2], sum_price=3600))
+    buy_ms = (time.perf_counter() - t0) * 1000 / max(1, len(issued))
+    cancelled = issued[:: 10]
+    t0 = time.perf_counter()
+    for t in cancelled:
+        cancel(t.uuid, "bench-user")
+    cancel_ms = (time.perf_counter() - t0) * 1000 / max(1, len(cancelled))
+
+    def _day_range(d: int):
+        d0 = DAY0 + timedelta(days=d)
+        return Show.movie_id == 1, Show.start_at >= d0, Show.start_at < d0 + timedelta(days=1)
+
+    def _count(d: int) -> dict[int, int]:
+        with engine.connect() as conn:
+            ids = conn.execute(select(Show.id).where(*_day_range(d)).order_by(Show.start_at)).scalars().all()
+            return {
+                sid: int(conn.execute(select(func.count()).select_from(TicketSeat).where(TicketSeat.show_id == sid)).scalar())
+                for sid in ids
+            }
+
+    def _group(d: int) -> dict[int, int]:
+        with engine.connect() as conn:
+            ids = conn.execute(select(Show.id).where(*_day_range(d)).order_by(Show.start_at)).scalars().all()
+            sold = dict(
+                conn.execute(
+                    select(TicketSeat.show_id, func.count()).where(TicketSeat.show_id.in_(ids)).group_by(TicketSeat.show_id)
+                ).all()
+            )
+            return {sid: int(sold.get(sid, 0)) for sid in ids}
+
+    def _counter(d: int) -> dict[int, int]:
+        with engine.connect() as conn:
+            rows = conn.execute(
+                select(Show.id, func.coalesce(ShowOccupancy.seat_count, 0))
+                .outerjoin(ShowOccupancy, ShowOccupancy.show_id == Show.id)
+                .where(*_day_range(d))
+                .order_by(Show.start_at)
+            ).all()
+            return {int(sid): int(n) for sid, n in rows}
+
+    views = [rng.randrange(args.days) for _ in range(args.views)]
+    results = {}
+    timings = {}
+    for name, fn in (("count", _count), ("group", _group), ("counter", _counter)):
+        t0 = time.perf_counter()
+        results[name] = [fn(d) for d in views]
+        timings[name] = (time.perf_counter() - t0) * 1000 / len(views)
+
+    with write_transaction() as conn:
+        mismatches = check_show_occupancy(conn)
+    engine.dispose()
+    tmp.cleanup()
+
+    print(f"shows={n_shows} tickets={len(issued)} cancelled={len(cancelled)} views={args.views} (shows/day={args.shows_per_day})")
+    for name in ("count", "group", "counter"):
+        print(f"show select  {name:<8}: {timings[name]:8.3f} ms")
+    print(f"create_ticket (with counters) : {buy_ms:8.3f} ms")
+    print(f"cancel        (with counters) : {cancel_ms:8.3f} ms")
+    if results["counter"] != results["count"] or results["group"] != results["count"]:
+        print("ERROR: remaining seats differ between the queries")
+        return 1
+    if mismatches:
+        print(f"ERROR: show_occupancy differs from tickets for {len(mismatches)} shows")
+        return 1
+    print("\nOK: counters match COUNT(ticket_seats)")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,188 @@
+from __future__ import annotations
+
+"""上映回選択(UserShowSelect)の残席表示と絞り込みの比較(ベンチマーク)。
+
+- 1日に数百回の上映回(ホールA〜D)がある映画を作り、座席をランダムに売る
+- count  : 上映回ごとに ticket_seats を COUNT する
+- group  : その日の上映回の ticket_seats を GROUP BY でまとめて数える
+- counter: services.catalog.list_show_availability(集計テーブル show_occupancy を結合)
+- 満席を隠す / N席並びで空きあり の絞り込みの時間も出す
+- 並び席の判定が allocate_seats(分割なし)と一致すること、
+  クエリプランが shows / ticket_seats のテーブル本体を読まない(索引だけで済む)ことを確かめる
+- CINEMA_DB_PATH で一時DBを使うので cinema.db には触らない
+
+使い方:
+  python scripts/bench_show_select.py
+  python scripts/bench_show_select.py --shows 800 --fill 0.9
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+HALLS = "ABCD"
+DAY = datetime(2030, 1, 1)
+
+
+def _seed(n_shows: int, fill: float, seed: int) -> None:
+    from sqlalchemy import insert
+
+    from db.db import SessionLocal, init_db, write_transaction
+    from db.models import Movie, Show, Ticket, TicketSeat, User
+    from services.showOccupancy import rebuild_show_occupancy
+    from utils.hallLayout import load_layout
+
+    init_db()
+    with SessionLocal() as db_session:
+        db_session.add(Movie(title="movie", duration_min=90, default_price=1800))
+        db_session.add(User(id="bench-user", username="bench", password_hash="-", role="User"))
+        db_session.commit()
+
+    rng = random.Random(seed)
+    shows, tickets, seats = [], [], []
+    for i in range(n_shows):
+        hall = HALLS[i % 4]
+        start = DAY + timedelta(minutes=i * 1440 // n_shows)
+        shows.append({"movie_id": 1, "hall": hall, "start_at": start, "end_at": start + timedelta(minutes=90), "price": 1800})
+        # 上映回ごとに埋まり具合を変える(満席の回も混ぜる)
+        seat_list = list(load_layout(hall).seat_list)
+        rate = 1.0 if rng.random() < 0.15 else rng.random() * fill
+        for seat in seat_list:
+            if rng.random() < rate:
+                tickets.append({"uuid": f"{len(tickets):032x}", "show_id": i + 1, "user_id": "bench-user", "breakdown_json": "{}", "sum_price": 1800, "issued_at": DAY})
+                seats.append({"ticket_id": len(tickets), "show_id": i + 1, "seat": seat})
+    with write_transaction() as conn:
+        conn.execute(insert(Show), shows)
+        conn.execute(insert(Ticket), tickets)
+        conn.execute(insert(TicketSeat), seats)
+        rebuild_show_occupancy(conn)
+        conn.exec_driver_sql("ANALYZE")
+
+
+def _plan(conn, stmt, params) -> list[str]:
+    # パラメータを埋め込んだSQLで EXPLAIN QUERY PLAN を取る
+    sql = stmt.params(**params).compile(dialect=conn.dialect, compile_kwargs={"literal_binds": True})
+    return [str(r[-1]) for r in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}").all()]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="上映回選択の残席表示と絞り込みの比較")
+    parser.add_argument("--shows", type=int, default=400, help="1日の上映回数")
+    parser.add_argument("--fill", type=float, default=0.8, help="埋まり具合の上限(0〜1)")
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    tmp = tempfile.TemporaryDirectory()
+    # db.db を import する前に設定する(import時に読む)
+    os.environ["CINEMA_DB_PATH"] = os.path.join(tmp.name, "bench.db")
+
+    from sqlalchemy import func, select
+
+    from db.db import engine
+    from db.models import Show, TicketSeat
+    from services.catalog import _AVAILABILITY_ON_DATE, _TAKEN_SEATS, list_show_availability
+    from utils.hallLayout import get_occupancy
+    from utils.seatAllocator import allocate_seats
+
+    _seed(args.shows, args.fill, args.seed)
+    day = DAY.date()
+    d_range = (Show.movie_id == 1, Show.start_at >= DAY, Show.start_at < DAY + timedelta(days=1))
+
+    # どれも一覧に出す列(開始・終了・ホール・料金)を読む
+    show_list = select(Show.id, Show.hall, Show.start_at, Show.end_at, Show.price).where(*d_range).order_by(Show.start_at, Show.hall, Show.id)
+
+    def _count() -> dict[int, int]:
+        with engine.connect() as conn:
+            ids = [r.id for r in conn.execute(show_list).all()]
+            return {
+                sid: int(conn.execute(select(func.count()).select_from(TicketSeat).where(TicketSeat.show_id == sid)).scalar())
+                for sid in ids
+            }
+
+    def _group() -> dict[int, int]:
+        with engine.connect() as conn:
+            ids = [r.id for r in conn.execute(show_list).all()]
+            sold = dict(
+                conn.execute(
+                    select(TicketSeat.show_id, func.count()).where(TicketSeat.show_id.in_(ids)).group_by(TicketSeat.show_id)
+                ).all()
+            )
+            return {sid: int(sold.get(sid, 0)) for sid in ids}
+
+    def _counter() -> dict[int, int]:
+        return {s.id: s.sold_count for s in list_show_availability(1, day)}
+
+    def _timed(fn):
+        result = fn()
+        t0 = time.perf_counter()
+        for _ in range(args.repeat):
+            fn()
+        return result, (time.perf_counter() - t0) * 1000 / args.repeat
+
+    counts, count_ms = _timed(_count)
+    grouped, group_ms = _timed(_group)
+    counted, counter_ms = _timed(_counter)
+    if not (counts == grouped == counted):
+        print("ERROR: sold seat counts differ between the queries")
+        return 1
+
+    print(f"shows/day={args.shows} sold seats={sum(counts.values())} repeat={args.repeat}")
+    print(f"remaining  count    : {count_ms:8.3f} ms")
+    print(f"remaining  group    : {group_ms:8.3f} ms")
+    print(f"remaining  counter  : {counter_ms:8.3f} ms")
+
+    # 絞り込み: 結果が allocate_seats(連続のみ)と一致するか
+    with engine.connect() as conn:
+        taken: dict[int, list[str]] = {}
+        for sid, seat in conn.execute(select(TicketSeat.show_id, TicketSeat.seat)):
+            taken.setdefault(int(sid), []).append(seat)
+        halls = dict(conn.execute(select(Show.id, Show.hall)).all())
+    all_shows = list_show_availability(1, day)
+    _, sold_out_ms = _timed(lambda: list_show_availability(1, day, hide_sold_out=True))
+    print(f"hide sold out       : {sold_out_ms:8.3f} ms  ({sum(not s.sold_out for s in all_shows)}/{len(all_shows)} shows)")
+    for n in (2, 4, 6):
+        found, ms = _timed(lambda: list_show_availability(1, day, adjacent=n))
+        expected = [
+            s.id for s in all_shows
+            if allocate_seats(get_occupancy(halls[s.id], taken.get(s.id, ())), n, allow_split=False) is not None
+        ]
+        if [s.id for s in found] != expected:
+            print(f"ERROR: adjacent={n} differs from allocate_seats")
+            return 1
+        print(f"adjacent {n} seats    : {ms:8.3f} ms  ({len(found)}/{len(all_shows)} shows)")
+
+    # クエリプラン: 索引だけで読めているか
+    with engine.connect() as conn:
+        plans = {
+            "list": _plan(conn, _AVAILABILITY_ON_DATE, {"movie_id": 1, "d0": DAY, "d1": DAY + timedelta(days=1)}),
+            "taken seats": _plan(conn, _TAKEN_SEATS, {"show_ids": [s.id for s in all_shows], "now": DAY}),
+        }
+    engine.dispose()
+    tmp.cleanup()
+
+    print()
+    bad = []
+    for name, plan in plans.items():
+        print(f"plan ({name}):")
+        for line in plan:
+            print(f"  {line}")
+            if ("shows" in line or "ticket_seats" in line) and "COVERING INDEX" not in line:
+                bad.append(line)
+    if bad:
+        print(f"ERROR: table lookups in plan: {bad}")
+        return 1
+    print("\nOK: counts match, adjacent filter matches allocate_seats, plans are index-only")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,205 @@
+from __future__ import annotations
+
+"""チケット表示(予約一覧・キャンセル・QR表示・改札)の読み取りの比較(ベンチマーク)。
+
+- 500枚(既定)のチケット履歴があるユーザーを作る(大半は使用済み、1枚1〜4席、上映回・映画はばらばら)
+- 1回の表示あたりの時間を、読み方ごとに比べる
+  per_row : チケット → 上映回 → 映画 → 座席 を1つずつ引く(変更前の UserTicketQR の読み方)
+  in_lists: チケットを読んでから、上映回・映画・座席を IN でまとめて引き、Pythonで突き合わせる
+  two     : チケット + 上映回 + 映画を結合で1クエリ、座席をもう1クエリ(変更前の load_summaries)
+  group_by: 座席も結合して GROUP BY + group_concat で1クエリ
+  single  : 座席は相関サブクエリの group_concat で1クエリ(services.ticketViews.load_summaries)
+- 表示: 予約一覧(使用済みも含めた全件 / 未使用のみ) と チケット1枚(QR表示・改札)
+- どの読み方でも同じ結果になることを確かめる
+- CINEMA_DB_PATH で一時DBを使うので cinema.db には触らない
+
+使い方:
+  python scripts/bench_ticket_views.py
+  python scripts/bench_ticket_views.py --tickets 2000 --repeat 50
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+USER_ID = "bench-user"
+
+
+def _seed(n_tickets: int, seed: int) -> list[str]:
+    from sqlalchemy import insert
+
+    from db.db import SessionLocal, init_db, write_transaction
+    from db.models import Movie, Show, Ticket, TicketSeat, User
+
+    init_db()
+    rng = random.Random(seed)
+    n_movies = 30
+    n_shows = max(1, n_tickets // 2)
+    day0 = datetime(2030, 1, 1, 9)
+    with SessionLocal() as db_session:
+        for i in range(n_movies):
+            db_session.add(Movie(title=f"映画{i}", duration_min=120, default_price=1800))
+        db_session.add(User(id=USER_ID, username="bench", password_hash="-", role="User"))
+        # 他のユーザーのチケットも混ぜる(索引で自分の分だけ引けているか)
+        db_session.add(User(id="other", username="other", password_hash="-", role="User"))
+        db_session.commit()
+
+    shows = []
+    for i in range(n_shows):
+        start = day0 + timedelta(hours=3 * i)
+        shows.append({"movie_id": i % n_movies + 1, "hall": "ABCD"[i % 4], "start_at": start, "end_at": start + timedelta(hours=2), "price": 1800})
+    tickets, seats, uuids = [], [], []
+    for i in range(n_tickets * 4):
+        user = USER_ID if i % 4 == 0 else "other"
+        show_id = i % n_shows + 1
+        ticket_uuid = str(uuid.UUID(int=rng.getrandbits(128), version=4))
+        issued = day0 + timedelta(minutes=i)
+        tickets.append({
+            "uuid": ticket_uuid, "show_id": show_id, "user_id": user, "user_name": "bench", "age": 30, "sex": "F",
+            "breakdown_json": '{"adult":1}', "sum_price": 1800, "issued_at": issued,
+            # 直近の1割だけ未使用
+            "used_at": None if i >= n_tickets * 4 * 0.9 else issued + timedelta(days=1),
+        })
+        for k in range(rng.randint(1, 4)):
+            seats.append({"ticket_id": i + 1, "show_id": show_id, "seat": f"{'ABCDEFGH'[i // n_shows % 8]}-{(i // (8 * n_shows)) * 4 + k + 1}"})
+        if user == USER_ID:
+            uuids.append(ticket_uuid)
+    with write_transaction() as conn:
+        conn.execute(insert(Show), shows)
+        conn.execute(insert(Ticket), tickets)
+        conn.execute(insert(TicketSeat), seats)
+        conn.exec_driver_sql("ANALYZE")
+    return uuids
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="チケット表示の読み取りの比較")
+    parser.add_argument("--tickets", type=int, default=500, help="ユーザー1人のチケット枚数")
+    parser.add_argument("--repeat", type=int, default=30)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    tmp = tempfile.TemporaryDirectory()
+    # db.db を import する前に設定する(import時に読む)
+    os.environ["CINEMA_DB_PATH"] = os.path.join(tmp.name, "bench.db")
+
+    from sqlalchemy import func, select
+
+    from db.db import SessionLocal, engine
+    from db.models import Movie, Show, Ticket, TicketSeat
+    from services.ticketViews import load_summaries
+
+    uuids = _seed(args.tickets, args.seed)
+    order = (Ticket.issued_at.desc().nullslast(), Ticket.id.desc())
+
+    def _view(t, show, movie, seat_list) -> tuple:
+        # 比較用に、表示に使う値だけの tuple にそろえる
+        return (
+            int(t.id), str(t.uuid), show.hall if show else None, show.start_at if show else None,
+            movie.title if movie else None, sorted(seat_list), int(t.sum_price), t.used_at,
+        )
+
+    def per_row(*criteria) -> list[tuple]:
+        with SessionLocal() as db_session:
+            out = []
+            for t in db_session.execute(select(Ticket).where(*criteria).order_by(*order)).scalars().all():
+                show = db_session.execute(select(Show).where(Show.id == t.show_id)).scalar_one_or_none()
+                movie = db_session.execute(select(Movie).where(Movie.id == show.movie_id)).scalar_one_or_none() if show else None
+                seat_list = db_session.execute(select(TicketSeat.seat).where(TicketSeat.ticket_id == t.id)).scalars().all()
+                out.append(_view(t, show, movie, seat_list))
+            return out
+
+    def in_lists(*criteria) -> list[tuple]:
+        with engine.connect() as conn:
+            ts = conn.execute(select(Ticket).where(*criteria).order_by(*order)).all()
+            shows = {s.id: s for s in conn.execute(select(Show).where(Show.id.in_({t.show_id for t in ts}))).all()}
+            movies = {m.id: m for m in conn.execute(select(Movie).where(Movie.id.in_({s.movie_id for s in shows.values()}))).all()}
+            seat_map: dict[int, list[str]] = {}
+            for tid, seat in conn.execute(select(TicketSeat.ticket_id, TicketSeat.seat).where(TicketSeat.ticket_id.in_([t.id for t in ts]))):
+                seat_map.setdefault(tid, []).append(seat)
+            out = []
+            for t in ts:
+                show = shows.get(t.show_id)
+                out.append(_view(t, show, movies.get(show.movie_id) if show else None, seat_map.get(t.id, [])))
+            return out
+
+    base = (
+        select(Ticket.id, Ticket.uuid, Ticket.sum_price, Ticket.used_at, Show.hall, Show.start_at, Movie.title)
+        .outerjoin(Show, Show.id == Ticket.show_id)
+        .outerjoin(Movie, Movie.id == Show.movie_id)
+    )
+
+    def two(*criteria) -> list[tuple]:
+        with engine.connect() as conn:
+            rows = conn.execute(base.where(*criteria).order_by(*order)).all()
+            seat_map: dict[int, list[str]] = {}
+            for tid, seat in conn.execute(
+                select(TicketSeat.ticket_id, TicketSeat.seat).where(TicketSeat.ticket_id.in_([r.id for r in rows])).order_by(TicketSeat.ticket_id, TicketSeat.seat)
+            ):
+                seat_map.setdefault(tid, []).append(seat)
+        return [(int(r.id), r.uuid, r.hall, r.start_at, r.title, seat_map.get(r.id, []), int(r.sum_price), r.used_at) for r in rows]
+
+    def group_by(*criteria) -> list[tuple]:
+        stmt = (
+            base.add_columns(func.group_concat(TicketSeat.seat).label("seats"))
+            .outerjoin(TicketSeat, TicketSeat.ticket_id == Ticket.id)
+            .where(*criteria)
+            .group_by(Ticket.id)
+            .order_by(*order)
+        )
+        with engine.connect() as conn:
+            rows = conn.execute(stmt).all()
+        return [(int(r.id), r.uuid, r.hall, r.start_at, r.title, sorted(r.seats.split(",")) if r.seats else [], int(r.sum_price), r.used_at) for r in rows]
+
+    def single(*criteria) -> list[tuple]:
+        with engine.connect() as conn:
+            found = load_summaries(conn, *criteria, order_by=order)
+        return [(t.ticket_id, t.uuid, t.hall, t.start_at, t.movie_title, t.seats, t.sum_price, t.used_at) for t in found]
+
+    rng = random.Random(args.seed)
+    picks = [rng.choice(uuids) for _ in range(args.repeat)]
+    views = {
+        f"list all ({len(uuids)})": lambda: [(Ticket.user_id == USER_ID,)],
+        "list unused": lambda: [(Ticket.user_id == USER_ID, Ticket.used_at.is_(None))],
+        "one ticket (QR/gate)": lambda: [(Ticket.uuid == u,) for u in picks],
+    }
+    methods = {"per_row": per_row, "in_lists": in_lists, "two": two, "group_by": group_by, "single": single}
+
+    print(f"user tickets={len(uuids)} (all users {len(uuids) * 4}) repeat={args.repeat}")
+    print(f"{'view':<22}" + "".join(f"{name:>11}" for name in methods) + "   (ms per view)")
+    for label, make_calls in views.items():
+        calls = make_calls()
+        if len(calls) == 1:
+            calls = calls * args.repeat
+        expected = None
+        line = f"{label:<22}"
+        for name, fn in methods.items():
+            results = [fn(*c) for c in calls[:3]]
+            if expected is None:
+                expected = results
+            elif results != expected:
+                print(f"\nERROR: {name} returned different rows for {label}")
+                return 1
+            t0 = time.perf_counter()
+            for c in calls:
+                fn(*c)
+            line += f"{(time.perf_counter() - t0) * 1000 / len(calls):>11.3f}"
+        print(line)
+
+    engine.dispose()
+    tmp.cleanup()
+    print("\nOK: all methods return the same ticket views")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,142 @@
+from __future__ import annotations
+
+"""チケットUUIDの保存形式(TEXT 36文字 vs BLOB 16バイト)の比較(ベンチマーク)。
+
+- 一時DBに id + uuid だけのテーブルを2つ作り、同じUUIDを大量に入れる
+  text: 変更前と同じ UUID文字列 / blob: 変更後の tickets.uuid と同じ 16バイト
+- 一意インデックスを作る時間と、テーブル・インデックスのサイズ(dbstat)を比べる
+- 1件ずつの照合(ある/ない)の時間を比べる(改札の照合と同じ「uuid = ?」)
+- PRAGMA は db.db と同じ(cache_size / mmap_size など)
+- CINEMA_DB_PATH で一時DBを使うので cinema.db には触らない
+
+使い方:
+  python scripts/bench_uuid_storage.py
+  python scripts/bench_uuid_storage.py --rows 1000000 --lookups 50000
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+import uuid
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+CHUNK = 100_000
+
+
+def _fill(conn, n_rows: int, n_samples: int, seed: int) -> list[bytes]:
+    # 同じ乱数列から両方のテーブルへ入れる(全件はメモリに持たず、照合用に一部だけ残す)
+    rng = random.Random(seed)
+    step = max(1, n_rows // n_samples)
+    samples: list[bytes] = []
+    for base in range(0, n_rows, CHUNK):
+        keys = [rng.randbytes(16) for _ in range(min(CHUNK, n_rows - base))]
+        samples.extend(keys[(-base) % step::step])
+        ids = range(base + 1, base + len(keys) + 1)
+        conn.exec_driver_sql("INSERT INTO uuid_blob (id, uuid) VALUES (?, ?)", list(zip(ids, keys)))
+        conn.exec_driver_sql(
+            "INSERT INTO uuid_text (id, uuid) VALUES (?, ?)",
+            list(zip(ids, (str(uuid.UUID(bytes=k)) for k in keys))),
+        )
+    return samples[:n_samples]
+
+
+def _sizes(conn, names: list[str]) -> dict[str, int]:
+    rows = conn.exec_driver_sql(
+        f"SELECT name, SUM(pgsize) FROM dbstat WHERE name IN ({', '.join('?' * len(names))}) GROUP BY name",
+        tuple(names),
+    ).all()
+    return {str(name): int(size) for name, size in rows}
+
+
+def _lookup_us(cursor, table: str, keys: list) -> tuple[float, int]:
+    sql = f"SELECT id FROM {table} WHERE uuid = ?"
+    found = 0
+    t0 = time.perf_counter()
+    for key in keys:
+        if cursor.execute(sql, (key,)).fetchone() is not None:
+            found += 1
+    return (time.perf_counter() - t0) / len(keys) * 1e6, found
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="チケットUUIDの保存形式(TEXT/BLOB)の比較")
+    parser.add_argument("--rows", type=int, default=5_000_000)
+    parser.add_argument("--lookups", type=int, default=20_000, help="照合の件数(ある/ないそれぞれ)")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    tmp = tempfile.TemporaryDirectory()
+    # db.db を import する前に設定する(import時に読む)
+    os.environ["CINEMA_DB_PATH"] = os.path.join(tmp.name, "bench.db")
+
+    from db.db import engine, write_transaction
+    from db.models import uuid_to_bytes
+
+    t0 = time.perf_counter()
+    with write_transaction() as conn:
+        conn.exec_driver_sql("CREATE TABLE uuid_text (id INTEGER PRIMARY KEY, uuid VARCHAR NOT NULL)")
+        conn.exec_driver_sql("CREATE TABLE uuid_blob (id INTEGER PRIMARY KEY, uuid BLOB NOT NULL)")
+        hits = _fill(conn, args.rows, args.lookups, args.seed)
+    print(f"rows={args.rows} insert: {time.perf_counter() - t0:.1f} s")
+
+    build_sec: dict[str, float] = {}
+    for table in ("uuid_text", "uuid_blob"):
+        t0 = time.perf_counter()
+        with write_transaction() as conn:
+            conn.exec_driver_sql(f"CREATE UNIQUE INDEX ix_{table} ON {table} (uuid)")
+        build_sec[table] = time.perf_counter() - t0
+
+    with engine.connect() as conn:
+        sizes = _sizes(conn, ["uuid_text", "uuid_blob", "ix_uuid_text", "ix_uuid_blob"])
+
+    # 照合: ある(入れたUUID) / ない(新しい乱数)。text 側は改札で読み取る文字列そのもの、
+    # blob 側はモデル(UuidBytes)と同じ変換をしてから引く
+    rng = random.Random(args.seed + 1)
+    rng.shuffle(hits)
+    misses = [rng.randbytes(16) for _ in range(len(hits))]
+    hit_text = [str(uuid.UUID(bytes=k)) for k in hits]
+    miss_text = [str(uuid.UUID(bytes=k)) for k in misses]
+
+    results: dict[str, tuple[float, float]] = {}
+    raw = engine.raw_connection()
+    try:
+        cursor = raw.cursor()
+        for table, hit_keys, miss_keys in (
+            ("uuid_text", hit_text, miss_text),
+            ("uuid_blob", [uuid_to_bytes(k) for k in hit_text], [uuid_to_bytes(k) for k in miss_text]),
+        ):
+            # 1回目はページをキャッシュに載せるための空回し
+            _lookup_us(cursor, table, hit_keys)
+            hit_us, found = _lookup_us(cursor, table, hit_keys)
+            miss_us, false_hits = _lookup_us(cursor, table, miss_keys)
+            if found != len(hit_keys) or false_hits:
+                print(f"ERROR: {table} found={found}/{len(hit_keys)} false_hits={false_hits}")
+                return 1
+            results[table] = (hit_us, miss_us)
+        cursor.close()
+    finally:
+        raw.close()
+    engine.dispose()
+    tmp.cleanup()
+
+    print(f"{'storage':<10}{'table MiB':>11}{'index MiB':>11}{'B/key':>8}{'build s':>9}{'hit us':>9}{'miss us':>9}")
+    for label, table in (("TEXT", "uuid_text"), ("BLOB", "uuid_blob")):
+        index_bytes = sizes[f"ix_{table}"]
+        hit_us, miss_us = results[table]
+        print(
+            f"{label:<10}{sizes[table] / 1024 / 1024:>11.1f}{index_bytes / 1024 / 1024:>11.1f}"
+            f"{index_bytes / args.rows:>8.1f}{build_sec[table]:>9.2f}{hit_us:>9.2f}{miss_us:>9.2f}"
+        )
+    ratio = sizes["ix_uuid_blob"] / sizes["ix_uuid_text"]
+    print(f"\nOK: BLOB index is {ratio:.0%} of TEXT index")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
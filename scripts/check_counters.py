@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+"""集計テーブル(show_occupancy / show_days)がチケット・上映回と合っているかを確認する。
+
+- show_occupancy: 上映回ごとの予約済み席数・チケット枚数・売上
+- show_days     : 上映日カレンダーの (映画, 上映日) ごとの上映回数・座席数・販売済み席数
+- どちらも購入/キャンセル/上映回の編集と同じトランザクションで更新しているので、通常はずれない
+  (DBを直接編集した・古い版で書き込んだ、などのときに使う)
+- --rebuild を付けると、ずれの有無にかかわらず全件作り直す
+- 確認中は書き込みロックを取る(確認の途中で購入が入って、ずれて見えないようにするため)
+
+使い方:
+  python scripts/check_counters.py
+  python scripts/check_counters.py --rebuild
+"""
+
+import argparse
+import os
+import sys
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+# ずれの詳細を表示する最大件数
+MAX_REPORT = 20
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="集計テーブル(show_occupancy / show_days)の確認・作り直し")
+    parser.add_argument("--rebuild", action="store_true", help="チケット・上映回から全件作り直す")
+    args = parser.parse_args()
+
+    from db.db import init_db, write_transaction
+    from services.showCalendar import check_show_days, rebuild_show_days
+    from services.showOccupancy import check_show_occupancy, rebuild_show_occupancy
+
+    init_db()
+
+    if args.rebuild:
+        with write_transaction() as conn:
+            shows = rebuild_show_occupancy(conn)
+            days = rebuild_show_days(conn)
+        print(f"OK: rebuilt show_occupancy ({shows} shows) and show_days ({days} days)")
+        return 0
+
+    with write_transaction() as conn:
+        occupancy = check_show_occupancy(conn)
+        show_days = check_show_days(conn)
+
+    for m in occupancy[:MAX_REPORT]:
+        print(f"show_occupancy show_id={m.show_id} stored(seats,tickets,revenue)={m.stored} actual={m.actual}")
+    for movie_id, day in show_days[:MAX_REPORT]:
+        print(f"show_days movie_id={movie_id} day={day:%Y-%m-%d}")
+
+    if occupancy or show_days:
+        print(
+            f"ERROR: show_occupancy {len(occupancy)} shows / show_days {len(show_days)} days differ "
+            "(python scripts/check_counters.py --rebuild で作り直せます)",
+            file=sys.stderr,
+        )
+        return 1
+    print("OK: show_occupancy and show_days match tickets and shows")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+"""上映回のチケットQRを画像ファイル(SVG/PNG)に一括出力する(団体の幹事・印刷所向け)。
+
+- 上映回ID(複数可)または上映日の範囲でチケットを選ぶ
+- 出力先に show_<上映回ID>/<UUID>.svg / .png と manifest.csv(座席・UUID・ファイル名の対応表)を書く
+- 描画はプロセスプールで並列に行う(--workers。既定はCPUコア数)
+- PNG は追加のライブラリなしで書ける(Pillow 不要)
+
+使い方:
+  python scripts/export_qr.py --show 12 --out exports/show12
+  python scripts/export_qr.py --from 2025-01-10 --to 2025-01-12 --out exports/jan --format png
+  python scripts/export_qr.py --show 12 --show 13 --out exports --workers 4
+"""
+
+import argparse
+import os
+import sys
+from datetime import date
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="チケットQRの一括出力(SVG/PNG + manifest.csv)")
+    parser.add_argument("--show", type=int, action="append", default=[], help="上映回ID(くり返し指定可)")
+    parser.add_argument("--from", dest="date_from", type=date.fromisoformat, default=None, help="上映日の開始(YYYY-MM-DD)")
+    parser.add_argument("--to", dest="date_to", type=date.fromisoformat, default=None, help="上映日の終了(YYYY-MM-DD、この日を含む)")
+    parser.add_argument("--out", required=True, help="出力先ディレクトリ")
+    parser.add_argument("--format", type=str, default="svg,png", help="svg / png / svg,png")
+    parser.add_argument("--workers", type=int, default=None, help="描画に使うプロセス数(既定: CPUコア数)")
+    parser.add_argument("--chunk", type=int, default=None, help="1回にワーカーへ渡すチケット数")
+    parser.add_argument("--box-size", type=int, default=10, help="PNGの1セルのピクセル数")
+    args = parser.parse_args()
+
+    if not args.show and args.date_from is None and args.date_to is None:
+        parser.error("--show か --from/--to のどちらかを指定してください")
+
+    from db.db import init_db
+    from services.qrExport import DEFAULT_CHUNK, export_tickets, ticket_filter
+
+    init_db()
+    try:
+        summary = export_tickets(
+            args.out,
+            ticket_filter(args.show, args.date_from, args.date_to),
+            formats=[f.strip() for f in args.format.split(",") if f.strip()],
+            workers=args.workers,
+            chunk_size=args.chunk or DEFAULT_CHUNK,
+            box_size=args.box_size,
+        )
+    except (ValueError, OSError) as exc:
+        print(f"ERROR: {exc}", file=sys.stderr)
+        return 1
+
+    if summary.tickets == 0:
+        print("ERROR: 条件に合うチケットがありません", file=sys.stderr)
+        return 1
+    print(
+        f"OK: tickets={summary.tickets} files={summary.files} "
+        f"size={summary.bytes_written / 1024 / 1024:.1f}MiB sec={summary.seconds:.2f} "
+        f"tickets/s={summary.tickets_per_sec:.0f} ({summary.tickets_per_sec / summary.workers:.0f}/worker, workers={summary.workers})"
+    )
+    print(f"manifest: {summary.manifest_path}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+"""改札の一括処理(バーコードスキャナーの出力・UUIDリストのファイル向け)。
+
+- 1行1UUIDを標準入力またはファイルから読み、まとめて照合・入場処理する
+  (バッチごとに照合1クエリ + used_at の UPDATE 1文)
+- 読み取り1件ごとに結果をタブ区切りで出力する: 通し番号 / 結果 / UUID / ホール / 開始 / 座席
+  (通し番号は空行を飛ばして数えた何件目か。入力ファイルの行番号とはずれることがある)
+  結果は accepted(入場OK) / duplicate(使用済み) / unknown(該当なし)
+- スキャナーをパイプでつないだ場合は、読み取りが途切れるたびにその時点の分を処理する
+
+使い方:
+  python scripts/gate_scan.py scans.txt
+  scanner-reader | python scripts/gate_scan.py
+  python scripts/gate_scan.py --batch-size 1000 < scans.txt
+"""
+
+import argparse
+import os
+import sys
+from collections import Counter
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="改札の一括処理(1行1UUID)")
+    parser.add_argument("file", nargs="?", default="-", help="UUIDのファイル(省略または - で標準入力)")
+    parser.add_argument("--batch-size", type=int, default=None, help="1回にまとめて処理する最大件数")
+    args = parser.parse_args()
+
+    from db.db import init_db
+    from services.gate import (
+        DEFAULT_SCAN_BATCH,
+        SCAN_ACCEPTED,
+        SCAN_DUPLICATE,
+        SCAN_UNKNOWN,
+        check_in_batch,
+        read_scan_batches,
+    )
+    from utils.datetimeFormat import format_ymd_hm
+
+    init_db()
+    batch_size = args.batch_size or DEFAULT_SCAN_BATCH
+
+    if args.file == "-":
+        stream = sys.stdin
+        # パイプ・端末はスキャナーとして扱い、届いた分ずつ処理する
+        live = not stream.seekable()
+    else:
+        try:
+            stream = open(args.file, encoding="utf-8")
+        except OSError as exc:
+            print(f"ERROR: {exc}", file=sys.stderr)
+            return 1
+        live = False
+
+    counts: Counter[str] = Counter()
+    scan_no = 0
+    try:
+        for batch in read_scan_batches(stream, batch_size, live=live):
+            for r in check_in_batch(batch):
+                scan_no += 1
+                counts[r.status] += 1
+                if r.status == SCAN_UNKNOWN:
+                    print(f"{scan_no}\t{r.status}\t{r.uuid}\t-\t-\t-")
+                else:
+                    print(f"{scan_no}\t{r.status}\t{r.uuid}\t{r.hall or '-'}\t{format_ymd_hm(r.start_at)}\t{','.join(r.seats) or '-'}")
+            sys.stdout.flush()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+
+    print(
+        f"OK: scanned={scan_no} accepted={counts[SCAN_ACCEPTED]} "
+        f"duplicate={counts[SCAN_DUPLICATE]} unknown={counts[SCAN_UNKNOWN]}",
+        file=sys.stderr,
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
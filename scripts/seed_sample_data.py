@@ -26,10 +26,11 @@ if ROOT_DIR not in sys.path:
 
 from sqlalchemy import select
 
-from db.db import SessionLocal
+from db.db import DB_PATH, SessionLocal, init_db  # DB_PATH は CINEMA_DB_PATH の指定も反映済み
 from db.models import Movie, Show
-
-DB_PATH = os.path.join(ROOT_DIR, "cinema.db")
+from services.movieCatalog import bump_movie_version
+from services.movieSearch import sync_movie
+from services.showCalendar import refresh_show_days
 
 
 def _add_months(d: date, months: int) -> date:
@@ -46,6 +47,9 @@ def main() -> int:
         print("  先に `python db/init_db.py` を実行してDBを作成してください。")
         return 1
 
+    # 既存DBを最新のスキーマに合わせる(集計テーブルの追加など)
+    init_db()
+
     # 5本のサンプル映画
     sample_movies: list[dict[str, object]] = [
         {
@@ -97,6 +101,8 @@ def main() -> int:
     created_movies = 0
     reused_movies = 0
     created_shows = 0
+    # 上映日カレンダーの集計を数え直す (movie_id, 上映日)
+    touched_days: set[tuple[int, datetime]] = set()
     skipped_shows = 0
 
     with SessionLocal() as db_session:
@@ -123,6 +129,7 @@ def main() -> int:
                 )
                 db_session.add(movie)
                 db_session.flush()  # movie.id 確定
+                sync_movie(db_session.connection(), movie.id)
                 created_movies += 1
             else:
                 reused_movies += 1
@@ -136,32 +143,36 @@ def main() -> int:
             if 0 <= wd <= 4:
                 movie_id = weekday_movie_ids[wd]
                 start_dt = datetime.combine(d, start_t)
-                start_at = start_dt.strftime("%Y-%m-%dT%H:%M")
 
                 # 既に同一(hall, start_at)があればスキップ
                 exists = db_session.execute(
-                    select(Show.id).where(Show.hall == hall, Show.start_at == start_at)
+                    select(Show.id).where(Show.hall == hall, Show.start_at == start_dt)
                 ).first()
                 if exists is not None:
                     skipped_shows += 1
                 else:
                     movie = db_session.execute(select(Movie).where(Movie.id == movie_id)).scalar_one()
                     end_dt = start_dt + timedelta(minutes=int(movie.duration_min))
-                    end_at = end_dt.strftime("%Y-%m-%dT%H:%M")
 
                     # 上映回の登録
                     show = Show(
                         movie_id=movie_id,
                         hall=hall,
-                        start_at=start_at,
-                        end_at=end_at,
+                        start_at=start_dt,
+                        end_at=end_dt,
                         price=int(movie.default_price or 0),
                     )
                     db_session.add(show)
                     created_shows += 1
+                    touched_days.add((movie_id, start_dt))
 
             d += timedelta(days=1)
 
+        db_session.flush()
+        refresh_show_days(db_session.connection(), touched_days)
+        # 起動中のアプリの映画一覧キャッシュにも新しい映画が出るように版を上げる
+        if created_movies:
+            bump_movie_version(db_session.connection())
         db_session.commit()
 
     print("OK: seeded sample data")
@@ -0,0 +1,521 @@
+from __future__ import annotations
+
+"""予約機能の HTTP/JSON API サーバー(ローカル用)。
+
+router.py(対話型の端末1つ)とは別の入口で、Webフロントや券売機・改札端末から
+同じDB・同じ services の処理を呼べるようにする。
+
+- asyncio の標準ライブラリだけで動く HTTP/1.1 サーバー(keep-alive 対応)
+- DBアクセス(ブロッキング)はスレッドプールで実行し、イベントループは止めない
+- 利用者の認証はないので、既定では 127.0.0.1 でだけ待ち受ける
+- 改札(/gate/check-in)は、CINEMA_API_TOKEN を設定して
+  `Authorization: Bearer <トークン>` を付けたときだけ使える(未設定なら 403)
+- ユーザーの予約一覧にはチケットUUID(QRの中身)を含めない
+
+使い方:
+  python server.py
+  python server.py --port 8080 --workers 16
+
+エンドポイント:
+  GET    /health
+  GET    /movies
+  GET    /movies/{movie_id}/shows[?date=YYYY-MM-DD]
+  GET    /shows/{show_id}/seats[?hold_token=...]
+  POST   /shows/{show_id}/holds          {"seats": [...], "hold_token": "...", "user_id": "..."}
+  DELETE /holds/{hold_token}
+  POST   /reservations                   {"show_id", "seats", "breakdown", "user_id", "hold_token"?, ...}
+  GET    /reservations/{uuid}
+  DELETE /reservations/{uuid}?user_id=...
+  GET    /users/{user_id}/reservations[?include_used=1]
+  POST   /gate/check-in                  {"uuid": "..."}   (Authorization: Bearer <CINEMA_API_TOKEN>)
+"""
+
+import argparse
+import asyncio
+import dataclasses
+import hmac
+import json
+import os
+import re
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+from http import HTTPStatus
+from typing import Any, Callable
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from sqlalchemy import select
+
+from db.db import engine, init_db
+from db.models import User
+from services.catalog import get_seat_map, list_movies, list_shows
+from services.errors import (
+    InvalidBreakdownError,
+    InvalidSeatsError,
+    ReservationError,
+    SeatConflictError,
+    ShowNotFoundError,
+    TicketAlreadyUsedError,
+    TicketNotFoundError,
+)
+from services.gate import check_in
+from services.reservation import cancel, get_reservation, list_reservations, reserve
+from services.seatHold import hold_seats, release_hold
+
+# リクエストの上限(これを超えたら 4xx を返して接続を閉じる)
+MAX_HEADER_BYTES = 64 * 1024
+MAX_BODY_BYTES = 1024 * 1024
+# keep-alive の接続で次のリクエストを待つ秒数
+KEEPALIVE_TIMEOUT_SEC = 15.0
+# 改札APIのトークン(.env / 環境変数)
+API_TOKEN_ENV = "CINEMA_API_TOKEN"
+# 予約の sex に使える値(UserCheckout の入力例と同じ)
+SEXES = ("M", "F", "Other")
+
+
+def _env_int(key: str, default: int) -> int:
+    try:
+        return int((os.environ.get(key) or "").strip() or default)
+    except ValueError:
+        return default
+
+
+# 既定のワーカー数は DB の接続プール(pool_size + max_overflow)に合わせる
+# (これより多くしても接続待ちになるだけ)
+DEFAULT_WORKERS = _env_int("CINEMA_DB_POOL_SIZE", 8) + _env_int("CINEMA_DB_MAX_OVERFLOW", 8)
+
+
+class HttpError(Exception):
+    def __init__(self, status: HTTPStatus, message: str, **extra: Any):
+        self.status = status
+        self.message = message
+        self.extra = extra
+        super().__init__(message)
+
+
+# services の例外 → HTTPステータス(上から順に isinstance で判定)
+_ERROR_STATUS: tuple[tuple[type[ReservationError], HTTPStatus], ...] = (
+    (ShowNotFoundError, HTTPStatus.NOT_FOUND),
+    (TicketNotFoundError, HTTPStatus.NOT_FOUND),
+    (InvalidSeatsError, HTTPStatus.BAD_REQUEST),
+    (InvalidBreakdownError, HTTPStatus.BAD_REQUEST),
+    (SeatConflictError, HTTPStatus.CONFLICT),
+    (TicketAlreadyUsedError, HTTPStatus.CONFLICT),
+)
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.strftime("%Y-%m-%dT%H:%M")
+    if isinstance(value, date):
+        return value.isoformat()
+    if dataclasses.is_dataclass(value):
+        return dataclasses.asdict(value)
+    raise TypeError(f"JSONに変換できません: {type(value).__name__}")
+
+
+def _dumps(obj: Any) -> bytes:
+    return json.dumps(obj, ensure_ascii=False, default=_json_default, separators=(",", ":")).encode("utf-8")
+
+
+# ---- リクエスト値の取り出し ----
+
+def _require(body: dict, key: str) -> Any:
+    if key not in body or body[key] is None:
+        raise HttpError(HTTPStatus.BAD_REQUEST, f"{key} が指定されていません。")
+    return body[key]
+
+
+def _seat_list(value: Any) -> list[str]:
+    # ["A-1", "A-2"] / "A-1,A-2" のどちらでも受け付ける
+    if isinstance(value, str):
+        value = value.split(",")
+    if not isinstance(value, list) or not all(isinstance(s, str) for s in value):
+        raise HttpError(HTTPStatus.BAD_REQUEST, "seats は座席IDの配列で指定してください。")
+    return [s.strip().upper() for s in value if s.strip()]
+
+
+# SQLite の INTEGER(符号付き64ビット)に収まる範囲。超える値はバインドで OverflowError になる
+_MAX_ID = 2**63 - 1
+
+
+def _path_id(value: str) -> int:
+    # パスの \d+ 部分。範囲外の id の行はないので 404
+    number = int(value)
+    if number > _MAX_ID:
+        raise HttpError(HTTPStatus.NOT_FOUND, f"見つかりません: {value}")
+    return number
+
+
+def _body_id(body: dict, key: str) -> int:
+    value = _require(body, key)
+    if isinstance(value, bool):
+        raise HttpError(HTTPStatus.BAD_REQUEST, f"{key} は整数で指定してください。")
+    try:
+        number = int(value)
+    except (TypeError, ValueError):
+        raise HttpError(HTTPStatus.BAD_REQUEST, f"{key} は整数で指定してください。") from None
+    if not -_MAX_ID - 1 <= number <= _MAX_ID:
+        raise HttpError(HTTPStatus.BAD_REQUEST, f"{key} の値が範囲外です。")
+    return number
+
+
+def _optional(body: dict, key: str, types: tuple[type, ...], message: str) -> Any:
+    # 省略/null は None。bool は int の一種なので、int を求めるときは別に弾く
+    value = body.get(key)
+    if value is None:
+        return None
+    if not isinstance(value, types) or (bool not in types and isinstance(value, bool)):
+        raise HttpError(HTTPStatus.BAD_REQUEST, message)
+    return value
+
+
+def _require_user(user_id: str) -> None:
+    # SQLite の外部キー制約は無効なので、存在しないユーザーのチケット・押さえができないようにここで確かめる
+    with engine.connect() as conn:
+        if conn.execute(select(User.id).where(User.id == user_id)).first() is None:
+            raise HttpError(HTTPStatus.NOT_FOUND, f"ユーザーが見つかりません: {user_id}")
+
+
+def _query_one(query: dict[str, list[str]], key: str) -> str | None:
+    values = query.get(key)
+    return values[0] if values else None
+
+
+# ---- ハンドラ(スレッドプールで実行される。戻り値は (ステータス, JSON化するオブジェクト)) ----
+
+Handler = Callable[[tuple[str, ...], dict[str, list[str]], dict], tuple[HTTPStatus, Any]]
+
+
+def _health(params, query, body):
+    return HTTPStatus.OK, {"status": "ok"}
+
+
+def _movies(params, query, body):
+    return HTTPStatus.OK, list_movies()
+
+
+def _movie_shows(params, query, body):
+    on_date = None
+    raw = _query_one(query, "date")
+    if raw:
+        try:
+            on_date = datetime.strptime(raw, "%Y-%m-%d").date()
+        except ValueError:
+            raise HttpError(HTTPStatus.BAD_REQUEST, "date は YYYY-MM-DD で指定してください。") from None
+    return HTTPStatus.OK, list_shows(_path_id(params[0]), on_date)
+
+
+def _show_seats(params, query, body):
+    return HTTPStatus.OK, get_seat_map(_path_id(params[0]), exclude_token=_query_one(query, "hold_token"))
+
+
+def _hold(params, query, body):
+    hold_token = _optional(body, "hold_token", (str,), "hold_token は文字列で指定してください。") or uuid.uuid4().hex
+    user_id = _optional(body, "user_id", (str,), "user_id は文字列で指定してください。")
+    if user_id is not None:
+        _require_user(user_id)
+    expires_at = hold_seats(_path_id(params[0]), _seat_list(_require(body, "seats")), hold_token, user_id=user_id)
+    return HTTPStatus.OK, {"hold_token": hold_token, "expires_at": expires_at}
+
+
+def _release(params, query, body):
+    return HTTPStatus.OK, {"released": release_hold(params[0])}
+
+
+def _reserve(params, query, body):
+    breakdown = _require(body, "breakdown")
+    if not isinstance(breakdown, dict):
+        raise HttpError(HTTPStatus.BAD_REQUEST, "breakdown は {区分: 枚数} で指定してください。")
+    try:
+        breakdown = {str(k): int(v) for k, v in breakdown.items()}
+    except (TypeError, ValueError):
+        raise HttpError(HTTPStatus.BAD_REQUEST, "breakdown の値が不正です。") from None
+    show_id = _body_id(body, "show_id")
+
+    # チケットにそのまま保存される値なので、型を確かめてから渡す
+    user_name = _optional(body, "user_name", (str,), "user_name は文字列で指定してください。")
+    age = _optional(body, "age", (int,), "age は整数で指定してください。")
+    if age is not None and not 0 <= age <= 150:
+        raise HttpError(HTTPStatus.BAD_REQUEST, "age の値が不正です。")
+    sex = _optional(body, "sex", (str,), "sex は文字列で指定してください。")
+    if sex is not None and sex not in SEXES:
+        raise HttpError(HTTPStatus.BAD_REQUEST, f"sex は {' / '.join(SEXES)} のどれかで指定してください。")
+    is_member = _optional(body, "is_member", (bool, int), "is_member は true/false で指定してください。")
+    if is_member not in (None, True, False):
+        raise HttpError(HTTPStatus.BAD_REQUEST, "is_member は true/false で指定してください。")
+    hold_token = _optional(body, "hold_token", (str,), "hold_token は文字列で指定してください。")
+
+    user_id = _require(body, "user_id")
+    if not isinstance(user_id, str):
+        raise HttpError(HTTPStatus.BAD_REQUEST, "user_id は文字列で指定してください。")
+    _require_user(user_id)
+
+    ticket = reserve(
+        show_id,
+        _seat_list(_require(body, "seats")),
+        breakdown,
+        user_id,
+        user_name=user_name,
+        age=age,
+        sex=sex,
+        is_member=1 if is_member else 0,
+        hold_token=hold_token,
+    )
+    return HTTPStatus.CREATED, ticket
+
+
+def _reservation(params, query, body):
+    found = get_reservation(params[0])
+    if found is None:
+        raise TicketNotFoundError(params[0])
+    return HTTPStatus.OK, found
+
+
+def _cancel(params, query, body):
+    user_id = _query_one(query, "user_id") or body.get("user_id")
+    if not user_id:
+        raise HttpError(HTTPStatus.BAD_REQUEST, "user_id が指定されていません。")
+    cancel(params[0], str(user_id))
+    return HTTPStatus.OK, {"cancelled": params[0]}
+
+
+def _user_reservations(params, query, body):
+    include_used = (_query_one(query, "include_used") or "").lower() in {"1", "true", "yes"}
+    # UUID はそのまま改札・キャンセルに使えるので、user_id を知っているだけの人には返さない
+    return HTTPStatus.OK, [
+        {k: v for k, v in dataclasses.asdict(r).items() if k != "uuid"}
+        for r in list_reservations(params[0], include_used=include_used)
+    ]
+
+
+def _check_in(params, query, body):
+    result = check_in(str(_require(body, "uuid")).strip())
+    return HTTPStatus.OK, result
+
+
+_ROUTES: list[tuple[str, re.Pattern[str], Handler]] = [
+    ("GET", re.compile(r"/health"), _health),
+    ("GET", re.compile(r"/movies"), _movies),
+    ("GET", re.compile(r"/movies/(\d+)/shows"), _movie_shows),
+    ("GET", re.compile(r"/shows/(\d+)/seats"), _show_seats),
+    ("POST", re.compile(r"/shows/(\d+)/holds"), _hold),
+    ("DELETE", re.compile(r"/holds/([^/]+)"), _release),
+    ("POST", re.compile(r"/reservations"), _reserve),
+    ("GET", re.compile(r"/reservations/([^/]+)"), _reservation),
+    ("DELETE", re.compile(r"/reservations/([^/]+)"), _cancel),
+    ("GET", re.compile(r"/users/([^/]+)/reservations"), _user_reservations),
+    ("POST", re.compile(r"/gate/check-in"), _check_in),
+]
+
+
+# 改札の端末だけが呼ぶ(トークンが必要な)ハンドラ
+_ADMIN_HANDLERS: frozenset[Handler] = frozenset({_check_in})
+
+
+def _route(method: str, path: str) -> tuple[Handler, tuple[str, ...]]:
+    path_allowed = False
+    for route_method, pattern, handler in _ROUTES:
+        m = pattern.fullmatch(path)
+        if m is None:
+            continue
+        if route_method == method:
+            return handler, tuple(unquote(g) for g in m.groups())
+        path_allowed = True
+    if path_allowed:
+        raise HttpError(HTTPStatus.METHOD_NOT_ALLOWED, f"{method} は使えません: {path}")
+    raise HttpError(HTTPStatus.NOT_FOUND, f"見つかりません: {path}")
+
+
+def _call(handler: Handler, params: tuple[str, ...], query: dict[str, list[str]], body: dict) -> tuple[HTTPStatus, bytes]:
+    # ワーカースレッド側: 処理 → JSON化までをまとめて行う(イベントループで重い処理をしない)
+    try:
+        status, obj = handler(params, query, body)
+        return status, _dumps(obj)
+    except HttpError as exc:
+        return exc.status, _dumps({"error": exc.message, **exc.extra})
+    except ReservationError as exc:
+        status = next((s for t, s in _ERROR_STATUS if isinstance(exc, t)), HTTPStatus.BAD_REQUEST)
+        payload: dict[str, Any] = {"error": str(exc), "type": type(exc).__name__}
+        if isinstance(exc, (SeatConflictError, InvalidSeatsError)):
+            payload["seats"] = exc.seats
+        return status, _dumps(payload)
+    except FileNotFoundError as exc:
+        # ホールのレイアウトファイルがない
+        return HTTPStatus.INTERNAL_SERVER_ERROR, _dumps({"error": str(exc)})
+    except Exception as exc:
+        return HTTPStatus.INTERNAL_SERVER_ERROR, _dumps({"error": f"内部エラー: {type(exc).__name__}"})
+
+
+# ---- HTTP/1.1 ----
+
+class _BadRequest(Exception):
+    def __init__(self, status: HTTPStatus, message: str):
+        self.status = status
+        super().__init__(message)
+
+
+async def _read_request(reader: asyncio.StreamReader) -> tuple[str, str, str, dict[str, str], bytes] | None:
+    # 1リクエスト読む。接続が閉じられていたら None
+    try:
+        head = await reader.readuntil(b"\r\n\r\n")
+    except asyncio.IncompleteReadError as exc:
+        if not exc.partial.strip():
+            return None
+        raise _BadRequest(HTTPStatus.BAD_REQUEST, "リクエストが途中で切れました。") from None
+    except asyncio.LimitOverrunError:
+        raise _BadRequest(HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE, "ヘッダーが大きすぎます。") from None
+
+    lines = head.decode("latin-1").split("\r\n")
+    try:
+        method, target, version = lines[0].split(" ", 2)
+    except ValueError:
+        raise _BadRequest(HTTPStatus.BAD_REQUEST, "リクエスト行が不正です。") from None
+    if not version.startswith("HTTP/1."):
+        raise _BadRequest(HTTPStatus.HTTP_VERSION_NOT_SUPPORTED, "HTTP/1.x のみ対応しています。")
+
+    headers: dict[str, str] = {}
+    for line in lines[1:]:
+        if not line:
+            continue
+        name, sep, value = line.partition(":")
+        if not sep:
+            raise _BadRequest(HTTPStatus.BAD_REQUEST, "ヘッダーが不正です。")
+        headers[name.strip().lower()] = value.strip()
+
+    if "transfer-encoding" in headers:
+        raise _BadRequest(HTTPStatus.LENGTH_REQUIRED, "Content-Length を指定してください(chunked 非対応)。")
+    try:
+        length = int(headers.get("content-length", "0"))
+    except ValueError:
+        raise _BadRequest(HTTPStatus.BAD_REQUEST, "Content-Length が不正です。") from None
+    if length < 0 or length > MAX_BODY_BYTES:
+        raise _BadRequest(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "本文が大きすぎます。")
+    body = await reader.readexactly(length) if length else b""
+    return method.upper(), target, version, headers, body
+
+
+def _wants_keep_alive(version: str, headers: dict[str, str]) -> bool:
+    # HTTP/1.1 は既定で keep-alive、HTTP/1.0 は明示されたときだけ
+    connection = headers.get("connection", "").lower()
+    if version == "HTTP/1.0":
+        return "keep-alive" in connection
+    return "close" not in connection
+
+
+def _response(status: HTTPStatus, body: bytes, keep_alive: bool) -> bytes:
+    head = (
+        f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+        "Content-Type: application/json; charset=utf-8\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n"
+        "\r\n"
+    )
+    return head.encode("latin-1") + body
+
+
+class ApiServer:
+    def __init__(self, executor: ThreadPoolExecutor, api_token: str | None = None):
+        self.executor = executor
+        self.api_token = api_token or None
+
+    def _authorize(self, headers: dict[str, str]) -> None:
+        if self.api_token is None:
+            raise HttpError(HTTPStatus.FORBIDDEN, f"改札APIを使うには {API_TOKEN_ENV} を設定してください。")
+        scheme, _, token = headers.get("authorization", "").partition(" ")
+        if scheme.lower() != "bearer" or not hmac.compare_digest(token.strip().encode(), self.api_token.encode()):
+            raise HttpError(HTTPStatus.UNAUTHORIZED, "トークンが正しくありません。")
+
+    async def handle(
+        self, method: str, target: str, body_bytes: bytes, headers: dict[str, str] | None = None
+    ) -> tuple[HTTPStatus, bytes]:
+        url = urlsplit(target)
+        try:
+            handler, params = _route(method, url.path.rstrip("/") or "/")
+            if handler in _ADMIN_HANDLERS:
+                self._authorize(headers or {})
+            body: dict = {}
+            if body_bytes:
+                body = json.loads(body_bytes)
+                if not isinstance(body, dict):
+                    raise HttpError(HTTPStatus.BAD_REQUEST, "本文は JSON オブジェクトで指定してください。")
+        except HttpError as exc:
+            return exc.status, _dumps({"error": exc.message})
+        except ValueError:
+            return HTTPStatus.BAD_REQUEST, _dumps({"error": "本文が JSON ではありません。"})
+
+        query = parse_qs(url.query)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, _call, handler, params, query, body)
+
+    async def serve_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                try:
+                    request = await asyncio.wait_for(_read_request(reader), KEEPALIVE_TIMEOUT_SEC)
+                except _BadRequest as exc:
+                    writer.write(_response(exc.status, _dumps({"error": str(exc)}), keep_alive=False))
+                    await writer.drain()
+                    return
+                if request is None:
+                    return
+
+                method, target, version, headers, body = request
+                keep_alive = _wants_keep_alive(version, headers)
+                status, payload = await self.handle(method, target, body, headers)
+                writer.write(_response(status, payload, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    return
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+            # 待ち時間切れ / クライアント側の切断
+            return
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+
+async def serve(
+    host: str,
+    port: int,
+    workers: int,
+    ready: Callable[[int], None] | None = None,
+    api_token: str | None = None,
+) -> None:
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="cinema-api") as executor:
+        api = ApiServer(executor, api_token)
+        server = await asyncio.start_server(api.serve_client, host, port, limit=MAX_HEADER_BYTES, backlog=1024)
+        bound_port = server.sockets[0].getsockname()[1]
+        if ready is not None:
+            ready(bound_port)
+        async with server:
+            await server.serve_forever()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="予約機能の HTTP/JSON API サーバー")
+    parser.add_argument("--host", type=str, default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000, help="0 なら空いているポートを使う")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="DB処理用のスレッド数")
+    args = parser.parse_args()
+
+    init_db()
+
+    def _ready(port: int) -> None:
+        # 負荷試験スクリプトはこの行からポート番号を読む
+        print(f"listening on http://{args.host}:{port} (workers={args.workers})", flush=True)
+
+    try:
+        # db.db の import 時に .env は読み込み済み
+        api_token = (os.environ.get(API_TOKEN_ENV) or "").strip() or None
+        asyncio.run(serve(args.host, args.port, args.workers, _ready, api_token))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
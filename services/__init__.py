@@ -0,0 +1,4 @@
+"""Services package.
+
+Business logic shared by the CLI pages and scripts (no input()/console output).
+"""
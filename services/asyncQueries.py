@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+from datetime import date, datetime
+
+from sqlalchemy import select
+
+from db.async_db import AsyncSessionLocal
+from db.models import Movie, Show
+from services.catalog import (
+    MOVIE_COLUMNS,
+    SHOW_COLUMNS,
+    MovieInfo,
+    SeatMap,
+    ShowInfo,
+    build_seat_map,
+    shows_query,
+    sold_seats_query,
+)
+from services.errors import ShowNotFoundError
+from services.gate import CheckInResult, check_in_on
+from services.seatHold import held_seats_query
+
+# よく使うクエリの非同期版(asyncio のサーバーなどから await で呼ぶ)
+# - 上映回選択(UserShowSelect): get_movie / list_shows
+# - 座席選択(UserSeatSelect): get_show / get_seat_map
+# - 改札(AdminGateCheck): check_in
+# SELECT文・結果の組み立ては同期版(services.catalog / services.gate)と共通
+
+
+async def get_movie(movie_id: int) -> MovieInfo | None:
+    async with AsyncSessionLocal() as session:
+        row = (await session.execute(select(*MOVIE_COLUMNS).where(Movie.id == movie_id))).first()
+    return MovieInfo(**row._mapping) if row is not None else None
+
+
+async def list_shows(movie_id: int, on_date: date | None = None) -> list[ShowInfo]:
+    async with AsyncSessionLocal() as session:
+        rows = (await session.execute(shows_query(movie_id, on_date))).all()
+    return [ShowInfo(**row._mapping) for row in rows]
+
+
+async def get_show(show_id: int) -> ShowInfo | None:
+    async with AsyncSessionLocal() as session:
+        row = (await session.execute(select(*SHOW_COLUMNS).where(Show.id == show_id))).first()
+    return ShowInfo(**row._mapping) if row is not None else None
+
+
+async def get_seat_map(show_id: int, exclude_token: str | None = None, now: datetime | None = None) -> SeatMap:
+    # 例外: ShowNotFoundError
+    async with AsyncSessionLocal() as session:
+        hall = (await session.execute(select(Show.hall).where(Show.id == show_id))).scalar_one_or_none()
+        if hall is None:
+            raise ShowNotFoundError(show_id)
+        sold = (await session.execute(sold_seats_query(show_id))).scalars().all()
+        held = (await session.execute(held_seats_query(show_id, exclude_token, now))).scalars().all()
+    return build_seat_map(show_id, hall, sold, held)
+
+
+async def check_in(ticket_uuid: str, now: datetime | None = None) -> CheckInResult:
+    # 例外: TicketNotFoundError(このときは何も書かずに巻き戻る)
+    # 先に UPDATE で書き込みロックを取るので、同じチケットを同時に読んでも入場OKは1回だけ
+    async with AsyncSessionLocal() as session:
+        result = await session.run_sync(lambda s: check_in_on(s.connection(), ticket_uuid, now))
+        await session.commit()
+    return result
@@ -0,0 +1,265 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+
+from typing import Iterable
+
+from sqlalchemy import Select, bindparam, func, select, union_all
+
+from db.db import engine
+from db.models import Movie, SeatHold, Show, ShowOccupancy, TicketSeat
+from services.errors import ShowNotFoundError
+from services.seatHold import held_seats
+from services.showCalendar import hall_seat_count
+from utils.hallLayout import CELL_AISLE, get_occupancy, load_layout
+from utils.seatAllocator import has_block, max_vacant_without_block
+from utils.seatOccupancy import SeatOccupancy
+
+# 映画・上映回・座席表の読み取り(表示・API用)
+# - 値だけを持つ dataclass で返すので、DBセッションの外でもそのまま使える
+
+# 座席表の1セルの記号
+SEAT_VACANT = "o"
+SEAT_SOLD = "x"
+SEAT_HELD = "h"
+SEAT_AISLE = "."
+SEAT_NONE = " "
+
+
+@dataclass(frozen=True)
+class MovieInfo:
+    id: int
+    title: str
+    duration_min: int
+    default_price: int
+    tags_json: str
+    description: str | None
+    run_start_date: str | None
+    run_end_date: str | None
+
+
+@dataclass(frozen=True)
+class ShowInfo:
+    id: int
+    movie_id: int
+    hall: str
+    start_at: datetime
+    end_at: datetime
+    price: int
+
+
+# 上映回選択の一覧用(残席つき)
+@dataclass(frozen=True)
+class ShowAvailability:
+    id: int
+    hall: str
+    start_at: datetime
+    end_at: datetime
+    price: int
+    seat_count: int     # ホールの座席数(レイアウトがなければ0)
+    sold_count: int     # 予約済みの席数(show_occupancy)
+
+    @property
+    def remaining(self) -> int:
+        return max(0, self.seat_count - self.sold_count)
+
+    @property
+    def sold_out(self) -> bool:
+        return self.remaining == 0
+
+
+@dataclass(frozen=True)
+class SeatMap:
+    show_id: int
+    hall: str
+    rows: list[str]        # 行ごとの記号列(o=空席 x=予約済 h=仮押さえ中 .=通路)
+    sold: list[str]
+    held: list[str]
+    vacant_count: int
+    seat_count: int
+
+
+# 一覧用の SELECT 文(非同期版 services.asyncQueries でも同じ文を使う)
+MOVIE_COLUMNS = (
+    Movie.id,
+    Movie.title,
+    Movie.duration_min,
+    Movie.default_price,
+    Movie.tags_json,
+    Movie.description,
+    Movie.run_start_date,
+    Movie.run_end_date,
+)
+SHOW_COLUMNS = (Show.id, Show.movie_id, Show.hall, Show.start_at, Show.end_at, Show.price)
+
+
+def shows_query(movie_id: int, on_date: date | None = None) -> Select:
+    # on_date を指定するとその日の上映回だけ(start_at は経過分なので整数の範囲比較)
+    stmt = select(*SHOW_COLUMNS).where(Show.movie_id == movie_id)
+    if on_date is not None:
+        d0 = datetime(on_date.year, on_date.month, on_date.day)
+        stmt = stmt.where(Show.start_at >= d0, Show.start_at < d0 + timedelta(days=1))
+    return stmt.order_by(Show.start_at, Show.hall, Show.id)
+
+
+def list_movies() -> list[MovieInfo]:
+    with engine.connect() as conn:
+        rows = conn.execute(select(*MOVIE_COLUMNS).order_by(Movie.id)).all()
+    return [MovieInfo(**row._mapping) for row in rows]
+
+
+def list_shows(movie_id: int, on_date: date | None = None) -> list[ShowInfo]:
+    with engine.connect() as conn:
+        rows = conn.execute(shows_query(movie_id, on_date)).all()
+    return [ShowInfo(**row._mapping) for row in rows]
+
+
+# 上映回の一覧 + 予約済み席数(集計テーブルを主キーで結合するだけ。ticket_seats は数えない)
+# shows は ix_shows_movie_cover だけで読めるので、テーブル本体には行かない
+_AVAILABILITY = (
+    select(
+        Show.id,
+        Show.hall,
+        Show.start_at,
+        Show.end_at,
+        Show.price,
+        func.coalesce(ShowOccupancy.seat_count, 0).label("sold_count"),
+    )
+    .outerjoin(ShowOccupancy, ShowOccupancy.show_id == Show.id)
+    .where(Show.movie_id == bindparam("movie_id"))
+    # 並びは開始・ホール順(索引の列順のまま並べて、並べ替えの一時テーブルを作らせない)
+    .order_by(Show.start_at, Show.hall, Show.end_at, Show.price, Show.id)
+)
+_AVAILABILITY_ON_DATE = _AVAILABILITY.where(Show.start_at >= bindparam("d0"), Show.start_at < bindparam("d1"))
+
+# 連続席の絞り込み用: 候補の上映回の仮押さえ中の席数
+_HELD_COUNTS = (
+    select(SeatHold.show_id, func.count())
+    .where(SeatHold.show_id.in_(bindparam("show_ids", expanding=True)), SeatHold.expires_at > bindparam("now"))
+    .group_by(SeatHold.show_id)
+)
+
+# 同じく、座席を見ないと分からない回の予約済み席 + 仮押さえ中の席(どちらも show_id, seat の索引だけで読める)
+_TAKEN_SEATS = union_all(
+    select(TicketSeat.show_id, TicketSeat.seat).where(TicketSeat.show_id.in_(bindparam("show_ids", expanding=True))),
+    select(SeatHold.show_id, SeatHold.seat).where(
+        SeatHold.show_id.in_(bindparam("show_ids", expanding=True)),
+        SeatHold.expires_at > bindparam("now"),
+    ),
+)
+
+
+def list_show_availability(
+    movie_id: int,
+    on_date: date | None = None,
+    *,
+    hide_sold_out: bool = False,
+    adjacent: int = 0,
+    now: datetime | None = None,
+) -> list[ShowAvailability]:
+    """上映回(on_date を指定するとその日の分だけ)を残席つきで返す。
+
+    hide_sold_out=True なら満席の回を除く。adjacent=N(2以上)なら、同じ行で通路をまたがずに
+    N席並んで空いている回だけにする(仮押さえ中の席も埋まっているものとして数える)。
+    """
+    params: dict[str, object] = {"movie_id": int(movie_id)}
+    if on_date is not None:
+        d0 = datetime(on_date.year, on_date.month, on_date.day)
+        params.update(d0=d0, d1=d0 + timedelta(days=1))
+
+    with engine.connect() as conn:
+        rows = conn.execute(_AVAILABILITY if on_date is None else _AVAILABILITY_ON_DATE, params).all()
+        # ホールの座席数はホールごとに1回だけ調べる
+        seat_counts = {hall: hall_seat_count(hall) for hall in {r.hall for r in rows}}
+        shows = [
+            ShowAvailability(
+                id=show_id,
+                hall=hall,
+                start_at=start_at,
+                end_at=end_at,
+                price=price,
+                seat_count=seat_counts[hall],
+                sold_count=sold_count,
+            )
+            for show_id, hall, start_at, end_at, price, sold_count in rows
+        ]
+        if hide_sold_out or adjacent > 1:
+            shows = [s for s in shows if s.remaining >= max(1, adjacent)]
+        if adjacent <= 1:
+            return shows
+
+        # ホールの並びでそもそも N 席並ばない回は外す
+        # (残席が N 以上 = 座席数が1以上なので、レイアウトは必ずある)
+        layouts = {hall: load_layout(hall) for hall in {s.hall for s in shows}}
+        limits = {hall: max_vacant_without_block(layout, adjacent) for hall, layout in layouts.items()}
+        shows = [s for s in shows if s.seat_count > limits[s.hall]]
+        if not shows:
+            return shows
+
+        # 空席(仮押さえ中を除く)が「N席並ばずに空けられる最大数」より多い回は、座席を見なくても並びがある
+        now = now or datetime.now()
+        held = dict(conn.execute(_HELD_COUNTS, {"show_ids": [s.id for s in shows], "now": now}).all())
+        unsure = [s for s in shows if s.remaining - held.get(s.id, 0) <= limits[s.hall]]
+        if not unsure:
+            return shows
+
+        # 残りの回だけ、埋まっている席をまとめて1クエリで読み、上映回ごとのビットマスクにする
+        ordinals = {s.id: layouts[s.hall].ordinals for s in unsure}
+        masks = dict.fromkeys(ordinals, 0)
+        taken = conn.execute(_TAKEN_SEATS, {"show_ids": list(ordinals), "now": now}).all()
+    for show_id, seat in taken:
+        i = ordinals[show_id].get(seat)
+        if i is not None:
+            masks[show_id] |= 1 << i
+    return [s for s in shows if s.id not in masks or has_block(SeatOccupancy(layouts[s.hall], masks[s.id]), adjacent)]
+
+
+def get_seat_map(show_id: int, exclude_token: str | None = None, now: datetime | None = None) -> SeatMap:
+    """上映回の座席表。exclude_token の仮押さえ(自分の分)は空席として返す。
+
+    例外: ShowNotFoundError
+    """
+    with engine.connect() as conn:
+        hall = conn.execute(select(Show.hall).where(Show.id == show_id)).scalar_one_or_none()
+        if hall is None:
+            raise ShowNotFoundError(show_id)
+        sold = conn.execute(sold_seats_query(show_id)).scalars().all()
+        held = held_seats(conn, show_id, exclude_token=exclude_token, now=now)
+    return build_seat_map(show_id, hall, sold, held)
+
+
+def sold_seats_query(show_id: int) -> Select:
+    return select(TicketSeat.seat).where(TicketSeat.show_id == show_id)
+
+
+def build_seat_map(show_id: int, hall: str, sold: Iterable[str], held: Iterable[str]) -> SeatMap:
+    # 予約済み・仮押さえ中の座席から座席表を組み立てる(DBは触らない)
+    occupancy = get_occupancy(hall, sold)
+    held_occupancy = get_occupancy(hall, held) - occupancy
+    layout = occupancy.layout
+
+    rows: list[str] = []
+    for row in layout.grid:
+        cells: list[str] = []
+        for ordinal in row:
+            if ordinal >= 0:
+                if occupancy.is_taken(ordinal):
+                    cells.append(SEAT_SOLD)
+                elif held_occupancy.is_taken(ordinal):
+                    cells.append(SEAT_HELD)
+                else:
+                    cells.append(SEAT_VACANT)
+            else:
+                cells.append(SEAT_AISLE if ordinal == CELL_AISLE else SEAT_NONE)
+        rows.append("".join(cells))
+
+    return SeatMap(
+        show_id=show_id,
+        hall=hall,
+        rows=rows,
+        sold=occupancy.seat_ids(),
+        held=held_occupancy.seat_ids(),
+        vacant_count=(occupancy | held_occupancy).vacant_count,
+        seat_count=layout.seat_count,
+    )
@@ -0,0 +1,48 @@
+from __future__ import annotations
+
+from typing import Iterable
+
+# services の例外
+# - ページ側はメッセージを表示するだけでよいように、日本語のメッセージを持たせる
+# - 座席関係は、どの座席が原因かを seats に入れておく
+
+
+class ReservationError(Exception):
+    pass
+
+
+class ShowNotFoundError(ReservationError):
+    def __init__(self, show_id: int):
+        self.show_id = show_id
+        super().__init__(f"上映回が見つかりません: show_id={show_id}")
+
+
+class InvalidSeatsError(ReservationError):
+    # レイアウトに存在しない座席
+    def __init__(self, seats: Iterable[str]):
+        self.seats = list(seats)
+        super().__init__(f"存在しない座席があります: {', '.join(self.seats)}")
+
+
+class SeatConflictError(ReservationError):
+    # 指定した座席の一部がすでに予約済み/他の人が押さえ中
+    def __init__(self, seats: Iterable[str]):
+        self.seats = sorted(seats)
+        super().__init__(f"座席が確保できませんでした: {', '.join(self.seats)}")
+
+
+class InvalidBreakdownError(ReservationError):
+    # 内訳(料金区分ごとの枚数)が座席数と合わない、未知の区分がある など
+    pass
+
+
+class TicketNotFoundError(ReservationError):
+    def __init__(self, ticket_uuid: str):
+        self.ticket_uuid = ticket_uuid
+        super().__init__(f"チケットが見つかりません: {ticket_uuid}")
+
+
+class TicketAlreadyUsedError(ReservationError):
+    def __init__(self, ticket_uuid: str):
+        self.ticket_uuid = ticket_uuid
+        super().__init__("このチケットは使用済みです。")
@@ -0,0 +1,236 @@
+from __future__ import annotations
+
+import os
+import uuid
+from select import select as select_fds  # 標準入力に次の行が届いているかの確認用
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Iterator, Sequence, TextIO
+
+from sqlalchemy import bindparam, func, select, update
+from sqlalchemy.engine import Connection
+
+from db.db import write_transaction
+from db.models import Movie, Show, Ticket, TicketSeat
+from services.errors import TicketNotFoundError
+from services.ticketViews import ReservationSummary, load_summaries
+from utils.hallLayout import seat_sort_key
+
+# 改札(チケットUUIDの照合と used_at の更新)
+
+
+@dataclass(frozen=True)
+class CheckInResult:
+    reservation: ReservationSummary
+    admitted: bool   # True: 今回入場OK / False: すでに使用済み
+
+
+def check_in(ticket_uuid: str, now: datetime | None = None) -> CheckInResult:
+    """未使用なら used_at を入れて入場OKにする。
+
+    「未使用なら更新」を UPDATE 1文(used_at IS NULL 条件付き)で行うので、
+    複数の改札端末で同じチケットを同時に読んでも入場OKになるのは1回だけ。
+    例外: TicketNotFoundError
+    """
+    with write_transaction() as conn:
+        return check_in_on(conn, ticket_uuid, now)
+
+
+def check_in_on(conn: Connection, ticket_uuid: str, now: datetime | None = None) -> CheckInResult:
+    # check_in() の中身。トランザクションは呼び出し側で用意する(非同期版からも使う)
+    # DBは分単位で保存するので秒以下は切り捨て
+    now = (now or datetime.now()).replace(second=0, microsecond=0)
+    result = conn.execute(
+        update(Ticket).where(Ticket.uuid == ticket_uuid, Ticket.used_at.is_(None)).values(used_at=now)
+    )
+    found = load_summaries(conn, Ticket.uuid == ticket_uuid)
+    if not found:
+        raise TicketNotFoundError(ticket_uuid)
+    return CheckInResult(reservation=found[0], admitted=result.rowcount == 1)
+
+
+# ---- 一括改札(スキャナーから連続で読んだUUIDをまとめて処理する) ----
+
+SCAN_ACCEPTED = "accepted"    # 今回入場OK
+SCAN_DUPLICATE = "duplicate"  # 使用済み(以前の入場 or 同じバッチ内で2回目)
+SCAN_UNKNOWN = "unknown"      # 該当チケットなし
+
+DEFAULT_SCAN_BATCH = 500
+
+
+@dataclass(frozen=True)
+class ScanResult:
+    uuid: str
+    status: str
+    ticket_id: int | None = None
+    show_id: int | None = None
+    hall: str | None = None
+    start_at: datetime | None = None
+    movie_title: str | None = None
+    seats: tuple[str, ...] = ()
+    used_at: datetime | None = None
+
+
+# バッチ1回ぶんの照合(チケット + 上映回 + 映画 + 座席を1クエリで)
+_SCAN_LOOKUP = (
+    select(
+        Ticket.id,
+        Ticket.uuid,
+        Ticket.used_at,
+        Ticket.show_id,
+        Show.hall,
+        Show.start_at,
+        Movie.title,
+        func.group_concat(TicketSeat.seat).label("seats"),
+    )
+    .outerjoin(Show, Show.id == Ticket.show_id)
+    .outerjoin(Movie, Movie.id == Show.movie_id)
+    .outerjoin(TicketSeat, TicketSeat.ticket_id == Ticket.id)
+    .where(Ticket.uuid.in_(bindparam("uuids", expanding=True)))
+    .group_by(Ticket.id)
+)
+_MARK_USED = (
+    update(Ticket)
+    .where(Ticket.id.in_(bindparam("ids", expanding=True)), Ticket.used_at.is_(None))
+    .values(used_at=bindparam("now", type_=Ticket.__table__.c.used_at.type))
+)
+
+
+def check_in_batch(ticket_uuids: Sequence[str], now: datetime | None = None) -> list[ScanResult]:
+    """読み取ったUUIDをまとめて照合し、未使用のものに used_at を入れる。
+
+    照合は1クエリ、更新は UPDATE 1文で、BEGIN IMMEDIATE の中で行う。
+    結果は入力と同じ順番・同じ件数で返す(空行も unknown として返す)。
+    """
+    # DBは分単位で保存するので秒以下は切り捨て
+    now = (now or datetime.now()).replace(second=0, microsecond=0)
+    keys = [str(u).strip().lower() for u in ticket_uuids]
+    # DBから戻るUUIDは小文字・ハイフン付きなので、照合結果と突き合わせるキーもその形にそろえる
+    # (大文字・ハイフンなし・{...}・urn:uuid: で送ってくるスキャナーもある)。UUIDとして読めないものはDBに送らない
+    canonical = [_canonical_uuid(k) for k in keys]
+    unique_keys = list(dict.fromkeys(c for c in canonical if c))
+    if not unique_keys:
+        return [ScanResult(uuid=k, status=SCAN_UNKNOWN) for k in keys]
+
+    with write_transaction() as conn:
+        found = {row.uuid: row for row in conn.execute(_SCAN_LOOKUP, {"uuids": unique_keys})}
+        new_ids = [row.id for row in found.values() if row.used_at is None]
+        if new_ids:
+            conn.execute(_MARK_USED, {"ids": new_ids, "now": now})
+
+    results: list[ScanResult] = []
+    admitted: set[str] = set()
+    for key, canonical_key in zip(keys, canonical):
+        row = found.get(canonical_key) if canonical_key else None
+        if row is None:
+            results.append(ScanResult(uuid=key, status=SCAN_UNKNOWN))
+            continue
+        if row.used_at is None and canonical_key not in admitted:
+            admitted.add(canonical_key)
+            status, used_at = SCAN_ACCEPTED, now
+        else:
+            status, used_at = SCAN_DUPLICATE, row.used_at or now
+        results.append(
+            ScanResult(
+                uuid=canonical_key,
+                status=status,
+                ticket_id=int(row.id),
+                show_id=int(row.show_id),
+                hall=row.hall,
+                start_at=row.start_at,
+                movie_title=row.title,
+                seats=tuple(sorted(row.seats.split(","), key=seat_sort_key)) if row.seats else (),
+                used_at=used_at,
+            )
+        )
+    return results
+
+
+def _canonical_uuid(value: str) -> str | None:
+    try:
+        return str(uuid.UUID(value))
+    except ValueError:
+        return None
+
+
+def read_scan_batches(
+    stream: TextIO,
+    batch_size: int = DEFAULT_SCAN_BATCH,
+    live: bool | None = None,
+    stop_on_blank: bool | None = None,
+) -> Iterator[list[str]]:
+    """1行1UUIDのストリームを、バッチに区切って返す。
+
+    - ファイル(live=False): batch_size 行ずつ
+    - スキャナー(live=True, 端末・パイプ): 読み取りが途切れた時点で溜まっている分を返す
+      (待たずに結果を出すため。連続で読んでいる間は自然にまとめて処理される)
+    - stop_on_blank なら空行または "b" の行で終わる(既定は端末のときだけ)
+    """
+    if live is None:
+        live = _isatty(stream)
+    if stop_on_blank is None:
+        stop_on_blank = _isatty(stream)
+    if live:
+        yield from _read_live_batches(stream.fileno(), batch_size, stop_on_blank)
+        return
+
+    batch: list[str] = []
+    for line in iter(stream.readline, ""):
+        text = line.strip()
+        if stop_on_blank and text.lower() in {"", "b", "back"}:
+            break
+        if text:
+            batch.append(text)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _read_live_batches(fd: int, batch_size: int, stop_on_blank: bool) -> Iterator[list[str]]:
+    # TextIOWrapper は先読みした行を抱えるため、select で「次の入力があるか」を正しく判定できない。
+    # ここでは fd から直接読んで、行の切り出しも自前で行う
+    batch: list[str] = []
+    pending = b""
+    while True:
+        if batch and not _readable(fd):
+            yield batch
+            batch = []
+        chunk = os.read(fd, 65536)
+        if not chunk:
+            break
+        lines = (pending + chunk).split(b"\n")
+        pending = lines.pop()
+        for line in lines:
+            text = line.decode("ascii", "replace").strip()
+            if stop_on_blank and text.lower() in {"", "b", "back"}:
+                if batch:
+                    yield batch
+                return
+            if text:
+                batch.append(text)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+    text = pending.decode("ascii", "replace").strip()
+    if text:
+        batch.append(text)
+    if batch:
+        yield batch
+
+
+def _isatty(stream: TextIO) -> bool:
+    try:
+        return stream.isatty()
+    except (AttributeError, ValueError):
+        return False
+
+
+def _readable(fd: int) -> bool:
+    try:
+        readable, _, _ = select_fds([fd], [], [], 0)
+    except (OSError, ValueError):
+        # select が使えない環境(Windows のコンソールなど)は、読めた分ごとに処理する
+        return False
+    return bool(readable)
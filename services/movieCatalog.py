@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+from sqlalchemy import bindparam, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.engine import Connection
+
+from db.db import engine
+from db.models import CacheVersion, Movie
+
+# 映画一覧のキャッシュ(UserMovieBrowse / AdminMovieList / AdminScheduleEdit)
+# - 一覧に出す列だけの軽い値(説明・タグは持たない)を、プロセスの中にキャッシュする
+# - 映画を追加/編集/削除したら、同じトランザクションで bump_movie_version() を呼んで版を上げる
+# - 読むときは版(cache_versions の1行)だけ確かめ、変わっていれば読み直す
+#   (窓口端末が複数あっても、別のプロセスでの変更に気づける)
+
+MOVIES = "movies"
+
+
+@dataclass(frozen=True)
+class MovieSummary:
+    id: int
+    title: str
+    duration_min: int
+    default_price: int
+    run_start_date: str | None
+    run_end_date: str | None
+
+
+_VERSION = select(CacheVersion.version).where(CacheVersion.name == bindparam("name"))
+_BUMP = sqlite_insert(CacheVersion).values(name=bindparam("name"), version=1)
+_BUMP = _BUMP.on_conflict_do_update(
+    index_elements=[CacheVersion.name],
+    set_={"version": CacheVersion.version + 1},
+)
+_SUMMARIES = select(
+    Movie.id,
+    Movie.title,
+    Movie.duration_min,
+    Movie.default_price,
+    Movie.run_start_date,
+    Movie.run_end_date,
+).order_by(Movie.id)
+
+# (版, 一覧)。版が変わるまで使い回す
+_cached: tuple[int, tuple[MovieSummary, ...]] | None = None
+
+
+def bump_movie_version(conn: Connection) -> None:
+    # movies を書いたのと同じトランザクションで呼ぶ(コミットされたときだけ版が上がる)
+    conn.execute(_BUMP, {"name": MOVIES})
+
+
+def list_movie_summaries() -> list[MovieSummary]:
+    global _cached
+    with engine.connect() as conn:
+        # 版を先に読む。一覧を読む間に更新が入っても、古い版で新しい一覧を持つだけ(次回読み直す)
+        version = conn.execute(_VERSION, {"name": MOVIES}).scalar() or 0
+        cached = _cached
+        if cached is not None and cached[0] == version:
+            return list(cached[1])
+        rows = conn.execute(_SUMMARIES).all()
+    movies = tuple(
+        MovieSummary(
+            id=movie_id,
+            title=title,
+            duration_min=duration_min,
+            default_price=default_price,
+            run_start_date=run_start_date,
+            run_end_date=run_end_date,
+        )
+        for movie_id, title, duration_min, default_price, run_start_date, run_end_date in rows
+    )
+    _cached = (version, movies)
+    return list(movies)
+
+
+def clear_movie_cache() -> None:
+    # 次の list_movie_summaries() で必ず読み直す(別のDBに切り替えたときなど)
+    global _cached
+    _cached = None
@@ -0,0 +1,215 @@
+from __future__ import annotations
+
+import json
+import re
+import unicodedata
+from typing import Iterable
+
+from sqlalchemy import column, delete, exists, func, insert, literal_column, or_, select, table
+from sqlalchemy.engine import Connection
+from sqlalchemy.exc import OperationalError
+
+from db.db import engine
+from db.models import Movie, MovieTag
+from services.movieCatalog import MovieSummary
+
+# 映画の検索(タイトル・説明の全文検索 + タグ)
+# - movies_fts: タイトル・説明の FTS5 仮想テーブル(rowid = movies.id)。
+#   結果はタイトルに一致したもの → 説明だけに一致したもの の順、それぞれ bm25 の順
+# - movie_tags: tags_json を1タグ1行に展開したもの。タグは完全一致(大文字小文字・全角半角は区別しない)
+# - どちらも movies を書いたのと同じトランザクションで sync_movie() / remove_movie() を呼んで保つ
+#   (AdminMovieEdit / AdminMovieDelete / seed_sample_data)。空なら init_db() の fill_if_empty() で作る
+# - FTS5 のない SQLite では movies_fts を作れないので、タイトル・説明の LIKE で探す(順位は付かない)
+#
+# 日本語は単語の区切りがないので、索引に入れる前に自前で区切る
+# - かな・漢字などの連続は「2文字ずつずらした組」+「最後の1文字」(東京タワー → 東京 京タ タワ ワー ー)
+#   2文字以上の語は組の並び(フレーズ)、1文字の語はその文字で始まる組(前方一致)で引ける
+# - 英数字は単語のまま入れ、前方一致で引く(star → Star Wars)
+# - NFKC で全角英数字・半角カナをそろえ、小文字にしてから区切る
+
+SEARCH_LIMIT = 50
+
+_TOKEN = re.compile(r"[0-9a-z]+|[^\W0-9a-z_]+")
+
+movies_fts = table("movies_fts", column("rowid"), column("title"), column("description"))
+
+_CREATE_FTS = "CREATE VIRTUAL TABLE IF NOT EXISTS movies_fts USING fts5(title, description)"
+# 列の重み: タイトルに一致した方を上に出す
+_RANK = func.bm25(literal_column("movies_fts"), 10.0, 1.0)
+_INSERT_FTS = insert(movies_fts)
+_SUMMARY_COLUMNS = (
+    Movie.id,
+    Movie.title,
+    Movie.duration_min,
+    Movie.default_price,
+    Movie.run_start_date,
+    Movie.run_end_date,
+)
+
+
+def _normalize(text: str | None) -> str:
+    return unicodedata.normalize("NFKC", text or "").lower()
+
+
+def _runs(text: str | None) -> list[str]:
+    return _TOKEN.findall(_normalize(text))
+
+
+def index_text(text: str | None) -> str:
+    # 索引に入れる文字列(区切った語を空白でつなぐ。FTS5 の既定の区切りは空白で切るだけになる)
+    tokens: list[str] = []
+    for run in _runs(text):
+        if run.isascii():
+            tokens.append(run)
+            continue
+        tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+        tokens.append(run[-1])
+    return " ".join(tokens)
+
+
+def parse_tags(tags_json: str | None) -> list[str]:
+    # tags_json(JSON の文字列の配列)→ そろえたタグ。配列として読めなければタグなし
+    try:
+        values = json.loads(tags_json or "[]")
+    except ValueError:
+        return []
+    if not isinstance(values, list):
+        return []
+    return sorted({_normalize(v).strip() for v in values if isinstance(v, str) and v.strip()})
+
+
+def match_query(words: Iterable[str]) -> str:
+    # 検索語 → FTS5 の MATCH 式(語どうしは AND)
+    parts: list[str] = []
+    for word in words:
+        for run in _runs(word):
+            if run.isascii() or len(run) == 1:
+                parts.append(f'"{run}"*')
+            else:
+                parts.append('"' + " ".join(run[i:i + 2] for i in range(len(run) - 1)) + '"')
+    return " AND ".join(parts)
+
+
+def split_query(query: str) -> tuple[list[str], list[str]]:
+    # "東京 #drama" → (語, タグ)
+    words: list[str] = []
+    tags: list[str] = []
+    for part in query.split():
+        if part.startswith("#") and len(part) > 1:
+            tags.append(_normalize(part[1:]).strip())
+        else:
+            words.append(part)
+    return words, tags
+
+
+def has_fts(conn: Connection) -> bool:
+    return bool(
+        conn.exec_driver_sql("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'movies_fts'").first()
+    )
+
+
+def ensure_search_index(conn: Connection) -> bool:
+    # movies_fts を作る(冪等)。FTS5 が使えない SQLite なら False
+    try:
+        conn.exec_driver_sql(_CREATE_FTS)
+    except OperationalError:
+        return False
+    return True
+
+
+def _write(conn: Connection, rows: list, fts: bool) -> None:
+    # rows: (id, title, description, tags_json)
+    tags = [{"movie_id": int(r[0]), "tag": tag} for r in rows for tag in parse_tags(r[3])]
+    if tags:
+        conn.execute(insert(MovieTag), tags)
+    if fts and rows:
+        conn.execute(
+            _INSERT_FTS,
+            [{"rowid": int(r[0]), "title": index_text(r[1]), "description": index_text(r[2])} for r in rows],
+        )
+
+
+def remove_movie(conn: Connection, movie_id: int) -> None:
+    conn.execute(delete(MovieTag).where(MovieTag.movie_id == int(movie_id)))
+    if has_fts(conn):
+        conn.execute(delete(movies_fts).where(movies_fts.c.rowid == int(movie_id)))
+
+
+def sync_movie(conn: Connection, movie_id: int) -> None:
+    # movies の1行(追加・編集後)を索引に反映する。ORM なら flush してから呼ぶ
+    remove_movie(conn, movie_id)
+    rows = conn.execute(
+        select(Movie.id, Movie.title, Movie.description, Movie.tags_json).where(Movie.id == int(movie_id))
+    ).all()
+    _write(conn, rows, has_fts(conn))
+
+
+def rebuild_movie_search(conn: Connection) -> int:
+    # 全件作り直す(初回作成・修復用)
+    fts = has_fts(conn)
+    conn.execute(delete(MovieTag))
+    if fts:
+        conn.execute(delete(movies_fts))
+    rows = conn.execute(select(Movie.id, Movie.title, Movie.description, Movie.tags_json)).all()
+    _write(conn, rows, fts)
+    return len(rows)
+
+
+def fill_if_empty(conn: Connection) -> int:
+    # 検索の索引を追加する前のDB(映画はあるのに索引が空)なら全件作る
+    if not conn.execute(select(exists().select_from(Movie))).scalar():
+        return 0
+    if has_fts(conn):
+        if conn.exec_driver_sql("SELECT 1 FROM movies_fts LIMIT 1").first():
+            return 0
+    elif conn.execute(select(exists().select_from(MovieTag))).scalar():
+        return 0
+    return rebuild_movie_search(conn)
+
+
+def _with_tags(stmt, tags: list[str], id_column=Movie.id):
+    for tag in tags:
+        stmt = stmt.where(id_column.in_(select(MovieTag.movie_id).where(MovieTag.tag == tag)))
+    return stmt
+
+
+def _ranked(expr: str, tags: list[str], limit: int | None):
+    # movies_fts の中で順位付け・件数の絞り込みまで済ませてから movies を結合する
+    # (結合してから並べ替えると、一致した全件ぶん movies を読むことになる)
+    # タグの条件は rowid + 0 で書く。rowid のままだと FTS5 が rowid ごとに MATCH を引き直して極端に遅くなる
+    score = _RANK.label("score")
+    hits = _with_tags(
+        select(movies_fts.c.rowid, score).where(literal_column("movies_fts").op("MATCH")(expr)),
+        tags,
+        movies_fts.c.rowid + 0,
+    ).order_by(score, movies_fts.c.rowid)
+    if limit is not None:
+        hits = hits.limit(limit)
+    hits = hits.subquery()
+    return select(*_SUMMARY_COLUMNS).join(hits, hits.c.rowid == Movie.id).order_by(hits.c.score, Movie.id)
+
+
+def search_movies(query: str, limit: int | None = SEARCH_LIMIT) -> list[MovieSummary]:
+    # 語はタイトル・説明の部分一致(英数字は前方一致)、#タグ はタグの完全一致。全部の条件を満たす映画
+    words, tags = split_query(query)
+    expr = match_query(words)
+    with engine.connect() as conn:
+        if expr and has_fts(conn):
+            # 先にタイトルで一致するものだけを順位付けする(よくある語だと説明まで含めた一致は数万件になり、
+            # 全部に bm25 を計算すると遅い)。足りないときだけ、説明で一致するものを後ろに続ける
+            rows = conn.execute(_ranked(f"{{title}} : ({expr})", tags, limit)).all()
+            if limit is None or len(rows) < limit:
+                rest = None if limit is None else limit - len(rows)
+                rows += conn.execute(_ranked(f"({expr}) NOT {{title}} : ({expr})", tags, rest)).all()
+        elif expr:
+            # FTS5 なし: 語ごとにタイトルか説明に含まれるもの
+            stmt = select(*_SUMMARY_COLUMNS).order_by(Movie.id)
+            for word in words:
+                pattern = f"%{word}%"
+                stmt = stmt.where(or_(Movie.title.like(pattern), Movie.description.like(pattern)))
+            rows = conn.execute(_with_tags(stmt, tags).limit(limit)).all()
+        elif tags:
+            rows = conn.execute(_with_tags(select(*_SUMMARY_COLUMNS).order_by(Movie.id), tags).limit(limit)).all()
+        else:
+            return []
+    return [MovieSummary(*row) for row in rows]
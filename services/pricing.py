@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from decimal import Decimal, ROUND_HALF_UP  # 料金計算用, ROUND_HALF_UPは四捨五入用
+from typing import Mapping
+
+from services.errors import InvalidBreakdownError
+
+# 料金ルール（必要ならここだけ触ればOK）
+# - base_price (= show.price) に倍率を掛ける
+# - Decimal文字列で書くと丸めが安定する
+PRICE_RULES: dict[str, dict[str, str]] = {
+    "adult": {"label": "一般", "mult": "1.0"},
+    "college": {"label": "大学生", "mult": "0.8"},
+    "highschool": {"label": "高校生", "mult": "0.7"},
+    "junior": {"label": "小中学生", "mult": "0.6"},
+    "child": {"label": "幼児(3歳以上)", "mult": "0.5"},
+    "senior": {"label": "シニア(60歳以上)", "mult": "0.7"},
+    "disabled": {"label": "障がい者割引", "mult": "0.7"},
+    "other": {"label": "その他", "mult": "1.0"},
+}
+
+# 会員割引（合計に対して倍率を掛ける）
+MEMBER_DISCOUNT_MULT = Decimal("0.8")
+
+
+@dataclass(frozen=True)
+class PriceQuote:
+    unit_prices: dict[str, int]  # 区分ごとの単価
+    pre_discount: int            # 会員割引前の合計
+    sum_price: int               # 支払う合計
+    is_member: bool
+
+
+def validate_breakdown(breakdown: Mapping[str, int], seat_count: int) -> None:
+    # 内訳: 区分 → 枚数。合計が座席数と一致する必要がある
+    unknown = [key for key in breakdown if key not in PRICE_RULES]
+    if unknown:
+        raise InvalidBreakdownError(f"未知の料金区分があります: {', '.join(unknown)}")
+    if any(int(cnt) < 0 for cnt in breakdown.values()):
+        raise InvalidBreakdownError("枚数は0以上で指定してください。")
+    total = sum(int(cnt) for cnt in breakdown.values())
+    if total != seat_count:
+        raise InvalidBreakdownError(f"内訳の合計({total})が座席数({seat_count})と一致しません。")
+
+
+def quote(base_price: int, breakdown: Mapping[str, int], is_member: bool | int = False) -> PriceQuote:
+    # 合計金額計算（内訳×倍率）
+    base = Decimal(str(base_price))
+    sum_price_dec = Decimal("0")
+    unit_prices: dict[str, int] = {}
+
+    # 単価計算、種別ごとに倍率適用
+    for key, cnt in breakdown.items():
+        mult = Decimal(PRICE_RULES[key]["mult"])
+        unit = (base * mult).quantize(Decimal("1"), rounding=ROUND_HALF_UP)
+        unit_prices[key] = int(unit)
+        sum_price_dec += unit * Decimal(int(cnt))
+
+    # 会員割引適用
+    pre_discount = sum_price_dec
+    if int(is_member) == 1:
+        sum_price_dec = (sum_price_dec * MEMBER_DISCOUNT_MULT).quantize(Decimal("1"), rounding=ROUND_HALF_UP)
+
+    return PriceQuote(
+        unit_prices=unit_prices,
+        pre_discount=int(pre_discount),
+        sum_price=int(sum_price_dec),
+        is_member=int(is_member) == 1,
+    )
@@ -0,0 +1,179 @@
+from __future__ import annotations
+
+import csv
+import os
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from typing import Iterator, Sequence
+
+from sqlalchemy import select
+
+from db.db import engine
+from db.models import Show, Ticket
+from services.ticketViews import ReservationSummary, load_summaries
+from utils import QRGenerator
+from utils.datetimeFormat import format_ymd_hm
+
+# チケットQRの一括出力(団体の幹事・印刷所向けに、上映回のチケットを画像ファイルにする)
+# - チケットは id 順に CHUNK 件ずつ読み、チャンク単位でプロセスプールへ渡す
+# - 画像はワーカーが直接ファイルに書き、親には書いたファイル名だけ返す(画像のバイト列を送り返さない)
+# - 同時に処理中のチャンクは workers × 2 個までにして、読み込みが先走らないようにする
+#   (1万枚を超えても、メモリに載るのは処理中のチャンク分だけ)
+# - マニフェスト(CSV)はチャンクが終わった順ではなく、チケットの id 順に1行ずつ書き足す
+
+FORMAT_SVG = "svg"
+FORMAT_PNG = "png"
+FORMATS = (FORMAT_SVG, FORMAT_PNG)
+
+DEFAULT_CHUNK = 200
+MANIFEST_NAME = "manifest.csv"
+MANIFEST_COLUMNS = ("ticket_id", "uuid", "show_id", "movie_title", "start_at", "hall", "seats", "user_name", "files")
+
+
+@dataclass(frozen=True)
+class ExportSummary:
+    tickets: int
+    files: int
+    bytes_written: int
+    seconds: float
+    workers: int
+    manifest_path: str
+
+    @property
+    def tickets_per_sec(self) -> float:
+        return self.tickets / self.seconds if self.seconds else 0.0
+
+
+def ticket_filter(show_ids: Sequence[int] = (), date_from: date | None = None, date_to: date | None = None) -> list:
+    # 上映回ID または 上映日の範囲(date_to を含む)でチケットを絞り込む条件
+    criteria: list = []
+    if show_ids:
+        criteria.append(Ticket.show_id.in_([int(s) for s in show_ids]))
+    if date_from is not None or date_to is not None:
+        shows = select(Show.id)
+        if date_from is not None:
+            shows = shows.where(Show.start_at >= datetime.combine(date_from, datetime.min.time()))
+        if date_to is not None:
+            shows = shows.where(Show.start_at < datetime.combine(date_to + timedelta(days=1), datetime.min.time()))
+        criteria.append(Ticket.show_id.in_(shows))
+    return criteria
+
+
+def iter_ticket_chunks(criteria: Sequence, chunk_size: int = DEFAULT_CHUNK) -> Iterator[list[ReservationSummary]]:
+    # id だけを少しずつ読み進め、チャンクごとに表示用の情報(座席・上映回)をまとめて取る
+    with engine.connect() as conn:
+        ids = conn.execution_options(yield_per=chunk_size).execute(
+            select(Ticket.id).where(*criteria).order_by(Ticket.id)
+        )
+        for part in ids.partitions(chunk_size):
+            yield load_summaries(conn, Ticket.id.in_([r.id for r in part]), order_by=(Ticket.id,))
+
+
+def _relative_base(ticket: ReservationSummary) -> str:
+    return os.path.join(f"show_{ticket.show_id}", ticket.uuid)
+
+
+def _render_chunk(out_dir: str, jobs: list[tuple[str, str]], formats: tuple[str, ...], border: int, box_size: int) -> list[tuple[list[str], int]]:
+    # ワーカー側: (UUID, 出力先の相対パス(拡張子なし)) ごとに画像を書き、書いたファイル名とバイト数を返す
+    results: list[tuple[list[str], int]] = []
+    made_dirs: set[str] = set()
+    for ticket_uuid, rel_base in jobs:
+        files: list[str] = []
+        written = 0
+        # QRの生成(一番重い)は1枚につき1回だけ
+        m = QRGenerator.matrix(ticket_uuid, border)
+        for fmt in formats:
+            body = QRGenerator.svg_from_matrix(m) if fmt == FORMAT_SVG else QRGenerator.png_from_matrix(m, box_size)
+            rel_path = f"{rel_base}.{fmt}"
+            path = os.path.join(out_dir, rel_path)
+            parent = os.path.dirname(path)
+            if parent not in made_dirs:
+                os.makedirs(parent, exist_ok=True)
+                made_dirs.add(parent)
+            with open(path, "wb") as f:
+                f.write(body)
+            files.append(rel_path)
+            written += len(body)
+        results.append((files, written))
+    return results
+
+
+def export_tickets(
+    out_dir: str,
+    criteria: Sequence,
+    formats: Sequence[str] = FORMATS,
+    workers: int | None = None,
+    chunk_size: int = DEFAULT_CHUNK,
+    border: int = 4,
+    box_size: int = 10,
+) -> ExportSummary:
+    """条件に合うチケットのQRを out_dir に画像で書き出し、manifest.csv を作る。
+
+    workers=1 のときはプロセスプールを使わずにこのプロセスで描画する。
+    """
+    formats = tuple(dict.fromkeys(f.lower() for f in formats))
+    unknown = [f for f in formats if f not in FORMATS]
+    if unknown or not formats:
+        raise ValueError(f"出力形式は {', '.join(FORMATS)} から選んでください: {', '.join(unknown)}")
+    workers = max(1, workers or os.cpu_count() or 1)
+    os.makedirs(out_dir, exist_ok=True)
+    manifest_path = os.path.join(out_dir, MANIFEST_NAME)
+
+    t0 = time.perf_counter()
+    tickets = files = written = 0
+    # Excel で開いても文字化けしないよう BOM 付きで書く(タイトルが日本語のため)
+    with open(manifest_path, "w", encoding="utf-8-sig", newline="") as f:
+        manifest = csv.writer(f)
+        manifest.writerow(MANIFEST_COLUMNS)
+
+        def _write(chunk: list[ReservationSummary], results: list[tuple[list[str], int]]) -> None:
+            nonlocal tickets, files, written
+            for t, (paths, size) in zip(chunk, results):
+                manifest.writerow(
+                    (
+                        t.ticket_id,
+                        t.uuid,
+                        t.show_id,
+                        t.movie_title or "",
+                        format_ymd_hm(t.start_at),
+                        t.hall or "",
+                        ",".join(t.seats),
+                        t.user_name or "",
+                        ";".join(p.replace(os.sep, "/") for p in paths),
+                    )
+                )
+                tickets += 1
+                files += len(paths)
+                written += size
+            f.flush()
+
+        def _jobs(chunk: list[ReservationSummary]) -> list[tuple[str, str]]:
+            return [(t.uuid, _relative_base(t)) for t in chunk]
+
+        if workers == 1:
+            for chunk in iter_ticket_chunks(criteria, chunk_size):
+                _write(chunk, _render_chunk(out_dir, _jobs(chunk), formats, border, box_size))
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                pending: deque[tuple[list[ReservationSummary], Future]] = deque()
+                for chunk in iter_ticket_chunks(criteria, chunk_size):
+                    pending.append((chunk, pool.submit(_render_chunk, out_dir, _jobs(chunk), formats, border, box_size)))
+                    # 処理中が workers × 2 に達したら、いちばん古いチャンクが終わるまで待って書く
+                    while len(pending) >= workers * 2:
+                        done_chunk, future = pending.popleft()
+                        _write(done_chunk, future.result())
+                while pending:
+                    done_chunk, future = pending.popleft()
+                    _write(done_chunk, future.result())
+
+    return ExportSummary(
+        tickets=tickets,
+        files=files,
+        bytes_written=written,
+        seconds=time.perf_counter() - t0,
+        workers=workers,
+        manifest_path=manifest_path,
+    )
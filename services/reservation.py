@@ -0,0 +1,291 @@
+from __future__ import annotations
+
+import json
+import uuid
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Iterable, Mapping
+
+from sqlalchemy import Integer, delete, insert, literal, select, tuple_
+from sqlalchemy.engine import Connection
+from sqlalchemy.exc import IntegrityError
+
+from db.db import engine, write_transaction
+from db.models import Show, Ticket, TicketSeat
+from services.errors import (
+    InvalidSeatsError,
+    SeatConflictError,
+    ShowNotFoundError,
+    TicketAlreadyUsedError,
+    TicketNotFoundError,
+)
+from services.pricing import quote, validate_breakdown
+from services.seatHold import consume_hold
+from services.showCalendar import add_sold_seats
+from services.showOccupancy import add_occupancy
+from services.ticketViews import ReservationSummary, load_summaries
+from utils.hallLayout import load_layout
+from utils.seatOccupancy import unknown_seats
+
+# 予約(チケット発行・一覧・キャンセル)
+# - input()/console を使わないので、ページ以外(負荷試験・バッチ)からもそのまま呼べる
+# - 失敗は services.errors の例外で返す(メッセージはそのまま表示できる)
+#
+# 書き込み(create_ticket)について
+# - Ticket 1行 + TicketSeat 全行を、BEGIN IMMEDIATE の短いトランザクション1つで書く
+# - TicketSeat は全席ぶんのパラメータを executemany 1回でまとめて入れる
+#   (ORMで1席ずつ add → flush するより、書き込みロックを持っている時間が短い)
+# - 挿入する値・SQL文はロックを取る前に用意しておき、ロック中は SQL を流すだけにする
+# - 集計(show_days の販売済み席数・show_occupancy)も同じトランザクションで増減する
+
+_INSERT_TICKET = insert(Ticket)
+_INSERT_TICKET_SEATS = insert(TicketSeat)
+
+
+@dataclass(frozen=True)
+class IssuedTicket:
+    id: int
+    uuid: str
+    issued_at: datetime
+    seats: list[str]
+    sum_price: int = 0
+
+
+def list_reservations(user_id: str, include_used: bool = False) -> list[ReservationSummary]:
+    # ユーザーの現在の予約(既定は未使用のみ)。発行が新しい順
+    criteria = [Ticket.user_id == str(user_id)]
+    if not include_used:
+        criteria.append(Ticket.used_at.is_(None))
+    with engine.connect() as conn:
+        return load_summaries(conn, *criteria, order_by=(Ticket.issued_at.desc().nullslast(), Ticket.id.desc()))
+
+
+# 予約一覧のページ送り(キーセット方式)
+# - 並びは発行日時・チケットIDの降順。ページ端の (issued_at, id) をキーにして次/前のページを読む
+#   (OFFSET と違い、何ページ目でも索引をキーの位置から limit + 1 件読むだけで済む)
+# - 発行日時のない古いチケットは一覧の最後に ID 降順で並ぶ(SQLite の降順では NULL が最後)。
+#   行値の比較 (issued_at, id) < (?, ?) は NULL を含まないので、その部分は別に読む
+DEFAULT_PAGE_SIZE = 20
+
+_PAGE_KEY = tuple_(Ticket.issued_at, Ticket.id)
+_NEWEST_FIRST = (Ticket.issued_at.desc(), Ticket.id.desc())
+_OLDEST_FIRST = (Ticket.issued_at, Ticket.id)
+
+
+@dataclass(frozen=True)
+class ReservationPage:
+    items: list[ReservationSummary]
+    has_prev: bool
+    has_next: bool
+
+    # 前/次のページを読むときに渡すキー
+    @property
+    def first_key(self) -> tuple[datetime | None, int] | None:
+        return (self.items[0].issued_at, self.items[0].ticket_id) if self.items else None
+
+    @property
+    def last_key(self) -> tuple[datetime | None, int] | None:
+        return (self.items[-1].issued_at, self.items[-1].ticket_id) if self.items else None
+
+
+def _key_value(issued_at: datetime, ticket_id: int):
+    # tuple_ の中のリテラルは列の型を引き継がないので、経過分(EpochMinutes)で渡すよう型を付ける
+    return tuple_(literal(issued_at, Ticket.issued_at.type), literal(int(ticket_id), Integer()))
+
+
+def _read_older(conn: Connection, criteria: list, key, n: int) -> list[ReservationSummary]:
+    # 一覧の並びで key より後ろを n 件
+    if key is None:
+        return load_summaries(conn, *criteria, order_by=_NEWEST_FIRST, limit=n)
+    issued_at, ticket_id = key
+    if issued_at is None:
+        return load_summaries(
+            conn, *criteria, Ticket.issued_at.is_(None), Ticket.id < ticket_id, order_by=_NEWEST_FIRST, limit=n
+        )
+    rows = load_summaries(conn, *criteria, _PAGE_KEY < _key_value(issued_at, ticket_id), order_by=_NEWEST_FIRST, limit=n)
+    if len(rows) < n:
+        rows += load_summaries(conn, *criteria, Ticket.issued_at.is_(None), order_by=_NEWEST_FIRST, limit=n - len(rows))
+    return rows
+
+
+def _read_newer(conn: Connection, criteria: list, key, n: int) -> list[ReservationSummary]:
+    # 一覧の並びで key より前を、key に近い順(昇順)で n 件
+    issued_at, ticket_id = key
+    if issued_at is not None:
+        return load_summaries(conn, *criteria, _PAGE_KEY > _key_value(issued_at, ticket_id), order_by=_OLDEST_FIRST, limit=n)
+    rows = load_summaries(
+        conn, *criteria, Ticket.issued_at.is_(None), Ticket.id > ticket_id, order_by=_OLDEST_FIRST, limit=n
+    )
+    if len(rows) < n:
+        rows += load_summaries(conn, *criteria, Ticket.issued_at.is_not(None), order_by=_OLDEST_FIRST, limit=n - len(rows))
+    return rows
+
+
+def list_reservation_page(
+    user_id: str,
+    *,
+    after: tuple[datetime | None, int] | None = None,
+    before: tuple[datetime | None, int] | None = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+    include_used: bool = False,
+) -> ReservationPage:
+    # after: そのキーより後ろ(古い方)のページ / before: そのキーより前(新しい方)のページ / どちらもなければ先頭
+    # limit + 1 件読んで、その先にまだあるかを判定する
+    criteria = [Ticket.user_id == str(user_id)]
+    if not include_used:
+        criteria.append(Ticket.used_at.is_(None))
+    limit = max(1, int(limit))
+    with engine.connect() as conn:
+        if before is None:
+            rows = _read_older(conn, criteria, after, limit + 1)
+            return ReservationPage(rows[:limit], has_prev=after is not None, has_next=len(rows) > limit)
+        rows = _read_newer(conn, criteria, before, limit + 1)
+    if len(rows) < limit:
+        # 先頭まで戻って1ページに満たない(間にキャンセルがあった)ときは先頭ページを出す
+        return list_reservation_page(user_id, limit=limit, include_used=include_used)
+    page = rows[:limit]
+    page.reverse()
+    return ReservationPage(page, has_prev=len(rows) > limit, has_next=True)
+
+
+def get_reservation(ticket_uuid: str) -> ReservationSummary | None:
+    with engine.connect() as conn:
+        found = load_summaries(conn, Ticket.uuid == ticket_uuid)
+    return found[0] if found else None
+
+
+def _sold_seats(conn: Connection, show_id: int, seats: list[str]) -> list[str]:
+    return list(
+        conn.execute(
+            select(TicketSeat.seat).where(TicketSeat.show_id == show_id, TicketSeat.seat.in_(seats))
+        ).scalars().all()
+    )
+
+
+def create_ticket(
+    *,
+    show_id: int,
+    user_id: str,
+    seats: Iterable[str],
+    breakdown_json: str = "{}",
+    sum_price: int = 0,
+    user_name: str | None = None,
+    age: int | None = None,
+    sex: str | None = None,
+    is_member: int = 0,
+    hold_token: str | None = None,
+    issued_at: datetime | None = None,
+) -> IssuedTicket:
+    """チケットと座席をまとめて書き込む(料金・座席の妥当性チェックはしない)。
+
+    予約済み、または他の人が仮押さえ中の座席があれば何も書かずに
+    SeatConflictError(該当する座席の一覧付き)を送出する。
+    """
+    seat_list = list(dict.fromkeys(str(s).strip().upper() for s in seats))
+    if not seat_list:
+        raise ValueError("座席が指定されていません。")
+
+    now = datetime.now()
+    issued_at = issued_at or now.replace(second=0, microsecond=0)
+    ticket_uuid = str(uuid.uuid4())
+    ticket_values = {
+        "uuid": ticket_uuid,
+        "show_id": show_id,
+        "user_id": str(user_id),
+        "user_name": user_name,
+        "age": age,
+        "sex": sex,
+        "is_member": int(is_member),
+        "breakdown_json": breakdown_json,
+        "sum_price": int(sum_price),
+        "issued_at": issued_at,
+    }
+
+    try:
+        with write_transaction() as conn:
+            # 仮押さえを外し、予約済み/他の人の押さえと重なっていないか確認
+            consume_hold(conn, show_id, seat_list, hold_token, now=now)
+
+            ticket_id = int(conn.execute(_INSERT_TICKET, ticket_values).inserted_primary_key[0])
+            conn.execute(
+                _INSERT_TICKET_SEATS,
+                [{"ticket_id": ticket_id, "show_id": show_id, "seat": seat} for seat in seat_list],
+            )
+            add_sold_seats(conn, show_id, len(seat_list))
+            add_occupancy(conn, show_id, len(seat_list), 1, int(sum_price))
+    except IntegrityError:
+        # 書き込みロック中に確認しているので通常は来ないが、来たらどの座席かを調べ直す
+        with engine.connect() as conn:
+            sold = _sold_seats(conn, show_id, seat_list)
+        if not sold:
+            raise
+        raise SeatConflictError(sold) from None
+
+    return IssuedTicket(id=ticket_id, uuid=ticket_uuid, issued_at=issued_at, seats=seat_list, sum_price=int(sum_price))
+
+
+def reserve(
+    show_id: int,
+    seats: Iterable[str],
+    breakdown: Mapping[str, int],
+    user_id: str,
+    *,
+    user_name: str | None = None,
+    age: int | None = None,
+    sex: str | None = None,
+    is_member: int = 0,
+    hold_token: str | None = None,
+) -> IssuedTicket:
+    """座席と内訳を検証し、料金を計算してチケットを発行する。
+
+    例外: ShowNotFoundError / InvalidSeatsError / InvalidBreakdownError / SeatConflictError
+    """
+    seat_list = list(dict.fromkeys(str(s).strip().upper() for s in seats))
+    if not seat_list:
+        raise InvalidSeatsError([])
+
+    with engine.connect() as conn:
+        show = conn.execute(select(Show.hall, Show.price).where(Show.id == show_id)).first()
+    if show is None:
+        raise ShowNotFoundError(show_id)
+
+    invalid = unknown_seats(load_layout(show.hall), seat_list)
+    if invalid:
+        raise InvalidSeatsError(invalid)
+
+    validate_breakdown(breakdown, len(seat_list))
+    price = quote(show.price, breakdown, is_member)
+
+    return create_ticket(
+        show_id=show_id,
+        user_id=user_id,
+        seats=seat_list,
+        breakdown_json=json.dumps(dict(breakdown), ensure_ascii=False),
+        sum_price=price.sum_price,
+        user_name=user_name,
+        age=age,
+        sex=sex,
+        is_member=int(is_member),
+        hold_token=hold_token,
+    )
+
+
+def cancel(ticket_uuid: str, user_id: str) -> None:
+    """ユーザー自身の未使用チケットを削除する(座席も一緒に消える)。
+
+    例外: TicketNotFoundError(他人のチケットも含む) / TicketAlreadyUsedError
+    """
+    with write_transaction() as conn:
+        row = conn.execute(
+            select(Ticket.id, Ticket.show_id, Ticket.sum_price, Ticket.used_at).where(Ticket.uuid == ticket_uuid, Ticket.user_id == str(user_id))
+        ).first()
+        if row is None:
+            raise TicketNotFoundError(ticket_uuid)
+        if row.used_at is not None:
+            raise TicketAlreadyUsedError(ticket_uuid)
+
+        released = conn.execute(delete(TicketSeat).where(TicketSeat.ticket_id == row.id)).rowcount
+        conn.execute(delete(Ticket).where(Ticket.id == row.id))
+        released = int(released or 0)
+        add_sold_seats(conn, row.show_id, -released)
+        add_occupancy(conn, row.show_id, -released, -1, -int(row.sum_price))
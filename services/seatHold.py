@@ -0,0 +1,172 @@
+from __future__ import annotations
+
+import os
+from datetime import datetime, timedelta
+from typing import Iterable
+
+from sqlalchemy import Select, bindparam, delete, insert, select, union_all
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from db.db import engine, write_transaction
+from db.models import SeatHold, Show, TicketSeat
+from services.errors import InvalidSeatsError, SeatConflictError, ShowNotFoundError
+from utils.hallLayout import load_layout
+from utils.seatOccupancy import unknown_seats
+
+# 座席の仮押さえ
+# - 座席選択の時点で座席を押さえ、購入確定(UserCheckout)までの間に他の人に取られないようにする
+# - 押さえは TTL(分)で期限切れになる。期限切れの行は次の押さえ時にまとめて掃除する
+# - 押さえの単位は hold_token(購入手続き1回ごとのランダム文字列)。
+#   同じ token で押さえ直すと、前に押さえていた座席は解放される
+
+DEFAULT_HOLD_TTL_MIN = 10
+
+
+def hold_ttl_minutes() -> int:
+    # .env / 環境変数 CINEMA_SEAT_HOLD_TTL_MIN で変更可(db.db の import 時に .env は読み込み済み)
+    try:
+        ttl = int((os.environ.get("CINEMA_SEAT_HOLD_TTL_MIN") or "").strip() or DEFAULT_HOLD_TTL_MIN)
+    except ValueError:
+        return DEFAULT_HOLD_TTL_MIN
+    return ttl if ttl > 0 else DEFAULT_HOLD_TTL_MIN
+
+
+def _expires_at(now: datetime, ttl_min: int) -> datetime:
+    # DBは分単位なので切り上げて、押さえ時間が TTL より短くならないようにする
+    expires = now + timedelta(minutes=ttl_min)
+    if expires.second or expires.microsecond:
+        expires = expires.replace(second=0, microsecond=0) + timedelta(minutes=1)
+    return expires
+
+
+def sweep_expired(conn: Connection, now: datetime | None = None) -> int:
+    # 期限切れの押さえを削除する(ix_seat_holds_expires の範囲削除なので、期限切れの件数ぶんしか読まない)
+    now = now or datetime.now()
+    result = conn.execute(delete(SeatHold).where(SeatHold.expires_at <= now))
+    return int(result.rowcount or 0)
+
+
+def hold_seats(
+    show_id: int,
+    seats: Iterable[str],
+    hold_token: str,
+    user_id: str | None = None,
+    ttl_min: int | None = None,
+    now: datetime | None = None,
+) -> datetime:
+    """座席をまとめて押さえ、有効期限を返す。
+
+    予約済み、または他の token が押さえ中の座席があれば1席も押さえずに SeatConflictError。
+    BEGIN IMMEDIATE の中で「掃除 → 自分の前の押さえを解放 → 空きチェック → 挿入」を行うので、
+    同時に同じ座席を押さえにきても片方だけが成功する。
+    例外: ShowNotFoundError / InvalidSeatsError / SeatConflictError
+    """
+    seat_list = list(dict.fromkeys(str(s).strip().upper() for s in seats))
+    if seat_list:
+        # 上映回・座席の存在は reserve() と同じく書き込みの前に確かめる(ない上映回・座席の押さえを作らない)
+        with engine.connect() as conn:
+            hall = conn.execute(select(Show.hall).where(Show.id == show_id)).scalar()
+        if hall is None:
+            raise ShowNotFoundError(show_id)
+        invalid = unknown_seats(load_layout(hall), seat_list)
+        if invalid:
+            raise InvalidSeatsError(invalid)
+    now = now or datetime.now()
+    expires_at = _expires_at(now, ttl_min or hold_ttl_minutes())
+
+    with write_transaction() as conn:
+        sweep_expired(conn, now)
+        conn.execute(delete(SeatHold).where(SeatHold.hold_token == hold_token))
+
+        if not seat_list:
+            return expires_at
+
+        sold = conn.execute(
+            select(TicketSeat.seat).where(TicketSeat.show_id == show_id, TicketSeat.seat.in_(seat_list))
+        ).scalars().all()
+        held = conn.execute(
+            select(SeatHold.seat).where(SeatHold.show_id == show_id, SeatHold.seat.in_(seat_list))
+        ).scalars().all()
+        if sold or held:
+            raise SeatConflictError(set(sold) | set(held))
+
+        conn.execute(
+            insert(SeatHold),
+            [
+                {"show_id": show_id, "seat": seat, "hold_token": hold_token, "user_id": user_id, "expires_at": expires_at}
+                for seat in seat_list
+            ],
+        )
+    return expires_at
+
+
+def release_hold(hold_token: str) -> int:
+    # 購入をやめたときなど、token の押さえをすべて解放する
+    with write_transaction() as conn:
+        result = conn.execute(delete(SeatHold).where(SeatHold.hold_token == hold_token))
+    return int(result.rowcount or 0)
+
+
+def held_seats(
+    db_session: Session | Connection,
+    show_id: int,
+    exclude_token: str | None = None,
+    now: datetime | None = None,
+) -> list[str]:
+    # 上映回で押さえ中(期限内)の座席。exclude_token の押さえ(自分の分)は除く
+    return list(db_session.execute(held_seats_query(show_id, exclude_token, now)).scalars().all())
+
+
+def held_seats_query(show_id: int, exclude_token: str | None = None, now: datetime | None = None) -> Select:
+    # held_seats() の SELECT 文(非同期セッションからも同じ文を使う)
+    now = now or datetime.now()
+    stmt = select(SeatHold.seat).where(SeatHold.show_id == show_id, SeatHold.expires_at > now)
+    if exclude_token:
+        stmt = stmt.where(SeatHold.hold_token != exclude_token)
+    return stmt
+
+
+# 購入確定時のチェック用(呼び出しごとに組み立てず、使い回す)
+_DELETE_TOKEN_HOLDS = delete(SeatHold).where(SeatHold.hold_token == bindparam("hold_token"))
+_SEAT_CONFLICTS = union_all(
+    # 予約済み
+    select(TicketSeat.seat).where(
+        TicketSeat.show_id == bindparam("show_id"),
+        TicketSeat.seat.in_(bindparam("seats", expanding=True)),
+    ),
+    # 他の token が期限内に押さえている
+    select(SeatHold.seat).where(
+        SeatHold.show_id == bindparam("show_id"),
+        SeatHold.seat.in_(bindparam("seats", expanding=True)),
+        SeatHold.expires_at > bindparam("now"),
+        SeatHold.hold_token != bindparam("hold_token"),
+    ),
+)
+
+
+def consume_hold(
+    conn: Connection,
+    show_id: int,
+    seats: Iterable[str],
+    hold_token: str | None,
+    now: datetime | None = None,
+) -> None:
+    """購入確定時に、自分の押さえを外して座席が買えるか確認する。
+
+    write_transaction() の中で、TicketSeat を書く直前に呼ぶ。
+    予約済み、または他の token が期限内に押さえている座席があれば SeatConflictError。
+    自分の押さえが期限切れでも、その間に誰も押さえていなければそのまま購入できる。
+    """
+    params = {
+        "show_id": show_id,
+        "seats": [str(s).strip().upper() for s in seats],
+        "now": now or datetime.now(),
+        # token なしの購入では、すべての押さえが「他の人の押さえ」になる
+        "hold_token": hold_token or "",
+    }
+    if hold_token:
+        conn.execute(_DELETE_TOKEN_HOLDS, params)
+    conflicts = conn.execute(_SEAT_CONFLICTS, params).scalars().all()
+    if conflicts:
+        raise SeatConflictError(set(conflicts))
@@ -0,0 +1,201 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from typing import Any, Iterable
+
+from sqlalchemy import Integer, bindparam, delete, exists, func, select, tuple_, type_coerce, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.engine import Connection
+
+from db.db import engine
+from db.models import Show, ShowDay, TicketSeat
+from utils.hallLayout import load_layout
+
+# 上映日カレンダーの集計(show_days: 映画 × 上映日 → 上映回数・最初の開始・座席数・販売済み席数)
+# - 読み取り(UserShowCalendar)は movie_id + 月の範囲で主キーを1回引くだけ
+# - 書き込み側は、上映回やチケットを書くのと同じトランザクションの中で更新する
+#   チケット購入/キャンセル: add_sold_seats() で販売済み席数を増減(UPDATE 1文)
+#   上映回の追加/削除     : refresh_show_days() でその日の行を上映回から数え直す(管理画面なので回数が少ない)
+# - 行がない(集計を作る前のDB)場合は init_db() の fill_if_empty() で全件作る
+
+_DAY = timedelta(days=1)
+_MINUTES_PER_DAY = 24 * 60
+
+# 残席の割合がこれ以下なら「残りわずか」
+FEW_SEATS_RATIO = 0.2
+
+
+@dataclass(frozen=True)
+class ShowDaySummary:
+    day: date
+    show_count: int
+    first_start_at: datetime
+    seat_count: int
+    sold_count: int
+
+    @property
+    def remaining(self) -> int:
+        return max(0, self.seat_count - self.sold_count)
+
+    @property
+    def sold_out(self) -> bool:
+        return self.seat_count > 0 and self.remaining == 0
+
+    @property
+    def few_left(self) -> bool:
+        return not self.sold_out and self.remaining <= self.seat_count * FEW_SEATS_RATIO
+
+
+def day_start(value: datetime) -> datetime:
+    return datetime(value.year, value.month, value.day)
+
+
+def hall_seat_count(hall: str) -> int:
+    # レイアウトファイルのないホールは座席数0として数える(座席表も出せないため)
+    try:
+        return load_layout(hall).seat_count
+    except FileNotFoundError:
+        return 0
+
+
+# 上映回の開始(経過分)を、その日の 00:00 の経過分にする式
+_START_MIN = type_coerce(Show.start_at, Integer)
+_SHOW_DAY_MIN = _START_MIN - _START_MIN % _MINUTES_PER_DAY
+
+# 購入/キャンセル: 上映回の (映画, 上映日) の行の販売済み席数を増減する
+_ADD_SOLD = (
+    update(ShowDay)
+    .where(
+        tuple_(ShowDay.movie_id, type_coerce(ShowDay.day, Integer)).in_(
+            select(Show.movie_id, _SHOW_DAY_MIN).where(Show.id == bindparam("show_id"))
+        )
+    )
+    .values(sold_count=ShowDay.sold_count + bindparam("delta", type_=Integer))
+)
+
+_UPSERT_DAY = sqlite_insert(ShowDay)
+_UPSERT_DAY = _UPSERT_DAY.on_conflict_do_update(
+    index_elements=[ShowDay.movie_id, ShowDay.day],
+    set_={
+        "show_count": _UPSERT_DAY.excluded.show_count,
+        "first_start_at": _UPSERT_DAY.excluded.first_start_at,
+        "seat_count": _UPSERT_DAY.excluded.seat_count,
+        "sold_count": _UPSERT_DAY.excluded.sold_count,
+    },
+)
+
+_MONTH_DAYS = (
+    select(ShowDay.day, ShowDay.show_count, ShowDay.first_start_at, ShowDay.seat_count, ShowDay.sold_count)
+    .where(ShowDay.movie_id == bindparam("movie_id"), ShowDay.day >= bindparam("d0"), ShowDay.day < bindparam("d1"))
+)
+
+
+def add_sold_seats(conn: Connection, show_id: int, delta: int) -> None:
+    conn.execute(_ADD_SOLD, {"show_id": int(show_id), "delta": int(delta)})
+
+
+def _aggregate(conn: Connection, *criteria: Any) -> dict[tuple[int, datetime], dict[str, Any]]:
+    # 条件に合う上映回を (映画, 上映日) ごとに数える(販売済み席数は上映回ごとに1クエリでまとめて数える)
+    shows = conn.execute(select(Show.id, Show.movie_id, Show.hall, Show.start_at).where(*criteria)).all()
+    if not shows:
+        return {}
+    sold = dict(
+        conn.execute(
+            select(TicketSeat.show_id, func.count())
+            .where(TicketSeat.show_id.in_(select(Show.id).where(*criteria)))
+            .group_by(TicketSeat.show_id)
+        ).all()
+    )
+
+    days: dict[tuple[int, datetime], dict[str, Any]] = {}
+    for r in shows:
+        key = (int(r.movie_id), day_start(r.start_at))
+        agg = days.get(key)
+        if agg is None:
+            agg = days[key] = {
+                "movie_id": key[0],
+                "day": key[1],
+                "show_count": 0,
+                "first_start_at": r.start_at,
+                "seat_count": 0,
+                "sold_count": 0,
+            }
+        agg["show_count"] += 1
+        agg["first_start_at"] = min(agg["first_start_at"], r.start_at)
+        agg["seat_count"] += hall_seat_count(r.hall)
+        agg["sold_count"] += int(sold.get(r.id, 0))
+    return days
+
+
+def refresh_show_days(conn: Connection, keys: Iterable[tuple[int, datetime]]) -> None:
+    """(映画, 上映日) の行を上映回から数え直す。上映回がなくなった日は行を消す。
+
+    上映回の追加/削除を flush した後、commit の前に同じトランザクションで呼ぶ。
+    """
+    keys = {(int(movie_id), day_start(day)) for movie_id, day in keys}
+    if not keys:
+        return
+    days = sorted({day for _, day in keys})
+    found = _aggregate(
+        conn,
+        Show.movie_id.in_(sorted({movie_id for movie_id, _ in keys})),
+        Show.start_at >= days[0],
+        Show.start_at < days[-1] + _DAY,
+    )
+    if found:
+        conn.execute(_UPSERT_DAY, list(found.values()))
+    gone = [key for key in keys if key not in found]
+    if gone:
+        conn.execute(delete(ShowDay).where(tuple_(ShowDay.movie_id, ShowDay.day).in_(gone)))
+
+
+def remove_movie_days(conn: Connection, movie_id: int) -> None:
+    conn.execute(delete(ShowDay).where(ShowDay.movie_id == int(movie_id)))
+
+
+def rebuild_show_days(conn: Connection) -> int:
+    # 全件作り直す(集計がずれた場合の修復・初回作成用)
+    conn.execute(delete(ShowDay))
+    found = _aggregate(conn)
+    if found:
+        conn.execute(_UPSERT_DAY, list(found.values()))
+    return len(found)
+
+
+def check_show_days(conn: Connection) -> list[tuple[int, datetime]]:
+    # 上映回・チケットから数え直した値と違う (映画, 上映日) の一覧
+    stored = {
+        (int(r.movie_id), r.day): (int(r.show_count), r.first_start_at, int(r.seat_count), int(r.sold_count))
+        for r in conn.execute(select(ShowDay.__table__)).all()
+    }
+    actual = {
+        key: (agg["show_count"], agg["first_start_at"], agg["seat_count"], agg["sold_count"])
+        for key, agg in _aggregate(conn).items()
+    }
+    return sorted(key for key in stored.keys() | actual.keys() if stored.get(key) != actual.get(key))
+
+
+def fill_if_empty(conn: Connection) -> int:
+    # 集計テーブルを追加する前のDB(上映回はあるのに集計が空)なら全件作る
+    if conn.execute(select(exists().select_from(ShowDay))).scalar() or not conn.execute(select(exists().select_from(Show))).scalar():
+        return 0
+    return rebuild_show_days(conn)
+
+
+def month_show_days(movie_id: int, year: int, month: int) -> dict[int, ShowDaySummary]:
+    # 指定月の上映日 → 集計(日にち → ShowDaySummary)
+    d0 = datetime(year, month, 1)
+    d1 = datetime(year + 1, 1, 1) if month == 12 else datetime(year, month + 1, 1)
+    with engine.connect() as conn:
+        rows = conn.execute(_MONTH_DAYS, {"movie_id": int(movie_id), "d0": d0, "d1": d1}).all()
+    return {
+        r.day.day: ShowDaySummary(
+            day=r.day.date(),
+            show_count=int(r.show_count),
+            first_start_at=r.first_start_at,
+            seat_count=int(r.seat_count),
+            sold_count=int(r.sold_count),
+        )
+        for r in rows
+    }
@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any, Iterable
+
+from sqlalchemy import delete, exists, func, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.engine import Connection
+
+from db.models import Show, ShowOccupancy, Ticket, TicketSeat
+
+# 上映回ごとの販売状況(show_occupancy: 上映回 → 予約済み席数・チケット枚数・売上)
+# - 読み取り(UserShowSelect)は shows に主キーで外部結合するだけ(上映回ごとに COUNT しない)
+# - 書き込み側は、チケット・上映回を書くのと同じトランザクションの中で更新する
+#   チケット購入/キャンセル: add_occupancy() で増減(UPSERT 1文)
+#   上映回の削除         : remove_shows() で行を消す
+# - 行がない(集計を作る前のDB)場合は init_db() の fill_if_empty() で全件作る
+# - ずれていないかの確認・作り直しは scripts/check_counters.py
+
+
+@dataclass(frozen=True)
+class OccupancyMismatch:
+    show_id: int
+    stored: tuple[int, int, int]    # (席数, 枚数, 売上) show_occupancy の値
+    actual: tuple[int, int, int]    # 同じく、チケットから数え直した値
+
+
+# 購入/キャンセル: 行がなければ作り、あれば増減する
+_ADD = sqlite_insert(ShowOccupancy)
+_ADD = _ADD.on_conflict_do_update(
+    index_elements=[ShowOccupancy.show_id],
+    set_={
+        "seat_count": ShowOccupancy.seat_count + _ADD.excluded.seat_count,
+        "ticket_count": ShowOccupancy.ticket_count + _ADD.excluded.ticket_count,
+        "revenue": ShowOccupancy.revenue + _ADD.excluded.revenue,
+    },
+)
+
+
+def add_occupancy(conn: Connection, show_id: int, seats: int, tickets: int, revenue: int) -> None:
+    # キャンセルは負の値で呼ぶ
+    conn.execute(
+        _ADD,
+        {"show_id": int(show_id), "seat_count": int(seats), "ticket_count": int(tickets), "revenue": int(revenue)},
+    )
+
+
+def remove_shows(conn: Connection, show_ids: Iterable[int]) -> None:
+    ids = sorted({int(s) for s in show_ids})
+    if ids:
+        conn.execute(delete(ShowOccupancy).where(ShowOccupancy.show_id.in_(ids)))
+
+
+def _aggregate(conn: Connection, *criteria: Any) -> dict[int, tuple[int, int, int]]:
+    # チケット・座席から上映回ごとに数え直す(存在する上映回のものだけ)
+    shows = select(Show.id).where(*criteria)
+    tickets = conn.execute(
+        select(Ticket.show_id, func.count(), func.coalesce(func.sum(Ticket.sum_price), 0))
+        .where(Ticket.show_id.in_(shows))
+        .group_by(Ticket.show_id)
+    ).all()
+    seats = dict(
+        conn.execute(
+            select(TicketSeat.show_id, func.count()).where(TicketSeat.show_id.in_(shows)).group_by(TicketSeat.show_id)
+        ).all()
+    )
+    found = {int(sid): (int(seats.pop(sid, 0)), int(n), int(total)) for sid, n, total in tickets}
+    # チケットのない座席(壊れたデータ)も席数には数える
+    for sid, n in seats.items():
+        found[int(sid)] = (int(n), 0, 0)
+    return found
+
+
+def rebuild_show_occupancy(conn: Connection) -> int:
+    # 全件作り直す(集計がずれた場合の修復・初回作成用)
+    conn.execute(delete(ShowOccupancy))
+    found = _aggregate(conn)
+    if found:
+        conn.execute(
+            sqlite_insert(ShowOccupancy),
+            [
+                {"show_id": sid, "seat_count": s, "ticket_count": t, "revenue": r}
+                for sid, (s, t, r) in sorted(found.items())
+            ],
+        )
+    return len(found)
+
+
+def check_show_occupancy(conn: Connection) -> list[OccupancyMismatch]:
+    # show_occupancy とチケットから数え直した値が違う上映回の一覧(全部0の行と行なしは同じとみなす)
+    stored = {
+        int(r.show_id): (int(r.seat_count), int(r.ticket_count), int(r.revenue))
+        for r in conn.execute(select(ShowOccupancy.__table__)).all()
+    }
+    actual = _aggregate(conn)
+    zero = (0, 0, 0)
+    return [
+        OccupancyMismatch(show_id=sid, stored=stored.get(sid, zero), actual=actual.get(sid, zero))
+        for sid in sorted(stored.keys() | actual.keys())
+        if stored.get(sid, zero) != actual.get(sid, zero)
+    ]
+
+
+def fill_if_empty(conn: Connection) -> int:
+    # 集計テーブルを追加する前のDB(チケットはあるのに集計が空)なら全件作る
+    if conn.execute(select(exists().select_from(ShowOccupancy))).scalar() or not conn.execute(select(exists().select_from(Ticket))).scalar():
+        return 0
+    return rebuild_show_occupancy(conn)
@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Iterable
+
+from sqlalchemy import func, select
+from sqlalchemy.engine import Connection
+
+from db.models import Movie, Show, Ticket, TicketSeat
+from utils.hallLayout import seat_sort_key
+
+# チケットの表示用データ(チケット + 上映回 + 映画 + 座席)の読み取り
+# - 予約一覧・キャンセル・チケット表示(QR)・改札・QR一括出力で共通
+# - 1文で取る: 上映回・映画は外部結合、座席は相関サブクエリの group_concat
+#   (座席の索引 ticket_id + seat だけで読めるので、GROUP BY も2本目のクエリもいらない)
+
+
+# 予約一覧・改札などの表示用(DBセッションの外でも使えるように値だけ持つ)
+@dataclass(frozen=True)
+class ReservationSummary:
+    ticket_id: int
+    uuid: str
+    user_id: str
+    user_name: str | None
+    show_id: int
+    movie_title: str | None
+    start_at: datetime | None
+    hall: str | None
+    seats: list[str]
+    breakdown_json: str
+    sum_price: int
+    issued_at: datetime | None
+    used_at: datetime | None
+    # チケット表示(QR)用。上映回が消えている場合 end_at/price は None
+    end_at: datetime | None = None
+    price: int | None = None
+    age: int | None = None
+    sex: str | None = None
+    is_member: int = 0
+
+    @property
+    def show_found(self) -> bool:
+        return self.hall is not None
+
+
+_SEATS = (
+    select(func.group_concat(TicketSeat.seat, ","))
+    .where(TicketSeat.ticket_id == Ticket.id)
+    .correlate(Ticket)
+    .scalar_subquery()
+    .label("seats")
+)
+
+TICKET_VIEW = (
+    select(
+        Ticket.id,
+        Ticket.uuid,
+        Ticket.user_id,
+        Ticket.user_name,
+        Ticket.age,
+        Ticket.sex,
+        Ticket.is_member,
+        Ticket.show_id,
+        Ticket.breakdown_json,
+        Ticket.sum_price,
+        Ticket.issued_at,
+        Ticket.used_at,
+        Show.start_at,
+        Show.end_at,
+        Show.hall,
+        Show.price,
+        Movie.title,
+        _SEATS,
+    )
+    .outerjoin(Show, Show.id == Ticket.show_id)
+    .outerjoin(Movie, Movie.id == Show.movie_id)
+)
+
+
+def _split_seats(value: str | None) -> list[str]:
+    return sorted(value.split(","), key=seat_sort_key) if value else []
+
+
+def load_summaries(
+    conn: Connection, *criteria: Any, order_by: Iterable[Any] = (), limit: int | None = None
+) -> list[ReservationSummary]:
+    stmt = TICKET_VIEW.where(*criteria).order_by(*order_by)
+    if limit is not None:
+        stmt = stmt.limit(limit)
+    rows = conn.execute(stmt).all()
+    # 列名で引くより速いので、TICKET_VIEW の列順どおりに展開する
+    return [
+        ReservationSummary(
+            ticket_id=ticket_id,
+            uuid=ticket_uuid,
+            user_id=user_id,
+            user_name=user_name,
+            show_id=show_id,
+            movie_title=title,
+            start_at=start_at,
+            hall=hall,
+            seats=_split_seats(seats),
+            breakdown_json=breakdown_json,
+            sum_price=sum_price,
+            issued_at=issued_at,
+            used_at=used_at,
+            end_at=end_at,
+            price=price,
+            age=age,
+            sex=sex,
+            is_member=is_member or 0,
+        )
+        for (
+            ticket_id, ticket_uuid, user_id, user_name, age, sex, is_member, show_id, breakdown_json,
+            sum_price, issued_at, used_at, start_at, end_at, hall, price, title, seats,
+        ) in rows
+    ]
@@ -1,4 +1,8 @@
 import os
+import re
+import struct
+import zlib
+from functools import lru_cache
 
 import qrcode
 from rich.console import Console
@@ -19,56 +23,132 @@ def _is_colab() -> bool:
 
 console = Console(highlight=False)
 
+# 表示モード
+# - half : 半ブロック(█▀▄)で上下2セルを1文字にまとめる(通常のコンソール)
+# - ascii: 1セル1文字(Colab はブロック文字や罫線がフォント混在で崩れやすいため)
+MODE_HALF = "half"
+MODE_ASCII = "ascii"
 
-def print(data: str, border: int = 4) -> None:
-    """QRを表示する。
+# 描画済みテキストを何件まで覚えておくか(チケット表示は購入直後・入場前に何度も開かれる)
+CACHE_SIZE = 128
+
+# 半ブロック: 上のセルを2、下のセルを1とした 0〜3 の値 → 文字
+_HALF_GLYPHS = str.maketrans({"\x00": " ", "\x01": "▄", "\x02": "▀", "\x03": "█"})
+# Colab: 白は全角幅に合わせて空白2つ
+_ASCII_GLYPHS = str.maketrans({"\x00": "  ", "\x01": "█"})
+
+
+def default_mode() -> str:
+    return MODE_ASCII if _is_colab() else MODE_HALF
+
+
+def _rows_to_text(m: list[list[bool]], mode: str) -> str:
+    # セルごとの if 分岐をやめ、1行ずつ bytes にして translate で文字に置き換える
+    # (bool の行は bytes() で 0/1 の並びになる。ループは行の数だけ)
+    if mode == MODE_ASCII:
+        return "\n".join(bytes(row).decode("latin-1").translate(_ASCII_GLYPHS) for row in m)
+
+    w = len(m[0])
+    blank = bytes(w)
+    lines: list[str] = []
+    for y in range(0, len(m), 2):
+        top = int.from_bytes(bytes(m[y]), "big")
+        bottom = int.from_bytes(bytes(m[y + 1]) if y + 1 < len(m) else blank, "big")
+        # 各バイトは 0/1 なので、上を2倍して足しても隣のバイトへ繰り上がらない
+        pair = (top * 2 + bottom).to_bytes(w, "big")
+        lines.append(pair.decode("latin-1").translate(_HALF_GLYPHS))
+    return "\n".join(lines)
 
-    - 通常: コンソール向けに文字で表示
-    - Colab: ブロック文字(█▀▄)や罫線がフォント混在で崩れやすいので、ASCII表示を優先
-    """
 
+def _make(data: str, border: int) -> qrcode.QRCode:
     qr = qrcode.QRCode(
         border=border,
         error_correction=qrcode.constants.ERROR_CORRECT_M,
     )
     qr.add_data(data)
     qr.make(fit=True)
+    return qr
 
-    m = qr.get_matrix()
-    h = len(m)
-    w = len(m[0])
 
-    # Colabはブロック文字が崩れやすいのでASCIIのみで表示。
-    if _is_colab():
-        BLACK = "█"
-        WHITE = "  "
-        lines: list[str] = []
-        for row in m:
-            lines.append("".join(BLACK if cell else WHITE for cell in row))
-        res = Text("\n".join(lines), overflow="ignore", no_wrap=True)
-        console.print(res)
-        return
-
-    # 通常環境: 半ブロックで高さを1/2にしてコンパクトに表示
-    SPACE = " "
-    lines: list[str] = []
-    for y in range(0, h, 2):
-        row_chars: list[str] = []
-        for x in range(w):
-            top = m[y][x]
-            bottom = m[y + 1][x] if y + 1 < h else False
-
-            if top and bottom:
-                ch = "█"
-            elif top and not bottom:
-                ch = "▀"
-            elif (not top) and bottom:
-                ch = "▄"
-            else:
-                ch = SPACE
-
-            row_chars.append(ch)
-        lines.append("".join(row_chars))
-
-    res = Text("\n".join(lines), overflow="ignore", no_wrap=True)
+@lru_cache(maxsize=CACHE_SIZE)
+def _render(data: str, border: int, mode: str) -> str:
+    return _rows_to_text(_make(data, border).get_matrix(), mode)
+
+
+def render(data: str, border: int = 4, mode: str | None = None) -> str:
+    """QRを表示用の文字列にする(同じ内容・余白・モードなら2回目以降はキャッシュから返す)。"""
+    return _render(data, border, mode or default_mode())
+
+
+def prerender(data: str, border: int = 4) -> None:
+    # 購入直後などに先に描画しておき、チケット表示では出力するだけにする
+    render(data, border)
+
+
+def print(data: str, border: int = 4) -> None:
+    """QRを表示する。
+
+    - 通常: コンソール向けに文字で表示
+    - Colab: ブロック文字(█▀▄)や罫線がフォント混在で崩れやすいので、ASCII表示を優先
+    """
+    res = Text(render(data, border), overflow="ignore", no_wrap=True)
     console.print(res)
+
+
+# 画像ファイル用(印刷・配布向けの一括出力で使う)
+# - QRの生成(マスク選び)が一番重いので、SVGとPNGの両方を出すときは matrix() を1回だけ呼んで使い回す
+# - どちらも追加のライブラリなしで書ける(Pillow / pypng / lxml 不要)
+
+_DARK_RUN = re.compile(b"\x01+")
+
+
+def matrix(data: str, border: int = 4) -> list[list[bool]]:
+    return _make(data, border).get_matrix()
+
+
+def svg_from_matrix(m: list[list[bool]]) -> bytes:
+    # 黒セルの横の並びを1つの長方形(M x,y h幅 v1 h-幅 z)にまとめ、path 1本で描く。1セル = 1mm
+    n = len(m)
+    path: list[str] = []
+    for y, row in enumerate(m):
+        for run in _DARK_RUN.finditer(bytes(row)):
+            width = run.end() - run.start()
+            path.append(f"M{run.start()},{y}h{width}v1h-{width}z")
+    return (
+        f'<?xml version="1.0" encoding="UTF-8"?>\n'
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{n}mm" height="{n}mm" viewBox="0 0 {n} {n}" shape-rendering="crispEdges">'
+        f'<rect width="{n}" height="{n}" fill="#fff"/><path fill="#000" d="{"".join(path)}"/></svg>\n'
+    ).encode("utf-8")
+
+
+def _png_chunk(tag: bytes, body: bytes) -> bytes:
+    return struct.pack(">I", len(body)) + tag + body + struct.pack(">I", zlib.crc32(tag + body))
+
+
+def png_from_matrix(m: list[list[bool]], box_size: int = 10) -> bytes:
+    """白黒(1ビット)のPNGにする。zlib で直接組み立てる。"""
+    size = len(m) * box_size
+    pad = "1" * (-size % 8)
+    black = "0" * box_size  # 1ビットグレースケール: 0 = 黒, 1 = 白
+    white = "1" * box_size
+    lines: list[bytes] = []
+    for row in m:
+        bits = "".join(black if cell else white for cell in row) + pad
+        # 各行の先頭はフィルタ種別(0 = なし)。同じ行を box_size 回くり返して拡大する
+        line = b"\x00" + int(bits, 2).to_bytes(len(bits) // 8, "big")
+        lines.extend([line] * box_size)
+    header = struct.pack(">IIBBBBB", size, size, 1, 0, 0, 0, 0)
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + _png_chunk(b"IHDR", header)
+        + _png_chunk(b"IDAT", zlib.compress(b"".join(lines), 9))
+        + _png_chunk(b"IEND", b"")
+    )
+
+
+def to_svg(data: str, border: int = 4) -> bytes:
+    return svg_from_matrix(matrix(data, border))
+
+
+def to_png(data: str, border: int = 4, box_size: int = 10) -> bytes:
+    return png_from_matrix(matrix(data, border), box_size)
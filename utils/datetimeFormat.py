@@ -3,12 +3,16 @@ from __future__ import annotations
 from datetime import datetime
 
 # ユーティリティ関数: 日付時刻の表示用フォーマット変換
-def format_ymd_hm(value: str | None) -> str:
-    # DB保存のISO文字列(YYYY-MM-DDTHH:MM)を、表示用(YYYY/MM/DD HH:MM)に整形する
+def format_ymd_hm(value: datetime | str | None) -> str:
+    # DBから読んだ日時(datetime)、または ISO文字列(YYYY-MM-DDTHH:MM)を、表示用(YYYY/MM/DD HH:MM)に整形する
     # 失敗したらそのまま返す
     if value is None:
         return "-"
 
+    # 上映・チケットの日時はDBから datetime で返ってくるのでパース不要
+    if isinstance(value, datetime):
+        return value.strftime("%Y/%m/%d %H:%M")
+
     v = str(value).strip()
     if v == "":
         return "-"
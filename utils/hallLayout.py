@@ -1,72 +1,168 @@
 from __future__ import annotations
 
+import threading                  # レイアウトキャッシュの排他用
+from functools import lru_cache   # 関数の結果キャッシュ
 from dataclasses import dataclass # dataclass: クラスの定義を簡潔に書くためのモジュール。__init__などを自動で生成してくれる。
 from pathlib import Path          # ファイルパス操作用モジュール
-from typing import Iterable       # 型ヒント用モジュール
+from types import MappingProxyType  # 読み取り専用のdict
+from typing import Iterable, Mapping  # 型ヒント用モジュール
 
 from rich.console import Console  # richライブラリのConsoleクラスをインポート
 from rich.table import Table      # richライブラリのTableクラスをインポート
 
 from utils.rich_compat import TABLE_KWARGS
+from utils.seatOccupancy import SeatOccupancy
+
+# グリッド上のセル種別(座席以外)
+CELL_AISLE = -1  # '.' 通路
+CELL_EMPTY = -2  # それ以外(空白など)
 
 # 映画館のホールレイアウトを扱うユーティリティ
-@dataclass(frozen=True)
+# - レイアウトファイルの'#'だけを座席として扱う
+# - 座席IDは "A-1" 形式（行=英字、列=その行の座席番号）
+# - 行ラベルは「空行を除いた行番号」で連番にする
+# - 座席には左上から順に通し番号(ordinal, 0始まり)を振る
+# - 読み込み後は変更しないので、比較/ハッシュはオブジェクトの同一性で行う(eq=False)
+@dataclass(frozen=True, eq=False)
 class HallLayout:
     hall: str
-    lines: list[str]
-
-    def seat_ids(self) -> list[str]:
-        # レイアウトの'#'だけを座席として扱う
-        # 座席IDは "A-1" 形式（行=英字、列=その行の座席番号）
-        seat_ids: list[str] = []
-
-        # 行ラベルは「空行を除いた行番号」で連番にする
-        row_no = 0
-        for raw in self.lines:
-            line = raw.rstrip("\n")
-            if line.strip() == "":
-                continue
-
+    lines: tuple[str, ...]
+
+    # 以下は parse() で一度だけ計算しておく座席インデックス
+    rows: tuple[str, ...]                              # 空行を除いた行
+    grid: tuple[tuple[int, ...], ...]                  # [行][桁] → 座席のordinal / CELL_AISLE / CELL_EMPTY
+    seat_list: tuple[str, ...]                         # ordinal順の座席ID
+    seat_set: frozenset[str]                           # 存在チェック用
+    ordinals: Mapping[str, int]                        # 座席ID → ordinal
+    positions: tuple[tuple[int, int], ...]             # ordinal → (行, 桁)
+    row_spans: tuple[tuple[int, int, int], ...]        # 行ごとの座席 (行, 先頭ordinal, 席数)
+    blocks: tuple[tuple[int, int, int], ...]           # 通路で区切られた連続席 (行, 先頭ordinal, 席数)
+
+    @classmethod
+    def parse(cls, hall: str, lines: Iterable[str]) -> HallLayout:
+        all_lines = tuple(raw.rstrip("\n") for raw in lines)
+        rows = tuple(ln for ln in all_lines if ln.strip() != "")
+
+        grid: list[tuple[int, ...]] = []
+        seat_list: list[str] = []
+        positions: list[tuple[int, int]] = []
+        row_spans: list[tuple[int, int, int]] = []
+        blocks: list[tuple[int, int, int]] = []
+        for row_no, line in enumerate(rows):
             row_letter = chr(ord("A") + row_no)
-            row_no += 1
-
             col_no = 0
-            for ch in line:
+            cells: list[int] = []
+            row_first = len(seat_list)
+            block_first = None
+            for x, ch in enumerate(line):
                 if ch == "#":
                     col_no += 1
-                    seat_ids.append(f"{row_letter}-{col_no}")
+                    if block_first is None:
+                        block_first = len(seat_list)
+                    cells.append(len(seat_list))
+                    seat_list.append(f"{row_letter}-{col_no}")
+                    positions.append((row_no, x))
+                    continue
+                # 座席以外のセルで連続席が途切れる
+                if block_first is not None:
+                    blocks.append((row_no, block_first, len(seat_list) - block_first))
+                    block_first = None
+                cells.append(CELL_AISLE if ch == "." else CELL_EMPTY)
+            if block_first is not None:
+                blocks.append((row_no, block_first, len(seat_list) - block_first))
+            if len(seat_list) > row_first:
+                row_spans.append((row_no, row_first, len(seat_list) - row_first))
+            grid.append(tuple(cells))
+
+        return cls(
+            hall=hall,
+            lines=all_lines,
+            rows=rows,
+            grid=tuple(grid),
+            seat_list=tuple(seat_list),
+            seat_set=frozenset(seat_list),
+            ordinals=MappingProxyType({seat: i for i, seat in enumerate(seat_list)}),
+            positions=tuple(positions),
+            row_spans=tuple(row_spans),
+            blocks=tuple(blocks),
+        )
+
+    @property
+    def seat_count(self) -> int:
+        return len(self.seat_list)
+
+    def seat_ids(self) -> list[str]:
+        return list(self.seat_list)
+
+
+# 座席IDの並び順(行 → その行の座席番号)。文字列のままだと "A-10" が "A-2" より前になる
+def seat_sort_key(seat: str) -> tuple[str, int]:
+    row, _, col = seat.partition("-")
+    return (row, int(col)) if col.isdigit() else (seat, -1)
 
-        return seat_ids
 
-# レイアウトファイルの格納ディレクトリを取得
+# レイアウトファイルの格納ディレクトリを取得(resolveは遅いので1回だけ)
+@lru_cache(maxsize=1)
 def _layouts_dir() -> Path:
     # utils/ の1つ上がプロジェクトルート想定
     return Path(__file__).resolve().parent.parent / "layouts"
 
-# ホールのレイアウトをファイルから読み込む
+
+# 読み込み済みレイアウトのキャッシュ(プロセス内で共有)
+# hall → ((mtime_ns, size), HallLayout)。ファイルが更新されたら読み直す
+_layout_cache: dict[str, tuple[tuple[int, int], HallLayout]] = {}
+_layout_cache_lock = threading.Lock()
+
+# ホールのレイアウトをファイルから読み込む(2回目以降はキャッシュ)
 def load_layout(hall: str) -> HallLayout:
     path = _layouts_dir() / f"{hall}.txt"
-    if not path.exists():
+    try:
+        stat = path.stat()
+    except (FileNotFoundError, NotADirectoryError):
+        with _layout_cache_lock:
+            _layout_cache.pop(hall, None)
         raise FileNotFoundError(f"レイアウトが見つかりません: {path}")
 
-    lines = path.read_text(encoding="utf-8").splitlines()
-    return HallLayout(hall=hall, lines=lines)
+    version = (stat.st_mtime_ns, stat.st_size)
+    cached = _layout_cache.get(hall)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+
+    layout = HallLayout.parse(hall, path.read_text(encoding="utf-8").splitlines())
+    with _layout_cache_lock:
+        _layout_cache[hall] = (version, layout)
+    return layout
+
+
+def clear_layout_cache() -> None:
+    with _layout_cache_lock:
+        _layout_cache.clear()
 
-# ホール内の全座席IDを取得
-def get_all_seats(hall: str) -> set[str]:
+# ホール内の全座席IDを取得(キャッシュ済みの集合をそのまま返す)
+def get_all_seats(hall: str) -> frozenset[str]:
+    return load_layout(hall).seat_set
+
+
+# 予約済み座席(席IDの列 or SeatOccupancy)をホールのビットマスクにする
+def get_occupancy(hall: str, reserved: Iterable[str] | SeatOccupancy = ()) -> SeatOccupancy:
     layout = load_layout(hall)
-    return set(layout.seat_ids())
+    if isinstance(reserved, SeatOccupancy):
+        if reserved.layout is layout:
+            return reserved
+        # レイアウトファイルが読み直された場合は席IDで引き直す
+        return SeatOccupancy.from_seats(layout, reserved.seat_ids())
+    return SeatOccupancy.from_seats(layout, reserved)
 
 # ホールの空席/予約済み席を表形式で表示
 def render_vacancy_table(
     console: Console,
     hall: str,
-    reserved: Iterable[str],
+    reserved: Iterable[str] | SeatOccupancy,
 ) -> None:
     # 最小: 空席/予約席を一覧表示（後でマップ表示にも拡張しやすい）
-    all_seats = sorted(get_all_seats(hall))
-    reserved_set = set(reserved)
-    available = [s for s in all_seats if s not in reserved_set]
+    occupancy = get_occupancy(hall, reserved)
+    available = occupancy.vacant().seat_ids()
+    reserved_list = occupancy.seat_ids()
 
     table = Table(title=f"Hall {hall} 座席状況", **TABLE_KWARGS)
     table.add_column("区分", justify="left")
@@ -79,8 +175,8 @@ def render_vacancy_table(
             return ", ".join(items)
         return ", ".join(items[:n]) + f" ...(+{len(items) - n})"
 
-    table.add_row("空席", str(len(available)), _preview(available))
-    table.add_row("予約済", str(len(reserved_set)), _preview(sorted(reserved_set)))
+    table.add_row("空席", str(occupancy.vacant_count), _preview(available))
+    table.add_row("予約済", str(occupancy.count), _preview(reserved_list))
 
     console.print(table)
 
@@ -88,23 +184,24 @@ def render_vacancy_table(
 def render_seat_map(
     console: Console,
     hall: str,
-    reserved: Iterable[str],
+    reserved: Iterable[str] | SeatOccupancy,
+    held: Iterable[str] | SeatOccupancy = (),
 ) -> None:
     # レイアウトを「席の配置っぽく」表形式で表示する
     # - # : 座席
     # - . : 通路
-    # 表示は seat_id を色分け（空席=緑、予約済=赤）
+    # 表示は seat_id を色分け（空席=緑、予約済=赤、他の人が仮押さえ中=黄）
 
-    layout = load_layout(hall)
-    reserved_set = {str(s).strip().upper() for s in reserved}
+    occupancy = get_occupancy(hall, reserved)
+    held_occupancy = get_occupancy(hall, held) - occupancy
+    layout = occupancy.layout
 
     # 表示対象行（空行は除外）
-    rows = [ln for ln in layout.lines if ln.strip() != ""]
-    if not rows:
+    if not layout.rows:
         console.print("[yellow]レイアウトが空です。[/yellow]")
         return
 
-    max_cols = max(len(r) for r in rows)
+    max_cols = max(len(r) for r in layout.grid)
 
     # 表形式で表示
     table = Table(title=f"Hall {hall} 座席表", show_header=True, **TABLE_KWARGS)
@@ -112,27 +209,28 @@ def render_seat_map(
     for i in range(1, max_cols + 1):
         table.add_column(str(i), justify="center")
 
-    for row_no, line in enumerate(rows):
+    for row_no, row in enumerate(layout.grid):
         row_letter = chr(ord("A") + row_no)
-        col_no = 0
-        
+
         # 予約の有無で色分けして表示
         cells: list[str] = [row_letter]
         for x in range(max_cols):
-            ch = line[x] if x < len(line) else " "
-            if ch == "#":
-                col_no += 1
-                seat_id = f"{row_letter}-{col_no}"
-                if seat_id.upper() in reserved_set:
+            ordinal = row[x] if x < len(row) else CELL_EMPTY
+            if ordinal >= 0:
+                seat_id = layout.seat_list[ordinal]
+                if occupancy.is_taken(ordinal):
                     cells.append(f"[red]{seat_id}[/red]")
+                elif held_occupancy.is_taken(ordinal):
+                    cells.append(f"[yellow]{seat_id}[/yellow]")
                 else:
                     cells.append(f"[green]{seat_id}[/green]")
-            elif ch == ".":
-                cells.append(" ")
             else:
                 cells.append(" ")
 
         table.add_row(*cells)
 
-    console.print("[green]緑=空席[/green]  [red]赤=予約済[/red]")
+    legend = "[green]緑=空席[/green]  [red]赤=予約済[/red]"
+    if held_occupancy:
+        legend += "  [yellow]黄=仮押さえ中[/yellow]"
+    console.print(legend)
     console.print(table)
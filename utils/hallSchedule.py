@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass, field
+from typing import Any, Generic, Iterable, Iterator, TypeVar
+
+# ホールごとの上映スケジュール(時間帯)の重なり検索用ユーティリティ
+# - 区間は半開区間 [start, end) として扱う(前の回の終了時刻ちょうどに次の回を始めてもOK)
+# - start/end は datetime でも整数(経過分)でも、比較できれば何でもよい
+
+T = TypeVar("T")
+
+
+@dataclass
+class _HallIntervals(Generic[T]):
+    # 開始時刻順に並べた区間(starts/ends/items は同じ並び)
+    starts: list[Any] = field(default_factory=list)
+    ends: list[Any] = field(default_factory=list)
+    items: list[T] = field(default_factory=list)
+
+    # 先頭から i 番目までの end の最大値(単調増加なので二分探索できる)
+    max_ends: list[Any] = field(default_factory=list)
+
+    # 追加されたが未ソートの区間
+    pending: list[tuple[Any, Any, T]] = field(default_factory=list)
+
+    def build(self) -> None:
+        if not self.pending:
+            return
+        merged = list(zip(self.starts, self.ends, self.items)) + self.pending
+        merged.sort(key=lambda x: (x[0], x[1]))
+        self.pending = []
+
+        self.starts = [s for s, _, _ in merged]
+        self.ends = [e for _, e, _ in merged]
+        self.items = [item for _, _, item in merged]
+
+        self.max_ends = []
+        running = None
+        for e in self.ends:
+            running = e if running is None or e > running else running
+            self.max_ends.append(running)
+
+
+class HallScheduleIndex(Generic[T]):
+    """ホールごとの上映区間を持ち、「[start, end) と重なる上映」を O(log n + k) で返す索引。
+
+    開始時刻でソートした区間と、その end の累積最大値を持っておく(sweep-line)。
+    重なり候補は「end の累積最大値 > start」になる最初の位置から
+    「開始時刻 < end」の最後の位置までなので、両端を二分探索で求めて間だけを見る。
+    同じホール内で区間同士が重ならない(通常のスケジュール)なら、見る範囲はちょうど k 件になる。
+    """
+
+    def __init__(self) -> None:
+        self._halls: dict[str, _HallIntervals[T]] = {}
+
+    def add(self, hall: str, start: Any, end: Any, item: T) -> None:
+        # まとめて追加してから検索する使い方を想定し、ソートは検索時にまとめて行う
+        self._halls.setdefault(hall, _HallIntervals()).pending.append((start, end, item))
+
+    def add_all(self, entries: Iterable[tuple[str, Any, Any, T]]) -> None:
+        for hall, start, end, item in entries:
+            self.add(hall, start, end, item)
+
+    def __len__(self) -> int:
+        return sum(len(h.starts) + len(h.pending) for h in self._halls.values())
+
+    def _hall(self, hall: str) -> _HallIntervals[T] | None:
+        intervals = self._halls.get(hall)
+        if intervals is not None:
+            intervals.build()
+        return intervals
+
+    def overlapping(self, hall: str, start: Any, end: Any) -> list[T]:
+        # [start, end) と重なる区間(既存の start < end かつ 既存の end > start)を開始時刻順で返す
+        intervals = self._hall(hall)
+        if intervals is None:
+            return []
+
+        lo = bisect_right(intervals.max_ends, start)
+        hi = bisect_left(intervals.starts, end)
+        return [intervals.items[i] for i in range(lo, hi) if intervals.ends[i] > start]
+
+    def overlapping_pairs(self, hall: str) -> Iterator[tuple[T, T]]:
+        # ホール内で重なっている区間のペアをすべて返す(入力したスケジュール同士の衝突チェック用)
+        intervals = self._hall(hall)
+        if intervals is None:
+            return
+        starts, ends, items = intervals.starts, intervals.ends, intervals.items
+        n = len(starts)
+        for i in range(n):
+            # 開始時刻順なので、i の終了より前に始まるものだけが i と重なる
+            j = i + 1
+            while j < n and starts[j] < ends[i]:
+                if ends[j] > starts[i]:
+                    yield items[i], items[j]
+                j += 1
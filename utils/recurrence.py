@@ -0,0 +1,150 @@
+from __future__ import annotations
+
+from array import array
+from dataclasses import dataclass, field
+from datetime import date, time
+from typing import Iterable, Mapping
+
+# 繰り返し上映(RRULE のようなルール)の展開
+# - WeeklyRule: n週ごと・曜日ごとの開始時刻。週は開始日から7日ずつ数える(開始日の曜日が週の始まり)
+# - MonthlyRule: nか月ごと・開始日と同じ日付(その日がない月は飛ばす)
+# - exclude: 上映しない日(祝日・休館日など)。parse_dates() で「日付」「期間 a..b」の並びから作れる
+# - 結果は開始時刻の経過分(db.models.to_epoch_min と同じ 1970-01-01 からの分)を昇順に並べた array('q')
+#   (Show.start_at / end_at は EpochMinutes なので、整数のまま INSERT に渡せる。終了は + duration_min)
+#
+# 1日ずつ走査せず、(曜日, 時刻)ごとに「最初の回 + 7*interval 日ずつ」の等差数列として作る
+# numpy があれば配列演算で作る(なくても結果は同じ)
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+HAS_NUMPY = np is not None
+
+MINUTES_PER_DAY = 24 * 60
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+
+def _day_number(d: date) -> int:
+    # 1970-01-01 からの日数
+    return d.toordinal() - _EPOCH_ORDINAL
+
+
+def _minute_of_day(t: time) -> int:
+    return t.hour * 60 + t.minute
+
+
+def _finish(starts: list[int], exclude: frozenset[date]) -> array:
+    # 昇順に並べ、除外日の回を落とす
+    if exclude:
+        skip = {_day_number(d) for d in exclude}
+        starts = [s for s in starts if s // MINUTES_PER_DAY not in skip]
+    return array("q", sorted(starts))
+
+
+def _finish_numpy(starts, exclude: frozenset[date]) -> array:
+    if exclude:
+        skip = np.fromiter((_day_number(d) for d in exclude), dtype=np.int64, count=len(exclude))
+        starts = starts[~np.isin(starts // MINUTES_PER_DAY, skip)]
+    out = array("q")
+    out.frombytes(starts.astype(np.int64).tobytes())
+    return out
+
+
+@dataclass(frozen=True)
+class WeeklyRule:
+    start_date: date
+    end_date: date
+    # 曜日(0=Mon..6=Sun) → 開始時刻
+    times_by_weekday: Mapping[int, Iterable[time]]
+    interval: int = 1
+    exclude: frozenset[date] = field(default_factory=frozenset)
+
+    def _offsets(self) -> list[int]:
+        # 各週(開始日から7日ずつ)の先頭からの分。1週の中に収まるので、週の並びのまま昇順になる
+        first_weekday = self.start_date.weekday()
+        return sorted(
+            ((weekday - first_weekday) % 7) * MINUTES_PER_DAY + _minute_of_day(t)
+            for weekday, times in self.times_by_weekday.items()
+            for t in set(times)
+        )
+
+    def occurrences(self, use_numpy: bool = HAS_NUMPY) -> array:
+        if self.interval < 1:
+            raise ValueError("interval must be >= 1")
+        offsets = self._offsets()
+        first = _day_number(self.start_date) * MINUTES_PER_DAY
+        # 終了日の翌日0:00より前に始まる回まで
+        stop = (_day_number(self.end_date) + 1) * MINUTES_PER_DAY
+        step = 7 * self.interval * MINUTES_PER_DAY
+        if not offsets or first >= stop:
+            return array("q")
+
+        if use_numpy:
+            # (週, 週の中の位置) の表を作って平らにする。週ごとに並べるので並べ替えは要らない
+            weeks = (stop - first + step - 1) // step
+            grid = first + np.arange(weeks, dtype=np.int64)[:, None] * step + np.asarray(offsets, dtype=np.int64)
+            starts = grid.ravel()
+            return _finish_numpy(starts[starts < stop], self.exclude)
+
+        # (曜日, 時刻)ごとの等差数列。range は C で回るので1日ずつ判定するより速い
+        starts: list[int] = []
+        for offset in offsets:
+            starts.extend(range(first + offset, stop, step))
+        return _finish(starts, self.exclude)
+
+
+@dataclass(frozen=True)
+class MonthlyRule:
+    start_date: date
+    end_date: date
+    times: Iterable[time]
+    interval: int = 1
+    exclude: frozenset[date] = field(default_factory=frozenset)
+
+    def occurrences(self, use_numpy: bool = HAS_NUMPY) -> array:
+        if self.interval < 1:
+            raise ValueError("interval must be >= 1")
+        # 月の数は年12回程度なので、月ごとに日付を作る(31日がない月などは飛ばす)
+        minutes = sorted({_minute_of_day(t) for t in self.times})
+        day_of_month = self.start_date.day
+        first_month = self.start_date.year * 12 + self.start_date.month - 1
+        last_month = self.end_date.year * 12 + self.end_date.month - 1
+        days: list[int] = []
+        for month_index in range(first_month, last_month + 1, self.interval):
+            try:
+                d = date(month_index // 12, month_index % 12 + 1, day_of_month)
+            except ValueError:
+                continue
+            if d <= self.end_date:
+                days.append(_day_number(d) * MINUTES_PER_DAY)
+
+        if use_numpy:
+            grid = np.asarray(days, dtype=np.int64)[:, None] + np.asarray(minutes, dtype=np.int64)
+            return _finish_numpy(grid.ravel(), self.exclude)
+        return _finish([d + m for d in days for m in minutes], self.exclude)
+
+
+def parse_dates(text: str) -> frozenset[date]:
+    # "2030-01-01, 2030-02-10..2030-02-15" → 日付の集合(期間は両端を含む)。不正な形式は ValueError
+    result: set[date] = set()
+    for part in text.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        first, sep, last = part.partition("..")
+        start = date.fromisoformat(first.strip())
+        end = date.fromisoformat(last.strip()) if sep else start
+        if end < start:
+            raise ValueError(f"period end is before start: {part}")
+        ordinal = start.toordinal()
+        result.update(date.fromordinal(o) for o in range(ordinal, end.toordinal() + 1))
+    return frozenset(result)
+
+
+def to_datetime64(starts: array):
+    # 経過分の配列 → numpy の datetime64[m](コピーせずに見方だけ変える)。numpy が必要
+    if np is None:
+        raise RuntimeError("numpy is not installed")
+    return np.frombuffer(starts, dtype=np.int64).view("datetime64[m]")
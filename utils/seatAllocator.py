@@ -0,0 +1,144 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from functools import lru_cache
+
+from utils.hallLayout import HallLayout
+from utils.seatOccupancy import SeatOccupancy
+
+# おまかせ座席選択(best available)
+# - 同じ行で連続した空席を探し、ホール中央に近いものを選ぶ
+# - 既定では通路('.')をまたがない。allow_aisle=True なら行内で通路をまたいでもよい
+# - 連続で取れない場合は、取れる一番大きい塊から順に分割して割り当てる(allow_split)
+# - 空席判定はビットマスク(SeatOccupancy)上で行う
+#   座席の通し番号(ordinal)は行内で左から連番なので、
+#   「ordinal o から n 席空いている」= mask の o〜o+n-1 ビットがすべて 0
+
+# 好みの行(前から何割の位置か)。少し後ろ寄りを中央扱いにする
+PREFERRED_ROW_RATIO = 0.6
+
+# 横のずれ1桁に対して、縦のずれ1行をどれだけ重く見るか
+ROW_WEIGHT = 1.5
+
+
+@dataclass(frozen=True)
+class SeatAllocation:
+    seats: list[str]        # 割り当てた座席ID(ブロック順、ブロック内は左から)
+    blocks: int             # 何か所に分かれたか(1なら連続)
+
+    @property
+    def contiguous(self) -> bool:
+        return self.blocks == 1
+
+
+def _free_runs(free: int, count: int) -> int:
+    # free をずらしながら AND → ビット o は「o〜o+count-1 が全部空き」
+    runs = free
+    width = 1
+    while width < count:
+        # 倍々でずらす(count=8 なら 3回)
+        step = min(width, count - width)
+        runs &= runs >> step
+        width += step
+    return runs
+
+
+@lru_cache(maxsize=256)
+def _candidate_order(layout: HallLayout, count: int, allow_aisle: bool) -> tuple[int, ...]:
+    # 行/ブロックをはみ出さない先頭ordinalを、好ましい順(中央に近い順)に並べておく
+    # レイアウトと人数ごとに1回だけ計算する
+    spans = layout.row_spans if allow_aisle else layout.blocks
+    positions = layout.positions
+    width = max((len(r) for r in layout.grid), default=0)
+    center_x = (width - 1) / 2
+    preferred_row = (len(layout.rows) - 1) * PREFERRED_ROW_RATIO
+
+    scored: list[tuple[float, int]] = []
+    for _, first, length in spans:
+        for o in range(first, first + length - count + 1):
+            row, x0 = positions[o]
+            x1 = positions[o + count - 1][1]
+            score = abs((x0 + x1) / 2 - center_x) + ROW_WEIGHT * abs(row - preferred_row)
+            scored.append((score, o))
+    scored.sort()
+    return tuple(o for _, o in scored)
+
+
+@lru_cache(maxsize=256)
+def _start_mask(layout: HallLayout, count: int, allow_aisle: bool) -> int:
+    # 行/ブロックをはみ出さない先頭ordinalのビットを立てたマスク
+    mask = 0
+    for o in _candidate_order(layout, count, allow_aisle):
+        mask |= 1 << o
+    return mask
+
+
+@lru_cache(maxsize=256)
+def max_vacant_without_block(layout: HallLayout, count: int, allow_aisle: bool = False) -> int:
+    # 連続した count 席の空きが1つもないときに、空席が最大いくつあり得るか
+    # (長さ L の並びは count 席ごとに1席埋まっていれば並ばないので L - L // count)
+    # 空席数がこれより多ければ、座席を見なくても count 席並んだ空きが必ずある
+    spans = layout.row_spans if allow_aisle else layout.blocks
+    return sum(length - length // count for _, _, length in spans)
+
+
+def has_block(occupancy: SeatOccupancy, count: int, *, allow_aisle: bool = False) -> bool:
+    # 連続した count 席の空きがあるか(席は選ばない。上映回一覧の絞り込み用)
+    if count <= 0:
+        raise ValueError("count は1以上で指定してください。")
+    if occupancy.vacant_count < count:
+        return False
+    layout = occupancy.layout
+    runs = _free_runs(~occupancy.mask & ((1 << layout.seat_count) - 1), count)
+    return bool(runs & _start_mask(layout, count, allow_aisle))
+
+
+def _best_block(layout: HallLayout, mask: int, count: int, allow_aisle: bool) -> int | None:
+    runs = _free_runs(~mask & ((1 << layout.seat_count) - 1), count)
+    if not runs:
+        return None
+    for o in _candidate_order(layout, count, allow_aisle):
+        if (runs >> o) & 1:
+            return o
+    return None
+
+
+def allocate_seats(
+    occupancy: SeatOccupancy,
+    count: int,
+    *,
+    allow_aisle: bool = False,
+    allow_split: bool = True,
+) -> SeatAllocation | None:
+    # occupancy(予約済み座席)に対して count 席を割り当てる。取れなければ None
+    if count <= 0:
+        raise ValueError("count は1以上で指定してください。")
+    if occupancy.vacant_count < count:
+        return None
+
+    layout = occupancy.layout
+    seat_list = layout.seat_list
+    mask = occupancy.mask
+
+    start = _best_block(layout, mask, count, allow_aisle)
+    if start is not None:
+        return SeatAllocation(seats=list(seat_list[start : start + count]), blocks=1)
+    if not allow_split:
+        return None
+
+    # 分割: 残り枚数以下で取れる一番大きい塊を、中央寄りから順に取っていく
+    seats: list[str] = []
+    blocks = 0
+    remaining = count
+    size = count - 1
+    while remaining > 0:
+        size = min(size, remaining)
+        start = _best_block(layout, mask, size, allow_aisle)
+        if start is None:
+            size -= 1
+            continue
+        seats.extend(seat_list[start : start + size])
+        mask |= ((1 << size) - 1) << start
+        blocks += 1
+        remaining -= size
+    return SeatAllocation(seats=seats, blocks=blocks)
@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Iterable, Iterator
+
+if TYPE_CHECKING:
+    from utils.hallLayout import HallLayout
+
+# 上映回ごとの座席の埋まり具合(ビットマスク)
+# - ホールレイアウトの座席通し番号(ordinal)をビット位置にして、予約済みの席のビットを立てる
+# - 席IDの文字列の集合(1席あたり数十バイト)の代わりに、1席1ビットで持つ
+#   (200席のホールなら int 1個 = 数十バイト、to_bytes() すると25バイト)
+# - 和/差/積は int のビット演算、席数は popcount(int.bit_count) で数える
+
+
+@dataclass(frozen=True)
+class SeatOccupancy:
+    layout: HallLayout
+    mask: int = 0
+
+    @classmethod
+    def empty(cls, layout: HallLayout) -> SeatOccupancy:
+        return cls(layout, 0)
+
+    @classmethod
+    def full(cls, layout: HallLayout) -> SeatOccupancy:
+        return cls(layout, (1 << layout.seat_count) - 1)
+
+    @classmethod
+    def from_seats(cls, layout: HallLayout, seats: Iterable[str]) -> SeatOccupancy:
+        # レイアウトに存在しない席IDは無視する(存在チェックは unknown_seats() で行う)
+        ordinals = layout.ordinals
+        mask = 0
+        for seat in seats:
+            i = ordinals.get(str(seat).strip().upper())
+            if i is not None:
+                mask |= 1 << i
+        return cls(layout, mask)
+
+    @classmethod
+    def from_bytes(cls, layout: HallLayout, data: bytes) -> SeatOccupancy:
+        if len(data) != _byte_length(layout):
+            raise ValueError(f"座席データの長さが不正です: {len(data)} bytes (hall={layout.hall})")
+        mask = int.from_bytes(data, "little")
+        if mask >> layout.seat_count:
+            raise ValueError(f"座席データに存在しない座席が含まれています (hall={layout.hall})")
+        return cls(layout, mask)
+
+    def to_bytes(self) -> bytes:
+        # ordinal 0 が先頭バイトの最下位ビット
+        return self.mask.to_bytes(_byte_length(self.layout), "little")
+
+    # --- 集合演算(同じレイアウト同士のみ) ---
+
+    def _other_mask(self, other: SeatOccupancy) -> int:
+        if other.layout is not self.layout and other.layout.hall != self.layout.hall:
+            raise ValueError(f"異なるホールの座席は比較できません: {self.layout.hall} / {other.layout.hall}")
+        return other.mask
+
+    def __or__(self, other: SeatOccupancy) -> SeatOccupancy:
+        return SeatOccupancy(self.layout, self.mask | self._other_mask(other))
+
+    def __and__(self, other: SeatOccupancy) -> SeatOccupancy:
+        return SeatOccupancy(self.layout, self.mask & self._other_mask(other))
+
+    def __sub__(self, other: SeatOccupancy) -> SeatOccupancy:
+        return SeatOccupancy(self.layout, self.mask & ~self._other_mask(other))
+
+    union = __or__
+    intersection = __and__
+    difference = __sub__
+
+    def vacant(self) -> SeatOccupancy:
+        # 空席側(補集合)
+        return SeatOccupancy(self.layout, ~self.mask & ((1 << self.layout.seat_count) - 1))
+
+    # --- 参照 ---
+
+    def __contains__(self, seat: object) -> bool:
+        i = self.layout.ordinals.get(str(seat).strip().upper())
+        return i is not None and (self.mask >> i) & 1 == 1
+
+    def is_taken(self, ordinal: int) -> bool:
+        return (self.mask >> ordinal) & 1 == 1
+
+    def __len__(self) -> int:
+        return self.mask.bit_count()
+
+    def __bool__(self) -> bool:
+        return self.mask != 0
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.seat_ids())
+
+    @property
+    def count(self) -> int:
+        return self.mask.bit_count()
+
+    @property
+    def vacant_count(self) -> int:
+        return self.layout.seat_count - self.mask.bit_count()
+
+    def ordinals(self) -> list[int]:
+        # 立っているビットの位置を小さい順に返す
+        result: list[int] = []
+        m = self.mask
+        while m:
+            low = m & -m
+            result.append(low.bit_length() - 1)
+            m ^= low
+        return result
+
+    def seat_ids(self) -> list[str]:
+        seat_list = self.layout.seat_list
+        return [seat_list[i] for i in self.ordinals()]
+
+
+def _byte_length(layout: HallLayout) -> int:
+    return (layout.seat_count + 7) // 8
+
+
+# レイアウトに存在しない席IDを入力順で返す
+def unknown_seats(layout: HallLayout, seats: Iterable[str]) -> list[str]:
+    return [s for s in seats if str(s).strip().upper() not in layout.seat_set]